@@ -1,5 +1,5 @@
 import axios from "axios"
-import type { BrandConfig, BrandConfigs, SimulationResponse, MonthlyData, DailyData, BrandSummary } from "@/types/index"
+import type { BrandConfig, BrandConfigs, SimulationResponse, MonthlyData, DailyData, BrandSummary, CompareResponse, PolicyResponse, SensitivityResponse, SimulationPreviewResponse, SimulationStreamMessage, SharedConstraint } from "@/types/index"
 
 export type SimulationRequest = Record<string, BrandConfig> & {
     festival_multipliers?: Record<string, number>
@@ -7,6 +7,13 @@ export type SimulationRequest = Record<string, BrandConfig> & {
     use_historical_data: boolean
     start_day?: number
     end_day?: number
+    include?: string[] // Only compute these response sections (default: all)
+    resolution?: "day" | "week" | "month" // Server-side aggregation for chart series
+    max_points?: number // LTTB downsampling target per brand
+    granularity?: "brand" | "product" | "region" | "retailer" // Per-SKU or per-segment stock simulation rolled up to brands
+    seed?: number // Same request + seed → same result (served from the scenario store)
+    shared_constraint?: SharedConstraint // Couple brands under one capacity / purchasing budget
+    demand_source?: "parameters" | "forecast" | "history" // Per-product forecasts (GET /forecast) or a replay of actual daily sales
     festival_demand?: {
         multipliers: Record<string, number>
         start_day: number
@@ -15,7 +22,48 @@ export type SimulationRequest = Record<string, BrandConfig> & {
     }
 }
 
-export type { BrandConfig, BrandConfigs, SimulationResponse, MonthlyData, DailyData, BrandSummary }
+export type CompareRequest = {
+    baseline: SimulationRequest
+    variants: Record<string, SimulationRequest> // Must share the baseline's date range
+    replications?: number // Shared demand paths (common random numbers), default 30
+    seed?: number
+    confidence?: number // Default 0.95
+}
+
+export type SensitivityRequest = {
+    base: SimulationRequest
+    parameters: { name: string; low: number; high: number }[] // name: "NIKE.reorder_point", "*.demand_multiplier" or "festival.<FESTIVAL_ID>"
+    method?: "morris" | "sobol"
+    trajectories?: number // morris, default 10
+    levels?: number // morris, even, default 4
+    samples?: number // sobol, default 256
+    replications?: number // Default 1
+    seed?: number
+    metrics?: string[]
+}
+
+export type InventoryPolicy = {
+    type: "s_S" | "R_Q" | "order_up_to" | "base_stock"
+    name?: string
+    reorder_point?: number // s (s_S) or R (R_Q)
+    order_up_to?: number // S (s_S, order_up_to, base_stock)
+    order_quantity?: number // Q (R_Q)
+    review_period?: number // T days (order_up_to)
+    initial_stock?: number
+}
+
+export type PolicyRequest = {
+    base?: SimulationRequest // Date range, festivals, demand/lead time per brand
+    policies: Record<string, InventoryPolicy[]> // Brand -> policies to benchmark
+    replications?: number // Shared demand paths, default 30
+    seed?: number
+    confidence?: number // Default 0.95
+    holding_cost?: number // Per unit per day
+    order_cost?: number // Per order
+    lost_sale_cost?: number // Per unit of lost sales
+}
+
+export type { BrandConfig, BrandConfigs, SimulationResponse, MonthlyData, DailyData, BrandSummary, CompareResponse, PolicyResponse, SensitivityResponse, SimulationPreviewResponse, SimulationStreamMessage }
 
 // Create axios instance with base configuration
 const apiClient = axios.create({
@@ -76,6 +124,78 @@ export async function runSimulation(config: SimulationRequest): Promise<Simulati
     }
 }
 
+// Run a simulation over the WebSocket endpoint; month-end aggregates arrive via onMessage
+// before the final "result". Returns a function that cancels the run.
+export function streamSimulation(
+    request: SimulationRequest,
+    onMessage: (message: SimulationStreamMessage) => void,
+): () => void {
+    const url = `${String(apiClient.defaults.baseURL).replace(/^http/, "ws")}/ws/simulate`
+    const socket = new WebSocket(url)
+    socket.onopen = () => socket.send(JSON.stringify(request))
+    socket.onmessage = (event) => onMessage(JSON.parse(event.data) as SimulationStreamMessage)
+    socket.onerror = () => onMessage({ type: "error", status: 0, detail: "WebSocket connection failed" })
+    return () => {
+        if (socket.readyState === WebSocket.OPEN) {
+            socket.send(JSON.stringify({ type: "cancel" }))
+        }
+        socket.close()
+    }
+}
+
+// Instant surrogate estimate of per-brand summary metrics (for slider feedback)
+export async function previewSimulation(request: SimulationRequest): Promise<SimulationPreviewResponse> {
+    try {
+        const response = await apiClient.post<SimulationPreviewResponse>("/simulate/preview", request)
+        return response.data
+    } catch (error) {
+        if (axios.isAxiosError(error)) {
+            const errorMessage = error.response?.data?.detail || error.message
+            throw new Error(`API request failed: ${errorMessage}`)
+        }
+        throw new Error(`Unexpected error: ${error}`)
+    }
+}
+
+export async function compareScenarios(request: CompareRequest): Promise<CompareResponse> {
+    try {
+        const response = await apiClient.post<CompareResponse>("/compare", request)
+        return response.data
+    } catch (error) {
+        if (axios.isAxiosError(error)) {
+            const errorMessage = error.response?.data?.detail || error.message
+            throw new Error(`API request failed: ${errorMessage}`)
+        }
+        throw new Error(`Unexpected error: ${error}`)
+    }
+}
+
+export async function runSensitivity(request: SensitivityRequest): Promise<SensitivityResponse> {
+    try {
+        const response = await apiClient.post<SensitivityResponse>("/sensitivity", request)
+        return response.data
+    } catch (error) {
+        if (axios.isAxiosError(error)) {
+            const errorMessage = error.response?.data?.detail || error.message
+            throw new Error(`API request failed: ${errorMessage}`)
+        }
+        throw new Error(`Unexpected error: ${error}`)
+    }
+}
+
+export async function comparePolicies(request: PolicyRequest): Promise<PolicyResponse> {
+    try {
+        const response = await apiClient.post<PolicyResponse>("/policies", request)
+        return response.data
+    } catch (error) {
+        if (axios.isAxiosError(error)) {
+            const errorMessage = error.response?.data?.detail || error.message
+            throw new Error(`API request failed: ${errorMessage}`)
+        }
+        throw new Error(`Unexpected error: ${error}`)
+    }
+}
+
 // Transform monthly data from API to chart format
 export function transformMonthlyDataForChart(monthlyData: MonthlyData[]) {
     const months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
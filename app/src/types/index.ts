@@ -6,6 +6,9 @@ export type BrandConfig = {
     reorder_quantity: number // Added reorder_quantity field
     demand_multiplier: number
     enable_reorder: boolean // Added enable_reorder flag to control reorder functionality
+    lead_time_days?: number // Supplier lead time (0 = same-day arrival)
+    lead_time_distribution?: "fixed" | "uniform" | "poisson"
+    lead_time_spread?: number // uniform: lead_time_days ± spread
 }
 
 export type BrandConfigs = Record<string, BrandConfig>
@@ -45,6 +48,8 @@ export type RestockEvent = {
     stock_before: number
     stock_after: number
     type: "periodic" | "reorder" // Added type field to distinguish restock types
+    order_day?: number
+    arrival_day?: number
 }
 
 export type ReorderPointEvent = {
@@ -54,6 +59,7 @@ export type ReorderPointEvent = {
     reorder_point: number
     reorder_quantity: number
     triggered: boolean
+    on_order?: number
 }
 
 export type FestivalEvent = {
@@ -84,6 +90,7 @@ export type BrandSummary = {
     final_stock: number
     lost_sales_rate: number
     avg_price: number
+    longest_stockout_streak?: number
 }
 
 export type BestSellingProduct = {
@@ -136,6 +143,68 @@ export type ProductTrendEvent = {
     reason: string
 }
 
+export type SeriesPoint = {
+    brand: string
+    day: number
+    date: string
+    days: number
+    demand: number
+    sales: number
+    revenue: number
+    lost_sales: number
+    stockout_days: number
+    avg_stock: number
+    stock_after: number
+}
+
+export type ProductSummary = {
+    brand: string
+    product: string
+    demand_share: number
+    total_demand: number
+    total_units_sold: number
+    total_lost_sales: number
+    lost_sales_rate: number
+    stockout_days: number
+    total_revenue: number
+    final_stock: number
+}
+
+export type SegmentSummary = {
+    brand: string
+    dimension: "region" | "retailer"
+    segment: string
+    demand_share: number
+    total_demand: number
+    total_units_sold: number
+    total_lost_sales: number
+    lost_sales_rate: number
+    stockout_days: number
+    total_revenue: number
+    final_stock: number
+    avg_stock: number
+}
+
+export type SharedConstraint = {
+    kind?: "capacity" | "budget" // capacity: stock + on order across brands ≤ limit; budget: order value ≤ limit per period_days
+    limit: number
+    period_days?: number
+    rule?: "priority" | "proportional" | "greedy"
+    priorities?: Record<string, number> // Lower = served first
+    unit_cost_ratio?: number // Unit cost = average selling price × ratio
+}
+
+export type AllocationSummary = {
+    brand: string
+    constraint: "capacity" | "budget"
+    rule: "priority" | "proportional" | "greedy"
+    requested_units: number
+    granted_units: number
+    fill_rate: number
+    constrained_days: number
+    spend: number
+}
+
 export type SimulationResponse = {
     daily_data: DailyData[]
     monthly_data: MonthlyData[]
@@ -150,6 +219,126 @@ export type SimulationResponse = {
     trend_events: TrendEvent[] // Added trend_events for brand-level trend changes
     product_monthly_trends: ProductMonthlyTrend[] // Added product_monthly_trends
     product_trend_events: ProductTrendEvent[] // Added product_trend_events
+    series?: SeriesPoint[] // Server-aggregated chart series (when resolution / max_points is sent)
+    product_summary?: ProductSummary[] // Per-product results (granularity "product")
+    segment_summary?: SegmentSummary[] // Per-region / per-retailer results (granularity "region" | "retailer")
+    allocation_summary?: AllocationSummary[] // Orders granted under shared_constraint
+    scenario_id?: string | null // Stored result id (GET /scenarios/{id})
+    seed?: number | null // Seed actually used for this run
+    cached?: boolean // true when served from the scenario store
+}
+
+export type MonthUpdate = {
+    type: "month"
+    brand: string
+    month: number
+    date: string // Last simulated day of the month
+    days_done: number
+    simulation_days: number
+    sales: number
+    baseline_units: number
+    growth_vs_baseline: number
+    mom_growth?: number | null
+    seasonality_factor: number
+    trend: string
+    trend_score: number
+}
+
+export type SimulationStreamMessage =
+    | { type: "started"; seed: number; simulation_days: number }
+    | MonthUpdate
+    | { type: "result"; data: SimulationResponse }
+    | { type: "cancelled"; day: number; reason: string }
+    | { type: "error"; status: number; detail: unknown }
+
+export type BrandPreview = {
+    brand: string
+    total_units_sold: number
+    total_revenue: number
+    total_lost_sales: number
+    lost_sales_rate: number
+    stockout_days: number
+    avg_stock: number
+    final_stock: number
+    restock_count: number
+    r2: Record<string, number> // Holdout R² per model target
+    samples: number
+}
+
+export type SimulationPreviewResponse = {
+    data_version?: string | null
+    trained_at?: string | null
+    brands: BrandPreview[]
+}
+
+export type MetricDelta = {
+    variant: string
+    brand: string // "ALL" = all brands combined
+    metric: string
+    baseline_mean: number
+    variant_mean: number
+    delta_mean: number // variant - baseline
+    delta_ci_low: number
+    delta_ci_high: number
+    relative_delta?: number | null
+    significant: boolean // confidence interval excludes 0
+    variance_reduction?: number | null
+}
+
+export type CompareResponse = {
+    seed: number
+    replications: number
+    confidence: number
+    simulation_days: number
+    brands: string[]
+    variants: string[]
+    deltas: MetricDelta[]
+}
+
+export type SensitivityIndex = {
+    brand: string // "ALL" = all brands combined
+    metric: string
+    parameter: string
+    mu?: number | null // morris
+    mu_star?: number | null
+    sigma?: number | null
+    s1?: number | null // sobol
+    s1_conf?: number | null
+    st?: number | null
+    st_conf?: number | null
+}
+
+export type SensitivityResponse = {
+    method: "morris" | "sobol"
+    seed: number
+    replications: number
+    evaluations: number
+    simulation_days: number
+    parameters: string[]
+    brands: string[]
+    indices: SensitivityIndex[]
+}
+
+export type PolicyMetric = {
+    mean: number
+    ci_low: number
+    ci_high: number
+}
+
+export type PolicyResult = {
+    brand: string
+    policy: string
+    type: string
+    rank: number // 1 = lowest mean total_cost for the brand
+    metrics: Record<string, PolicyMetric>
+}
+
+export type PolicyResponse = {
+    seed: number
+    replications: number
+    confidence: number
+    simulation_days: number
+    results: PolicyResult[]
 }
 
 export type BrandParameters = {
@@ -0,0 +1,375 @@
+"""Load test ของ API: สตาร์ท app (uvicorn) บนเครื่อง แล้วยิง traffic ผสมตามอัตราที่กำหนด
+
+    python loadtest.py --rate 4 --duration 60
+    python loadtest.py --rate 10 --duration 120 --workers 4 --mix mix.json --json result.json
+    python loadtest.py --url http://localhost:8000 --rate 2       # ยิง server ที่รันอยู่แล้ว (ไม่วัด RSS)
+
+traffic เป็น open loop: ตารางเวลาของทุก request (Poisson หรือคงที่) และ payload สร้างล่วงหน้าจาก --seed
+จึงได้ชุด request เดิมทุกครั้ง latency นับจากเวลาที่ request ควรถูกส่งตามตาราง (ไม่ใช่ตอนที่ส่งได้จริง)
+server ที่ช้าจึงเห็นเป็น latency ที่สูงขึ้น ไม่ใช่อัตราที่ลดลง (ไม่มี coordinated omission)
+
+mix (ไฟล์ JSON ทับค่าใน DEFAULT_MIX ทีละ key):
+  simulate.weight            สัดส่วนของ POST /simulate
+  simulate.horizons          simulation_days ที่สุ่มเลือก
+  simulate.brand_counts      จำนวนแบรนด์ที่ส่ง BrandConfig ของตัวเอง (ที่เหลือใช้ค่าเริ่มต้น — ทุกแบรนด์ถูกจำลองเสมอ)
+  simulate.festival_override สัดส่วนของ request ที่ override ตัวคูณเทศกาล
+  simulate.includes          ตัวเลือกของ include (null = ทุก section)
+  simulate.repeat            สัดส่วนที่ส่ง payload ซ้ำกับที่เคยส่ง (seed เดิม → scenario store hit)
+  reference.weight / paths   สัดส่วนและ endpoint อ้างอิงที่ยิง (GET)
+
+รายงาน p50/p95/p99 latency, throughput และ RSS (รวมทุก process ของ server) แยกตามชนิด request
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from utils.constants import FESTIVALS
+
+DEFAULT_MIX: Dict[str, Dict[str, Any]] = {
+    "simulate": {
+        "weight": 0.6,
+        "horizons": [30, 90, 180, 365],
+        "brand_counts": [0, 1, 2, 4],
+        "festival_override": 0.3,
+        "includes": [None, ["summary", "monthly_data"], ["summary", "daily_data"]],
+        "repeat": 0.2,
+    },
+    "reference": {
+        "weight": 0.4,
+        "paths": ["/brand-params", "/seasons-festivals", "/available-brands"],
+    },
+}
+
+LOAD_BRANDS = ["NIKE", "ADIDAS", "PUMA", "H_M"]
+READY_TIMEOUT_SECONDS = 120
+
+
+# -----------------------------
+# Traffic schedule
+# -----------------------------
+def load_mix(path: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    mix = {name: dict(section) for name, section in DEFAULT_MIX.items()}
+    if path:
+        with open(path) as f:
+            for name, section in json.load(f).items():
+                mix.setdefault(name, {}).update(section)
+    return mix
+
+
+def _simulate_payload(mix: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "simulation_days": rng.choice(mix["horizons"]),
+        "start_day": rng.randrange(0, 365),
+        "seed": rng.getrandbits(31),
+    }
+    for brand in rng.sample(LOAD_BRANDS, min(rng.choice(mix["brand_counts"]), len(LOAD_BRANDS))):
+        payload[brand] = {
+            "demand_multiplier": round(rng.uniform(0.7, 1.5), 2),
+            "lead_time_days": rng.choice([0, 0, 2, 5]),
+            "enable_reorder": rng.random() < 0.8,
+        }
+    if rng.random() < mix["festival_override"]:
+        festivals = rng.sample(sorted(FESTIVALS), rng.randint(1, 4))
+        payload["festival_demand"] = {
+            "multipliers": {fid: round(rng.uniform(1.0, 2.5), 2) for fid in festivals},
+            "start_day": payload["start_day"],
+            "end_day": payload["start_day"] + payload["simulation_days"] - 1,
+            "total_days": payload["simulation_days"],
+        }
+    include = rng.choice(mix["includes"])
+    if include is not None:
+        payload["include"] = include
+    return payload
+
+
+def build_schedule(
+    mix: Dict[str, Dict[str, Any]], rate: float, duration: float, seed: int, arrival: str = "poisson"
+) -> List[Tuple[float, str, str, str, Optional[bytes]]]:
+    """[(เวลาที่ต้องส่ง (วินาที), ชนิด, method, path, body)] ทั้งหมดของการทดสอบ"""
+    rng = random.Random(seed)
+    kinds = [name for name in ("simulate", "reference") if mix[name]["weight"] > 0]
+    weights = [mix[name]["weight"] for name in kinds]
+    sent: List[bytes] = []
+    schedule = []
+    t = 0.0
+    while True:
+        t += rng.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+        if t >= duration:
+            return schedule
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "reference":
+            schedule.append((t, kind, "GET", rng.choice(mix["reference"]["paths"]), None))
+            continue
+        if sent and rng.random() < mix["simulate"]["repeat"]:
+            body = rng.choice(sent)
+        else:
+            body = json.dumps(_simulate_payload(mix["simulate"], rng)).encode()
+            sent.append(body)
+        schedule.append((t, kind, "POST", "/simulate", body))
+
+
+# -----------------------------
+# Server process + RSS
+# -----------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _process_tree(pid: int) -> List[int]:
+    """pid และ process ลูกหลานทั้งหมด (uvicorn workers, process pool) จาก /proc"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        p = stack.pop()
+        tree.append(p)
+        stack.extend(children.get(p, []))
+    return tree
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """RSS รวมของ pid และลูกหลาน (MB) — None ถ้าอ่าน /proc ไม่ได้ (ไม่ใช่ Linux)"""
+    if not os.path.isdir("/proc"):
+        return None
+    total = 0
+    for p in _process_tree(pid):
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total / 1024
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            value = rss_mb(self.pid)
+            if value is not None:
+                self.samples.append(value)
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def start_server(port: int, workers: int, log_path: Optional[str]) -> subprocess.Popen:
+    log = open(log_path, "w") if log_path else subprocess.DEVNULL
+    cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(url: str, server: Optional[subprocess.Popen], timeout: float = READY_TIMEOUT_SECONDS) -> None:
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+            conn.request("GET", "/ready")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server not ready after {timeout:.0f}s")
+
+
+# -----------------------------
+# Load generation
+# -----------------------------
+class Client:
+    """HTTP keep-alive หนึ่ง connection ต่อ thread"""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.host, self.port, self.timeout = parts.hostname, parts.port or 80, timeout
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body: Optional[bytes]) -> Tuple[int, int]:
+        """(status, bytes ของ body) — status 0 = connection ล้มเหลว/timeout"""
+        headers = {"Accept-Encoding": "gzip"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                return response.status, len(response.read())
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                self._local.conn = None
+                if attempt:  # connection keep-alive ที่ server ปิดไปแล้ว ลองใหม่ครั้งเดียว
+                    return 0, 0
+        return 0, 0
+
+
+def run_load(
+    url: str, schedule: List[Tuple[float, str, str, str, Optional[bytes]]], concurrency: int, timeout: float
+) -> Tuple[List[Dict[str, Any]], float]:
+    client = Client(url, timeout)
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def fire(offset: float, kind: str, method: str, path: str, body: Optional[bytes]) -> None:
+        status, size = client.request(method, path, body)
+        done = time.perf_counter() - start
+        with lock:
+            results.append({
+                "kind": kind, "path": path, "status": status, "bytes": size,
+                "scheduled": offset, "latency": done - offset,
+            })
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for entry in schedule:
+            delay = entry[0] - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, *entry)
+    return results, time.perf_counter() - start
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def summarize(results: List[Dict[str, Any]], elapsed: float, warmup: float) -> Dict[str, Any]:
+    measured = [r for r in results if r["scheduled"] >= warmup]
+    window = max(elapsed - warmup, 1e-9)
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for r in measured:
+        groups.setdefault(r["kind"], []).append(r)
+        groups.setdefault(f"{r['kind']} {r['path']}", []).append(r)
+
+    report = {}
+    for name, rows in [("all", measured)] + sorted(groups.items()):
+        ok = [r["latency"] for r in rows if 200 <= r["status"] < 400]
+        latency = np.array(ok) * 1000 if ok else np.zeros(1)
+        report[name] = {
+            "requests": len(rows),
+            "errors": len(rows) - len(ok),
+            "throughput_rps": len(ok) / window,
+            "p50_ms": float(np.percentile(latency, 50)),
+            "p95_ms": float(np.percentile(latency, 95)),
+            "p99_ms": float(np.percentile(latency, 99)),
+            "max_ms": float(latency.max()),
+            "mean_kb": float(np.mean([r["bytes"] for r in rows]) / 1024) if rows else 0.0,
+        }
+    return report
+
+
+def print_report(report: Dict[str, Any], rss: List[float], target_rate: float) -> None:
+    print(f"\n📊 Load test (target {target_rate:g} req/s)")
+    print(f"{'':34} {'req':>6} {'err':>5} {'rps':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'KB':>8}")
+    for name, row in report.items():
+        print(
+            f"{name:34} {row['requests']:6d} {row['errors']:5d} {row['throughput_rps']:7.2f} "
+            f"{row['p50_ms']:9.1f} {row['p95_ms']:9.1f} {row['p99_ms']:9.1f} {row['max_ms']:9.1f} {row['mean_kb']:8.1f}"
+        )
+    if rss:
+        print(f"🧠 RSS: start {rss[0]:.0f} MB, peak {max(rss):.0f} MB, end {rss[-1]:.0f} MB")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test ของ Inventory Simulation API")
+    parser.add_argument("--url", help="ยิง server ที่รันอยู่แล้ว (ไม่ระบุ = สตาร์ท uvicorn เองบน port ว่าง)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn --workers ของ server ที่สตาร์ทเอง")
+    parser.add_argument("--rate", type=float, default=2.0, help="request ต่อวินาทีที่ต้องการ")
+    parser.add_argument("--duration", type=float, default=30.0, help="ระยะเวลาที่ส่ง request (วินาที)")
+    parser.add_argument("--warmup", type=float, default=0.0, help="ไม่นับ request ที่ถูกส่งในกี่วินาทีแรก")
+    parser.add_argument("--arrival", choices=["poisson", "constant"], default="poisson")
+    parser.add_argument("--mix", help="ไฟล์ JSON ทับค่า DEFAULT_MIX")
+    parser.add_argument("--seed", type=int, default=0, help="seed ของตารางเวลาและ payload")
+    parser.add_argument("--concurrency", type=int, default=64, help="request ค้างพร้อมกันสูงสุดฝั่ง client")
+    parser.add_argument("--timeout", type=float, default=120.0, help="timeout ต่อ request (วินาที)")
+    parser.add_argument("--server-log", help="เก็บ stdout/stderr ของ server ที่สตาร์ทเอง")
+    parser.add_argument("--json", help="เขียนผลเป็น JSON (ใช้เทียบระหว่าง run)")
+    args = parser.parse_args(argv)
+
+    mix = load_mix(args.mix)
+    schedule = build_schedule(mix, args.rate, args.duration, args.seed, args.arrival)
+    print(f"🧪 {len(schedule)} requests over {args.duration:g}s (seed {args.seed})")
+
+    server = None
+    url = args.url
+    if url is None:
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = start_server(port, args.workers, args.server_log)
+        print(f"🚀 Starting server at {url} ({args.workers} worker(s))")
+    sampler = None
+    try:
+        t0 = time.perf_counter()
+        wait_ready(url, server)
+        print(f"✅ Ready after {time.perf_counter() - t0:.1f}s")
+        if server is not None:
+            sampler = RssSampler(server.pid)
+            sampler.start()
+        results, elapsed = run_load(url, schedule, args.concurrency, args.timeout)
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    report = summarize(results, elapsed, args.warmup)
+    rss = sampler.samples if sampler is not None else []
+    print_report(report, rss, args.rate)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "args": vars(args),
+                "mix": mix,
+                "elapsed_seconds": elapsed,
+                "report": report,
+                "rss_mb": {"start": rss[0], "peak": max(rss), "end": rss[-1]} if rss else None,
+            }, f, indent=2)
+    return 1 if report["all"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
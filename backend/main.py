@@ -1,9 +1,16 @@
+import logging
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
+from fastapi.middleware.gzip import GZipMiddleware
+
+from services import startup
+from routers import experiments, forecast, history, root, scenarios, simulation
 
-from routers import root, simulation
-from services.data_service import init_data
+# LOG_LEVEL=DEBUG เพื่อดูรายละเอียดการคำนวณพารามิเตอร์แบรนด์
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(message)s")
+startup.mark("app modules imported")
 
 app = FastAPI(title="Inventory Simulation API")
 
@@ -16,16 +23,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# บีบอัด response ใหญ่ (เช่น /simulate) ตาม Accept-Encoding — endpoint อ้างอิงบีบอัดไว้แล้วจึงถูกข้าม
+# COMPRESS_MIN_BYTES: ขนาด body ขั้นต่ำที่จะบีบอัด, COMPRESS_LEVEL: ระดับ gzip (ต่ำ = เร็ว)
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=int(os.getenv("COMPRESS_MIN_BYTES", "4096")),
+    compresslevel=int(os.getenv("COMPRESS_LEVEL", "5")),
+)
+
 # Include routers
 app.include_router(root.router)
 app.include_router(simulation.router)
+app.include_router(scenarios.router)
+app.include_router(experiments.router)
+app.include_router(history.router)
+app.include_router(forecast.router)
 
-# Initialize data on startup
+# โหลดข้อมูลเบื้องหลัง: /health ตอบได้ทันที, /ready เป็น 200 เมื่อโหลดเสร็จ
 @app.on_event("startup")
 async def startup_event():
-    init_data()
+    startup.mark("server started")
+    startup.start_warm_up()
 
 if __name__ == "__main__":
+    import uvicorn
+
     print("🚀 Starting Inventory Simulation API with Season & Festival Analysis...")
     print("📍 API will be available at: http://localhost:8000")
     print("📖 API docs available at: http://localhost:8000/docs")
@@ -13,6 +13,10 @@ class BrandConfig(BaseModel):
     reorder_point: Optional[int] = None
     demand_multiplier: Optional[float] = 1.0
     enable_reorder: Optional[bool] = True  # Enable immediate restock on reorder point trigger
+    # Lead time ของซัพพลายเออร์ (วัน) — 0 = ของเข้าภายในวันที่สั่ง
+    lead_time_days: Optional[int] = 0
+    lead_time_distribution: Optional[str] = "fixed"  # "fixed" | "uniform" | "poisson"
+    lead_time_spread: Optional[int] = 0  # uniform: lead_time_days ± spread
 
 class FestivalDemand(BaseModel):
     multipliers: Dict[str, float]
@@ -20,6 +24,16 @@ class FestivalDemand(BaseModel):
     end_day: int
     total_days: int
 
+class SharedConstraint(BaseModel):
+    # ข้อจำกัดร่วมทุกแบรนด์ — order ที่แข่งกันในวันเดียวกันถูกแบ่งตาม rule
+    kind: Optional[str] = "capacity"             # "capacity" = สต็อก + ของที่สั่งแล้วรวมทุกแบรนด์ ≤ limit (ชิ้น)
+                                                 # "budget" = มูลค่าที่สั่ง ≤ limit ต่อ period_days วัน
+    limit: float
+    period_days: Optional[int] = 30              # รอบงบ (budget เท่านั้น, งบที่เหลือไม่สะสม)
+    rule: Optional[str] = "proportional"         # "priority" | "proportional" | "greedy"
+    priorities: Optional[Dict[str, int]] = None  # แบรนด์ → ลำดับ (น้อย = ได้ก่อน) สำหรับ priority / ตัดสินเสมอของ greedy
+    unit_cost_ratio: Optional[float] = 1.0       # ต้นทุนต่อหน่วย = ราคาขายเฉลี่ย × ratio
+
 class SimulationRequest(BaseModel):
     NIKE: Optional[BrandConfig] = None
     ADIDAS: Optional[BrandConfig] = None
@@ -30,6 +44,21 @@ class SimulationRequest(BaseModel):
     festival_demand: Optional[FestivalDemand] = None
     start_day: Optional[int] = 0  # 0-indexed day of year
     end_day: Optional[int] = None
+    # เลือกเฉพาะ section ของ response ที่ต้องการ (None = ทั้งหมด) เช่น ["summary", "monthly_data"]
+    include: Optional[List[str]] = None
+    # series สำหรับกราฟ: รวมรายวันเป็น "day" | "week" | "month" และ downsample (LTTB) ไม่เกิน max_points จุดต่อแบรนด์
+    resolution: Optional[str] = None
+    max_points: Optional[int] = None
+    # "brand" = สต็อกรวมต่อแบรนด์ (SimPy), "product" = สต็อกต่อสินค้า (vectorized) แล้ว rollup เป็นแบรนด์
+    # "region" / "retailer" = สต็อกแยกต่อ segment (พารามิเตอร์ fit ต่อ segment) แล้ว rollup เป็นแบรนด์
+    granularity: Optional[str] = "brand"
+    # seed ของการสุ่ม: ส่ง seed เดิม + request เดิม → ได้ผลเดิม (และใช้ผลจาก scenario store ซ้ำได้)
+    seed: Optional[int] = None
+    # ข้อจำกัดร่วม (ความจุคลัง / งบจัดซื้อ) ข้ามแบรนด์ — None = แต่ละแบรนด์จำลองอิสระ
+    shared_constraint: Optional[SharedConstraint] = None
+    # "parameters" = ความต้องการจากพารามิเตอร์ของแบรนด์, "forecast" = จากพยากรณ์ต่อสินค้า (GET /forecast),
+    # "history" = replay ยอดขายจริงรายวัน (start_day นับจากวันแรกของ historical data)
+    demand_source: Optional[str] = "parameters"
 
 # -----------------------------
 # Core data rows
@@ -53,6 +82,19 @@ class DailyData(BaseModel):
     festival: Optional[str] = None
     festival_multiplier: float
 
+class SeriesPoint(BaseModel):
+    brand: str
+    day: int                           # วันแรกของช่วง (หรือวันที่ถูกเลือกจาก LTTB)
+    date: str
+    days: int                          # จำนวนวันที่รวมในจุดนี้
+    demand: int
+    sales: int
+    revenue: float
+    lost_sales: int
+    stockout_days: int
+    avg_stock: float
+    stock_after: int                   # สต็อกปิดช่วง
+
 class MonthlyData(BaseModel):
     month: int
     brand: str
@@ -68,6 +110,8 @@ class RestockEvent(BaseModel):
     stock_before: int
     stock_after: int
     type: str  # "periodic" | "reorder"
+    order_day: Optional[int] = None    # วันที่สั่ง
+    arrival_day: Optional[int] = None  # วันที่ของเข้า (= day)
 
 class ReorderPointEvent(BaseModel):
     day: int
@@ -76,6 +120,7 @@ class ReorderPointEvent(BaseModel):
     reorder_point: int
     reorder_quantity: int
     triggered: bool
+    on_order: int = 0  # จำนวนที่สั่งแล้วแต่ยังไม่เข้า (ตอนตรวจ reorder point)
 
 class FestivalEvent(BaseModel):
     day: int
@@ -104,6 +149,43 @@ class BrandSummary(BaseModel):
     lost_sales_rate: float
     total_lost_sales: int
     avg_price: float
+    longest_stockout_streak: int = 0
+
+class ProductSummary(BaseModel):
+    brand: str
+    product: str
+    demand_share: float
+    total_demand: int
+    total_units_sold: int
+    total_lost_sales: int
+    lost_sales_rate: float
+    stockout_days: int
+    total_revenue: float
+    final_stock: int
+
+class SegmentSummary(BaseModel):
+    brand: str
+    dimension: str                               # region | retailer
+    segment: str
+    demand_share: float
+    total_demand: int
+    total_units_sold: int
+    total_lost_sales: int
+    lost_sales_rate: float
+    stockout_days: int
+    total_revenue: float
+    final_stock: int
+    avg_stock: float
+
+class AllocationSummary(BaseModel):
+    brand: str
+    constraint: str                              # capacity | budget
+    rule: str
+    requested_units: int
+    granted_units: int
+    fill_rate: float                             # % ของที่ขอที่ได้รับ
+    constrained_days: int                        # วันที่ order ของแบรนด์ถูกตัด
+    spend: float
 
 # -----------------------------
 # Trend models (brand-level)
@@ -158,14 +240,15 @@ class ProductTrendEvent(BaseModel):
 # -----------------------------
 
 class SimulationResponse(BaseModel):
-    daily_data: List[DailyData]
-    monthly_data: List[MonthlyData]
-    restock_events: List[RestockEvent]
-    reorder_point_events: List[ReorderPointEvent]
-    festival_events: List[FestivalEvent]
-    season_events: List[SeasonEvent]
-    summary: List[BrandSummary]
-    best_selling_products: List[Dict[str, Any]]
+    # section ที่ไม่ได้ขอผ่าน include จะเป็น list ว่าง
+    daily_data: List[DailyData] = []
+    monthly_data: List[MonthlyData] = []
+    restock_events: List[RestockEvent] = []
+    reorder_point_events: List[ReorderPointEvent] = []
+    festival_events: List[FestivalEvent] = []
+    season_events: List[SeasonEvent] = []
+    summary: List[BrandSummary] = []
+    best_selling_products: List[Dict[str, Any]] = []
     simulation_days: int
 
     # Trend (brand)
@@ -176,6 +259,278 @@ class SimulationResponse(BaseModel):
     product_monthly_trends: List[MonthlyProductTrend] = []
     product_trend_events: List[ProductTrendEvent] = []
 
+    # Series สำหรับกราฟ (เมื่อส่ง resolution / max_points หรือขอ "series")
+    series: List[SeriesPoint] = []
+
+    # สรุประดับสินค้า (granularity="product" และขอ "product_summary")
+    product_summary: List[ProductSummary] = []
+
+    # สรุประดับ segment (granularity="region" / "retailer" และขอ "segment_summary")
+    segment_summary: List[SegmentSummary] = []
+
+    # การแบ่ง order ใต้ข้อจำกัดร่วม (ส่ง shared_constraint)
+    allocation_summary: List[AllocationSummary] = []
+
+    # demand_source "history": แบรนด์ที่ไม่มียอดขายจริงในช่วงนั้น → ใช้ความต้องการจากพารามิเตอร์แทน
+    history_fallback_brands: List[str] = []
+
+    # Scenario store: id สำหรับเรียกดูซ้ำที่ /scenarios/{id}, seed ที่ใช้จริง, cached = ใช้ผลที่เก็บไว้
+    scenario_id: Optional[str] = None
+    seed: Optional[int] = None
+    cached: bool = False
+
+# -----------------------------
+# Scenario comparison (common random numbers)
+# -----------------------------
+
+class CompareRequest(BaseModel):
+    baseline: SimulationRequest
+    variants: Dict[str, SimulationRequest]       # ชื่อ variant → request (ช่วงวันที่ต้องเท่ากับ baseline)
+    replications: Optional[int] = 30             # จำนวน demand path ที่ทุก scenario ใช้ร่วมกัน
+    seed: Optional[int] = None                   # replication r ใช้ seed + r (r=0 ตรงกับ /simulate ที่ seed เดียวกัน)
+    confidence: Optional[float] = 0.95
+
+class MetricDelta(BaseModel):
+    variant: str
+    brand: str                                   # "ALL" = รวมทุกแบรนด์
+    metric: str
+    baseline_mean: float
+    variant_mean: float
+    delta_mean: float                            # variant - baseline (เฉลี่ยต่อ replication)
+    delta_ci_low: float
+    delta_ci_high: float
+    relative_delta: Optional[float] = None       # delta_mean / baseline_mean
+    significant: bool                            # ช่วงความเชื่อมั่นไม่ครอบ 0
+    variance_reduction: Optional[float] = None   # Var(indep. diff) / Var(CRN diff) โดยประมาณ
+
+class CompareResponse(BaseModel):
+    seed: int
+    replications: int
+    confidence: float
+    simulation_days: int
+    brands: List[str]
+    variants: List[str]
+    deltas: List[MetricDelta]
+
+# -----------------------------
+# Instant preview (surrogate)
+# -----------------------------
+
+class BrandPreview(BaseModel):
+    brand: str
+    total_units_sold: float
+    total_revenue: float
+    total_lost_sales: float
+    lost_sales_rate: float
+    stockout_days: float
+    avg_stock: float
+    final_stock: float
+    restock_count: float
+    r2: Dict[str, float]                         # holdout R² ต่อ target ของ model (ใกล้ 1 = แม่น)
+    samples: int                                 # จำนวนตัวอย่างที่ใช้ train
+
+class SimulationPreviewResponse(BaseModel):
+    data_version: Optional[str] = None
+    trained_at: Optional[str] = None
+    brands: List[BrandPreview]
+
+# -----------------------------
+# Sensitivity analysis
+# -----------------------------
+
+class SensitivityParameter(BaseModel):
+    name: str                                    # "NIKE.reorder_point", "*.demand_multiplier" (ทุกแบรนด์พร้อมกัน)
+                                                 # หรือ "festival.songkran" (ตัวคูณของเทศกาล, ทุกแบรนด์)
+    low: float
+    high: float
+
+class SensitivityRequest(BaseModel):
+    base: SimulationRequest                      # ค่าที่ไม่ได้อยู่ใน parameters ใช้จาก base
+    parameters: List[SensitivityParameter]
+    method: Optional[str] = "morris"             # "morris" (elementary effects) | "sobol" (Saltelli)
+    trajectories: Optional[int] = 10             # morris: จำนวน trajectory → trajectories·(k+1) การประเมิน
+    levels: Optional[int] = 4                    # morris: จำนวนระดับของ grid (เลขคู่)
+    samples: Optional[int] = 256                 # sobol: N → N·(k+2) การประเมิน
+    replications: Optional[int] = 1              # demand path ต่อจุด (ทุกจุดใช้ชุดเดียวกัน)
+    seed: Optional[int] = None
+    metrics: Optional[List[str]] = None          # None = ทุกตัวชี้วัดของ /compare
+
+class SensitivityIndex(BaseModel):
+    brand: str                                   # "ALL" = รวมทุกแบรนด์
+    metric: str
+    parameter: str
+    # morris
+    mu: Optional[float] = None
+    mu_star: Optional[float] = None
+    sigma: Optional[float] = None
+    # sobol (conf = half-width 95% จาก bootstrap)
+    s1: Optional[float] = None
+    s1_conf: Optional[float] = None
+    st: Optional[float] = None
+    st_conf: Optional[float] = None
+
+class SensitivityResponse(BaseModel):
+    method: str
+    seed: int
+    replications: int
+    evaluations: int                             # จำนวนจุดของ design (ไม่นับ replication)
+    simulation_days: int
+    parameters: List[str]
+    brands: List[str]
+    indices: List[SensitivityIndex]
+
+# -----------------------------
+# Replenishment policies
+# -----------------------------
+
+class InventoryPolicy(BaseModel):
+    type: str                                    # "s_S" | "R_Q" | "order_up_to" | "base_stock"
+    name: Optional[str] = None                   # ชื่อในผล (ไม่ระบุ = type + ค่า)
+    reorder_point: Optional[int] = None          # s ของ s_S / R ของ R_Q
+    order_up_to: Optional[int] = None            # S ของ s_S, order_up_to, base_stock
+    order_quantity: Optional[int] = None         # Q ของ R_Q
+    review_period: Optional[int] = None          # T (วัน) ของ order_up_to
+    initial_stock: Optional[int] = None          # None = initial_stock ของ BrandConfig ใน base
+
+class PolicyRequest(BaseModel):
+    base: Optional[SimulationRequest] = None     # ช่วงวันที่, เทศกาล และ BrandConfig (demand/lead time) ต่อแบรนด์
+    policies: Dict[str, List[InventoryPolicy]]   # แบรนด์ → policy ที่ต้องการเทียบ
+    replications: Optional[int] = 30             # demand path ที่ทุก policy ของแบรนด์ใช้ร่วมกัน
+    seed: Optional[int] = None
+    confidence: Optional[float] = 0.95
+    holding_cost: Optional[float] = 0.0          # ต่อหน่วยต่อวัน
+    order_cost: Optional[float] = 0.0            # ต่อ order
+    lost_sale_cost: Optional[float] = 0.0        # ต่อหน่วยที่ขายไม่ได้
+
+class PolicyMetric(BaseModel):
+    mean: float
+    ci_low: float
+    ci_high: float
+
+class PolicyResult(BaseModel):
+    brand: str
+    policy: str
+    type: str
+    rank: int                                    # 1 = total_cost เฉลี่ยต่ำสุดของแบรนด์ (เท่ากัน → lost sales น้อยกว่า)
+    metrics: Dict[str, PolicyMetric]
+
+class PolicyResponse(BaseModel):
+    seed: int
+    replications: int
+    confidence: float
+    simulation_days: int
+    results: List[PolicyResult]
+
+# -----------------------------
+# Backtest (replay ยอดขายจริง)
+# -----------------------------
+
+class BacktestVariant(BrandConfig):
+    name: Optional[str] = None                   # None = สร้างจากค่าที่ตั้ง เช่น "reorder_point=500"
+
+class BacktestRequest(BaseModel):
+    base: Optional[SimulationRequest] = None     # ช่วงวันที่ (start_day นับจากวันแรกของ history) และ BrandConfig ตั้งต้นต่อแบรนด์
+    variants: Dict[str, List[BacktestVariant]]   # แบรนด์ → config ที่ต้องการเทียบ (field ที่ตั้งทับค่าของ base)
+    seed: Optional[int] = None                   # lead time แบบสุ่มเท่านั้น
+    holding_cost: Optional[float] = 0.0          # ต่อหน่วยต่อวัน
+    order_cost: Optional[float] = 0.0            # ต่อ order
+    lost_sale_cost: Optional[float] = 0.0        # ต่อหน่วยที่ขายไม่ได้
+
+class BacktestActual(BaseModel):
+    brand: str
+    units_sold: int                              # ยอดขายจริงในช่วง (= ความต้องการที่ replay เมื่อ demand_multiplier = 1)
+    revenue: float
+    selling_days: int
+
+class BacktestResult(BaseModel):
+    brand: str
+    variant: str
+    rank: int                                    # 1 = total_cost ต่ำสุดของแบรนด์ (เท่ากัน → lost sales น้อยกว่า)
+    metrics: Dict[str, float]
+    units_vs_actual: float                       # % ของยอดขายจริงที่นโยบายนี้ขายได้
+    revenue_vs_actual: float
+
+class BacktestResponse(BaseModel):
+    seed: int
+    start_date: str
+    end_date: str
+    simulation_days: int
+    actuals: List[BacktestActual]
+    results: List[BacktestResult]
+    elapsed_ms: float
+
+# -----------------------------
+# Out-of-core Monte Carlo experiments
+# -----------------------------
+
+class ExperimentRequest(BaseModel):
+    base: Optional[SimulationRequest] = None     # ช่วงวันที่, เทศกาล และ BrandConfig ต่อแบรนด์
+    paths: Optional[int] = 1000                  # จำนวน demand path (path p ใช้ seed + p)
+    seed: Optional[int] = None
+    brands: Optional[List[str]] = None           # None = ทุกแบรนด์
+    fields: Optional[List[str]] = None           # ค่ารายวันที่เก็บ (None = stock, sales, lost_sales)
+
+class ExperimentInfo(BaseModel):
+    experiment_id: str
+    status: str                                  # queued | running | completed | failed | interrupted
+    created_at: str
+    finished_at: Optional[str] = None
+    seed: int
+    paths: int
+    simulation_days: int
+    start_date: str
+    brands: List[str]
+    fields: List[str]
+    paths_done: int                              # รวมทุกแบรนด์ (เต็ม = paths × จำนวนแบรนด์)
+    bytes: int
+    request: Dict[str, Any]
+    summary: Optional[Dict[str, Dict[str, Dict[str, float]]]] = None   # แบรนด์ → ตัวชี้วัด → mean/std/min/p05/p50/p95/max
+    error: Optional[str] = None
+
+class ExperimentListResponse(BaseModel):
+    total: int
+    items: List[ExperimentInfo]
+
+class ExperimentSlice(BaseModel):
+    brand: str
+    field: str
+    path_start: int
+    path_stop: int
+    day_start: int
+    day_stop: int
+    values: List[List[int]]                      # [path][day]
+
+class ExperimentBands(BaseModel):
+    brand: str
+    field: str
+    day_start: int
+    day_stop: int
+    dates: List[str]
+    mean: List[float]
+    p05: List[float]
+    p50: List[float]
+    p95: List[float]
+
+# -----------------------------
+# Scenario store
+# -----------------------------
+
+class ScenarioInfo(BaseModel):
+    scenario_id: str
+    created_at: str
+    last_used_at: str
+    hits: int
+    seed: int
+    data_version: str
+    sections: List[str]
+    request: Dict[str, Any]
+    raw_bytes: int
+    stored_bytes: int
+
+class ScenarioListResponse(BaseModel):
+    total: int
+    items: List[ScenarioInfo]
+
 # -----------------------------
 # Static season/festival lookups
 # -----------------------------
@@ -196,3 +551,61 @@ class FestivalInfo(BaseModel):
 class SeasonFestivalResponse(BaseModel):
     seasons: List[SeasonInfo]
     festivals: List[FestivalInfo]
+
+# -----------------------------
+# Historical sales query
+# -----------------------------
+
+class HistoryDimensionsResponse(BaseModel):
+    rows: int
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    dimensions: Dict[str, Dict[str, int]]        # มิติ → ค่า → จำนวนแถว
+    metrics: List[str]
+    periods: List[str]
+
+class HistoryAggregateResponse(BaseModel):
+    group_by: List[str]
+    period: Optional[str] = None
+    metrics: List[str]
+    filters: Dict[str, List[str]]
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    matched_rows: int                            # แถวที่ผ่าน filter ทั้งหมด
+    total_groups: int                            # จำนวนกลุ่มทั้งหมด (ก่อนแบ่งหน้า)
+    limit: int
+    offset: int
+    groups: List[Dict[str, Any]]                 # ค่ามิติ (+ period) + rows + ผลรวมของตัวชี้วัด
+    query_ms: float
+
+# -----------------------------
+# Demand forecast
+# -----------------------------
+
+class ForecastPoint(BaseModel):
+    period: str                                  # วันแรกของช่วง (day / week) หรือ YYYY-MM (month)
+    units: float
+
+class ForecastSeries(BaseModel):
+    brand: str
+    product: str
+    model: str                                   # seasonal_naive | ses | holt_winters
+    alpha: Optional[float] = None
+    gamma: Optional[float] = None
+    mae: float                                   # MAE ของ error one-step-ahead บนประวัติ (หลังฤดูแรก)
+    history_mean: float
+    forecast: List[ForecastPoint]
+
+class ForecastResponse(BaseModel):
+    period: str
+    model: str                                   # ที่ขอ ("auto" = เลือกต่อ series)
+    season_length: int
+    horizon: int
+    history_start: str
+    history_periods: int
+    total_series: int
+    limit: int
+    offset: int
+    series: List[ForecastSeries]
+    fit_ms: float
+    query_ms: float
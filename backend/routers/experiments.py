@@ -0,0 +1,83 @@
+import io
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from models.pydantic import ExperimentBands, ExperimentInfo, ExperimentListResponse, ExperimentRequest, ExperimentSlice
+from services.startup import require_ready
+
+router = APIRouter()
+
+@router.post("/experiments", response_model=ExperimentInfo, status_code=202, dependencies=[Depends(require_ready)])
+def start_experiment(request: ExperimentRequest) -> ExperimentInfo:
+    """ Start a large Monte Carlo run in the background
+    Daily values of every path are written to memory-mapped .npy files
+    under RESULTS_DIR chunk by chunk; poll GET /experiments/{id} for
+    progress, then read summaries, bands or slices.
+    """
+    from services.experiment_service import start_experiment as _start_experiment
+    try:
+        return _start_experiment(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(f"❌ Experiment error: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Experiment error: {str(e)}")
+
+@router.get("/experiments", response_model=ExperimentListResponse)
+def list_experiments(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+) -> ExperimentListResponse:
+    """Stored experiments, newest first (without summaries)"""
+    from services.experiment_service import list_experiments as _list_experiments
+    return _list_experiments(limit=limit, offset=offset)
+
+@router.get("/experiments/{experiment_id}", response_model=ExperimentInfo)
+def get_experiment(experiment_id: str) -> ExperimentInfo:
+    """Status, progress and (once completed) per-brand summary statistics"""
+    from services.experiment_service import get_experiment as _get_experiment
+    return _get_experiment(experiment_id)
+
+@router.get("/experiments/{experiment_id}/slice", response_model=ExperimentSlice)
+def get_experiment_slice(
+    experiment_id: str,
+    brand: str,
+    field: str = "stock",
+    path_start: int = Query(0, ge=0),
+    path_stop: Optional[int] = Query(None, ge=1, description="Exclusive; default path_start + 100"),
+    day_start: int = Query(0, ge=0),
+    day_stop: Optional[int] = Query(None, ge=1, description="Exclusive; default the last day"),
+    format: str = Query("json", pattern="^(json|npy)$", description="npy returns the raw (paths, days) int32 array")
+):
+    """Daily values of a range of paths and days, read from disk without loading the whole run"""
+    from services.experiment_service import read_slice
+    result = read_slice(experiment_id, brand, field, path_start, path_stop, day_start, day_stop)
+    if format == "npy":
+        import numpy as np
+        buffer = io.BytesIO()
+        np.save(buffer, result["values"])
+        return Response(content=buffer.getvalue(), media_type="application/octet-stream")
+    result["values"] = result["values"].tolist()
+    return result
+
+@router.get("/experiments/{experiment_id}/bands", response_model=ExperimentBands)
+def get_experiment_bands(
+    experiment_id: str,
+    brand: str,
+    field: str = "stock",
+    day_start: int = Query(0, ge=0),
+    day_stop: Optional[int] = Query(None, ge=1)
+) -> ExperimentBands:
+    """Per-day mean and 5/50/95th percentiles across all paths"""
+    from services.experiment_service import read_bands
+    return read_bands(experiment_id, brand, field, day_start, day_stop)
+
+@router.delete("/experiments/{experiment_id}", status_code=204)
+def delete_experiment(experiment_id: str) -> Response:
+    """Remove an experiment and its files"""
+    from services.experiment_service import delete_experiment as _delete_experiment
+    _delete_experiment(experiment_id)
+    return Response(status_code=204)
@@ -0,0 +1,36 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from models.pydantic import ForecastResponse
+from services.startup import require_ready
+
+router = APIRouter()
+
+@router.get("/forecast", response_model=ForecastResponse, dependencies=[Depends(require_ready)])
+def get_forecast(
+    brand: Optional[List[str]] = Query(None),
+    product: Optional[List[str]] = Query(None),
+    model: str = Query("auto", description="auto, seasonal_naive, ses or holt_winters"),
+    period: str = Query("month", description="day, week or month"),
+    horizon: Optional[int] = Query(None, description="Periods ahead (default: one season)"),
+    limit: int = Query(100, ge=1, le=10_000),
+    offset: int = Query(0, ge=0)
+) -> ForecastResponse:
+    """ Forecast units sold per (brand, product)
+    Every series is fitted with every model in one batched pass per data
+    version and period; "auto" picks the model with the lowest one-step
+    MAE per series. Use demand_source="forecast" on /simulate to drive the
+    simulation with these forecasts.
+    """
+    from services.forecast_service import forecast_demand
+    brands = ["H&M" if b == "H_M" else b for b in brand] if brand else None
+    try:
+        return forecast_demand(brands, product, model, period, horizon, limit, offset)
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(f"❌ Forecast error: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Forecast error: {str(e)}")
@@ -0,0 +1,58 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from models.pydantic import HistoryAggregateResponse
+from services.startup import require_ready
+
+router = APIRouter()
+
+@router.get("/history/dimensions", dependencies=[Depends(require_ready)])
+def get_history_dimensions(request: Request) -> Response:
+    """Queryable dimensions with their values (row counts), metrics and the data date range"""
+    from services.reference_cache import cached_response
+    return cached_response(request, "history-dimensions")
+
+@router.get("/history/aggregate", response_model=HistoryAggregateResponse, dependencies=[Depends(require_ready)])
+def aggregate_history(
+    group_by: Optional[str] = Query(None, description="Comma-separated dimensions, e.g. region,retailer"),
+    period: Optional[str] = Query(None, description="Also group by day, week, month, quarter or year"),
+    metrics: Optional[str] = Query(None, description="Comma-separated metrics to sum (default all)"),
+    brand: Optional[List[str]] = Query(None),
+    retailer: Optional[List[str]] = Query(None),
+    region: Optional[List[str]] = Query(None),
+    state: Optional[List[str]] = Query(None),
+    city: Optional[List[str]] = Query(None),
+    product: Optional[List[str]] = Query(None),
+    sales_method: Optional[List[str]] = Query(None),
+    start_date: Optional[str] = Query(None, description="YYYY-MM-DD (inclusive)"),
+    end_date: Optional[str] = Query(None, description="YYYY-MM-DD (inclusive)"),
+    sort: Optional[str] = Query(None, description="Metric, 'rows', a group_by dimension or 'period'; prefix '-' for descending"),
+    limit: int = Query(100, ge=1, le=10_000),
+    offset: int = Query(0, ge=0)
+) -> HistoryAggregateResponse:
+    """ Aggregate historical sales by dimension and period
+    Filters repeat per value (region=West&region=South) and combine as OR
+    within a dimension, AND across dimensions. Served from a per-dimension
+    row index built once per data version, so queries never scan the
+    DataFrame.
+    """
+    from services.history_service import aggregate_history as _aggregate_history
+    filters = {
+        "brand": ["H&M" if b == "H_M" else b for b in brand] if brand else None,
+        "retailer": retailer,
+        "region": region,
+        "state": state,
+        "city": city,
+        "product": product,
+        "sales_method": sales_method,
+    }
+    try:
+        return _aggregate_history(group_by, period, metrics, filters, start_date, end_date, sort, limit, offset)
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(f"❌ History query error: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"History query error: {str(e)}")
@@ -1,24 +1,49 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import JSONResponse
 from typing import Dict, Any
 
-from utils.helpers import clean_data_for_json
-from services.data_service import get_historical_data, get_brand_parameters, get_supported_brands
+from services.startup import RETRY_AFTER_SECONDS, is_ready, require_ready, timeline
+
+# services.data_service / utils.helpers ดึง pandas มาด้วย จึง import ใน handler
+# (โหลดเสร็จแล้วโดย warm-up ก่อน ready) เพื่อให้ app สตาร์ทและตอบ /health ได้ทันที
 
 router = APIRouter()
 
 @router.get("/")
 def read_root() -> Dict[str, Any]:
+    brands_available = []
+    if is_ready():
+        from services.data_service import get_brand_parameters
+        brands_available = list((get_brand_parameters() or {}).keys())
     return {
         "message": "Inventory Simulation API with Season & Festival Analysis",
         "version": "2.0.1",
-        "data_loaded": get_historical_data() is not None,
-        "brands_available": list(get_brand_parameters().keys()) if get_brand_parameters() else [],
+        "data_loaded": is_ready(),
+        "brands_available": brands_available,
         "endpoints": {
             "POST /simulate": "Run inventory simulation",
-            "GET /health": "Health check",
+            "GET /health": "Liveness check (answers during warm-up)",
+            "GET /ready": "Readiness check (200 once data is loaded)",
             "GET /brand-params": "Get calculated brand parameters",
             "GET /seasons-festivals": "Get season and festival information",
-            "GET /available-brands": "Get available brands list"
+            "GET /available-brands": "Get available brands list",
+            "GET /scenarios": "List stored seeded simulation results",
+            "GET /scenarios/{scenario_id}": "Get a stored simulation result",
+            "POST /compare": "Compare a baseline against variant requests over shared replications",
+            "POST /sensitivity": "Morris / Sobol sensitivity of metrics to BrandConfig parameters",
+            "POST /simulate/preview": "Instant surrogate estimate of the /simulate summary",
+            "WS /ws/simulate": "Stream month-end results of a simulation (cancellable)",
+            "POST /policies": "Benchmark replenishment policies per brand",
+            "POST /experiments": "Start a large Monte Carlo run in the background",
+            "GET /experiments": "List experiments",
+            "GET /experiments/{experiment_id}": "Experiment status, progress and summary",
+            "GET /experiments/{experiment_id}/slice": "Read stored metrics or daily values of an experiment",
+            "GET /experiments/{experiment_id}/bands": "Percentile bands of daily values",
+            "DELETE /experiments/{experiment_id}": "Remove an experiment and its files",
+            "GET /history/dimensions": "Queryable historical sales dimensions and metrics",
+            "GET /history/aggregate": "Aggregate historical sales by dimension and period",
+            "GET /forecast": "Per-product demand forecasts from historical sales",
+            "POST /backtest": "Backtest BrandConfig variants against actual historical sales"
         },
         "fixes": [
             "✅ Fixed date range handling for start_day and end_day",
@@ -28,57 +53,39 @@ def read_root() -> Dict[str, Any]:
     }
 
 @router.get("/health")
-def health_check() -> Dict[str, bool]:
-    from services.data_service import get_historical_data
-    return {"status": "healthy", "data_loaded": get_historical_data() is not None}
+def health_check() -> Dict[str, Any]:
+    """Liveness: ตอบทันทีแม้ข้อมูลยังโหลดไม่เสร็จ"""
+    return {"status": "healthy", "data_loaded": is_ready()}
+
+@router.get("/ready")
+def readiness_check():
+    """Readiness: 200 เมื่อ warm-up เสร็จ, 503 ระหว่างโหลด (พร้อม timeline การสตาร์ท)"""
+    if not is_ready():
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming_up", "timeline": timeline()},
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+    from services.data_service import get_data_version
+    return {"status": "ready", "data_version": get_data_version(), "timeline": timeline()}
 
-@router.get("/brand-params")
-def get_brand_parameters_endpoint() -> Dict[str, Any]:
+# endpoint อ้างอิง: body เตรียมไว้ครั้งเดียวต่อ version ข้อมูล (บีบอัดไว้แล้ว + ETag / If-None-Match)
+# ดู services/reference_cache.py
+
+@router.get("/brand-params", dependencies=[Depends(require_ready)])
+def get_brand_parameters_endpoint(request: Request) -> Response:
     """Get calculated parameters from historical data"""
-    params = get_brand_parameters()
-    if not params:
-        raise HTTPException(status_code=404, detail="No historical data available")
-    return clean_data_for_json(params)
+    from services.reference_cache import cached_response
+    return cached_response(request, "brand-params")
 
 @router.get("/seasons-festivals")
-def get_seasons_and_festivals() -> Any:
+def get_seasons_and_festivals(request: Request) -> Response:
     """Get all season and festival information"""
-    from utils.constants import SEASON_MAPPING, FESTIVALS
-    from models.pydantic import SeasonInfo, FestivalInfo, SeasonFestivalResponse
-
-    seasons = []
-    for month, data in SEASON_MAPPING.items():
-        seasons.append(SeasonInfo(
-            month=month,
-            season_name=data["name"],
-            quarter=data["quarter"],
-            season_type=data["type"]
-        ))
-
-    festivals = []
-    for festival_id, data in FESTIVALS.items():
-        festivals.append(FestivalInfo(
-            festival_id=festival_id,
-            name=data["name"],
-            month=data["month"],
-            days=data["days"],
-            demand_multiplier=data["multiplier"]
-        ))
-
-    return SeasonFestivalResponse(seasons=seasons, festivals=festivals)
+    from services.reference_cache import cached_response
+    return cached_response(request, "seasons-festivals")
 
 @router.get("/available-brands")
-def get_available_brands() -> Dict[str, Any]:
+def get_available_brands(request: Request) -> Response:
     """Get list of available brands from historical data"""
-    brands = get_supported_brands()  # ใช้ฟังก์ชันใหม่
-    if not brands:
-        raise HTTPException(status_code=404, detail="No historical data available")
-    
-    count = len(brands)
-    main_brands = brands.copy()
-    
-    return {
-        "brands": brands,
-        "count": count,
-        "main_brands": main_brands
-    }
\ No newline at end of file
+    from services.reference_cache import cached_response
+    return cached_response(request, "available-brands")
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Query
+
+from models.pydantic import ScenarioListResponse, SimulationResponse
+from services.scenario_store import get_scenario_store
+from services.startup import require_ready
+
+router = APIRouter()
+
+@router.get("/scenarios", response_model=ScenarioListResponse)
+def list_scenarios(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+) -> ScenarioListResponse:
+    """Stored simulation scenarios, newest first (without result bodies)"""
+    store = get_scenario_store()
+    if store is None:
+        return ScenarioListResponse(total=0, items=[])
+    return store.list(limit=limit, offset=offset)
+
+@router.get("/scenarios/{scenario_id}", response_model=SimulationResponse, dependencies=[Depends(require_ready)])
+def get_scenario(scenario_id: str) -> SimulationResponse:
+    """Stored result of a scenario, as returned by /simulate"""
+    from services.simulation_service import get_scenario as _get_scenario
+    return _get_scenario(scenario_id)
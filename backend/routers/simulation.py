@@ -1,25 +1,153 @@
-from fastapi import APIRouter, HTTPException
-from models.pydantic import SimulationRequest, SimulationResponse
-from services.simulation_service import run_inventory_simulation
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket
+from typing import Optional
+from models.pydantic import (
+    BacktestRequest, BacktestResponse, CompareRequest, CompareResponse, PolicyRequest, PolicyResponse, SensitivityRequest,
+    SensitivityResponse, SimulationPreviewResponse, SimulationRequest, SimulationResponse
+)
+from services.startup import is_ready, require_ready
 
 router = APIRouter()
 
-@router.post("/simulate", response_model=SimulationResponse)
-def simulate_inventory(request: SimulationRequest) -> SimulationResponse:
+@router.post("/simulate", response_model=SimulationResponse, dependencies=[Depends(require_ready)])
+def simulate_inventory(
+    request: SimulationRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated response sections to compute, e.g. summary,monthly_data"),
+    deadline: Optional[float] = Query(None, description="Seconds this request may take (queueing included); default SIMULATE_DEADLINE_SECONDS")
+) -> SimulationResponse:
     """ Run inventory simulation with custom parameters
     Now includes season and festival impact on demand
     Properly handles start_day and end_day:
     - start_day: 0 = Jan 1, 31 = Feb 1, etc.
     - end_day: Optional, if not provided uses simulation_days
     - Example: start_day=31, end_day=100 → Feb 1 to Apr 10 (70 days)
+    Only the sections listed in fields= (or request.include) are computed;
+    the others come back as empty lists.
+    Runs go through a bounded admission queue: a request that cannot finish
+    within its deadline gets 503 with Retry-After instead of waiting.
     """
+    # import ตอนใช้งาน (pandas/simpy โหลดไว้แล้วโดย warm-up)
+    from services.simulation_service import simulate_admitted
+    from simulation.control import SimulationCancelled
     try:
-        results = run_inventory_simulation(request)
-        return results
+        include = fields.split(",") if fields else None
+        return simulate_admitted(request, include, deadline)
     except HTTPException:
         raise
+    except SimulationCancelled as e:
+        print(f"⏱️ Simulation stopped at day {e.day}: {e.reason}")
+        raise HTTPException(status_code=503, detail=f"Simulation {e.reason}", headers={"Retry-After": "1"})
     except Exception as e:
         import traceback
         print(f"❌ Simulation error: {str(e)}")
         print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Simulation error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Simulation error: {str(e)}")
+
+@router.websocket("/ws/simulate")
+async def simulate_stream(websocket: WebSocket):
+    """ Run a simulation over a WebSocket
+    The first client message is a SimulationRequest body; the server streams
+    one "month" message per brand at every simulated month end (the same rows
+    as trend_events), then the full "result". Sending {"type": "cancel"} or
+    disconnecting stops the engine mid-run. Runs go through the same
+    admission queue as POST /simulate (?deadline= sets the deadline).
+    """
+    await websocket.accept()
+    if not is_ready():
+        await websocket.send_json({"type": "error", "status": 503, "detail": "Service is warming up"})
+        await websocket.close(code=1013)
+        return
+    from services.stream_service import stream_simulation
+    await stream_simulation(websocket)
+
+@router.post("/simulate/preview", response_model=SimulationPreviewResponse, dependencies=[Depends(require_ready)])
+def preview_simulation(request: SimulationRequest) -> SimulationPreviewResponse:
+    """ Instant per-brand summary estimate from a surrogate model
+    Same body as /simulate; answers in milliseconds for interactive parameter
+    tweaking. The surrogate is trained in the background (503 until the first
+    fit finishes) and refitted as real simulations accumulate.
+    """
+    from services.surrogate_service import preview_simulation as run_preview
+    try:
+        return run_preview(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(f"❌ Preview error: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Preview error: {str(e)}")
+
+@router.post("/compare", response_model=CompareResponse, dependencies=[Depends(require_ready)])
+def compare_scenarios(request: CompareRequest) -> CompareResponse:
+    """ Compare a baseline against variant requests
+    All scenarios are simulated in one batched pass per brand over the same
+    demand paths (common random numbers); returns per-metric deltas
+    (variant - baseline) with confidence intervals across replications.
+    """
+    from services.compare_service import run_comparison
+    try:
+        return run_comparison(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(f"❌ Comparison error: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Comparison error: {str(e)}")
+
+@router.post("/sensitivity", response_model=SensitivityResponse, dependencies=[Depends(require_ready)])
+def sensitivity_analysis(request: SensitivityRequest) -> SensitivityResponse:
+    """ Global sensitivity of simulation metrics to BrandConfig parameters
+    Samples the given parameter ranges with a Morris (elementary effects) or
+    Sobol (Saltelli) design, simulates every point as one batched pass per
+    brand (split across worker processes for large designs) and returns
+    sensitivity indices per brand, metric and parameter.
+    """
+    from services.sensitivity_service import run_sensitivity
+    try:
+        return run_sensitivity(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(f"❌ Sensitivity error: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Sensitivity error: {str(e)}")
+
+@router.post("/policies", response_model=PolicyResponse, dependencies=[Depends(require_ready)])
+def compare_policies(request: PolicyRequest) -> PolicyResponse:
+    """ Benchmark replenishment policies per brand
+    (s,S), (R,Q), periodic-review order-up-to and base-stock policies are
+    evaluated together as one batched run per brand over shared demand
+    paths; returns per-policy metrics with confidence intervals, cost and a
+    cost-based rank.
+    """
+    from services.policy_service import run_policy_comparison
+    try:
+        return run_policy_comparison(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(f"❌ Policy comparison error: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Policy comparison error: {str(e)}")
+
+@router.post("/backtest", response_model=BacktestResponse, dependencies=[Depends(require_ready)])
+def backtest_configs(request: BacktestRequest) -> BacktestResponse:
+    """ Backtest BrandConfig variants against actual historical sales
+    Replays the real daily units of each brand over the chosen window
+    (base.start_day counts from the first day of history) for every variant
+    in one batched run per brand; returns per-variant metrics, a cost-based
+    rank and how each variant compares with the units/revenue actually sold.
+    """
+    from services.backtest_service import run_backtest
+    try:
+        return run_backtest(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(f"❌ Backtest error: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Backtest error: {str(e)}")
@@ -0,0 +1,203 @@
+"""Admission control ของ /simulate: ประมาณต้นทุน → คิวจำกัดขนาด → deadline ต่อ request
+
+แต่ละ request ได้ต้นทุนเป็น "brand-day units" (วัน × แบรนด์ × น้ำหนักของ section ที่ขอ) ซึ่งแปลงเป็นวินาที
+ด้วย seconds_per_unit ที่เรียนรู้จากการจำลองที่จบแล้ว (EWMA) เมื่อมีงานรันหรือรอคิวอยู่ ตรวจก่อนเข้าคิวว่า
+เวลารอคิวโดยประมาณ + เวลารันเสร็จทัน deadline หรือไม่ ไม่ทัน/คิวเต็ม → 503 + Retry-After ทันทีแทนการค้าง
+ใน threadpool (ไม่มีทางทันแม้คิวว่าง → 503 ไม่มี Retry-After) ระหว่างรัน engine ตรวจ CancelToken ที่มี
+deadline เดียวกันทุกวันจำลองและก่อนแต่ละ section — server ว่างจึงรับทุก request แล้วให้ deadline ตัดเอง
+และค่าประมาณที่ยังไม่เคยวัดจริงไม่ถูกใช้ปฏิเสธ request
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, Iterator, Optional, Tuple
+
+from fastapi import HTTPException
+
+from models.pydantic import SimulationRequest
+from simulation.control import CancelToken
+
+# จำนวน /simulate ที่รันพร้อมกัน (0 = ปิด admission control), จำนวนที่รอคิวได้, deadline เริ่มต้น/สูงสุด (วินาที)
+SIMULATE_MAX_CONCURRENT = int(os.getenv("SIMULATE_MAX_CONCURRENT", "2") or 0)
+SIMULATE_MAX_QUEUE = int(os.getenv("SIMULATE_MAX_QUEUE", "16") or 0)
+SIMULATE_DEADLINE_SECONDS = float(os.getenv("SIMULATE_DEADLINE_SECONDS", "30") or 30)
+MAX_DEADLINE_SECONDS = 300.0
+
+# ค่าเริ่มต้นของวินาทีต่อ unit (engine ระดับแบรนด์ 1 แบรนด์ 1 วัน) ก่อนมีการวัดจริง
+INITIAL_SECONDS_PER_UNIT = 5e-5
+EWMA_ALPHA = 0.2
+
+# ต้นทุนของ engine ต่อแบรนด์-วัน ตาม granularity
+ENGINE_COST = {"brand": 1.0, "product": 4.0, "region": 0.5, "retailer": 0.5}
+
+# ต้นทุนของ section: (ต่อแบรนด์-วัน, คงที่ต่อแบรนด์, จำนวนวันสูงสุดที่คิดต่อวัน) ในหน่วยเดียวกับ ENGINE_COST
+# product_* ใช้ stage product trends ร่วมกัน (นับครั้งเดียว) และเป็นส่วนที่แพงที่สุดของ response —
+# stage นี้ทำงานต่อเดือนปฏิทิน (ไม่เกิน 12) ต้นทุนจึงโตตามวันแค่ปีแรก
+SECTION_COST: Dict[str, Tuple[float, float, Optional[int]]] = {
+    "daily_data": (1.0, 0.0, None),
+    "series": (1.0, 0.0, None),
+    "season_events": (0.25, 0.0, None),
+    "trend_events": (0.2, 0.0, None),
+    "best_selling_products": (0.0, 1000.0, None),
+    "product_trends": (130.0, 1000.0, 366),
+}
+SHARED_SECTIONS = {"product_monthly_trends": "product_trends", "product_trend_events": "product_trends"}
+OTHER_SECTION_COST = (0.05, 0.0, None)
+
+
+def estimate_cost(simulation_days: int, brands: int, sections: Iterable[str], granularity: str = "brand") -> float:
+    """ต้นทุนโดยประมาณของการจำลอง (brand-day units)"""
+    stages = {SHARED_SECTIONS.get(name, name) for name in sections}
+    total = simulation_days * ENGINE_COST.get(granularity, 1.0)
+    for stage in stages:
+        day_cost, stage_fixed, max_days = SECTION_COST.get(stage, OTHER_SECTION_COST)
+        days = simulation_days if max_days is None else min(simulation_days, max_days)
+        total += days * day_cost + stage_fixed
+    return brands * total
+
+
+class AdmissionController:
+    """คิว FIFO จำกัดขนาดหน้า slot รันพร้อมกัน max_concurrent ช่อง พร้อมประมาณเวลารอจาก backlog"""
+
+    def __init__(self, max_concurrent: int, max_queue: int, seconds_per_unit: float = INITIAL_SECONDS_PER_UNIT):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.seconds_per_unit = seconds_per_unit
+        self.calibrated = False  # มีการจำลองที่จบแล้วอย่างน้อยหนึ่งครั้ง (seconds_per_unit มาจากการวัดจริง)
+        self.admitted = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+        self._running: Dict[int, Tuple[float, float]] = {}  # ticket → (เริ่ม, วินาทีโดยประมาณ)
+        self._queue: Deque[Tuple[int, float]] = deque()     # (ticket, วินาทีโดยประมาณ)
+        self._next_ticket = 0
+
+    def _backlog_seconds(self, now: float) -> float:
+        """เวลาโดยประมาณจนกว่างานที่รันอยู่ + ที่รอคิวทั้งหมดจะเสร็จ"""
+        running = sum(max(0.0, est - (now - start)) for start, est in self._running.values())
+        queued = sum(est for _, est in self._queue)
+        return (running + queued) / self.max_concurrent
+
+    def _reject(self, reason: str, wait: Optional[float]) -> HTTPException:
+        """503 — wait = None เมื่อลองใหม่ก็ไม่ทัน (ไม่ส่ง Retry-After)"""
+        self.rejected += 1
+        retry_after = max(1, math.ceil(wait)) if wait is not None else None
+        retry = f"retry in {retry_after}s" if retry_after is not None else "no retry"
+        print(f"🚦 /simulate rejected: {reason} (running {len(self._running)}, queued {len(self._queue)}, {retry})")
+        return HTTPException(
+            status_code=503,
+            detail=f"Simulation capacity exceeded: {reason}",
+            headers={"Retry-After": str(retry_after)} if retry_after is not None else None
+        )
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "running": len(self._running),
+                "queued": len(self._queue),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "seconds_per_unit": self.seconds_per_unit,
+                "calibrated": self.calibrated,
+                "backlog_seconds": self._backlog_seconds(time.monotonic()),
+            }
+
+    @contextmanager
+    def admit(self, cost: float, deadline_seconds: float) -> Iterator[CancelToken]:
+        """รอ slot ตามคิว แล้วคืน CancelToken ที่มี deadline ของ request (503 ถ้าไม่ทัน)
+
+        ไม่มีงานรัน/รอคิวเลย → รับทันที (deadline ตัดระหว่างรันเอง) ค่าประมาณใช้ปฏิเสธล่วงหน้าเฉพาะเมื่อ
+        seconds_per_unit มาจากการวัดจริงแล้ว
+        """
+        now = time.monotonic()
+        deadline = now + deadline_seconds
+        with self._cond:
+            # ยังไม่เคยวัด → ไม่เชื่อค่าประมาณ (ถือว่ารันเสร็จทันที่สุด)
+            est = cost * self.seconds_per_unit if self.calibrated else 0.0
+            busy = len(self._running) >= self.max_concurrent or bool(self._queue)
+            if busy:
+                wait = self._backlog_seconds(now)
+                if len(self._queue) >= self.max_queue:
+                    raise self._reject("queue is full", wait)
+                if est > deadline_seconds:
+                    raise self._reject(f"estimated {est:.1f}s exceeds the {deadline_seconds:g}s deadline", None)
+                if wait + est > deadline_seconds:
+                    raise self._reject(f"estimated {wait + est:.1f}s (queue + run) exceeds the {deadline_seconds:g}s deadline", wait)
+
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._queue.append((ticket, est))
+            while self._queue[0][0] != ticket or len(self._running) >= self.max_concurrent:
+                latest_start = deadline - est - time.monotonic()
+                if latest_start <= 0:
+                    self._queue.remove((ticket, est))
+                    self._cond.notify_all()
+                    raise self._reject("deadline passed while queued", self._backlog_seconds(time.monotonic()))
+                self._cond.wait(latest_start)
+            self._queue.popleft()
+            started = time.monotonic()
+            self._running[ticket] = (started, est)
+            self.admitted += 1
+            self._cond.notify_all()  # คิวถัดไปอาจได้ slot ที่ยังว่างอยู่
+
+        completed = False
+        try:
+            yield CancelToken(deadline=deadline)
+            completed = True
+        finally:
+            with self._cond:
+                del self._running[ticket]
+                if completed and cost > 0:
+                    observed = (time.monotonic() - started) / cost
+                    if self.calibrated:
+                        self.seconds_per_unit += EWMA_ALPHA * (observed - self.seconds_per_unit)
+                    else:
+                        self.seconds_per_unit = observed
+                        self.calibrated = True
+                self._cond.notify_all()
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """controller กลางของ process (None ถ้า SIMULATE_MAX_CONCURRENT <= 0)"""
+    global _controller
+    if SIMULATE_MAX_CONCURRENT <= 0:
+        return None
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(SIMULATE_MAX_CONCURRENT, SIMULATE_MAX_QUEUE)
+    return _controller
+
+
+def resolve_deadline(deadline: Optional[float]) -> float:
+    if deadline is None:
+        return SIMULATE_DEADLINE_SECONDS
+    if deadline <= 0:
+        raise HTTPException(status_code=400, detail="deadline must be > 0")
+    return min(deadline, MAX_DEADLINE_SECONDS)
+
+
+@contextmanager
+def admit_simulation(
+    request: SimulationRequest, include: Optional[Iterable[str]] = None, deadline: Optional[float] = None
+) -> Iterator[Optional[CancelToken]]:
+    """admission ของหนึ่ง /simulate → CancelToken ที่มี deadline (None ถ้าปิด admission control)"""
+    from services.data_service import get_supported_brands
+    from services.simulation_service import request_sections, resolve_horizon
+
+    sections = request_sections(request, include)
+    _, _, simulation_days = resolve_horizon(request)
+    deadline_seconds = resolve_deadline(deadline)
+    controller = get_admission_controller()
+    if controller is None:
+        yield None
+        return
+    cost = estimate_cost(simulation_days, len(get_supported_brands()), sections, request.granularity or "brand")
+    with controller.admit(cost, deadline_seconds) as cancel:
+        yield cancel
@@ -0,0 +1,135 @@
+"""Backtest: replay ยอดขายจริงรายวันจาก historical data กับหลาย BrandConfig แล้วเทียบกับที่เกิดขึ้นจริง
+
+ทุก variant ของแบรนด์วิ่งเป็น lane ของ batched run เดียว (TraceBatchSimulation) บน demand trace ที่
+data_service สร้างไว้ตอนโหลด งานใหญ่แบ่งก้อนของ variant ที่ติดกันข้าม process pool
+"""
+import random
+import time
+from datetime import timedelta
+from typing import Dict, List
+
+import numpy as np
+from fastapi import HTTPException
+
+from models.pydantic import BacktestRequest, BacktestResponse, BrandConfig, SimulationRequest
+from services.data_service import get_brand_parameters, get_demand_trace, get_supported_brands
+from services.policy_service import add_cost_metrics, rank_by_cost, resolve_costs
+from services.simulation_service import require_plain_request, resolve_brand_configs, resolve_trace_window
+from services.workers import SIMULATION_WORKERS, map_chunks, split_evenly
+from simulation.batch_simulation import BATCH_METRICS
+from simulation.pipeline import LEAD_TIME_DISTRIBUTIONS
+from simulation.replay import run_trace_batch
+
+# ตัวชี้วัดต่อ variant: BATCH_METRICS + fill_rate, total_cost
+BACKTEST_METRICS = BATCH_METRICS + ("fill_rate", "total_cost")
+
+MAX_VARIANTS = 1000
+# ต่ำกว่านี้ (variant รวมของแบรนด์) คำนวณใน process เดียว
+PARALLEL_MIN_LANES = 256
+
+
+def _variant_name(variant) -> str:
+    if variant.name:
+        return variant.name
+    values = [f"{k}={v}" for k, v in variant.model_dump(exclude_unset=True, exclude={"name"}).items()]
+    return ", ".join(values) or "base"
+
+
+def run_backtest(request: BacktestRequest) -> BacktestResponse:
+    """หลาย BrandConfig ต่อแบรนด์บนยอดขายจริงช่วงเดียวกัน → ตัวชี้วัด + เทียบยอดจริง + อันดับ"""
+    started = time.perf_counter()
+    brands = get_supported_brands()
+    trace = get_demand_trace()
+    if not request.variants:
+        raise HTTPException(status_code=400, detail="At least one brand with variants is required")
+    base = request.base or SimulationRequest()
+    # ทุก variant replay ยอดขายจริงอยู่แล้ว base จึงเป็น "parameters" หรือ "history" ก็ได้
+    require_plain_request(base, "/backtest", demand_sources=("parameters", "history"))
+    start_day, start_date, simulation_days = resolve_trace_window(base)
+    base_configs = resolve_brand_configs(base)
+
+    window = slice(start_day, start_day + simulation_days)
+    variants = {}
+    for brand, items in request.variants.items():
+        name = "H&M" if brand == "H_M" else brand
+        if name not in brands:
+            raise HTTPException(status_code=400, detail=f"Unknown brand: {brand}. Use one of {brands}")
+        row = trace['brands'].index(name)
+        if not trace['units'][row, window].any():
+            raise HTTPException(status_code=400, detail=f"{brand}: no historical sales in the backtest window")
+        if not items or len(items) > MAX_VARIANTS:
+            raise HTTPException(status_code=400, detail=f"{brand}: between 1 and {MAX_VARIANTS} variants")
+        names = [_variant_name(v) for v in items]
+        if len(set(names)) != len(names):
+            raise HTTPException(status_code=400, detail=f"{brand}: variant names must be unique")
+        configs = []
+        for v, label in zip(items, names):
+            # field ที่ variant ตั้งทับ BrandConfig ของ base
+            cfg = BrandConfig(**{**base_configs[name].model_dump(), **v.model_dump(exclude_unset=True, exclude={"name"})})
+            if (cfg.lead_time_distribution or "fixed") not in LEAD_TIME_DISTRIBUTIONS:
+                raise HTTPException(status_code=400, detail=f"{brand} / {label}: invalid lead_time_distribution {cfg.lead_time_distribution}")
+            if (cfg.lead_time_days or 0) < 0 or (cfg.lead_time_spread or 0) < 0:
+                raise HTTPException(status_code=400, detail=f"{brand} / {label}: lead time must be >= 0")
+            if (cfg.demand_multiplier or 1.0) < 0:
+                raise HTTPException(status_code=400, detail=f"{brand} / {label}: demand_multiplier must be >= 0")
+            configs.append(cfg)
+        variants[name] = (row, configs, names)
+
+    if request.seed is not None and request.seed < 0:
+        raise HTTPException(status_code=400, detail="seed must be >= 0")
+    costs = resolve_costs(request)
+    seed = request.seed if request.seed is not None else random.getrandbits(31)
+    end_date = start_date + timedelta(days=simulation_days - 1)
+
+    print("\n⏪ Backtest:")
+    for brand, (_, configs, _) in variants.items():
+        print(f" 🏷️ {brand}: {len(configs)} variants")
+    print(f" 📅 {start_date.strftime('%Y-%m-%d')} - {end_date.strftime('%Y-%m-%d')} ({simulation_days} days, seed {seed})")
+
+    # หนึ่ง batched run ต่อแบรนด์ (lane = variant) แบ่งเป็นก้อนของ variant ที่ติดกันเมื่องานใหญ่
+    brand_params = get_brand_parameters()
+    chunks, owners = [], []
+    for brand, (row, configs, _) in variants.items():
+        units, revenue = trace['units'][row, window], trace['revenue'][row, window]
+        parts = SIMULATION_WORKERS if len(configs) >= PARALLEL_MIN_LANES else 1
+        for part in split_evenly(len(configs), parts):
+            chunks.append((brand, configs[part], brand_params, [seed], units, revenue, start_date, simulation_days))
+            owners.append(brand)
+    outputs = map_chunks(run_trace_batch, chunks, parallel=len(chunks) > len(variants))
+
+    actuals: List[Dict] = []
+    results: List[Dict] = []
+    for brand, (row, configs, names) in variants.items():
+        parts = [res for owner, res in zip(owners, outputs) if owner == brand]
+        metrics = {m: np.concatenate([p[m][:, 0] for p in parts]).astype("float64") for m in BATCH_METRICS}
+        add_cost_metrics(metrics, simulation_days, costs)
+        actual_units = int(trace['units'][row, window].sum())
+        actual_revenue = float(trace['revenue'][row, window].sum())
+        actuals.append({
+            "brand": brand,
+            "units_sold": actual_units,
+            "revenue": actual_revenue,
+            "selling_days": int((trace['units'][row, window] > 0).sum()),
+        })
+        rank = rank_by_cost(metrics["total_cost"], metrics["total_lost_sales"])
+        for v, label in enumerate(names):
+            results.append({
+                "brand": brand,
+                "variant": label,
+                "rank": int(rank[v]),
+                "metrics": {m: float(metrics[m][v]) for m in BACKTEST_METRICS},
+                "units_vs_actual": float(metrics["total_units_sold"][v] / actual_units * 100) if actual_units else 0.0,
+                "revenue_vs_actual": float(metrics["total_revenue"][v] / actual_revenue * 100) if actual_revenue else 0.0,
+            })
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+    print(f"✅ Backtest completed: {len(results)} variants in {elapsed_ms:.0f} ms")
+    return BacktestResponse(
+        seed=seed,
+        start_date=start_date.strftime('%Y-%m-%d'),
+        end_date=end_date.strftime('%Y-%m-%d'),
+        simulation_days=simulation_days,
+        actuals=actuals,
+        results=results,
+        elapsed_ms=elapsed_ms
+    )
@@ -0,0 +1,128 @@
+import random
+from typing import Dict, List
+
+import numpy as np
+from fastapi import HTTPException
+
+from models.pydantic import CompareRequest, CompareResponse
+from services.data_service import get_brand_parameters, get_supported_brands
+from services.simulation_service import (
+    require_plain_request, resolve_brand_configs, resolve_festival_multipliers, resolve_horizon
+)
+from simulation.batch_simulation import BrandBatchSimulation
+from utils.stats import mean_ci
+
+# ตัวชี้วัดที่เปรียบเทียบ (ต่อแบรนด์ + รวม "ALL")
+COMPARE_METRICS = (
+    "total_units_sold",
+    "total_revenue",
+    "total_lost_sales",
+    "lost_sales_rate",
+    "stockout_days",
+    "avg_stock",
+    "final_stock",
+    "restock_count",
+)
+
+MAX_VARIANTS = 20
+MAX_REPLICATIONS = 1000
+BASELINE = "baseline"
+ALL_BRANDS = "ALL"
+
+
+def _brand_totals(per_brand: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """รวมทุกแบรนด์: ผลรวมของตัวชี้วัดแบบบวกได้, lost_sales_rate คิดจากยอดรวม"""
+    totals = {m: sum(per_brand[b][m] for b in per_brand) for m in COMPARE_METRICS + ("total_demand",)}
+    demand = totals["total_demand"]
+    totals["lost_sales_rate"] = np.where(demand > 0, totals["total_lost_sales"] / np.maximum(demand, 1) * 100, 0.0)
+    return totals
+
+
+def run_comparison(request: CompareRequest) -> CompareResponse:
+    """baseline + variants บน demand path ชุดเดียวกัน (common random numbers) → delta + CI ต่อตัวชี้วัด"""
+    if not request.variants:
+        raise HTTPException(status_code=400, detail="At least one variant is required")
+    if len(request.variants) > MAX_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_VARIANTS} variants per comparison")
+    if BASELINE in request.variants:
+        raise HTTPException(status_code=400, detail=f"Variant name '{BASELINE}' is reserved")
+    replications = request.replications or 30
+    if not 2 <= replications <= MAX_REPLICATIONS:
+        raise HTTPException(status_code=400, detail=f"replications must be between 2 and {MAX_REPLICATIONS}")
+    confidence = request.confidence if request.confidence is not None else 0.95
+    if not 0 < confidence < 1:
+        raise HTTPException(status_code=400, detail="confidence must be between 0 and 1")
+    if request.seed is not None and request.seed < 0:
+        raise HTTPException(status_code=400, detail="seed must be >= 0")
+
+    scenarios = [(BASELINE, request.baseline)] + list(request.variants.items())
+    names = [name for name, _ in scenarios]
+
+    _, start_date, simulation_days = resolve_horizon(request.baseline)
+    configs, festivals = [], []
+    for name, req in scenarios:
+        require_plain_request(req, f"{name}: /compare")
+        _, s_date, s_days = resolve_horizon(req)
+        if (s_date, s_days) != (start_date, simulation_days):
+            raise HTTPException(status_code=400, detail=f"{name}: date range must match the baseline")
+        configs.append(resolve_brand_configs(req))
+        festivals.append(resolve_festival_multipliers(req))
+
+    seed = request.seed if request.seed is not None else random.getrandbits(31)
+    seeds = [seed + r for r in range(replications)]
+    brands = get_supported_brands()
+
+    print("\n⚖️ Scenario Comparison:")
+    print(f" 🧪 Scenarios: {len(scenarios)} ({', '.join(names)})")
+    print(f" 🎲 Replications: {replications} (seed {seed}..{seed + replications - 1}, common random numbers)")
+    print(f" 📆 Simulation Days: {simulation_days}")
+
+    # หนึ่ง batched run ต่อแบรนด์: lane = scenario × replication
+    per_brand: Dict[str, Dict[str, np.ndarray]] = {}
+    for brand in brands:
+        batch = BrandBatchSimulation(
+            brand_name=brand,
+            configs=[cfg[brand] for cfg in configs],
+            brand_params=get_brand_parameters(),
+            seeds=seeds,
+            start_date=start_date,
+            festival_multipliers=festivals
+        )
+        per_brand[brand] = batch.run(simulation_days)
+    per_brand[ALL_BRANDS] = _brand_totals(per_brand)
+
+    deltas: List[Dict] = []
+    for v, name in enumerate(names[1:], start=1):
+        for brand, metrics in per_brand.items():
+            for metric in COMPARE_METRICS:
+                values = np.asarray(metrics[metric], dtype="float64")   # (scenarios, replications)
+                base, var = values[0], values[v]
+                diff = mean_ci(var - base, confidence)
+                mean_d, half = float(diff["mean"]), float(diff["half_width"])
+                base_mean = float(base.mean())
+                var_d = float(diff["std"]) ** 2
+                indep = float(base.var(ddof=1) + var.var(ddof=1))
+                deltas.append({
+                    "variant": name,
+                    "brand": brand,
+                    "metric": metric,
+                    "baseline_mean": base_mean,
+                    "variant_mean": float(var.mean()),
+                    "delta_mean": mean_d,
+                    "delta_ci_low": mean_d - half,
+                    "delta_ci_high": mean_d + half,
+                    "relative_delta": mean_d / base_mean if base_mean != 0 else None,
+                    "significant": bool(half < abs(mean_d)),
+                    "variance_reduction": indep / var_d if var_d > 0 else None,
+                })
+
+    print("✅ Comparison completed successfully")
+    return CompareResponse(
+        seed=seed,
+        replications=replications,
+        confidence=confidence,
+        simulation_days=simulation_days,
+        brands=brands,
+        variants=names[1:],
+        deltas=deltas
+    )
@@ -1,12 +1,20 @@
+import codecs
+import hashlib
+import logging
 import os
+import threading
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import random
-from typing import Optional, Dict, Any, List
+from typing import Callable, Optional, Dict, Any, List, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # กำหนดแบรนด์ที่รองรับทั้งหมด (อ่านจาก .env)
 SUPPORTED_BRANDS = {
     'ADIDAS': os.getenv("BRAND_ADIDAS_PATH"),
@@ -17,63 +25,209 @@ SUPPORTED_BRANDS = {
 
 historical_data = None
 brand_parameters = None
+product_parameters = None
+segment_parameters = None
+demand_trace = None
+data_version = None
+
+# granularity แบบแบ่งกลุ่ม → คอลัมน์ใน historical data
+SEGMENT_DIMENSIONS = {"region": "Region", "retailer": "Retailer"}
+
+# ไดเรกทอรีเก็บ historical data แบบ columnar ที่ทุก worker map ร่วมกัน (ไม่ตั้ง = โหลดเองทุก worker)
+SHARED_DATA_DIR = os.getenv("SHARED_DATA_DIR") or None
+
+# จำนวน worker สำหรับโหลดไฟล์แบรนด์พร้อมกัน (0/ไม่ตั้ง = ตามจำนวนไฟล์)
+DATA_LOAD_WORKERS = int(os.getenv("DATA_LOAD_WORKERS", "0") or 0)
+
+# ขนาดไบต์ที่อ่านจากหัวไฟล์เพื่อเดา encoding
+_ENCODING_SNIFF_BYTES = 64 * 1024
+
+def sniff_encoding(file_path: str) -> str:
+    """เดา encoding จากไบต์แรกของไฟล์ครั้งเดียว แทนการ parse ซ้ำทุก encoding"""
+    with open(file_path, 'rb') as fh:
+        head = fh.read(_ENCODING_SNIFF_BYTES)
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # final=False: ยอมให้ตัวอักษร multibyte ถูกตัดท้าย sample ได้
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    try:
+        head.decode('cp1252')
+        return 'cp1252'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+# รูปแบบวันที่ที่ลองตรวจ (เรียง dayfirst ก่อน ให้ตรงกับพฤติกรรมเดิม dayfirst=True)
+_DATE_FORMAT_CANDIDATES = [
+    '%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d',
+    '%d-%m-%Y', '%m-%d-%Y', '%d.%m.%Y', '%Y-%m-%d %H:%M:%S',
+    '%d/%m/%y', '%m/%d/%y',
+]
+_DATE_SAMPLE_SIZE = 500
+
+# cache รูปแบบวันที่ที่ตรวจแล้ว: key = file signature → format (None = ตรวจไม่ได้)
+_date_format_cache: Dict[Tuple[str, int, int], Optional[str]] = {}
+_date_format_lock = threading.Lock()
+
+def file_signature(file_path: str) -> Tuple[str, int, int]:
+    """(absolute path, size, mtime_ns) — เปลี่ยนเมื่อไฟล์ถูกแก้"""
+    st = os.stat(file_path)
+    return (os.path.abspath(file_path), st.st_size, st.st_mtime_ns)
+
+def detect_date_format(values: pd.Series) -> Optional[str]:
+    """ตรวจรูปแบบวันที่จาก sample ของค่าที่ไม่ซ้ำ คืน format แรกที่ parse ได้ครบทุกค่า"""
+    uniq = pd.Series(pd.unique(values.dropna()), dtype=object).astype(str).str.strip()
+    uniq = uniq[uniq != '']
+    if uniq.empty:
+        return None
+    if len(uniq) > _DATE_SAMPLE_SIZE:
+        # กระจาย sample ทั้งไฟล์ ไม่ใช่แค่หัวไฟล์
+        step = len(uniq) // _DATE_SAMPLE_SIZE
+        uniq = uniq.iloc[::step]
+    for fmt in _DATE_FORMAT_CANDIDATES:
+        parsed = pd.to_datetime(uniq, format=fmt, errors='coerce')
+        if parsed.notna().all():
+            return fmt
+    return None
+
+def parse_dates_unique(values: pd.Series, fmt: Optional[str] = None, detect: bool = False) -> Tuple[pd.Series, Optional[str]]:
+    """แปลงวันที่ผ่าน unique-value mapping (วันที่ invoice ซ้ำกันเยอะมาก)
+
+    factorize ครั้งเดียว แล้ว parse แค่ค่าที่ไม่ซ้ำด้วย format ที่ระบุ
+    (detect=True → ตรวจ format จากค่าที่ไม่ซ้ำก่อน) ค่าที่ไม่เข้า format จะ
+    fallback ไปใช้ format='mixed' เฉพาะค่านั้น แล้ว map กลับทุกแถวด้วย codes
+    """
+    codes, uniques = pd.factorize(values, sort=False)
+    uniq = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    if detect:
+        fmt = detect_date_format(uniq)
+    if fmt:
+        parsed = pd.to_datetime(uniq, format=fmt, errors='coerce')
+    else:
+        parsed = pd.Series(pd.NaT, index=uniq.index, dtype='datetime64[ns]')
+    bad = parsed.isna()
+    if bad.any():
+        parsed[bad] = pd.to_datetime(uniq[bad], dayfirst=True, format='mixed', errors='coerce')
+    # code -1 (ค่าว่าง) → ชี้ไปที่ NaT ช่องสุดท้าย
+    lookup = np.append(parsed.to_numpy(dtype='datetime64[ns]'), np.datetime64('NaT', 'ns'))
+    return pd.Series(lookup[codes], index=values.index), fmt
+
+def _parse_invoice_dates(df: pd.DataFrame, file_path: Optional[str] = None) -> pd.DataFrame:
+    """แปลงคอลัมน์วันที่ของไฟล์เดียว (รันขนานกันได้ต่อไฟล์)"""
+    date_columns = ['Invoice Date', 'invoice_date', 'InvoiceDate']
+    found = None
+    for c in date_columns:
+        if c in df.columns:
+            found = c
+            break
+    if not found:
+        print("⚠️ ไม่พบคอลัมน์วันที่, สร้างวันที่สุ่มแทน")
+        df['Invoice Date'] = pd.date_range(start='2020-01-01', periods=len(df), freq='D')
+        return df
+    if pd.api.types.is_datetime64_any_dtype(df[found]):
+        df['Invoice Date'] = df[found]
+        return df
+
+    sig = None
+    if file_path:
+        try:
+            sig = file_signature(file_path)
+        except OSError:
+            sig = None
+
+    with _date_format_lock:
+        cached = sig is not None and sig in _date_format_cache
+        fmt = _date_format_cache.get(sig) if cached else None
+    df['Invoice Date'], fmt = parse_dates_unique(df[found], fmt, detect=not cached)
+    if not cached:
+        if sig is not None:
+            with _date_format_lock:
+                _date_format_cache[sig] = fmt
+        print(f"📅 ตรวจรูปแบบวันที่ {file_path or found}: {fmt or 'mixed'}")
+    return df
+
+def _load_brand_file(brand_name: str, file_path: str) -> Optional[pd.DataFrame]:
+    """อ่าน CSV ของแบรนด์เดียว + แปลงวันที่ (ใช้ใน thread pool)"""
+    try:
+        encoding = sniff_encoding(file_path)
+    except OSError as e:
+        print(f"❌ เปิดไฟล์ {file_path} ไม่ได้: {e}")
+        return None
+
+    df = None
+    try:
+        df = pd.read_csv(file_path, encoding=encoding, on_bad_lines='skip', low_memory=False)
+        print(f"✅ โหลดไฟล์ {file_path} สำเร็จด้วย encoding {encoding} ({len(df)} แถว)")
+    except UnicodeDecodeError:
+        # sniff จาก sample ผิด (ไบต์เสียอยู่ท้ายไฟล์) → latin-1 decode ได้ทุกไบต์
+        print(f"⚠️ encoding {encoding} ใช้กับ {file_path} ไม่ได้ → ใช้ latin-1")
+        encoding = 'latin-1'
+        try:
+            df = pd.read_csv(file_path, encoding=encoding, on_bad_lines='skip', low_memory=False)
+        except Exception as e:
+            print(f"⚠️ อ่านไฟล์ {file_path} ล้มเหลว: {e}")
+    except pd.errors.ParserError as e:
+        print(f"⚠️ ParserError {file_path}: {e} → ลอง engine='python'")
+        try:
+            df = pd.read_csv(file_path, encoding=encoding, sep=None, engine='python', on_bad_lines='skip')
+            print(f"✅ โหลดไฟล์ {file_path} สำเร็จด้วยวิธีสำรอง ({len(df)} แถว)")
+        except Exception as e2:
+            print(f"❌ อ่านวิธีสำรองล้มเหลว: {e2}")
+    except Exception as e:
+        print(f"⚠️ อ่านไฟล์ {file_path} ล้มเหลว: {e}")
+
+    if df is None:
+        print(f"❌ ไม่สามารถโหลดไฟล์ {file_path} ด้วย encoding ใดๆ")
+        return None
+
+    # 🔒 บังคับแบรนด์จากไฟล์
+    df['Brand'] = brand_name
+    return _parse_invoice_dates(df, file_path)
 
 def load_and_prepare_data() -> Optional[pd.DataFrame]:
     print("📂 กำลังโหลดข้อมูลจากไฟล์...")
     print("📁 BRAND PATHS:", SUPPORTED_BRANDS)
-    dfs = []
     _seen_signatures = set()  # (size, mtime) เพื่อตรวจไฟล์ซ้ำ
 
+    jobs = []
     for brand_name, file_path in SUPPORTED_BRANDS.items():
+        if not file_path or not os.path.exists(file_path):
+            print(f"⚠️ ไม่พบไฟล์สำหรับ {brand_name}: {file_path}")
+            continue
+
+        # ตรวจไฟล์ซ้ำ (ป้องกัน path ชี้ไฟล์เดียวกัน)
         try:
-            if not file_path or not os.path.exists(file_path):
-                print(f"⚠️ ไม่พบไฟล์สำหรับ {brand_name}: {file_path}")
-                continue
+            st = os.stat(file_path)
+            sig = (st.st_size, int(st.st_mtime))
+            if sig in _seen_signatures:
+                print(f"⚠️ พบไฟล์ซ้ำกันระหว่างแบรนด์ (ขนาด/mtime เท่ากัน): {brand_name} → {file_path}")
+            _seen_signatures.add(sig)
+        except Exception as e:
+            print(f"⚠️ ตรวจลายเซ็นไฟล์ไม่ได้: {file_path} ({e})")
+
+        jobs.append((brand_name, file_path))
 
-            # ตรวจไฟล์ซ้ำ (ป้องกัน path ชี้ไฟล์เดียวกัน)
+    if not jobs:
+        print("⚠️ ไม่พบไฟล์ข้อมูล, จะใช้ข้อมูลจำลองแทน")
+        return None
+
+    # อ่าน + แปลงวันที่ทุกไฟล์พร้อมกัน (C parser ของ pandas ปล่อย GIL ระหว่าง tokenize)
+    workers = DATA_LOAD_WORKERS or len(jobs)
+    dfs = []
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = [pool.submit(_load_brand_file, b, p) for b, p in jobs]
+        # เก็บผลตามลำดับ SUPPORTED_BRANDS เพื่อให้ผล concat คงที่
+        for (brand_name, _), fut in zip(jobs, futures):
             try:
-                st = os.stat(file_path)
-                sig = (st.st_size, int(st.st_mtime))
-                if sig in _seen_signatures:
-                    print(f"⚠️ พบไฟล์ซ้ำกันระหว่างแบรนด์ (ขนาด/mtime เท่ากัน): {brand_name} → {file_path}")
-                _seen_signatures.add(sig)
+                df = fut.result()
             except Exception as e:
-                print(f"⚠️ ตรวจลายเซ็นไฟล์ไม่ได้: {file_path} ({e})")
-
-            # ลองอ่านหลาย encoding
-            read_success = False
-            for encoding in ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']:
-                try:
-                    df = pd.read_csv(file_path, encoding=encoding, on_bad_lines='skip', low_memory=False)
-                    # 🔒 บังคับแบรนด์จากไฟล์
-                    df['Brand'] = brand_name
-                    dfs.append(df)
-                    print(f"✅ โหลดไฟล์ {file_path} สำเร็จด้วย encoding {encoding} ({len(df)} แถว)")
-                    read_success = True
-                    break
-                except UnicodeDecodeError:
-                    continue
-                except pd.errors.ParserError as e:
-                    print(f"⚠️ ParserError {file_path}: {e} → ลอง engine='python'")
-                    try:
-                        df = pd.read_csv(file_path, encoding=encoding, sep=None, engine='python', on_bad_lines='skip')
-                        df['Brand'] = brand_name  # 🔒
-                        dfs.append(df)
-                        print(f"✅ โหลดไฟล์ {file_path} สำเร็จด้วยวิธีสำรอง ({len(df)} แถว)")
-                        read_success = True
-                        break
-                    except Exception as e2:
-                        print(f"❌ อ่านวิธีสำรองล้มเหลว: {e2}")
-                        continue
-                except Exception as e:
-                    print(f"⚠️ อ่านไฟล์ {file_path} ล้มเหลว: {e}")
-                    continue
-
-            if not read_success:
-                print(f"❌ ไม่สามารถโหลดไฟล์ {file_path} ด้วย encoding ใดๆ")
-
-        except Exception as e:
-            print(f"❌ ไม่สามารถโหลดไฟล์สำหรับ {brand_name}: {e}")
+                print(f"❌ ไม่สามารถโหลดไฟล์สำหรับ {brand_name}: {e}")
+                continue
+            if df is not None:
+                dfs.append(df)
 
     if not dfs:
         print("⚠️ ไม่พบไฟล์ข้อมูล, จะใช้ข้อมูลจำลองแทน")
@@ -81,28 +235,6 @@ def load_and_prepare_data() -> Optional[pd.DataFrame]:
 
     df = pd.concat(dfs, ignore_index=True)
 
-    # จัดการวันที่
-    date_columns = ['Invoice Date', 'invoice_date', 'InvoiceDate']
-    found = None
-    for c in date_columns:
-        if c in df.columns:
-            found = c
-            break
-    if found:
-        try:
-            df['Invoice Date'] = pd.to_datetime(df[found], dayfirst=True, format='mixed')
-        except Exception:
-            try:
-                df['Invoice Date'] = pd.to_datetime(df[found], format='%d/%m/%Y')
-            except Exception:
-                try:
-                    df['Invoice Date'] = pd.to_datetime(df[found], format='%m/%d/%Y')
-                except Exception:
-                    df['Invoice Date'] = pd.to_datetime(df[found], infer_datetime_format=True)
-    else:
-        print("⚠️ ไม่พบคอลัมน์วันที่, สร้างวันที่สุ่มแทน")
-        df['Invoice Date'] = pd.date_range(start='2020-01-01', periods=len(df), freq='D')
-
     # ทำความสะอาดตัวเลข
     print("\n🔧 กำลังทำความสะอาดข้อมูลตัวเลข...")
 
@@ -115,10 +247,12 @@ def load_and_prepare_data() -> Optional[pd.DataFrame]:
 
     for col in ['Units Sold', 'Total Sales', 'Operating Profit', 'Operating Margin', 'Price per Unit']:
         if col in df.columns:
-            before = df[col].sum() if df[col].dtype != 'object' else 0
-            df[col] = clean_numeric(df[col])
-            after = df[col].sum()
-            print(f"  ทำความสะอาด: {col} → ก่อน {before:.2f}, หลัง {after:.2f}")
+            if logger.isEnabledFor(logging.DEBUG):
+                before = df[col].sum() if df[col].dtype != 'object' else 0
+                df[col] = clean_numeric(df[col])
+                logger.debug(f"  ทำความสะอาด: {col} → ก่อน {before:.2f}, หลัง {df[col].sum():.2f}")
+            else:
+                df[col] = clean_numeric(df[col])
 
     df = df.dropna(subset=['Brand', 'Invoice Date'])
 
@@ -131,20 +265,21 @@ def load_and_prepare_data() -> Optional[pd.DataFrame]:
     }
     df['Brand'] = df['Brand'].astype(str).map(brand_mapping).fillna(df['Brand'])
 
-    # กรองเฉพาะแบรนด์ที่รองรับ
-    df = df[df['Brand'].isin(SUPPORTED_BRANDS.keys())]
+    # กรองเฉพาะแบรนด์ที่รองรับ + เก็บ Brand เป็น categorical (groupby/filter เร็วขึ้น)
+    df['Brand'] = pd.Categorical(df['Brand'], categories=list(SUPPORTED_BRANDS.keys()))
+    df = df[df['Brand'].notna()]
 
     print(f"\n📊 ข้อมูลรวมหลังทำความสะอาด: {len(df)} แถว")
     print(f"📅 ช่วงเวลา: {df['Invoice Date'].min()} ถึง {df['Invoice Date'].max()}")
     print(f"🏷️ แบรนด์: {', '.join(sorted(df['Brand'].unique()))}")
 
-    for brand in SUPPORTED_BRANDS.keys():
-        bd = df[df['Brand'] == brand]
-        if len(bd) > 0:
-            if 'Units Sold' in bd.columns:
-                print(f"  {brand}: {len(bd)} แถว, Units Sold รวม: {bd['Units Sold'].sum():,.0f}")
-            else:
-                print(f"  {brand}: {len(bd)} แถว, (ไม่มี Units Sold)")
+    rows_per_brand = df.groupby('Brand', observed=True).size()
+    units_per_brand = df.groupby('Brand', observed=True)['Units Sold'].sum() if 'Units Sold' in df.columns else None
+    for brand, n in rows_per_brand.items():
+        if units_per_brand is not None:
+            print(f"  {brand}: {n} แถว, Units Sold รวม: {units_per_brand[brand]:,.0f}")
+        else:
+            print(f"  {brand}: {n} แถว, (ไม่มี Units Sold)")
 
     return df
 
@@ -174,98 +309,124 @@ def create_sample_data() -> pd.DataFrame:
             })
     return pd.DataFrame(sample)
 
+_MOCK_BRAND_PARAMS = {
+    'ADIDAS': {'base_demand': 120, 'avg_price': 120},
+    'NIKE': {'base_demand': 150, 'avg_price': 150},
+    'PUMA': {'base_demand': 80,  'avg_price': 90},
+    'H&M':  {'base_demand': 200, 'avg_price': 70}
+}
+
+def _brand_month_stats(df: pd.DataFrame, units_col: str) -> pd.DataFrame:
+    """สรุปต่อ (brand, month) ใน groupby เดียวทั้ง DataFrame
+
+    ค่าระดับแบรนด์ (ยอดรวม, ช่วงวันที่, ราคาเฉลี่ย) rollup ต่อจากตารางนี้
+    ซึ่งมีไม่เกิน brands × 12 แถว จึงไม่ต้องกรอง df ทีละแบรนด์อีก
+    """
+    brands = list(SUPPORTED_BRANDS.keys())
+    units = df[units_col]
+    cols = {
+        'Brand': pd.Categorical(df['Brand'], categories=brands),
+        'month': df['Invoice Date'].dt.month,
+        'units': units,
+        'date': df['Invoice Date'],
+    }
+    if 'Price per Unit' in df.columns:
+        price = df['Price per Unit']
+        cols['price_sum'] = price.where(price > 0, 0.0)
+        cols['price_cnt'] = (price > 0).astype('int64')
+    if 'Total Sales' in df.columns:
+        valid = (df['Total Sales'] > 0) & (units > 0)
+        cols['ts_sales'] = df['Total Sales'].where(valid, 0.0)
+        cols['ts_units'] = units.where(valid, 0.0)
+    frame = pd.DataFrame(cols)
+
+    aggs = {
+        'units': ('units', 'sum'),
+        'rows': ('units', 'size'),
+        'date_min': ('date', 'min'),
+        'date_max': ('date', 'max'),
+        'date_nunique': ('date', 'nunique'),
+    }
+    for c in ('price_sum', 'price_cnt', 'ts_sales', 'ts_units'):
+        if c in frame.columns:
+            aggs[c] = (c, 'sum')
+    return frame.groupby(['Brand', 'month'], observed=True).agg(**aggs)
+
 def calculate_brand_parameters(df: pd.DataFrame) -> Dict[str, Any]:
     brand_params: Dict[str, Any] = {}
 
-    print("\n🔍 DEBUG: ตรวจสอบข้อมูลก่อนคำนวณพารามิเตอร์")
-    for brand in SUPPORTED_BRANDS.keys():
-        bd = df[df['Brand'] == brand]
-        print(f"\n{brand}:")
-        print(f"  จำนวนแถว: {len(bd)}")
-        if len(bd) > 0 and 'Units Sold' in bd.columns:
-            print(f"  Units Sold - รวม: {bd['Units Sold'].sum():,.0f}, ค่าเฉลี่ย: {bd['Units Sold'].mean():.2f}")
-            print(f"  ตัวอย่างค่า: {bd['Units Sold'].head(5).tolist()}")
-        if len(bd) > 0 and 'Price per Unit' in bd.columns:
-            print(f"  Price per Unit - ค่าเฉลี่ย: {bd['Price per Unit'].mean():.2f}")
+    units_col = None
+    for c in ['Units Sold', 'units_sold', 'UnitsSold', 'Quantity', 'Qty']:
+        if c in df.columns:
+            units_col = c
+            break
 
-    for brand in SUPPORTED_BRANDS.keys():
-        bd = df[df['Brand'] == brand].copy()
+    stats = None
+    if units_col is not None and len(df) > 0:
+        try:
+            stats = _brand_month_stats(df, units_col)
+        except Exception as e:
+            print(f"❌ เกิดข้อผิดพลาดในการคำนวณพารามิเตอร์: {e}")
+            stats = None
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("\n🔍 DEBUG: ตรวจสอบข้อมูลก่อนคำนวณพารามิเตอร์")
+        for brand in SUPPORTED_BRANDS.keys():
+            has = stats is not None and brand in stats.index.get_level_values('Brand')
+            bs = stats.xs(brand, level='Brand') if has else None
+            logger.debug(f"\n{brand}:")
+            logger.debug(f"  จำนวนแถว: {int(bs['rows'].sum()) if has else 0}")
+            if has:
+                total, rows = bs['units'].sum(), bs['rows'].sum()
+                logger.debug(f"  Units Sold - รวม: {total:,.0f}, ค่าเฉลี่ย: {total / rows:.2f}")
+                if 'price_cnt' in bs.columns and bs['price_cnt'].sum() > 0:
+                    logger.debug(f"  Price per Unit - ค่าเฉลี่ย: {bs['price_sum'].sum() / bs['price_cnt'].sum():.2f}")
 
+    for brand in SUPPORTED_BRANDS.keys():
         min_date, max_date = "N/A", "N/A"
         num_days = 365
         total_units = 0.0
-        base_daily_demand = 50.0
-        avg_price = 100.0
-
-        units_col = None
-        for c in ['Units Sold', 'units_sold', 'UnitsSold', 'Quantity', 'Qty']:
-            if c in bd.columns:
-                units_col = c
-                break
-
-        if len(bd) == 0 or units_col is None:
-            # mock
-            mock = {
-                'ADIDAS': {'base_demand': 120, 'avg_price': 120},
-                'NIKE': {'base_demand': 150, 'avg_price': 150},
-                'PUMA': {'base_demand': 80,  'avg_price': 90},
-                'H&M':  {'base_demand': 200, 'avg_price': 70}
-            }.get(brand, {'base_demand': 50, 'avg_price': 100})
-            base_daily_demand = float(mock['base_demand'])
-            avg_price = float(mock['avg_price'])
-            seasonality = {m: 1.0 for m in range(1, 13)}
-        else:
-            total_units = float(bd[units_col].sum())
-            if total_units == 0:
-                mock = {
-                    'ADIDAS': {'base_demand': 120, 'avg_price': 120},
-                    'NIKE': {'base_demand': 150, 'avg_price': 150},
-                    'PUMA': {'base_demand': 80,  'avg_price': 90},
-                    'H&M':  {'base_demand': 200, 'avg_price': 70}
-                }.get(brand, {'base_demand': 50, 'avg_price': 100})
-                base_daily_demand = float(mock['base_demand'])
-                avg_price = float(mock['avg_price'])
-                seasonality = {m: 1.0 for m in range(1, 13)}
-            else:
-                try:
-                    min_date = bd['Invoice Date'].min()
-                    max_date = bd['Invoice Date'].max()
-                    if pd.isna(min_date) or pd.isna(max_date):
-                        num_days = len(bd['Invoice Date'].unique())
-                        min_date, max_date = "N/A", "N/A"
+        mock = _MOCK_BRAND_PARAMS.get(brand, {'base_demand': 50, 'avg_price': 100})
+        base_daily_demand = float(mock['base_demand'])
+        avg_price = float(mock['avg_price'])
+        seasonality = {m: 1.0 for m in range(1, 13)}
+
+        has = stats is not None and brand in stats.index.get_level_values('Brand')
+        bs = stats.xs(brand, level='Brand') if has else None
+        if bs is not None and float(bs['units'].sum()) != 0:
+            try:
+                total_units = float(bs['units'].sum())
+                min_date = bs['date_min'].min()
+                max_date = bs['date_max'].max()
+                if pd.isna(min_date) or pd.isna(max_date):
+                    # วันที่ต่างเดือนไม่ซ้ำกัน → ผลรวม nunique รายเดือน = nunique ทั้งแบรนด์
+                    num_days = int(bs['date_nunique'].sum())
+                    min_date, max_date = "N/A", "N/A"
+                else:
+                    dr = (max_date - min_date).days + 1
+                    num_days = dr if dr > 0 else int(bs['date_nunique'].sum())
+                base_daily_demand = float(total_units / num_days) if num_days > 0 else 50.0
+
+                monthly_sales = bs['units']
+                avg_sales = monthly_sales.mean() if len(monthly_sales) > 0 else 0.0
+                seasonality = {}
+                for m in range(1, 13):
+                    if m in monthly_sales.index and avg_sales > 0:
+                        seasonality[m] = float(monthly_sales[m] / avg_sales)
                     else:
-                        dr = (max_date - min_date).days + 1
-                        num_days = dr if dr > 0 else len(bd['Invoice Date'].unique())
-                    base_daily_demand = float(total_units / num_days) if num_days > 0 else 50.0
-
-                    monthly_sales = bd.groupby(bd['Invoice Date'].dt.month)[units_col].sum()
-                    avg_sales = monthly_sales.mean() if len(monthly_sales) > 0 else 0.0
-                    seasonality = {}
-                    for m in range(1, 13):
-                        if m in monthly_sales.index and avg_sales > 0:
-                            seasonality[m] = float(monthly_sales[m] / avg_sales)
-                        else:
-                            seasonality[m] = 1.0
-
-                    if 'Price per Unit' in bd.columns:
-                        vp = bd[bd['Price per Unit'] > 0]['Price per Unit']
-                        if len(vp) > 0:
-                            avg_price = float(vp.mean())
-                        elif 'Total Sales' in bd.columns:
-                            valid = bd[(bd['Total Sales'] > 0) & (bd[units_col] > 0)]
-                            if len(valid) > 0:
-                                avg_price = float(valid['Total Sales'].sum() / valid[units_col].sum())
-                    elif 'Total Sales' in bd.columns:
-                        valid = bd[(bd['Total Sales'] > 0) & (bd[units_col] > 0)]
-                        if len(valid) > 0:
-                            avg_price = float(valid['Total Sales'].sum() / valid[units_col].sum())
-
-                except Exception as e:
-                    print(f"❌ เกิดข้อผิดพลาดในการคำนวณสำหรับ {brand}: {e}")
-                    mock = {'base_demand': 50, 'avg_price': 100}
-                    base_daily_demand = float(mock['base_demand'])
-                    avg_price = float(mock['avg_price'])
-                    seasonality = {m: 1.0 for m in range(1, 13)}
+                        seasonality[m] = 1.0
+
+                avg_price = 100.0
+                if 'price_cnt' in bs.columns and bs['price_cnt'].sum() > 0:
+                    avg_price = float(bs['price_sum'].sum() / bs['price_cnt'].sum())
+                elif 'ts_units' in bs.columns and bs['ts_units'].sum() > 0:
+                    avg_price = float(bs['ts_sales'].sum() / bs['ts_units'].sum())
+
+            except Exception as e:
+                print(f"❌ เกิดข้อผิดพลาดในการคำนวณสำหรับ {brand}: {e}")
+                base_daily_demand = 50.0
+                avg_price = 100.0
+                seasonality = {m: 1.0 for m in range(1, 13)}
 
         # baseline รายเดือน = seasonality * base_daily_demand * days_in_month
         monthly_baseline_units = {}
@@ -295,26 +456,196 @@ def calculate_brand_parameters(df: pd.DataFrame) -> Dict[str, Any]:
             }
         }
 
-        print(f"\n🏷️ {brand}:")
-        print(f" 📊 ช่วงวันที่: {min_date} ถึง {max_date} ({num_days} วัน)")
-        print(f" 📊 ความต้องการเฉลี่ยต่อวัน: {base_daily_demand:.1f} units (จาก {int(total_units):,} units)")
-        print(f" 💰 ราคาเฉลี่ย: ${avg_price:.2f}")
-        print(f" 📦 สต็อกเริ่มต้นที่คำนวณ: {initial_stock:,} units")
+        logger.info(f"\n🏷️ {brand}:")
+        logger.info(f" 📊 ช่วงวันที่: {min_date} ถึง {max_date} ({num_days} วัน)")
+        logger.info(f" 📊 ความต้องการเฉลี่ยต่อวัน: {base_daily_demand:.1f} units (จาก {int(total_units):,} units)")
+        logger.info(f" 💰 ราคาเฉลี่ย: ${avg_price:.2f}")
+        logger.info(f" 📦 สต็อกเริ่มต้นที่คำนวณ: {initial_stock:,} units")
 
     return brand_params
 
-def init_data():
-    global historical_data, brand_parameters
+def calculate_product_parameters(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """สัดส่วนความต้องการ + ราคาเฉลี่ยต่อสินค้า (SKU) ของแต่ละแบรนด์ ใน groupby เดียว
+
+    คืน {brand: {'products': ndarray[str], 'shares': ndarray[float], 'avg_price': ndarray[float]}}
+    shares รวมกันได้ 1.0 ต่อแบรนด์ ใช้กับโหมดจำลองระดับสินค้า
+    """
+    product_params: Dict[str, Dict[str, Any]] = {}
+    if not {'Brand', 'Product', 'Units Sold'} <= set(df.columns) or len(df) == 0:
+        return product_params
+
+    units = df['Units Sold'].clip(lower=0)
+    frame = pd.DataFrame({
+        'Brand': pd.Categorical(df['Brand'], categories=list(SUPPORTED_BRANDS.keys())),
+        'Product': df['Product'].astype(str),
+        'units': units,
+    })
+    if 'Price per Unit' in df.columns:
+        price = df['Price per Unit']
+        frame['price_sum'] = price.where(price > 0, 0.0)
+        frame['price_cnt'] = (price > 0).astype('int64')
+    else:
+        frame['price_sum'] = 0.0
+        frame['price_cnt'] = 0
+
+    stats = frame.groupby(['Brand', 'Product'], observed=True).agg(
+        units=('units', 'sum'), price_sum=('price_sum', 'sum'), price_cnt=('price_cnt', 'sum')
+    )
+    for brand, bs in stats.groupby(level='Brand', observed=True):
+        total = float(bs['units'].sum())
+        if total <= 0:
+            continue
+        bs = bs[bs['units'] > 0]
+        brand_avg = (bs['price_sum'].sum() / bs['price_cnt'].sum()) if bs['price_cnt'].sum() > 0 else 100.0
+        price = np.where(bs['price_cnt'] > 0, bs['price_sum'] / bs['price_cnt'].where(bs['price_cnt'] > 0, 1), brand_avg)
+        product_params[str(brand)] = {
+            'products': bs.index.get_level_values('Product').to_numpy(dtype=object),
+            'shares': (bs['units'] / total).to_numpy(dtype='float64'),
+            'avg_price': price.astype('float64'),
+        }
+    return product_params
+
+def calculate_segment_parameters(df: pd.DataFrame, brand_params: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """สัดส่วน + seasonality + ราคาเฉลี่ยต่อ segment (Region / Retailer) ของแต่ละแบรนด์ — groupby เดียวต่อมิติ
+
+    คืน {dimension: {brand: {'segments', 'shares', 'seasonality' (segments × 13, index เดือน), 'avg_price'}}}
+    share × seasonality ของทุก segment รวมกันเท่ากับ seasonality ของแบรนด์ทุกเดือน ผลรวมความต้องการ
+    ระดับแบรนด์จึงเท่ากับโหมด brand
+    """
+    segment_params: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    if not {'Brand', 'Invoice Date', 'Units Sold'} <= set(df.columns) or len(df) == 0:
+        return segment_params
+
+    for dimension, column in SEGMENT_DIMENSIONS.items():
+        if column not in df.columns:
+            continue
+        frame = pd.DataFrame({
+            'Brand': pd.Categorical(df['Brand'], categories=list(SUPPORTED_BRANDS.keys())),
+            'segment': df[column].astype(str).where(df[column].notna(), 'Unknown'),
+            'month': df['Invoice Date'].dt.month,
+            'units': df['Units Sold'].clip(lower=0),
+        })
+        if 'Price per Unit' in df.columns:
+            price = df['Price per Unit']
+            frame['price_sum'] = price.where(price > 0, 0.0)
+            frame['price_cnt'] = (price > 0).astype('int64')
+        else:
+            frame['price_sum'] = 0.0
+            frame['price_cnt'] = 0
+
+        stats = frame.groupby(['Brand', 'segment', 'month'], observed=True).agg(
+            units=('units', 'sum'), price_sum=('price_sum', 'sum'), price_cnt=('price_cnt', 'sum')
+        )
+        by_dimension: Dict[str, Dict[str, Any]] = {}
+        for brand, bs in stats.groupby(level='Brand', observed=True):
+            brand = str(brand)
+            bs = bs.droplevel('Brand')
+            monthly = bs['units'].unstack('month', fill_value=0.0).reindex(columns=range(1, 13), fill_value=0.0)
+            totals = monthly.sum(axis=1)
+            total = float(totals.sum())
+            if total <= 0:
+                continue
+            monthly = monthly[totals > 0]
+            shares = (monthly.sum(axis=1) / total).to_numpy(dtype='float64')
+
+            # seasonality ต่อ segment เทียบกับยอดเฉลี่ยต่อเดือนของทั้งแบรนด์ (เดือนที่มีข้อมูล เหมือน calculate_brand_parameters)
+            brand_monthly = monthly.sum(axis=0)
+            present = brand_monthly.to_numpy() > 0
+            avg_month = float(brand_monthly[present].mean())
+            seasonality = np.ones((len(monthly), 13), dtype='float64')
+            values = monthly.to_numpy(dtype='float64') / (shares[:, None] * avg_month)
+            seasonality[:, 1:] = np.where(present, values, 1.0)
+
+            price = bs.groupby(level='segment', observed=True)[['price_sum', 'price_cnt']].sum().reindex(monthly.index)
+            brand_avg = float(brand_params.get(brand, {}).get('avg_price', 100.0))
+            avg_price = np.where(price['price_cnt'] > 0, price['price_sum'] / price['price_cnt'].where(price['price_cnt'] > 0, 1), brand_avg)
+            by_dimension[brand] = {
+                'segments': monthly.index.to_numpy(dtype=object),
+                'shares': shares,
+                'seasonality': seasonality,
+                'avg_price': avg_price.astype('float64'),
+            }
+        segment_params[dimension] = by_dimension
+    return segment_params
+
+def build_demand_trace(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """ยอดขายจริงรายวันต่อแบรนด์เป็น matrix หนาแน่น (แบรนด์ × วัน) สำหรับ replay / backtest — bincount ครั้งเดียว
+
+    คืน {'brands': [...ตาม SUPPORTED_BRANDS], 'start_date': datetime, 'units': int64, 'revenue': float64}
+    วันที่ไม่มีขาย (หรือแบรนด์ที่ไม่มีข้อมูล) = 0
+    """
+    if not {'Brand', 'Invoice Date', 'Units Sold'} <= set(df.columns) or len(df) == 0:
+        return None
+    brands = list(SUPPORTED_BRANDS.keys())
+    codes = pd.Categorical(df['Brand'], categories=brands).codes.astype('int64')
+    days = df['Invoice Date'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype('int64')
+    valid = (codes >= 0) & (df['Invoice Date'].notna().to_numpy())
+    if not valid.any():
+        return None
+    codes, days = codes[valid], days[valid]
+    first = int(days.min())
+    span = int(days.max()) - first + 1
+    cell = codes * span + (days - first)
+    units = df['Units Sold'].to_numpy(dtype='float64')[valid].clip(min=0)
+    revenue = df['Total Sales'].to_numpy(dtype='float64')[valid] if 'Total Sales' in df.columns else np.zeros(len(cell))
+    shape = (len(brands), span)
+    return {
+        'brands': brands,
+        'start_date': datetime(1970, 1, 1) + timedelta(days=first),
+        'units': np.rint(np.bincount(cell, weights=units, minlength=len(brands) * span)).astype('int64').reshape(shape),
+        'revenue': np.bincount(cell, weights=np.nan_to_num(revenue), minlength=len(brands) * span).reshape(shape),
+    }
+
+def compute_data_version(sample: Optional[pd.DataFrame] = None) -> str:
+    """hash สั้นของแหล่งข้อมูล: path + ขนาด + mtime ของไฟล์แบรนด์ทั้งหมด (เปลี่ยนเมื่อไฟล์เปลี่ยน)
+    หรือเนื้อหาของข้อมูลตัวอย่าง (sample) ที่ใช้แทนเมื่อโหลดไฟล์ไม่ได้ — ข้อมูลตัวอย่างสุ่มใหม่ทุกครั้ง
+    จึงไม่ใช้ version ร่วมกับข้อมูลจริงหรือข้อมูลตัวอย่างชุดอื่น"""
+    h = hashlib.sha1()
+    if sample is not None:
+        h.update(b"sample")
+        h.update(pd.util.hash_pandas_object(sample, index=False).to_numpy().tobytes())
+        return h.hexdigest()[:16]
+    h.update(b"files")
+    for brand_name, file_path in SUPPORTED_BRANDS.items():
+        h.update(brand_name.encode())
+        if file_path and os.path.exists(file_path):
+            h.update(repr(file_signature(file_path)).encode())
+    return h.hexdigest()[:16]
+
+def prepare_shared_data() -> Optional[pd.DataFrame]:
+    """โหลด historical data ผ่าน SHARED_DATA_DIR (attach ถ้ามีแล้ว, ไม่งั้นสร้างแล้ว export)"""
+    from services.shared_data import load_or_build
+    return load_or_build(SHARED_DATA_DIR, data_version or compute_data_version(), load_and_prepare_data)
+
+def init_data(progress: Optional[Callable[[str], None]] = None):
+    """โหลด historical data + คำนวณพารามิเตอร์ (progress(stage) ถูกเรียกหลังแต่ละขั้น)"""
+    global historical_data, brand_parameters, product_parameters, segment_parameters, demand_trace, data_version
+    progress = progress or (lambda stage: None)
+    data_version = compute_data_version()
     try:
-        historical_data = load_and_prepare_data()
+        historical_data = prepare_shared_data() if SHARED_DATA_DIR else load_and_prepare_data()
         if historical_data is None:
             historical_data = create_sample_data()
+            data_version = compute_data_version(historical_data)
+        progress("historical data loaded")
         brand_parameters = calculate_brand_parameters(historical_data)
+        progress("brand parameters computed")
+        product_parameters = calculate_product_parameters(historical_data)
+        progress("product parameters computed")
+        segment_parameters = calculate_segment_parameters(historical_data, brand_parameters)
+        progress("segment parameters computed")
+        demand_trace = build_demand_trace(historical_data)
+        progress("demand trace built")
         print("\n✅ โหลดข้อมูลและคำนวณพารามิเตอร์สำเร็จ")
     except Exception as e:
         print(f"❌ ไม่สามารถโหลดข้อมูลได้: {e}")
         historical_data = create_sample_data()
+        data_version = compute_data_version(historical_data)
         brand_parameters = calculate_brand_parameters(historical_data)
+        product_parameters = calculate_product_parameters(historical_data)
+        segment_parameters = calculate_segment_parameters(historical_data, brand_parameters)
+        demand_trace = build_demand_trace(historical_data)
+        progress("sample data fallback loaded")
 
 def get_historical_data() -> Optional[pd.DataFrame]:
     return historical_data
@@ -322,5 +653,17 @@ def get_historical_data() -> Optional[pd.DataFrame]:
 def get_brand_parameters() -> Optional[Dict[str, Any]]:
     return brand_parameters
 
+def get_product_parameters() -> Dict[str, Dict[str, Any]]:
+    return product_parameters or {}
+
+def get_segment_parameters(dimension: str) -> Dict[str, Dict[str, Any]]:
+    return (segment_parameters or {}).get(dimension, {})
+
+def get_demand_trace() -> Optional[Dict[str, Any]]:
+    return demand_trace
+
+def get_data_version() -> Optional[str]:
+    return data_version
+
 def get_supported_brands() -> List[str]:
     return list(SUPPORTED_BRANDS.keys())
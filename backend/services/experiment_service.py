@@ -0,0 +1,330 @@
+"""Monte Carlo ขนาดใหญ่แบบ out-of-core (ดูรูปแบบไฟล์ใน simulation/experiment.py)
+
+POST /experiments สร้างไดเรกทอรี <RESULTS_DIR>/<experiment_id>/ แล้วจำลองเบื้องหลังทีละก้อนของ path
+(RESULTS_CHUNK_PATHS path ต่อก้อน, ข้าม process ผ่าน process pool ถ้ามี) เมื่อครบทุกก้อนจึงสรุปผล
+ทีละคอลัมน์/ช่วงวัน client ดึงผลบางส่วนตาม path / แบรนด์ / ช่วงวันได้โดยไม่ต้องโหลดทั้งก้อน
+
+experiment_id = hash ของ request + seed + data version — ส่ง experiment เดิมซ้ำจะได้ผลเดิมทันที
+manifest ของงานที่ยังไม่จบเก็บ owner (host, pid, heartbeat) ของ worker ที่รัน worker อื่นที่แชร์ RESULTS_DIR
+จึงเห็นงานนั้นเป็น running (ไม่ลบ/เริ่มใหม่ทับ) และเป็น interrupted เมื่อ owner หายไปแล้วเท่านั้น
+"""
+import hashlib
+import json
+import os
+import random
+import shutil
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+from fastapi import HTTPException
+
+from models.pydantic import ExperimentRequest, SimulationRequest
+from services.data_service import get_brand_parameters, get_data_version, get_supported_brands
+from services.simulation_service import (
+    require_plain_request, resolve_brand_configs, resolve_festival_multipliers, resolve_horizon
+)
+from services.workers import SIMULATION_WORKERS, map_chunks
+from simulation.batch_simulation import DAILY_FIELDS
+from simulation import experiment as store
+
+# ไดเรกทอรีผล, ขนาดสูงสุดต่อ experiment (bytes), จำนวน path ต่อก้อนที่จำลอง/เขียนพร้อมกัน
+RESULTS_DIR = os.getenv("RESULTS_DIR", "data/results")
+RESULTS_MAX_BYTES = int(os.getenv("RESULTS_MAX_BYTES", str(8 * 1024 ** 3)) or 0)
+RESULTS_CHUNK_PATHS = int(os.getenv("RESULTS_CHUNK_PATHS", "256") or 256)
+# owner บนเครื่องอื่น (RESULTS_DIR ที่แชร์ข้ามเครื่อง) ที่ไม่อัปเดต heartbeat นานเกินนี้ (วินาที) ถือว่าหยุดไปแล้ว
+EXPERIMENT_STALE_SECONDS = float(os.getenv("EXPERIMENT_STALE_SECONDS", "600") or 600)
+
+EXPERIMENT_SCHEMA = 1
+DEFAULT_FIELDS = ("stock", "sales", "lost_sales")
+MAX_PATHS = 100_000
+MAX_SLICE_CELLS = 200_000
+MANIFEST = "manifest.json"
+
+_runner: Optional[ThreadPoolExecutor] = None
+_runner_lock = threading.Lock()
+_active: Set[str] = set()
+_host = socket.gethostname()
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _directory(experiment_id: str) -> str:
+    return os.path.join(RESULTS_DIR, experiment_id)
+
+
+def experiment_key(request: Dict[str, Any], seed: int, data_version: str) -> str:
+    canonical = json.dumps(
+        {"schema": EXPERIMENT_SCHEMA, "request": request, "seed": int(seed), "data_version": data_version},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def _owner_alive(experiment_id: str, owner: Optional[Dict[str, Any]]) -> bool:
+    """worker ที่รัน experiment ยังอยู่หรือไม่ (process นี้ดูจาก _active, เครื่องเดียวกันดูจาก pid, เครื่องอื่นดู heartbeat)"""
+    if not owner:
+        return experiment_id in _active
+    if owner.get("host") == _host:
+        if owner.get("pid") == os.getpid():
+            return experiment_id in _active
+        try:
+            os.kill(int(owner["pid"]), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+    return time.time() - float(owner.get("heartbeat") or 0) < EXPERIMENT_STALE_SECONDS
+
+
+def _read_manifest(experiment_id: str) -> Optional[Dict[str, Any]]:
+    if not all(c in "0123456789abcdef" for c in experiment_id):
+        return None
+    try:
+        with open(os.path.join(_directory(experiment_id), MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest["status"] in ("queued", "running") and not _owner_alive(experiment_id, manifest.get("owner")):
+        # worker ที่รันอยู่หยุดไปก่อนจบ (restart)
+        manifest["status"] = "interrupted"
+    return manifest
+
+
+def _write_manifest(manifest: Dict[str, Any]) -> None:
+    if manifest["status"] in ("queued", "running"):
+        manifest["owner"] = {"host": _host, "pid": os.getpid(), "heartbeat": time.time()}
+    path = os.path.join(_directory(manifest["experiment_id"]), MANIFEST)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _get_runner() -> ThreadPoolExecutor:
+    """thread เดียวรัน experiment ตามลำดับ (งานในแต่ละ experiment กระจายผ่าน process pool)"""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="experiment")
+    return _runner
+
+
+def _run_experiment(manifest: Dict[str, Any], configs: Dict[str, Any], festivals: Dict[str, float]) -> None:
+    experiment_id = manifest["experiment_id"]
+    directory = _directory(experiment_id)
+    paths, days, seed = manifest["paths"], manifest["simulation_days"], manifest["seed"]
+    start_date = datetime.strptime(manifest["start_date"], "%Y-%m-%d")
+    brand_params = get_brand_parameters()
+    try:
+        manifest["status"] = "running"
+        _write_manifest(manifest)
+        chunks = [
+            (directory, brand, configs[brand], brand_params, list(range(seed + row0, seed + min(paths, row0 + RESULTS_CHUNK_PATHS))),
+             start_date, festivals, days, row0, manifest["fields"])
+            for brand in manifest["brands"]
+            for row0 in range(0, paths, RESULTS_CHUNK_PATHS)
+        ]
+        # ทีละกลุ่มเท่าจำนวน worker เพื่อบันทึกความคืบหน้า
+        group = max(1, SIMULATION_WORKERS)
+        for i in range(0, len(chunks), group):
+            done = map_chunks(store.run_experiment_chunk, chunks[i:i + group])
+            manifest["paths_done"] += sum(done)
+            _write_manifest(manifest)
+
+        summary = {}
+        for brand in manifest["brands"]:
+            summary[brand] = store.summarize_totals(directory, brand)
+            for field in manifest["fields"]:
+                store.compute_bands(directory, brand, field)
+        manifest.update(status="completed", summary=summary, finished_at=_now())
+        print(f"✅ Experiment {experiment_id} completed: {paths} paths x {len(manifest['brands'])} brands x {days} days")
+    except Exception as e:
+        import traceback
+        print(f"❌ Experiment {experiment_id} failed: {str(e)}")
+        print(traceback.format_exc())
+        manifest.update(status="failed", error=str(e), finished_at=_now())
+    finally:
+        _write_manifest(manifest)
+        _active.discard(experiment_id)
+
+
+def start_experiment(request: ExperimentRequest) -> Dict[str, Any]:
+    """สร้าง experiment และเริ่มจำลองเบื้องหลัง (experiment เดิมที่เสร็จ/กำลังรันอยู่ → คืนข้อมูลเดิม)"""
+    paths = request.paths if request.paths is not None else 1000
+    if not 1 <= paths <= MAX_PATHS:
+        raise HTTPException(status_code=400, detail=f"paths must be between 1 and {MAX_PATHS}")
+    if request.seed is not None and request.seed < 0:
+        raise HTTPException(status_code=400, detail="seed must be >= 0")
+    base = request.base or SimulationRequest()
+    require_plain_request(base, "/experiments")
+
+    supported = get_supported_brands()
+    brands = ["H&M" if b == "H_M" else b for b in (request.brands or supported)]
+    unknown = [b for b in brands if b not in supported]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown brands: {unknown}. Use any of {supported}")
+    brands = list(dict.fromkeys(brands))
+    fields = list(dict.fromkeys(request.fields or DEFAULT_FIELDS))
+    unknown = [f for f in fields if f not in DAILY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}. Use any of {list(DAILY_FIELDS)}")
+
+    _, start_date, simulation_days = resolve_horizon(base)
+    size = store.experiment_bytes(len(brands), len(fields), paths, simulation_days)
+    if RESULTS_MAX_BYTES and size > RESULTS_MAX_BYTES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Experiment needs {size / 1024 ** 3:.1f} GiB; limit is {RESULTS_MAX_BYTES / 1024 ** 3:.1f} GiB (RESULTS_MAX_BYTES)"
+        )
+    configs = resolve_brand_configs(base)
+    festivals = resolve_festival_multipliers(base)
+
+    seed = request.seed if request.seed is not None else random.getrandbits(31)
+    normalized = {
+        "base": base.model_dump(exclude={"include", "seed"}),
+        "paths": paths,
+        "brands": brands,
+        "fields": fields,
+    }
+    experiment_id = experiment_key(normalized, seed, get_data_version() or "")
+    existing = _read_manifest(experiment_id)
+    if existing is not None and existing["status"] in ("queued", "running", "completed"):
+        return existing
+    shutil.rmtree(_directory(experiment_id), ignore_errors=True)
+
+    try:
+        os.makedirs(_directory(experiment_id))
+    except FileExistsError:
+        # worker อื่นเริ่ม experiment เดียวกันพร้อมกัน
+        raise HTTPException(status_code=409, detail=f"Experiment {experiment_id} is being created by another worker; retry")
+    store.create_arrays(_directory(experiment_id), brands, fields, paths, simulation_days)
+    manifest = {
+        "schema": EXPERIMENT_SCHEMA,
+        "experiment_id": experiment_id,
+        "status": "queued",
+        "created_at": _now(),
+        "finished_at": None,
+        "seed": seed,
+        "paths": paths,
+        "simulation_days": simulation_days,
+        "start_date": start_date.strftime("%Y-%m-%d"),
+        "brands": brands,
+        "fields": fields,
+        "paths_done": 0,
+        "bytes": size,
+        "request": normalized,
+        "data_version": get_data_version(),
+        "summary": None,
+        "error": None,
+    }
+    _write_manifest(manifest)
+    _active.add(experiment_id)
+
+    print("\n🗄️ Experiment:")
+    print(f" 🆔 {experiment_id} → {_directory(experiment_id)}")
+    print(f" 🎲 Paths: {paths} (seed {seed}..{seed + paths - 1}) x {len(brands)} brands x {simulation_days} days")
+    print(f" 💾 Size: {size / 1024 ** 2:.1f} MiB ({', '.join(fields)})")
+    _get_runner().submit(_run_experiment, manifest, configs, festivals)
+    return dict(manifest)
+
+
+def get_experiment(experiment_id: str) -> Dict[str, Any]:
+    manifest = _read_manifest(experiment_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail=f"Experiment not found: {experiment_id}")
+    return manifest
+
+
+def list_experiments(limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+    """experiment ทั้งหมด ใหม่สุดก่อน (ไม่รวม summary)"""
+    manifests: List[Dict[str, Any]] = []
+    if os.path.isdir(RESULTS_DIR):
+        for name in os.listdir(RESULTS_DIR):
+            manifest = _read_manifest(name)
+            if manifest is not None:
+                manifests.append({**manifest, "summary": None})
+    manifests.sort(key=lambda m: m["created_at"], reverse=True)
+    return {"total": len(manifests), "items": manifests[offset:offset + limit]}
+
+
+def delete_experiment(experiment_id: str) -> None:
+    manifest = get_experiment(experiment_id)
+    if manifest["status"] in ("queued", "running"):
+        # _read_manifest รายงาน running เฉพาะเมื่อ worker ที่รันยังอยู่ (process ใดก็ได้)
+        raise HTTPException(status_code=409, detail="Experiment is still running")
+    shutil.rmtree(_directory(experiment_id), ignore_errors=True)
+
+
+def _completed(experiment_id: str, brand: str, field: str) -> Dict[str, Any]:
+    manifest = get_experiment(experiment_id)
+    if manifest["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Experiment is {manifest['status']}")
+    brand = "H&M" if brand == "H_M" else brand
+    if brand not in manifest["brands"]:
+        raise HTTPException(status_code=400, detail=f"Unknown brand: {brand}. Use one of {manifest['brands']}")
+    if field not in manifest["fields"]:
+        raise HTTPException(status_code=400, detail=f"Field not stored: {field}. Use one of {manifest['fields']}")
+    return manifest
+
+
+def _day_range(manifest: Dict[str, Any], day_start: int, day_stop: Optional[int]) -> slice:
+    days = manifest["simulation_days"]
+    stop = days if day_stop is None else min(day_stop, days)
+    if not 0 <= day_start < stop:
+        raise HTTPException(status_code=400, detail=f"Invalid day range: {day_start}..{day_stop} (0..{days})")
+    return slice(day_start, stop)
+
+
+def read_slice(
+    experiment_id: str, brand: str, field: str,
+    path_start: int = 0, path_stop: Optional[int] = None, day_start: int = 0, day_stop: Optional[int] = None
+) -> Dict[str, Any]:
+    """ค่ารายวันของ path ช่วง [path_start, path_stop) วัน [day_start, day_stop) — อ่านเฉพาะส่วนนั้นจากไฟล์"""
+    manifest = _completed(experiment_id, brand, field)
+    brand = "H&M" if brand == "H_M" else brand
+    paths = manifest["paths"]
+    p_stop = min(paths, path_stop if path_stop is not None else path_start + 100)
+    if not 0 <= path_start < p_stop:
+        raise HTTPException(status_code=400, detail=f"Invalid path range: {path_start}..{path_stop} (0..{paths})")
+    days = _day_range(manifest, day_start, day_stop)
+    cells = (p_stop - path_start) * (days.stop - days.start)
+    if cells > MAX_SLICE_CELLS:
+        raise HTTPException(status_code=400, detail=f"Slice has {cells} values; limit is {MAX_SLICE_CELLS}; request a smaller range")
+    values = store.read_window(store.daily_path(_directory(experiment_id), brand, field), slice(path_start, p_stop), days)
+    return {
+        "brand": brand,
+        "field": field,
+        "path_start": path_start,
+        "path_stop": p_stop,
+        "day_start": days.start,
+        "day_stop": days.stop,
+        "values": values,
+    }
+
+
+def read_bands(experiment_id: str, brand: str, field: str, day_start: int = 0, day_stop: Optional[int] = None) -> Dict[str, Any]:
+    """mean / p05 / p50 / p95 ข้ามทุก path ต่อวัน (คำนวณไว้แล้วตอนจบ experiment)"""
+    manifest = _completed(experiment_id, brand, field)
+    brand = "H&M" if brand == "H_M" else brand
+    days = _day_range(manifest, day_start, day_stop)
+    bands = np.load(store.bands_path(_directory(experiment_id), brand, field), mmap_mode="r")[:, days]
+    start = datetime.strptime(manifest["start_date"], "%Y-%m-%d")
+    result: Dict[str, Any] = {
+        "brand": brand,
+        "field": field,
+        "day_start": days.start,
+        "day_stop": days.stop,
+        "dates": [(start + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(days.start, days.stop)],
+    }
+    for i, stat in enumerate(store.BAND_STATS):
+        result[stat] = [float(v) for v in bands[i]]
+    return result
@@ -0,0 +1,149 @@
+"""พยากรณ์ความต้องการต่อ (แบรนด์, สินค้า) จาก historical data — GET /forecast และ demand_source="forecast"
+
+ทุกโมเดลของทุก series fit ครั้งเดียวต่อ (data version, period) ด้วย utils/forecasting.py บน series matrix
+ที่สร้างจาก HistoryIndex แล้วเก็บไว้ใน process — request ต่อมาแค่พยากรณ์จาก state ที่ fit แล้ว
+"""
+import calendar
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from services.data_service import get_data_version
+from services.history_service import get_history_index
+from utils.forecasting import FORECAST_MODELS, SEASON_LENGTHS, ForecastFit
+from utils.history_index import HistoryIndex
+
+FORECAST_PERIODS = tuple(SEASON_LENGTHS)
+MAX_HORIZON = 366
+MAX_LIMIT = 10_000
+
+_fits: Dict[str, Tuple[Optional[str], ForecastFit, float]] = {}
+_fits_lock = threading.Lock()
+# แบรนด์ → (สินค้า, ความต้องการเฉลี่ยต่อวันรูป สินค้า × 13 index เดือน) สำหรับการจำลอง
+_profiles: Dict[Tuple[Optional[str], str], Tuple[np.ndarray, np.ndarray]] = {}
+
+
+def get_forecast_fit(period: str = "month") -> Tuple[ForecastFit, float]:
+    """(ผล fit ของทุก series, เวลาที่ใช้ fit ms) ของ period — fit ใหม่เมื่อ data version เปลี่ยน"""
+    version = get_data_version()
+    entry = _fits.get(period)
+    if entry is None or entry[0] != version:
+        with _fits_lock:
+            entry = _fits.get(period)
+            if entry is None or entry[0] != version:
+                index = get_history_index()
+                started = time.perf_counter()
+                fit = ForecastFit(index, period)
+                entry = (version, fit, round((time.perf_counter() - started) * 1000, 3))
+                _fits[period] = entry
+                print(f"📈 forecast: fitted {fit.series} series × {fit.periods} {period}s in {entry[2]:.0f} ms")
+    return entry[1], entry[2]
+
+
+def forecast_demand(
+    brands: Optional[List[str]] = None,
+    products: Optional[List[str]] = None,
+    model: str = "auto",
+    period: str = "month",
+    horizon: Optional[int] = None,
+    limit: int = 100,
+    offset: int = 0
+) -> Dict[str, Any]:
+    """พยากรณ์ units sold ของ series ที่ตรงกับ brands / products (ว่าง = ทั้งหมด) แบบแบ่งหน้า"""
+    if period not in FORECAST_PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {list(FORECAST_PERIODS)}")
+    if model != "auto" and model not in FORECAST_MODELS:
+        raise HTTPException(status_code=400, detail=f"Unknown model: {model}. Use 'auto' or one of {list(FORECAST_MODELS)}")
+    horizon = horizon if horizon is not None else SEASON_LENGTHS[period]
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise HTTPException(status_code=400, detail=f"horizon must be between 1 and {MAX_HORIZON}")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_LIMIT}")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must be >= 0")
+
+    started = time.perf_counter()
+    fit, fit_ms = get_forecast_fit(period)
+    if model != "auto" and model not in fit.fits:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Not enough history for {model}: needs more than {fit.season_length} {period}s, have {fit.periods}"
+        )
+
+    keep = np.ones(fit.series, dtype=bool)
+    for values, codes, names, label in (
+        (brands, fit.brand_codes, fit.brands, "brand"),
+        (products, fit.product_codes, fit.products, "product"),
+    ):
+        if not values:
+            continue
+        lookup = {name: i for i, name in enumerate(names)}
+        unknown = [v for v in values if v not in lookup]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown {label}: {unknown}")
+        keep &= np.isin(codes, [lookup[v] for v in values])
+    matched = np.flatnonzero(keep)
+    page = matched[offset:offset + limit]
+
+    models, values = fit.forecast(model, horizon, page)
+    labels = [HistoryIndex.period_label(fit.period_code(step), period) for step in range(horizon)]
+    series = []
+    for i, row in enumerate(page):
+        name = models[i]
+        params = fit.fits[name]
+        series.append({
+            "brand": fit.brands[fit.brand_codes[row]],
+            "product": fit.products[fit.product_codes[row]],
+            "model": name,
+            "alpha": float(params["alpha"][row]) if "alpha" in params else None,
+            "gamma": float(params["gamma"][row]) if "gamma" in params else None,
+            "mae": float(params["mae"][row]),
+            "history_mean": float(fit.y[row].mean()),
+            "forecast": [{"period": label, "units": float(v)} for label, v in zip(labels, values[i])],
+        })
+
+    return {
+        "period": period,
+        "model": model,
+        "season_length": fit.season_length,
+        "horizon": horizon,
+        "history_start": HistoryIndex.period_label(fit.first_period, period),
+        "history_periods": fit.periods,
+        "total_series": int(len(matched)),
+        "limit": limit,
+        "offset": offset,
+        "series": series,
+        "fit_ms": fit_ms,
+        "query_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def get_demand_profile(brand: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """(สินค้า, ความต้องการเฉลี่ยต่อวัน รูป สินค้า × 13 index เดือน) จากพยากรณ์รายเดือน 12 เดือนถัดไป ("auto")
+
+    แต่ละเดือนปฏิทินใช้ค่าพยากรณ์ของเดือนนั้น ÷ จำนวนวันในเดือน (None = แบรนด์ไม่มีประวัติ)
+    """
+    key = (get_data_version(), brand)
+    cached = _profiles.get(key)
+    if cached is not None:
+        return cached
+    fit, _ = get_forecast_fit("month")
+    if brand not in fit.brands:
+        return None
+    rows = np.flatnonzero(fit.brand_codes == fit.brands.index(brand))
+    if not len(rows):
+        return None
+    _, values = fit.forecast("auto", 12, rows)
+    daily = np.zeros((len(rows), 13))
+    for step in range(12):
+        month = np.datetime64(fit.period_code(step), "M").astype(object)
+        daily[:, month.month] = values[:, step] / calendar.monthrange(month.year, month.month)[1]
+    products = np.array([fit.products[c] for c in fit.product_codes[rows]], dtype=object)
+    # ไม่มีพยากรณ์เลย (ทุกสินค้าเป็น 0) → ใช้พารามิเตอร์ปกติ
+    if daily.sum() <= 0:
+        return None
+    _profiles[key] = (products, daily)
+    return products, daily
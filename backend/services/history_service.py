@@ -0,0 +1,178 @@
+"""Query historical sales ตามมิติ (Retailer / Region / State / City / Product / Sales Method) และช่วงวันที่
+
+ใช้ HistoryIndex (utils/history_index.py) ที่สร้างครั้งเดียวต่อ data version — ดู GET /history/aggregate
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from services.data_service import get_data_version, get_historical_data
+from utils.history_index import DIMENSIONS, MEASURES, PERIODS, HistoryIndex
+
+MAX_LIMIT = 10_000
+# ผลรวมของ query ล่าสุด (ก่อนเรียง/แบ่งหน้า) — เปลี่ยนหน้า / sort ไม่ต้องรวมใหม่
+QUERY_CACHE_SIZE = 256
+
+_index: Optional[Tuple[Optional[str], HistoryIndex]] = None
+_index_lock = threading.Lock()
+_query_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+
+def get_history_index() -> HistoryIndex:
+    """ดัชนีของ historical data ปัจจุบัน (สร้างใหม่เมื่อ data version เปลี่ยน)"""
+    global _index
+    version = get_data_version()
+    entry = _index
+    if entry is None or entry[0] != version:
+        with _index_lock:
+            entry = _index
+            if entry is None or entry[0] != version:
+                df = get_historical_data()
+                if df is None:
+                    raise HTTPException(status_code=503, detail="Historical data not loaded")
+                entry = (version, HistoryIndex(df))
+                _index = entry
+                with _query_cache_lock:
+                    _query_cache.clear()
+    return entry[1]
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+
+def _parse_day(value: Optional[str], name: str) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(np.datetime64(datetime.strptime(value, "%Y-%m-%d").date(), "D").astype("int64"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be YYYY-MM-DD")
+
+
+def history_dimensions() -> Dict[str, Any]:
+    """มิติที่ query ได้ + ค่าในแต่ละมิติ (จำนวนแถว), ตัวชี้วัด และช่วงวันที่ของข้อมูล"""
+    index = get_history_index()
+    first, last = index.date_bounds()
+    return {
+        "rows": index.rows,
+        "start_date": str(first) if first is not None else None,
+        "end_date": str(last) if last is not None else None,
+        "dimensions": {dim: index.value_counts(dim) for dim in index.categories},
+        "metrics": ["rows", *index.measures],
+        "periods": list(PERIODS),
+    }
+
+
+def aggregate_history(
+    group_by: Optional[str] = None,
+    period: Optional[str] = None,
+    metrics: Optional[str] = None,
+    filters: Optional[Dict[str, Optional[List[str]]]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    sort: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0
+) -> Dict[str, Any]:
+    """filter (OR ภายในมิติ, AND ข้ามมิติ) + ช่วงวันที่ → รวมตามมิติใน group_by (+ period) แบบแบ่งหน้า"""
+    started = time.perf_counter()
+    index = get_history_index()
+
+    dims = _split(group_by)
+    for dim in dims:
+        if dim not in DIMENSIONS:
+            raise HTTPException(status_code=400, detail=f"Unknown dimension: {dim}. Use any of {list(DIMENSIONS)}")
+        if dim not in index.categories:
+            raise HTTPException(status_code=400, detail=f"Dimension not available in the loaded data: {dim}")
+    if len(set(dims)) != len(dims):
+        raise HTTPException(status_code=400, detail="group_by dimensions must be unique")
+    if period is not None and period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {list(PERIODS)}")
+    measures = _split(metrics) or list(index.measures)
+    for m in measures:
+        if m not in index.measures:
+            available = list(index.measures) if m in MEASURES else list(MEASURES)
+            raise HTTPException(status_code=400, detail=f"Unknown metric: {m}. Use any of {available}")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_LIMIT}")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must be >= 0")
+
+    codes: Dict[str, List[int]] = {}
+    applied: Dict[str, List[str]] = {}
+    for dim, values in (filters or {}).items():
+        if not values:
+            continue
+        if dim not in index.categories:
+            raise HTTPException(status_code=400, detail=f"Dimension not available in the loaded data: {dim}")
+        values = list(dict.fromkeys(values))
+        unknown = [v for v in values if v not in index.lookup[dim]]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown {dim}: {unknown}")
+        codes[dim] = [index.lookup[dim][v] for v in values]
+        applied[dim] = values
+
+    start_day, end_day = _parse_day(start_date, "start_date"), _parse_day(end_date, "end_date")
+    if start_day is not None and end_day is not None and end_day < start_day:
+        raise HTTPException(status_code=400, detail="end_date must be on or after start_date")
+
+    key = (
+        tuple(dims), period, tuple(measures), start_day, end_day,
+        tuple(sorted((dim, tuple(sorted(c))) for dim, c in codes.items()))
+    )
+    with _query_cache_lock:
+        cached = _query_cache.get(key)
+        if cached is not None:
+            _query_cache.move_to_end(key)
+    if cached is None:
+        cached = index.query(codes, start_day, end_day, dims, period, measures)
+        with _query_cache_lock:
+            _query_cache[key] = cached
+            while len(_query_cache) > QUERY_CACHE_SIZE:
+                _query_cache.popitem(last=False)
+    matched, components, counts, sums = cached
+
+    columns: Dict[str, np.ndarray] = {"rows": counts, **sums}
+    order = np.arange(len(counts))
+    if sort:
+        name = sort.lstrip("-")
+        if name in columns:
+            values = columns[name]
+        elif name in dims or (period and name == "period"):
+            values = components[dims.index(name) if name in dims else -1]
+        else:
+            raise HTTPException(status_code=400, detail=f"Cannot sort by {name}; use a metric, 'rows', a group_by dimension or 'period'")
+        order = np.argsort(-values if sort.startswith("-") else values, kind="stable")
+    page = order[offset:offset + limit]
+
+    groups = []
+    for g in page:
+        group: Dict[str, Any] = {dim: index.categories[dim][components[i][g]] for i, dim in enumerate(dims)}
+        if period:
+            group["period"] = HistoryIndex.period_label(int(components[-1][g]), period)
+        group["rows"] = int(counts[g])
+        for m in measures:
+            group[m] = float(sums[m][g])
+        groups.append(group)
+
+    return {
+        "group_by": dims,
+        "period": period,
+        "metrics": ["rows", *measures],
+        "filters": applied,
+        "start_date": start_date,
+        "end_date": end_date,
+        "matched_rows": matched,
+        "total_groups": int(len(counts)),
+        "limit": limit,
+        "offset": offset,
+        "groups": groups,
+        "query_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
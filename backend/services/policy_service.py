@@ -0,0 +1,162 @@
+import random
+from typing import Dict, List, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from models.pydantic import PolicyRequest, PolicyResponse, SimulationRequest
+from services.data_service import get_brand_parameters, get_supported_brands
+from services.simulation_service import (
+    require_plain_request, resolve_brand_configs, resolve_festival_multipliers, resolve_horizon
+)
+from services.workers import map_chunks
+from simulation.policies import policy_parameters, run_policy_batch
+from utils.stats import mean_ci
+
+# ตัวชี้วัดต่อ policy (จาก batch run) + ที่คำนวณเพิ่ม: fill_rate, total_cost
+POLICY_METRICS = (
+    "total_units_sold",
+    "total_revenue",
+    "total_lost_sales",
+    "lost_sales_rate",
+    "fill_rate",
+    "stockout_days",
+    "avg_stock",
+    "final_stock",
+    "orders_placed",
+    "units_ordered",
+    "restock_count",
+    "total_cost",
+)
+
+MAX_POLICIES = 50
+MAX_REPLICATIONS = 1000
+# ต่ำกว่านี้ (policy × replication รวมทุกแบรนด์) คำนวณใน process เดียว
+PARALLEL_MIN_LANES = 512
+
+
+def _policy_name(policy) -> str:
+    if policy.name:
+        return policy.name
+    values = [
+        f"{label}={value}" for label, value in (
+            ("s", policy.reorder_point), ("S", policy.order_up_to), ("Q", policy.order_quantity), ("T", policy.review_period)
+        ) if value is not None
+    ]
+    return f"{policy.type}({', '.join(values)})"
+
+
+def resolve_costs(request) -> Tuple[float, float, float]:
+    """(holding ต่อหน่วยต่อวัน, ต่อครั้งที่สั่ง, ต่อยอดขายที่เสีย) จาก request (ไม่ส่ง = 0, ติดลบ → 400)"""
+    costs = (request.holding_cost or 0.0), (request.order_cost or 0.0), (request.lost_sale_cost or 0.0)
+    if min(costs) < 0:
+        raise HTTPException(status_code=400, detail="costs must be >= 0")
+    return costs
+
+
+def add_cost_metrics(metrics: Dict[str, np.ndarray], simulation_days: int, costs: Tuple[float, float, float]) -> None:
+    """เติม fill_rate (%) และ total_cost ลงใน metrics (array ของ BATCH_METRICS ต่อ lane)"""
+    holding, ordering, lost_cost = costs
+    demand = metrics["total_demand"].astype("float64")
+    metrics["fill_rate"] = np.where(demand > 0, metrics["total_units_sold"] / np.maximum(demand, 1) * 100, 100.0)
+    metrics["total_cost"] = (
+        holding * metrics["avg_stock"] * simulation_days
+        + ordering * metrics["orders_placed"]
+        + lost_cost * metrics["total_lost_sales"]
+    )
+
+
+def rank_by_cost(total_cost: np.ndarray, lost_sales: np.ndarray) -> np.ndarray:
+    """อันดับ 1..n: total_cost ต่ำก่อน เท่ากันตัดสินด้วย lost sales ที่น้อยกว่า"""
+    order = np.lexsort((lost_sales, total_cost))
+    rank = np.empty(len(order), dtype="int64")
+    rank[order] = np.arange(1, len(order) + 1)
+    return rank
+
+
+def run_policy_comparison(request: PolicyRequest) -> PolicyResponse:
+    """หลาย replenishment policy ต่อแบรนด์ใน batch run เดียวบน demand path ชุดเดียวกัน → ตัวชี้วัด + CI + อันดับ"""
+    brands = get_supported_brands()
+    if not request.policies:
+        raise HTTPException(status_code=400, detail="At least one brand with policies is required")
+    policies = {}
+    for brand, items in request.policies.items():
+        name = "H&M" if brand == "H_M" else brand
+        if name not in brands:
+            raise HTTPException(status_code=400, detail=f"Unknown brand: {brand}. Use one of {brands}")
+        if not items or len(items) > MAX_POLICIES:
+            raise HTTPException(status_code=400, detail=f"{brand}: between 1 and {MAX_POLICIES} policies")
+        names = [_policy_name(p) for p in items]
+        if len(set(names)) != len(names):
+            raise HTTPException(status_code=400, detail=f"{brand}: policy names must be unique")
+        for p, label in zip(items, names):
+            try:
+                policy_parameters(p)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"{brand} / {label}: {e}")
+            if p.initial_stock is not None and p.initial_stock < 0:
+                raise HTTPException(status_code=400, detail=f"{brand} / {label}: initial_stock must be >= 0")
+        policies[name] = (items, names)
+
+    replications = request.replications or 30
+    if not 2 <= replications <= MAX_REPLICATIONS:
+        raise HTTPException(status_code=400, detail=f"replications must be between 2 and {MAX_REPLICATIONS}")
+    confidence = request.confidence if request.confidence is not None else 0.95
+    if not 0 < confidence < 1:
+        raise HTTPException(status_code=400, detail="confidence must be between 0 and 1")
+    if request.seed is not None and request.seed < 0:
+        raise HTTPException(status_code=400, detail="seed must be >= 0")
+    costs = resolve_costs(request)
+
+    base = request.base or SimulationRequest()
+    require_plain_request(base, "/policies")
+    _, start_date, simulation_days = resolve_horizon(base)
+    configs = resolve_brand_configs(base)
+    festivals = resolve_festival_multipliers(base)
+
+    seed = request.seed if request.seed is not None else random.getrandbits(31)
+    seeds = [seed + r for r in range(replications)]
+
+    print("\n🧮 Policy Comparison:")
+    for brand, (_, names) in policies.items():
+        print(f" 🏷️ {brand}: {len(names)} policies ({', '.join(names)})")
+    print(f" 🎲 Replications: {replications} (seed {seed}..{seed + replications - 1}, common random numbers)")
+    print(f" 📆 Simulation Days: {simulation_days}")
+
+    # หนึ่ง batched run ต่อแบรนด์: lane = policy × replication
+    chunks = [
+        (brand, configs[brand], items, get_brand_parameters(), seeds, start_date, festivals, simulation_days)
+        for brand, (items, _) in policies.items()
+    ]
+    lanes = sum(len(items) for items, _ in policies.values()) * replications
+    outputs = map_chunks(run_policy_batch, chunks, parallel=lanes >= PARALLEL_MIN_LANES)
+
+    results: List[Dict] = []
+    for (brand, (items, names)), metrics in zip(policies.items(), outputs):
+        add_cost_metrics(metrics, simulation_days, costs)
+        summary = {m: mean_ci(metrics[m], confidence) for m in POLICY_METRICS}   # (policies,)
+        rank = rank_by_cost(summary["total_cost"]["mean"], summary["total_lost_sales"]["mean"])
+        for p, (policy, label) in enumerate(zip(items, names)):
+            results.append({
+                "brand": brand,
+                "policy": label,
+                "type": policy.type,
+                "rank": int(rank[p]),
+                "metrics": {
+                    m: {
+                        "mean": float(s["mean"][p]),
+                        "ci_low": float(s["mean"][p] - s["half_width"][p]),
+                        "ci_high": float(s["mean"][p] + s["half_width"][p]),
+                    }
+                    for m, s in summary.items()
+                },
+            })
+
+    print("✅ Policy comparison completed successfully")
+    return PolicyResponse(
+        seed=seed,
+        replications=replications,
+        confidence=confidence,
+        simulation_days=simulation_days,
+        results=results
+    )
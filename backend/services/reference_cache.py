@@ -0,0 +1,193 @@
+"""response ของ endpoint อ้างอิง (/brand-params, /seasons-festivals, /available-brands) แบบ precompute
+
+แต่ละ endpoint serialize เป็น JSON ครั้งเดียวต่อ version ของข้อมูลที่มันขึ้นอยู่ แล้วเก็บเป็น bytes
+พร้อมฉบับบีบอัด (gzip เสมอ, br / zstd ถ้าติดตั้ง brotli / zstandard) และ strong ETag จาก hash ของ body
+request ที่ส่ง If-None-Match ตรงกันได้ 304 ทันที ที่เหลือได้ bytes ที่เตรียมไว้ตาม Accept-Encoding
+"""
+import gzip
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # optional
+    zstandard = None
+
+# ลำดับที่เลือกเมื่อ client รับได้หลายแบบด้วย q เท่ากัน
+ENCODING_PREFERENCE = ("zstd", "br", "gzip")
+CACHE_CONTROL = "no-cache"  # เก็บได้ แต่ต้อง revalidate ด้วย ETag ทุกครั้ง
+
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    encoded = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body, quality=11)
+    if zstandard is not None:
+        encoded["zstd"] = zstandard.ZstdCompressor(level=19).compress(body)
+    # เก็บเฉพาะแบบที่เล็กกว่า body จริง
+    return {name: data for name, data in encoded.items() if len(data) < len(body)}
+
+
+class PrecomputedResponse:
+    """body JSON (แบบเดียวกับ JSONResponse) + ฉบับบีบอัด + ETag ต่อ representation"""
+
+    def __init__(self, content: Any):
+        self.body = json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.encoded = _compress(self.body)
+
+    def etag(self, encoding: Optional[str]) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        """If-None-Match ตรงกับ representation ใดของ body นี้ (weak comparison ตาม RFC 9110)"""
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag.strip('"').split("-", 1)[0] == self.digest:
+                return True
+        return False
+
+
+def negotiate_encoding(accept_encoding: str, available) -> Optional[str]:
+    """encoding ที่ client รับได้ (q > 0) และมีให้ — q สูงสุดก่อน แล้วตาม ENCODING_PREFERENCE"""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    best, best_q = None, 0.0
+    for name in ENCODING_PREFERENCE:
+        q = accepted.get(name, accepted.get("*", 0.0))
+        if name in available and q > best_q:
+            best, best_q = name, q
+    return best
+
+
+# -----------------------------
+# Payloads ของแต่ละ endpoint
+# -----------------------------
+def _brand_params_payload() -> Any:
+    from services.data_service import get_brand_parameters
+    from utils.helpers import clean_data_for_json
+    params = get_brand_parameters()
+    if not params:
+        raise HTTPException(status_code=404, detail="No historical data available")
+    return clean_data_for_json(params)
+
+
+def _seasons_festivals_payload() -> Any:
+    from utils.constants import SEASON_MAPPING, FESTIVALS
+    from models.pydantic import SeasonInfo, FestivalInfo, SeasonFestivalResponse
+
+    seasons = [
+        SeasonInfo(month=month, season_name=data["name"], quarter=data["quarter"], season_type=data["type"])
+        for month, data in SEASON_MAPPING.items()
+    ]
+    festivals = [
+        FestivalInfo(
+            festival_id=festival_id,
+            name=data["name"],
+            month=data["month"],
+            days=data["days"],
+            demand_multiplier=data["multiplier"]
+        )
+        for festival_id, data in FESTIVALS.items()
+    ]
+    return SeasonFestivalResponse(seasons=seasons, festivals=festivals)
+
+
+def _available_brands_payload() -> Any:
+    from services.data_service import get_supported_brands
+    brands = get_supported_brands()
+    if not brands:
+        raise HTTPException(status_code=404, detail="No historical data available")
+    return {"brands": brands, "count": len(brands), "main_brands": brands.copy()}
+
+
+def _history_dimensions_payload() -> Any:
+    from services.history_service import history_dimensions
+    return history_dimensions()
+
+
+def _data_version() -> str:
+    from services.data_service import get_data_version
+    return get_data_version() or ""
+
+
+def _brands_version() -> str:
+    from services.data_service import get_supported_brands
+    return ",".join(get_supported_brands())
+
+
+# ชื่อ → (ฟังก์ชันคืน version ที่ payload ขึ้นอยู่, ฟังก์ชันสร้าง payload)
+REFERENCE_ENDPOINTS: Dict[str, Tuple[Callable[[], str], Callable[[], Any]]] = {
+    "brand-params": (_data_version, _brand_params_payload),
+    "seasons-festivals": (lambda: "static", _seasons_festivals_payload),
+    "available-brands": (_brands_version, _available_brands_payload),
+    "history-dimensions": (_data_version, _history_dimensions_payload),
+}
+
+_cache: Dict[str, Tuple[str, PrecomputedResponse]] = {}
+_cache_lock = threading.Lock()
+
+
+def get_precomputed(name: str) -> PrecomputedResponse:
+    """response ที่เตรียมไว้ของ endpoint (สร้างใหม่เมื่อ version เปลี่ยน)"""
+    version_fn, build = REFERENCE_ENDPOINTS[name]
+    version = version_fn()
+    entry = _cache.get(name)
+    if entry is None or entry[0] != version:
+        with _cache_lock:
+            entry = _cache.get(name)
+            if entry is None or entry[0] != version:
+                entry = (version, PrecomputedResponse(build()))
+                _cache[name] = entry
+    return entry[1]
+
+
+def prime() -> None:
+    """เตรียมทุก endpoint ไว้ก่อน request แรก (endpoint ที่ไม่มีข้อมูลข้ามไป)"""
+    for name in REFERENCE_ENDPOINTS:
+        try:
+            get_precomputed(name)
+        except HTTPException:
+            pass
+
+
+def cached_response(request: Request, name: str) -> Response:
+    """304 ถ้า If-None-Match ตรง ไม่งั้น body ที่เตรียมไว้ในแบบที่ client รับได้"""
+    cached = get_precomputed(name)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), cached.encoded)
+    headers = {"ETag": cached.etag(encoding), "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and cached.matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        return Response(content=cached.encoded[encoding], media_type="application/json", headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
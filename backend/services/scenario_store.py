@@ -0,0 +1,211 @@
+"""ที่เก็บผล simulation แบบถาวร (SQLite + blob columnar บีบอัด)
+
+แต่ละ scenario ใช้ id = hash ของ request (หลังตัด include), section ที่คำนวณ, seed และ
+data version ดังนั้น request เดิม + seed เดิม บนข้อมูลชุดเดิม จะได้ id เดิมและใช้ผลที่เก็บไว้
+ได้ทันที ไฟล์ SQLite ใช้ร่วมกันได้ทุก worker และอยู่รอดหลัง restart
+
+ผลแต่ละ section (list ของ dict) เก็บเป็นคอลัมน์ {field: [ค่า...]} แล้ว zlib ทั้งก้อน
+ค่าซ้ำในคอลัมน์เดียวกัน (brand/season/...) จึงบีบอัดได้ดีกว่าเก็บเป็นแถว
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# เปลี่ยนเมื่อรูปแบบผลลัพธ์/engine เปลี่ยน เพื่อไม่ให้ใช้ผลเก่าที่ไม่เข้ากัน
+STORE_SCHEMA = 2
+
+# path ของไฟล์ SQLite (ตั้งเป็นค่าว่าง = ปิด) และจำนวน scenario สูงสุดที่เก็บ (ลบอันที่ใช้ล่าสุดนานสุดก่อน)
+SCENARIO_DB_PATH = os.getenv("SCENARIO_DB_PATH", "data/scenarios.sqlite3")
+SCENARIO_STORE_MAX = int(os.getenv("SCENARIO_STORE_MAX", "500") or 0)
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    id            TEXT PRIMARY KEY,
+    created_at    TEXT NOT NULL,
+    last_used_at  TEXT NOT NULL,
+    hits          INTEGER NOT NULL DEFAULT 0,
+    seed          INTEGER NOT NULL,
+    data_version  TEXT NOT NULL,
+    sections      TEXT NOT NULL,
+    request       TEXT NOT NULL,
+    raw_bytes     INTEGER NOT NULL,
+    result        BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenarios_last_used ON scenarios (last_used_at);
+"""
+
+_LIST_COLUMNS = "id, created_at, last_used_at, hits, seed, data_version, sections, request, raw_bytes, length(result)"
+
+
+def scenario_key(request: Dict[str, Any], sections: Iterable[str], seed: int, data_version: str) -> str:
+    """content hash ของ scenario (request เป็น dict จาก model_dump ไม่รวม include/seed)"""
+    canonical = json.dumps(
+        {
+            "schema": STORE_SCHEMA,
+            "request": request,
+            "sections": sorted(sections),
+            "seed": int(seed),
+            "data_version": data_version,
+        },
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def encode_result(result: Dict[str, Any]) -> bytes:
+    """dict ของ response → คอลัมน์ต่อ section → JSON (ยังไม่บีบอัด)"""
+    packed: Dict[str, Any] = {}
+    for key, value in result.items():
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            names = list(value[0].keys())
+            packed[key] = {"rows": len(value), "columns": {n: [row.get(n) for row in value] for n in names}}
+        else:
+            packed[key] = {"value": value}
+    return json.dumps(packed, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def decode_result(blob: bytes) -> Dict[str, Any]:
+    packed = json.loads(zlib.decompress(blob).decode("utf-8"))
+    result: Dict[str, Any] = {}
+    for key, entry in packed.items():
+        if "columns" in entry:
+            cols = entry["columns"]
+            names = list(cols.keys())
+            result[key] = [dict(zip(names, values)) for values in zip(*(cols[n] for n in names))]
+        else:
+            result[key] = entry["value"]
+    return result
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _info(row: tuple) -> Dict[str, Any]:
+    sid, created, used, hits, seed, version, sections, request, raw, stored = row
+    return {
+        "scenario_id": sid,
+        "created_at": created,
+        "last_used_at": used,
+        "hits": int(hits),
+        "seed": int(seed),
+        "data_version": version,
+        "sections": json.loads(sections),
+        "request": json.loads(request),
+        "raw_bytes": int(raw),
+        "stored_bytes": int(stored),
+    }
+
+
+class ScenarioStore:
+    """ที่เก็บ scenario บนไฟล์ SQLite (เปิด connection ต่อการเรียก จึงใช้ได้ทุก thread/process)"""
+
+    def __init__(self, path: str, max_entries: int = 0):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_DDL)
+
+    @contextmanager
+    def _connect(self):
+        """connection ใหม่ต่อการเรียก: commit เมื่อสำเร็จ rollback เมื่อ error แล้วปิดเสมอ"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, scenario_id: str) -> Optional[Dict[str, Any]]:
+        """{"seed", "result": dict ของ response} ของ scenario + นับการใช้ซ้ำ; None ถ้าไม่มี"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT seed, result FROM scenarios WHERE id = ?", (scenario_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE scenarios SET hits = hits + 1, last_used_at = ? WHERE id = ?",
+                (_now(), scenario_id)
+            )
+        return {"seed": int(row[0]), "result": decode_result(row[1])}
+
+    def put(
+        self,
+        scenario_id: str,
+        request: Dict[str, Any],
+        sections: Iterable[str],
+        seed: int,
+        data_version: str,
+        result: Dict[str, Any]
+    ) -> None:
+        """บันทึกผล (id ซ้ำ = worker อื่นบันทึกไปแล้ว ข้าม)"""
+        raw = encode_result(result)
+        blob = zlib.compress(raw, 6)
+        now = _now()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO scenarios "
+                "(id, created_at, last_used_at, hits, seed, data_version, sections, request, raw_bytes, result) "
+                "VALUES (?, ?, ?, 0, ?, ?, ?, ?, ?, ?)",
+                (
+                    scenario_id, now, now, int(seed), data_version,
+                    json.dumps(sorted(sections)), json.dumps(request, ensure_ascii=False, default=str),
+                    len(raw), sqlite3.Binary(blob)
+                )
+            )
+            if self.max_entries > 0:
+                conn.execute(
+                    "DELETE FROM scenarios WHERE id IN ("
+                    " SELECT id FROM scenarios ORDER BY last_used_at DESC, created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+    def iter_results(self, limit: int, data_version: Optional[str] = None, section: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """{"request", "seed", "result"} ล่าสุดก่อน (ไม่นับเป็นการใช้ซ้ำ) กรองตาม data version / section ที่มี"""
+        query = "SELECT request, seed, result, sections FROM scenarios"
+        args: list = []
+        if data_version is not None:
+            query += " WHERE data_version = ?"
+            args.append(data_version)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(int(limit))
+        with self._connect() as conn:
+            rows = conn.execute(query, args).fetchall()
+        for request, seed, blob, sections in rows:
+            if section is not None and section not in json.loads(sections):
+                continue
+            yield {"request": json.loads(request), "seed": int(seed), "result": decode_result(blob)}
+
+    def list(self, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        """รายการ scenario ล่าสุดก่อน (ไม่รวมตัวผล)"""
+        with self._connect() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM scenarios").fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {_LIST_COLUMNS} FROM scenarios ORDER BY created_at DESC, id LIMIT ? OFFSET ?",
+                (int(limit), int(offset))
+            ).fetchall()
+        return {"total": int(total), "items": [_info(r) for r in rows]}
+
+
+_store: Optional[ScenarioStore] = None
+_store_lock = threading.Lock()
+
+
+def get_scenario_store() -> Optional[ScenarioStore]:
+    """store ของ process (สร้างครั้งแรกที่เรียก) หรือ None ถ้าปิดด้วย SCENARIO_DB_PATH="" """
+    global _store
+    if not SCENARIO_DB_PATH:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ScenarioStore(SCENARIO_DB_PATH, SCENARIO_STORE_MAX)
+    return _store
@@ -0,0 +1,238 @@
+import random
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from models.pydantic import BrandConfig, SensitivityRequest, SensitivityResponse
+from services.compare_service import ALL_BRANDS, COMPARE_METRICS, _brand_totals
+from services.data_service import get_brand_parameters, get_supported_brands
+from services.simulation_service import (
+    require_plain_request, resolve_brand_configs, resolve_festival_multipliers, resolve_horizon
+)
+from services.workers import SIMULATION_WORKERS, map_chunks, split_evenly
+from simulation.batch_simulation import run_brand_batch
+from utils.constants import FESTIVALS
+from utils.sensitivity import morris_design, morris_indices, saltelli_design, sobol_indices
+
+# field ของ BrandConfig ที่ปรับได้ → (ชนิด, ค่าต่ำสุดของ low)
+# field ที่ 0 หมายถึง "ใช้ค่าเริ่มต้นของแบรนด์" ต้องเริ่มที่ 1
+SENSITIVITY_FIELDS = {
+    "initial_stock": (int, 1),
+    "restock_days": (int, 1),
+    "restock_quantity": (int, 1),
+    "reorder_quantity": (int, 1),
+    "reorder_point": (int, 1),
+    "demand_multiplier": (float, 1e-6),
+    "lead_time_days": (int, 0),
+    "lead_time_spread": (int, 0),
+}
+SENSITIVITY_METHODS = ("morris", "sobol")
+ALL_BRANDS_PREFIX = "*"
+# "festival.<FESTIVAL_ID>" = ตัวคูณความต้องการของเทศกาลนั้น (กระทบทุกแบรนด์)
+FESTIVAL_PREFIX = "festival"
+
+MAX_PARAMETERS = 20
+MAX_REPLICATIONS = 100
+# จุด × replication ต่อแบรนด์ (demand matrix ของ batch คือ lanes × days)
+MAX_LANES = 50_000
+# ต่ำกว่านี้คำนวณใน process เดียว (ค่า overhead ของ process pool ไม่คุ้ม)
+PARALLEL_MIN_LANES = 512
+
+
+def _resolve_parameters(request: SensitivityRequest, brands: List[str]) -> List[Tuple[str, List[str], str]]:
+    """[(ชื่อ parameter, แบรนด์ที่กระทบ, field)] + ตรวจช่วงค่า (400)
+
+    parameter ของเทศกาลได้ field = "festival.<FESTIVAL_ID>" และกระทบทุกแบรนด์
+    """
+    if not request.parameters:
+        raise HTTPException(status_code=400, detail="At least one parameter is required")
+    if len(request.parameters) > MAX_PARAMETERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PARAMETERS} parameters")
+
+    resolved, seen = [], set()
+    for p in request.parameters:
+        brand, _, field = p.name.partition(".")
+        if brand == FESTIVAL_PREFIX:
+            if field not in FESTIVALS:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown festival in parameter {p.name}. Use {FESTIVAL_PREFIX}.<id> with id in {list(FESTIVALS)}"
+                )
+            if p.name in seen:
+                raise HTTPException(status_code=400, detail=f"{p.name} is covered by more than one parameter")
+            seen.add(p.name)
+            if not 0 <= p.low < p.high:
+                raise HTTPException(status_code=400, detail=f"{p.name}: require 0 <= low < high")
+            resolved.append((p.name, brands, p.name))
+            continue
+        brand = "H&M" if brand == "H_M" else brand
+        if field not in SENSITIVITY_FIELDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid parameter: {p.name}. Use BRAND.field or {ALL_BRANDS_PREFIX}.field with field in "
+                       f"{list(SENSITIVITY_FIELDS)}, or {FESTIVAL_PREFIX}.<id> with id in {list(FESTIVALS)}"
+            )
+        if brand != ALL_BRANDS_PREFIX and brand not in brands:
+            raise HTTPException(status_code=400, detail=f"Unknown brand in parameter {p.name}. Use one of {brands}")
+        targets = brands if brand == ALL_BRANDS_PREFIX else [brand]
+        for b in targets:
+            if (b, field) in seen:
+                raise HTTPException(status_code=400, detail=f"{b}.{field} is covered by more than one parameter")
+            seen.add((b, field))
+        _, minimum = SENSITIVITY_FIELDS[field]
+        if not minimum <= p.low < p.high:
+            raise HTTPException(status_code=400, detail=f"{p.name}: require {minimum} <= low < high")
+        resolved.append((p.name, targets, field))
+    return resolved
+
+
+def _design(request: SensitivityRequest, method: str, k: int, rng: np.random.Generator):
+    """จุดบน unit hypercube + ฟังก์ชันที่แปลงผล (จุด, ...) เป็น index ต่อ parameter"""
+    if method == "morris":
+        trajectories = request.trajectories or 10
+        levels = request.levels or 4
+        if trajectories < 2:
+            raise HTTPException(status_code=400, detail="trajectories must be >= 2")
+        if levels < 2 or levels % 2:
+            raise HTTPException(status_code=400, detail="levels must be an even number >= 2")
+        points, order, direction = morris_design(k, trajectories, levels, rng)
+        return points, lambda y: morris_indices(y, order, direction, levels)
+
+    samples = request.samples or 256
+    if samples < 16:
+        raise HTTPException(status_code=400, detail="samples must be >= 16")
+    points = saltelli_design(k, samples, rng)
+    return points, lambda y: sobol_indices(y, k, samples, rng)
+
+
+def _brand_configs(
+    brand: str,
+    base: BrandConfig,
+    parameters: List[Tuple[str, List[str], str]],
+    values: np.ndarray
+) -> List[BrandConfig]:
+    """config ของแบรนด์ต่อจุด (แบรนด์ที่ไม่มี parameter กระทบ → config เดียว)"""
+    columns = [(j, field) for j, (_, targets, field) in enumerate(parameters) if brand in targets]
+    if not columns:
+        return [base]
+    configs = []
+    for row in values:
+        update = {}
+        for j, field in columns:
+            if field not in SENSITIVITY_FIELDS:
+                continue
+            kind, _ = SENSITIVITY_FIELDS[field]
+            update[field] = int(round(row[j])) if kind is int else float(row[j])
+        configs.append(base.model_copy(update=update))
+    return configs
+
+
+def _festival_multipliers(
+    base: Dict[str, float],
+    parameters: List[Tuple[str, List[str], str]],
+    values: np.ndarray
+) -> Optional[List[Dict[str, float]]]:
+    """ตัวคูณเทศกาลต่อจุด (None = ไม่มี parameter ของเทศกาล → ทุกจุดใช้ base)"""
+    columns = [(j, field.partition(".")[2]) for j, (_, _, field) in enumerate(parameters) if field not in SENSITIVITY_FIELDS]
+    if not columns:
+        return None
+    return [{**base, **{fid: float(row[j]) for j, fid in columns}} for row in values]
+
+
+def run_sensitivity(request: SensitivityRequest) -> SensitivityResponse:
+    """global sensitivity ของตัวชี้วัดต่อ parameter ของ BrandConfig (Morris หรือ Sobol)
+
+    ทุกจุดของ design จำลองพร้อมกันเป็น lane ของ BrandBatchSimulation บน demand path ชุดเดียวกัน
+    (common random numbers) แบ่ง lane เป็นก้อนข้าม core ผ่าน process pool เมื่องานใหญ่พอ
+    """
+    method = request.method or "morris"
+    if method not in SENSITIVITY_METHODS:
+        raise HTTPException(status_code=400, detail=f"Invalid method: {method}. Use one of {list(SENSITIVITY_METHODS)}")
+    replications = request.replications or 1
+    if not 1 <= replications <= MAX_REPLICATIONS:
+        raise HTTPException(status_code=400, detail=f"replications must be between 1 and {MAX_REPLICATIONS}")
+    if request.seed is not None and request.seed < 0:
+        raise HTTPException(status_code=400, detail="seed must be >= 0")
+    metrics = list(request.metrics) if request.metrics else list(COMPARE_METRICS)
+    unknown = [m for m in metrics if m not in COMPARE_METRICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid metrics: {unknown}. Use any of {list(COMPARE_METRICS)}")
+    require_plain_request(request.base, "/sensitivity")
+
+    brands = get_supported_brands()
+    parameters = _resolve_parameters(request, brands)
+    k = len(parameters)
+
+    seed = request.seed if request.seed is not None else random.getrandbits(31)
+    rng = np.random.default_rng(seed)
+    points, analyse = _design(request, method, k, rng)
+    n_points = len(points)
+    if n_points * replications > MAX_LANES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Design needs {n_points} points x {replications} replications; limit is {MAX_LANES} per brand"
+        )
+
+    low = np.array([p.low for p in request.parameters])
+    high = np.array([p.high for p in request.parameters])
+    values = low + points * (high - low)
+
+    _, start_date, simulation_days = resolve_horizon(request.base)
+    base_configs = resolve_brand_configs(request.base)
+    festival = resolve_festival_multipliers(request.base)
+    festivals = _festival_multipliers(festival, parameters, values)
+    seeds = [seed + r for r in range(replications)]
+    brand_params = get_brand_parameters()
+
+    print("\n🔬 Sensitivity Analysis:")
+    print(f" 🧮 Method: {method} ({k} parameters, {n_points} points)")
+    print(f" 🎲 Replications: {replications} (seed {seed}, common random numbers)")
+    print(f" 📆 Simulation Days: {simulation_days}")
+
+    # งานต่อแบรนด์แบ่งเป็นก้อนของจุดที่ติดกัน (ก้อนเดียวถ้างานเล็ก)
+    chunks, owners = [], []
+    for brand in brands:
+        configs = _brand_configs(brand, base_configs[brand], parameters, values)
+        lanes = len(configs) * replications
+        parts = SIMULATION_WORKERS if lanes >= PARALLEL_MIN_LANES else 1
+        for part in split_evenly(len(configs), parts):
+            chunk = configs[part]
+            lane_festivals = festivals[part] if festivals is not None else [festival] * len(chunk)
+            chunks.append((brand, chunk, brand_params, seeds, start_date, lane_festivals, simulation_days))
+            owners.append(brand)
+    results = map_chunks(run_brand_batch, chunks, parallel=len(chunks) > len(brands))
+
+    per_brand: Dict[str, Dict[str, np.ndarray]] = {}
+    for brand in brands:
+        parts = [res for owner, res in zip(owners, results) if owner == brand]
+        # (จุด, replications) — แบรนด์ที่ไม่มี parameter กระทบขยายจากแถวเดียว
+        per_brand[brand] = {
+            m: np.broadcast_to(np.concatenate([p[m] for p in parts]), (n_points, replications)).astype("float64")
+            for m in COMPARE_METRICS + ("total_demand",)
+        }
+    per_brand[ALL_BRANDS] = _brand_totals(per_brand)
+
+    names = [name for name, _, _ in parameters]
+    index_fields = ("mu", "mu_star", "sigma") if method == "morris" else ("s1", "s1_conf", "st", "st_conf")
+    indices = []
+    for brand, brand_metrics in per_brand.items():
+        y = np.stack([brand_metrics[m].mean(axis=1) for m in metrics], axis=1)   # (จุด, metrics)
+        result = analyse(y)                                                      # field → (k, metrics)
+        for i, metric in enumerate(metrics):
+            for j, name in enumerate(names):
+                entry = {"brand": brand, "metric": metric, "parameter": name}
+                entry.update({f: float(result[f][j, i]) for f in index_fields})
+                indices.append(entry)
+
+    print("✅ Sensitivity analysis completed successfully")
+    return SensitivityResponse(
+        method=method,
+        seed=seed,
+        replications=replications,
+        evaluations=n_points,
+        simulation_days=simulation_days,
+        parameters=names,
+        brands=brands,
+        indices=indices
+    )
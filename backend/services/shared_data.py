@@ -0,0 +1,111 @@
+"""Historical data แบบ columnar บนดิสก์ที่ทุก worker map ร่วมกันได้แบบ read-only
+
+โหลด/ทำความสะอาด CSV ครั้งเดียว แล้วเขียนแต่ละคอลัมน์เป็น .npy (ข้อความ → categorical
+codes + categories) ลงไดเรกทอรีตาม data version worker อื่น attach ด้วย
+np.load(mmap_mode='r') ซึ่งใช้ page cache ชุดเดียวกันของ OS จึงไม่มีสำเนาต่อ worker
+
+    SHARED_DATA_DIR=/dev/shm/inventory-data gunicorn -w 8 -k uvicorn.workers.UvicornWorker main:app
+
+สร้างล่วงหน้าก่อนสตาร์ท worker ได้ด้วย `python -m services.shared_data`
+"""
+import json
+import os
+import shutil
+import tempfile
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = "manifest.json"
+
+
+def _column_file(i: int) -> str:
+    return f"col{i:03d}.npy"
+
+
+def export_columnar(df: pd.DataFrame, directory: str) -> None:
+    """เขียน DataFrame เป็น .npy ต่อคอลัมน์ + manifest.json ลง directory (ต้องยังไม่มี)"""
+    os.makedirs(directory)
+    columns = []
+    for i, name in enumerate(df.columns):
+        col = df[name]
+        entry = {"name": str(name), "file": _column_file(i)}
+        if pd.api.types.is_datetime64_any_dtype(col):
+            entry["kind"] = "datetime"
+            np.save(os.path.join(directory, entry["file"]), col.to_numpy(dtype="datetime64[ns]").view("int64"))
+        elif pd.api.types.is_bool_dtype(col) or pd.api.types.is_numeric_dtype(col):
+            entry["kind"] = "numeric"
+            np.save(os.path.join(directory, entry["file"]), col.to_numpy())
+        else:
+            # ข้อความ/ค่าผสม → categorical; เก็บ codes ด้วย dtype ที่ pandas ใช้เอง จะได้ไม่ถูกแปลง (copy) ตอน attach
+            cat = col if isinstance(col.dtype, pd.CategoricalDtype) else col.astype(str).where(col.notna()).astype("category")
+            entry["kind"] = "category"
+            entry["categories"] = [str(c) for c in cat.cat.categories]
+            np.save(os.path.join(directory, entry["file"]), cat.cat.codes.to_numpy())
+        columns.append(entry)
+
+    with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as fh:
+        json.dump({"rows": int(len(df)), "columns": columns}, fh, ensure_ascii=False)
+
+
+def attach_columnar(directory: str) -> pd.DataFrame:
+    """เปิด DataFrame จาก directory แบบ memory-mapped read-only (ไม่ copy ข้อมูลคอลัมน์)"""
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as fh:
+        manifest = json.load(fh)
+
+    data = {}
+    for entry in manifest["columns"]:
+        arr = np.load(os.path.join(directory, entry["file"]), mmap_mode="r")
+        if entry["kind"] == "datetime":
+            data[entry["name"]] = arr.view("datetime64[ns]")
+        elif entry["kind"] == "category":
+            data[entry["name"]] = pd.Categorical.from_codes(arr, categories=entry["categories"], validate=False)
+        else:
+            data[entry["name"]] = arr
+    return pd.DataFrame(data, copy=False)
+
+
+def load_or_build(root: str, version: str, build: Callable[[], Optional[pd.DataFrame]]) -> Optional[pd.DataFrame]:
+    """attach ข้อมูลของ version นี้ใต้ root ถ้ามีแล้ว ไม่งั้น build() → export → attach
+
+    เขียนลงไดเรกทอรีชั่วคราวแล้ว rename แบบ atomic ถ้าหลาย worker build พร้อมกัน
+    ตัวที่ rename ไม่ทันจะทิ้งของตัวเองแล้วใช้ของผู้ชนะ ไม่ต้องมี lock
+    """
+    target = os.path.join(root, version)
+    if not os.path.exists(os.path.join(target, MANIFEST)):
+        df = build()
+        if df is None:
+            return None
+        os.makedirs(root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".build-", dir=root)
+        staging = os.path.join(tmp, "data")
+        try:
+            export_columnar(df.reset_index(drop=True), staging)
+            try:
+                os.rename(staging, target)
+                print(f"💾 เขียน shared historical data: {target}")
+            except OSError:
+                pass  # worker อื่นเขียน version เดียวกันเสร็จก่อน
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        _remove_stale_versions(root, keep=version)
+
+    df = attach_columnar(target)
+    print(f"🔗 attach shared historical data (mmap): {target} ({len(df)} แถว)")
+    return df
+
+
+def _remove_stale_versions(root: str, keep: str) -> None:
+    # worker เก่าที่ยัง map ไฟล์อยู่ใช้ต่อได้ (POSIX unlink ไม่ตัด mapping)
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name != keep and not name.startswith(".") and os.path.isfile(os.path.join(path, MANIFEST)):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    from services.data_service import SHARED_DATA_DIR, prepare_shared_data
+    if not SHARED_DATA_DIR:
+        raise SystemExit("ตั้ง SHARED_DATA_DIR ก่อนสร้าง shared historical data")
+    prepare_shared_data()
@@ -1,28 +1,222 @@
+import random
+import sqlite3
+from functools import partial
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, Iterable, List, Optional, Set, Tuple
 from fastapi import HTTPException
 
-from models.pydantic import (
-    SimulationRequest, BrandConfig, SimulationResponse,
-    MonthlyTrend, TrendEvent, MonthlyProductTrend, ProductTrendEvent
+from models.pydantic import SimulationRequest, BrandConfig, SharedConstraint, SimulationResponse
+from services.admission import admit_simulation
+from services.data_service import (
+    get_brand_parameters, get_supported_brands, get_historical_data, get_product_parameters, get_segment_parameters, get_data_version,
+    get_demand_trace
 )
-from services.data_service import get_brand_parameters, get_supported_brands, get_historical_data
+from services.forecast_service import get_demand_profile
+from services.scenario_store import ScenarioStore, get_scenario_store, scenario_key
+from services.surrogate_service import record_simulation
+from simulation.allocation import ALLOCATION_RULES, CONSTRAINT_KINDS, AllocationPool
 from simulation.brand_simulation import BrandSimulation
+from simulation.control import CancelToken
+from simulation.forecast_simulation import ForecastBrandSimulation
+from simulation.segment_simulation import SegmentBrandSimulation
+from simulation.sku_simulation import SkuBrandSimulation, run_stacked
+from simulation.pipeline import LEAD_TIME_DISTRIBUTIONS
+from simulation.aggregators import MonthlyTotalsAggregator, MonthlyTrendAggregator, SummaryAggregator
+from simulation.streams import brand_generator, brand_random, lead_time_generator
 from utils.helpers import clean_data_for_json
+from utils.series import RESOLUTIONS, build_series
 
 import simpy
+import numpy as np
 import pandas as pd
 
 
 # -----------------------------
 # Run SimPy per brand
 # -----------------------------
+GRANULARITIES = ("brand", "product", "region", "retailer")
+# granularity ที่จำลองแยก segment ของ historical data (ดู calculate_segment_parameters)
+SEGMENT_GRANULARITIES = ("region", "retailer")
+# ที่มาของความต้องการ: พารามิเตอร์จาก historical data, พยากรณ์ต่อสินค้า (services/forecast_service.py)
+# หรือ replay ยอดขายจริงรายวัน (demand trace ใน data_service)
+DEMAND_SOURCES = ("parameters", "forecast", "history")
+
+# callback(แถว MonthlyTrend ของเดือนที่เพิ่งจบ, วันสุดท้ายของเดือน) ระหว่างจำลอง
+MonthEndCallback = Callable[[Dict[str, Any], datetime], None]
+
+
+def run_sku_simulation(
+    configs: Dict[str, BrandConfig],
+    simulation_days: int,
+    start_date: datetime,
+    festival_multipliers: Dict[str, float] | None = None,
+    seed: Optional[int] = None,
+    on_month_end: Optional[MonthEndCallback] = None,
+    cancel: Optional[CancelToken] = None
+) -> Dict[str, SkuBrandSimulation]:
+    """โหมดระดับสินค้า: หนึ่ง vectorized pass ต่อแบรนด์ (ไม่ใช้ SimPy)"""
+    brand_params = get_brand_parameters()
+    product_params = get_product_parameters()
+    simulations: Dict[str, SkuBrandSimulation] = {}
+    for brand_name, config in configs.items():
+        sim = SkuBrandSimulation(
+            brand_name=brand_name,
+            config=config or BrandConfig(),
+            brand_params=brand_params,
+            product_params=product_params,
+            start_date=start_date,
+            festival_multipliers=festival_multipliers,
+            rng=brand_generator(seed, brand_name) if seed is not None else None,
+            on_month_end=on_month_end
+        )
+        simulations[brand_name] = sim.run(simulation_days, cancel=cancel)
+    return simulations
+
+
+def run_segment_simulation(
+    configs: Dict[str, BrandConfig],
+    simulation_days: int,
+    start_date: datetime,
+    festival_multipliers: Dict[str, float] | None = None,
+    seed: Optional[int] = None,
+    on_month_end: Optional[MonthEndCallback] = None,
+    cancel: Optional[CancelToken] = None,
+    dimension: str = "region"
+) -> Dict[str, SegmentBrandSimulation]:
+    """โหมด segment: ทุก (แบรนด์ × segment) เป็น matrix เดียวใน pass เดียว แล้ว rollup เป็นแบรนด์"""
+    brand_params = get_brand_parameters()
+    segment_params = get_segment_parameters(dimension)
+    simulations: Dict[str, SegmentBrandSimulation] = {
+        brand_name: SegmentBrandSimulation(
+            brand_name=brand_name,
+            config=config or BrandConfig(),
+            brand_params=brand_params,
+            segment_params=segment_params,
+            dimension=dimension,
+            start_date=start_date,
+            festival_multipliers=festival_multipliers,
+            rng=brand_generator(seed, brand_name) if seed is not None else None,
+            on_month_end=on_month_end
+        )
+        for brand_name, config in configs.items()
+    }
+    run_stacked(list(simulations.values()), simulation_days, cancel=cancel)
+    return simulations
+
+
+def build_stacked_simulations(
+    configs: Dict[str, BrandConfig],
+    start_date: datetime,
+    festival_multipliers: Dict[str, float] | None = None,
+    seed: Optional[int] = None,
+    on_month_end: Optional[MonthEndCallback] = None,
+    granularity: str = "brand",
+    demand_source: str = "parameters"
+) -> Dict[str, SkuBrandSimulation]:
+    """simulation แบบ vectorized ต่อแบรนด์สำหรับ run_stacked ตาม granularity / demand_source
+
+    granularity "brand" = แบรนด์ละหนึ่งแถว, "product" = ต่อสินค้า, "region" / "retailer" = ต่อ segment
+    demand_source "forecast" = ความต้องการจากพยากรณ์ต่อสินค้า (แบรนด์ที่ไม่มีประวัติใช้พารามิเตอร์ปกติ)
+    """
+    common = dict(
+        brand_params=get_brand_parameters(), start_date=start_date, festival_multipliers=festival_multipliers,
+        on_month_end=on_month_end
+    )
+    product_params = get_product_parameters() if granularity == "product" else {}
+    simulations: Dict[str, SkuBrandSimulation] = {}
+    for brand_name, config in configs.items():
+        rng = brand_generator(seed, brand_name) if seed is not None else None
+        profile = get_demand_profile(brand_name) if demand_source == "forecast" else None
+        if profile is not None:
+            simulations[brand_name] = ForecastBrandSimulation(
+                brand_name=brand_name, config=config or BrandConfig(), rng=rng, product_params=get_product_parameters(),
+                profile=profile, by_brand=granularity == "brand", **common
+            )
+        elif granularity in SEGMENT_GRANULARITIES:
+            simulations[brand_name] = SegmentBrandSimulation(
+                brand_name=brand_name, config=config or BrandConfig(), rng=rng,
+                segment_params=get_segment_parameters(granularity), dimension=granularity, **common
+            )
+        else:
+            simulations[brand_name] = SkuBrandSimulation(
+                brand_name=brand_name, config=config or BrandConfig(), rng=rng, product_params=product_params, **common
+            )
+    return simulations
+
+
+def run_forecast_simulation(
+    configs: Dict[str, BrandConfig],
+    simulation_days: int,
+    start_date: datetime,
+    festival_multipliers: Dict[str, float] | None = None,
+    seed: Optional[int] = None,
+    on_month_end: Optional[MonthEndCallback] = None,
+    cancel: Optional[CancelToken] = None,
+    granularity: str = "product"
+) -> Dict[str, SkuBrandSimulation]:
+    """demand_source "forecast": ความต้องการจากพยากรณ์ต่อสินค้า ทุกแบรนด์ใน matrix เดียว"""
+    simulations = build_stacked_simulations(
+        configs, start_date, festival_multipliers, seed, on_month_end, granularity, demand_source="forecast"
+    )
+    run_stacked(list(simulations.values()), simulation_days, cancel=cancel)
+    return simulations
+
+
+def run_coupled_simulation(
+    configs: Dict[str, BrandConfig],
+    simulation_days: int,
+    start_date: datetime,
+    festival_multipliers: Dict[str, float] | None = None,
+    seed: Optional[int] = None,
+    on_month_end: Optional[MonthEndCallback] = None,
+    cancel: Optional[CancelToken] = None,
+    constraint: Optional[SharedConstraint] = None,
+    granularity: str = "brand",
+    demand_source: str = "parameters"
+) -> Dict[str, SkuBrandSimulation]:
+    """โหมดข้อจำกัดร่วม: ทุกแบรนด์ (× สินค้า / segment ตาม granularity) ใน matrix เดียวของ run_stacked
+    และ order ที่แข่งกันในแต่ละวันถูกแบ่งตาม constraint.rule (granularity "brand" = แบรนด์ละหนึ่งแถว)
+    """
+    simulations = build_stacked_simulations(
+        configs, start_date, festival_multipliers, seed, on_month_end, granularity, demand_source
+    )
+    sims = list(simulations.values())
+    priorities = constraint.priorities or {}
+    row_cost = np.concatenate([sim.product_prices for sim in sims]) * (constraint.unit_cost_ratio or 1.0)
+    # ไม่ระบุ priority → ต่อท้ายแบรนด์ที่ระบุ ตามลำดับแบรนด์
+    after = max(priorities.values(), default=0) + 1
+    brand_rank = np.array([priorities.get(name, after + i) for i, name in enumerate(simulations)], dtype="int64")
+    pools: List[AllocationPool] = []
+
+    def make_pool(brand_of: np.ndarray) -> AllocationPool:
+        pool = AllocationPool(
+            constraint.kind or "capacity", constraint.limit, constraint.rule or "proportional",
+            row_cost, brand_rank[brand_of], brand_of, period_days=constraint.period_days or 30
+        )
+        pools.append(pool)
+        return pool
+
+    run_stacked(sims, simulation_days, cancel=cancel, pool=make_pool)
+    for sim, row in zip(sims, pools[0].summary(list(simulations))):
+        sim.allocation_summary = row
+    return simulations
+
+
 def run_simulation(
     configs: Dict[str, BrandConfig],
     simulation_days: int,
     start_date: datetime,
-    festival_multipliers: Dict[str, float] | None = None
+    festival_multipliers: Dict[str, float] | None = None,
+    seed: Optional[int] = None,
+    on_month_end: Optional[MonthEndCallback] = None,
+    cancel: Optional[CancelToken] = None,
+    traces: Optional[Dict[str, np.ndarray]] = None
 ) -> Dict[str, BrandSimulation]:
+    """SimPy หนึ่ง environment ทุกแบรนด์ (seed = random stream แยกต่อแบรนด์, None = random module กลาง)
+
+    มี cancel → เดิน environment ทีละวันและตรวจการยกเลิกระหว่างวัน (ผลเหมือนรันรวดเดียว)
+    traces: แบรนด์ → ยอดขายจริงรายวันตั้งแต่ start_date (replay แทนความต้องการสุ่ม, แบรนด์ที่ไม่มี = ปกติ)
+    """
     env = simpy.Environment()
     simulations: Dict[str, BrandSimulation] = {}
     for brand_name, config in configs.items():
@@ -34,290 +228,408 @@ def run_simulation(
             config=config,
             brand_params=get_brand_parameters(),
             start_date=start_date,
-            festival_multipliers=festival_multipliers
+            festival_multipliers=festival_multipliers,
+            rng=brand_random(seed, brand_name) if seed is not None else None,
+            lead_rng=lead_time_generator(seed, brand_name) if seed is not None else None,
+            on_month_end=on_month_end,
+            demand_trace=(traces or {}).get(brand_name)
         )
         simulations[brand_name] = sim
-    env.run(until=simulation_days)
+    if cancel is None:
+        env.run(until=simulation_days)
+    else:
+        for day in range(1, simulation_days + 1):
+            cancel.check(day - 1)
+            env.run(until=day)
     return simulations
 
 
 # -----------------------------
 # Post-process results
 # -----------------------------
-def process_results(
-    simulations: Dict[str, BrandSimulation],
-    simulation_days: int,
-    start_date: datetime
-) -> SimulationResponse:
+# ส่วนของ response ที่เลือกได้ผ่าน include= / fields=
+RESPONSE_SECTIONS = (
+    "daily_data",
+    "monthly_data",
+    "restock_events",
+    "reorder_point_events",
+    "festival_events",
+    "season_events",
+    "summary",
+    "best_selling_products",
+    "monthly_trends",
+    "trend_events",
+    "product_monthly_trends",
+    "product_trend_events",
+    "series",
+    "product_summary",
+    "segment_summary",
+    "allocation_summary",
+)
+
+# section ที่คำนวณเฉพาะเมื่อขอชัดเจน (ไม่รวมใน default)
+OPT_IN_SECTIONS = ("series", "product_summary", "segment_summary", "allocation_summary")
+
+
+def resolve_sections(include: Optional[Iterable[str]]) -> Set[str]:
+    """แปลงรายการ section ที่ขอ → set (None/ว่าง = ทุก section ยกเว้น opt-in)"""
+    if not include:
+        return set(RESPONSE_SECTIONS) - set(OPT_IN_SECTIONS)
+    sections = {x.strip() for x in include if x and x.strip()}
+    unknown = sections - set(RESPONSE_SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown response sections: {sorted(unknown)}. Available: {list(RESPONSE_SECTIONS)}"
+        )
+    return sections or set(RESPONSE_SECTIONS) - set(OPT_IN_SECTIONS)
+
+
+class ResultStages:
+    """Stage หลังจำลองแบบ lazy: คำนวณเฉพาะ section ที่ถูกขอ
+
+    แต่ละ stage ถูก memoize ต่อ (stage, brand) ดังนั้น stage ที่ใช้ร่วมกัน
+    (เช่น historical ของ best sellers + product trends) คำนวณแค่ครั้งเดียว
+    และ stage ที่ไม่มี section ไหนต้องการจะไม่ถูกรันเลย ส่วน monthly_data /
+    monthly_trends / summary อ่านจาก aggregator ที่ engine สรุปไว้ระหว่างจำลอง
+    cancel ถูกตรวจก่อนแต่ละ section และก่อน product trends ของแต่ละแบรนด์ (stage ที่นานที่สุด)
+    """
+
+    def __init__(
+        self,
+        simulations: Dict[str, BrandSimulation],
+        simulation_days: int,
+        start_date: datetime,
+        resolution: str = "day",
+        max_points: Optional[int] = None,
+        cancel: Optional[CancelToken] = None
+    ):
+        self.simulations = simulations
+        self.simulation_days = simulation_days
+        self.start_date = start_date
+        self.resolution = resolution
+        self.max_points = max_points
+        self.cancel = cancel
+        self._cache: Dict[Tuple[str, Optional[str]], Any] = {}
+
+    def _memo(self, name: str, brand: Optional[str], fn):
+        key = (name, brand)
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def _check_cancel(self) -> None:
+        if self.cancel is not None:
+            self.cancel.check(self.simulation_days)
+
+    def section(self, name: str) -> List[Dict[str, Any]]:
+        self._check_cancel()
+        return self._memo(name, None, lambda: clean_data_for_json(getattr(self, f"_section_{name}")()))
+
+    # ---------- shared stages ----------
+    def simulated_months(self) -> Set[int]:
+        # เดือนที่อยู่ในช่วงจำลอง
+        return self._memo("simulated_months", None, lambda: {
+            (self.start_date + timedelta(days=d)).month for d in range(self.simulation_days)
+        })
 
-    all_daily_data: List[Dict[str, Any]] = []
-    all_monthly_data: List[Dict[str, Any]] = []
-    all_restock_events: List[Dict[str, Any]] = []
-    all_reorder_point_events: List[Dict[str, Any]] = []
-    all_festival_events: List[Dict[str, Any]] = []
-    all_season_events: List[Dict[str, Any]] = []
-    all_trend_events: List[Dict[str, Any]] = []    # จาก online SimPy (ถ้ามี)
-    summary_data: List[Dict[str, Any]] = []
-    best_selling_products: List[Dict[str, Any]] = []
-    monthly_trends: List[Dict[str, Any]] = []      # ย่อระดับแบรนด์ (offline ในขั้นนี้)
-
-    # NEW: product trends
-    product_monthly_trends: List[Dict[str, Any]] = []
-    product_trend_events: List[Dict[str, Any]] = []
-
-    # เดือนที่อยู่ในช่วงจำลอง
-    simulated_months = set()
-    for d in range(simulation_days):
-        simulated_months.add((start_date + timedelta(days=d)).month)
-
-    historical_data = get_historical_data()
-    brand_params = get_brand_parameters() or {}
-
-    for brand_name, sim in simulations.items():
-        # --- เก็บ logs ---
-        all_daily_data.extend(sim.sales_data)
-        all_restock_events.extend(sim.restock_events)
-        all_reorder_point_events.extend(sim.reorder_point_events)
-        all_festival_events.extend(sim.festival_events)
-        all_season_events.extend(sim.season_events)
-        if hasattr(sim, "trend_events"):
-            all_trend_events.extend(sim.trend_events)
-
-        # --- สรุปรายเดือนจากผลจำลอง ---
-        df = pd.DataFrame(sim.sales_data)
-        df["date"] = pd.to_datetime(df["date"])
-        df["month"] = df["date"].dt.month
-
-        monthly_agg = (
-            df.groupby("month")
-              .agg({
-                  "sales": "sum",
-                  "revenue": "sum",
-                  "stock_after": "mean",
-                  "stockout": "sum"
-              })
-              .reset_index()
-              .sort_values("month")
+    def daily_arrays(self, brand: str) -> Dict[str, np.ndarray]:
+        """คอลัมน์ตัวเลขรายวันของแบรนด์เป็น numpy array (ไม่ผ่าน DataFrame)"""
+        def build():
+            rows = self.simulations[brand].sales_data
+            cols = ("day", "demand", "sales", "revenue", "lost_sales", "stockout", "stock_after")
+            return {c: np.fromiter((r[c] for r in rows), dtype="float64" if c == "revenue" else "int64", count=len(rows)) for c in cols}
+        return self._memo("daily_arrays", brand, build)
+
+    def aggregate(self, brand: str, name: str) -> Any:
+        """ผลจาก streaming aggregator ใน engine (ไม่ต้องสร้าง DataFrame ใหม่)"""
+        return self._memo(f"aggregate:{name}", brand, lambda: self.simulations[brand].aggregate(name))
+
+    def brand_history(self, brand: str) -> Optional[pd.DataFrame]:
+        """historical ของแบรนด์ เฉพาะเดือนที่ simulate (None = ไม่มีคอลัมน์ที่ต้องใช้)"""
+        def build():
+            historical_data = get_historical_data()
+            if historical_data is None or not {"Brand", "Invoice Date", "Product", "Units Sold"} <= set(historical_data.columns):
+                return None
+            h = historical_data.loc[historical_data["Brand"] == brand, ["Invoice Date", "Product", "Units Sold"]].copy()
+            h["Invoice Date"] = pd.to_datetime(h["Invoice Date"])
+            h["month"] = h["Invoice Date"].dt.month
+            return h[h["month"].isin(self.simulated_months())]
+        return self._memo("brand_history", brand, build)
+
+    # ---------- sections ----------
+    def _collect(self, attr: str) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for sim in self.simulations.values():
+            out.extend(getattr(sim, attr, []))
+        return out
+
+    def _section_daily_data(self):
+        return self._collect("sales_data")
+
+    def _section_restock_events(self):
+        return self._collect("restock_events")
+
+    def _section_reorder_point_events(self):
+        return self._collect("reorder_point_events")
+
+    def _section_festival_events(self):
+        return self._collect("festival_events")
+
+    def _section_season_events(self):
+        return self._collect("season_events")
+
+    def _section_trend_events(self):
+        # จาก online SimPy
+        return self._collect("trend_events")
+
+    def _section_monthly_data(self):
+        rows: List[Dict[str, Any]] = []
+        for brand_name in self.simulations:
+            rows.extend(self.aggregate(brand_name, MonthlyTotalsAggregator.name) or [])
+        return rows
+
+    def _section_best_selling_products(self):
+        # อ้าง historical เฉพาะเดือนที่ simulate
+        rows: List[Dict[str, Any]] = []
+        for brand_name in self.simulations:
+            brand_df = self.brand_history(brand_name)
+            if brand_df is None or len(brand_df) == 0:
+                continue
+            product_monthly_sales = (
+                brand_df.groupby(["month", "Product"], observed=True)["Units Sold"]
+                        .sum()
+                        .reset_index()
+            )
+            if len(product_monthly_sales) == 0:
+                continue
+            top_products = (
+                product_monthly_sales.sort_values(["month", "Units Sold"], ascending=[True, False])
+                                     .groupby("month").first().reset_index()
+            )
+            for _, r in top_products.iterrows():
+                rows.append({
+                    "brand": brand_name,
+                    "month": int(r["month"]),
+                    "product": str(r["Product"]),
+                    "units_sold": int(r["Units Sold"])
+                })
+        return rows
+
+    def _section_monthly_trends(self):
+        # Brand-level monthly trends (สรุปใน engine ตามเดือนปฏิทิน)
+        rows: List[Dict[str, Any]] = []
+        for brand_name in self.simulations:
+            rows.extend(self.aggregate(brand_name, MonthlyTrendAggregator.name) or [])
+        return rows
+
+    def product_trends(self, brand: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Product-level monthly trends & events ของแบรนด์ (ใช้ร่วมกันสอง section)"""
+        self._check_cancel()
+        return self._memo("product_trends", brand, lambda: self._build_product_trends(brand))
+
+    def _build_product_trends(self, brand_name: str):
+        monthly_rows: List[Dict[str, Any]] = []
+        events: List[Dict[str, Any]] = []
+        h = self.brand_history(brand_name)
+        if h is None or len(h) == 0:
+            return monthly_rows, events
+
+        baseline = (
+            h.groupby(["Product", "month"], observed=True)["Units Sold"]
+             .mean()
+             .rename("baseline_units")
+             .reset_index()
+        )
+        actual = (
+            h.groupby(["Product", "month"], observed=True)["Units Sold"]
+             .sum()
+             .rename("sales")
+             .reset_index()
         )
+        merged = pd.merge(actual, baseline, on=["Product", "month"], how="left")
+        merged["brand"] = brand_name
 
-        for _, row in monthly_agg.iterrows():
-            all_monthly_data.append({
-                "month": int(row["month"]),
-                "brand": brand_name,
-                "total_sales": int(row["sales"]),
-                "total_revenue": float(row["revenue"]),
-                "avg_stock": float(row["stock_after"]),
-                "stockout_days": int(row["stockout"])
-            })
+        merged = merged.sort_values(["Product", "month"])
+        merged["growth_vs_baseline"] = merged.apply(
+            lambda r: 0.0 if (pd.isna(r["baseline_units"]) or r["baseline_units"] <= 0)
+            else (r["sales"] - r["baseline_units"]) / r["baseline_units"], axis=1
+        )
 
-        # --- best selling product (อ้าง historical เฉพาะเดือนที่ simulate) ---
-        if historical_data is not None and {"Brand", "Invoice Date", "Product", "Units Sold"} <= set(historical_data.columns):
-            brand_df = historical_data[historical_data["Brand"] == brand_name].copy()
-            brand_df["Invoice Date"] = pd.to_datetime(brand_df["Invoice Date"])
-            brand_df["month"] = brand_df["Invoice Date"].dt.month
-            brand_df = brand_df[brand_df["month"].isin(simulated_months)]
-            if len(brand_df) > 0:
-                product_monthly_sales = (
-                    brand_df.groupby(["month", "Product"])["Units Sold"]
-                            .sum()
-                            .reset_index()
-                )
-                if len(product_monthly_sales) > 0:
-                    top_products = (
-                        product_monthly_sales.sort_values(["month", "Units Sold"], ascending=[True, False])
-                                           .groupby("month").first().reset_index()
-                    )
-                    for _, r in top_products.iterrows():
-                        best_selling_products.append({
-                            "brand": brand_name,
-                            "month": int(r["month"]),
-                            "product": str(r["Product"]),
-                            "units_sold": int(r["Units Sold"])
-                        })
-
-        # --- Brand-level monthly trends (offline) ---
-        params = brand_params.get(brand_name, {})
-        seasonality = params.get("seasonality", {m: 1.0 for m in range(1, 13)})
-        monthly_baseline_units = params.get("monthly_baseline_units", {m: 0.0 for m in range(1, 13)})
-
-        prev_sales = None
-        for _, row in monthly_agg.iterrows():
-            m = int(row["month"])
-            sales_m = int(row["sales"])
-            baseline_m = float(monthly_baseline_units.get(m, 0.0))
-            season_factor = float(seasonality.get(m, 1.0))
-            growth_vs_baseline = 0.0 if baseline_m <= 0 else (sales_m - baseline_m) / baseline_m
-            mom_growth = (sales_m - prev_sales) / prev_sales if (prev_sales is not None and prev_sales > 0) else None
-
-            up = (growth_vs_baseline >= 0.15) or (mom_growth is not None and mom_growth >= 0.10)
-            down = (growth_vs_baseline <= -0.10) or (mom_growth is not None and mom_growth <= -0.10)
-            if up and not down:
-                trend_label = "uptrend"
-            elif down and not up:
-                trend_label = "downtrend"
+        merged["mom_growth"] = None
+        for product, grp in merged.groupby("Product", observed=True):
+            self._check_cancel()
+            prev = None
+            for idx, row in grp.iterrows():
+                if prev is not None and prev > 0:
+                    merged.loc[idx, "mom_growth"] = (row["sales"] - prev) / prev
+                prev = row["sales"]
+
+        def classify(gvb: float, mom: Any) -> tuple[str, float]:
+            momv = mom if mom is not None else 0.0
+            score = 0.7 * gvb + 0.3 * momv
+            if gvb >= 0.15 or momv >= 0.10:
+                label = "uptrend"
+            elif gvb <= -0.10 or momv <= -0.10:
+                label = "downtrend"
             else:
-                trend_label = "sideways"
+                label = "sideways"
+            return label, score
 
-            trend_score = 0.7 * growth_vs_baseline + 0.3 * (mom_growth if mom_growth is not None else 0.0)
+        merged[["trend", "trend_score"]] = merged.apply(
+            lambda r: pd.Series(classify(r["growth_vs_baseline"], r["mom_growth"])),
+            axis=1
+        )
 
-            monthly_trends.append({
-                "month": m,
+        # push monthly rows
+        for _, r in merged.iterrows():
+            monthly_rows.append({
                 "brand": brand_name,
-                "sales": sales_m,
-                "baseline_units": baseline_m,
-                "growth_vs_baseline": float(growth_vs_baseline),
-                "mom_growth": float(mom_growth) if mom_growth is not None else None,
-                "seasonality_factor": season_factor,
-                "trend": trend_label,
-                "trend_score": float(trend_score)
+                "product": str(r["Product"]),
+                "month": int(r["month"]),
+                "sales": int(r["sales"]),
+                "baseline_units": float(r["baseline_units"]) if pd.notna(r["baseline_units"]) else 0.0,
+                "growth_vs_baseline": float(r["growth_vs_baseline"]) if pd.notna(r["growth_vs_baseline"]) else None,
+                "mom_growth": float(r["mom_growth"]) if pd.notna(r["mom_growth"]) else None,
+                "trend": str(r["trend"]),
+                "trend_score": float(r["trend_score"])
             })
 
-            prev_sales = sales_m
-
-        # --- Product-level monthly trends & events ---
-        if historical_data is not None and {"Brand", "Invoice Date", "Product", "Units Sold"} <= set(historical_data.columns):
-            h = historical_data.copy()
-            h["Invoice Date"] = pd.to_datetime(h["Invoice Date"])
-            h["month"] = h["Invoice Date"].dt.month
-            h = h[(h["Brand"] == brand_name) & (h["month"].isin(simulated_months))]
-
-            if len(h) > 0:
-                baseline = (
-                    h.groupby(["Product", "month"])["Units Sold"]
-                     .mean()
-                     .rename("baseline_units")
-                     .reset_index()
-                )
-                actual = (
-                    h.groupby(["Product", "month"])["Units Sold"]
-                     .sum()
-                     .rename("sales")
-                     .reset_index()
-                )
-                merged = pd.merge(actual, baseline, on=["Product", "month"], how="left")
-                merged["brand"] = brand_name
-
-                merged = merged.sort_values(["Product", "month"])
-                merged["growth_vs_baseline"] = merged.apply(
-                    lambda r: 0.0 if (pd.isna(r["baseline_units"]) or r["baseline_units"] <= 0)
-                    else (r["sales"] - r["baseline_units"]) / r["baseline_units"], axis=1
-                )
-
-                merged["mom_growth"] = None
-                for product, grp in merged.groupby("Product"):
-                    prev = None
-                    for idx, row in grp.iterrows():
-                        if prev is not None and prev > 0:
-                            merged.loc[idx, "mom_growth"] = (row["sales"] - prev) / prev
-                        prev = row["sales"]
-
-                def classify(gvb: float, mom: Any) -> tuple[str, float]:
-                    momv = mom if mom is not None else 0.0
-                    score = 0.7 * gvb + 0.3 * momv
-                    if gvb >= 0.15 or momv >= 0.10:
-                        label = "uptrend"
-                    elif gvb <= -0.10 or momv <= -0.10:
-                        label = "downtrend"
-                    else:
-                        label = "sideways"
-                    return label, score
-
-                merged[["trend", "trend_score"]] = merged.apply(
-                    lambda r: pd.Series(classify(r["growth_vs_baseline"], r["mom_growth"])),
-                    axis=1
-                )
-
-                # push monthly rows
-                for _, r in merged.iterrows():
-                    product_monthly_trends.append({
-                        "brand": brand_name,
-                        "product": str(r["Product"]),
+        # events (เมื่อเปลี่ยนสถานะ)
+        for product, grp in merged.groupby("Product", observed=True):
+            grp = grp.sort_values("month")
+            prev_trend = None
+            for _, r in grp.iterrows():
+                cur = str(r["trend"])
+                if prev_trend is not None and cur != prev_trend:
+                    reason = []
+                    if pd.notna(r["mom_growth"]):
+                        reason.append(f"MoM={(float(r['mom_growth']) * 100):.1f}%")
+                    if pd.notna(r["growth_vs_baseline"]):
+                        reason.append(f"vsBase={(float(r['growth_vs_baseline']) * 100):.1f}%")
+                    events.append({
                         "month": int(r["month"]),
-                        "sales": int(r["sales"]),
-                        "baseline_units": float(r["baseline_units"]) if pd.notna(r["baseline_units"]) else 0.0,
-                        "growth_vs_baseline": float(r["growth_vs_baseline"]) if pd.notna(r["growth_vs_baseline"]) else None,
-                        "mom_growth": float(r["mom_growth"]) if pd.notna(r["mom_growth"]) else None,
-                        "trend": str(r["trend"]),
-                        "trend_score": float(r["trend_score"])
+                        "brand": brand_name,
+                        "product": str(product),
+                        "from_trend": prev_trend,
+                        "to_trend": cur,
+                        "trend_score": float(r["trend_score"]),
+                        "reason": "; ".join(reason) if reason else None
                     })
+                prev_trend = cur
+        return monthly_rows, events
+
+    def _section_product_monthly_trends(self):
+        rows: List[Dict[str, Any]] = []
+        for brand_name in self.simulations:
+            rows.extend(self.product_trends(brand_name)[0])
+        return rows
+
+    def _section_product_trend_events(self):
+        rows: List[Dict[str, Any]] = []
+        for brand_name in self.simulations:
+            rows.extend(self.product_trends(brand_name)[1])
+        return rows
+
+    def _section_series(self):
+        rows: List[Dict[str, Any]] = []
+        for brand_name in self.simulations:
+            rows.extend(build_series(
+                brand_name, self.daily_arrays(brand_name), self.start_date,
+                self.resolution, self.max_points
+            ))
+        return rows
+
+    def _section_product_summary(self):
+        rows: List[Dict[str, Any]] = []
+        for sim in self.simulations.values():
+            if hasattr(sim, "product_summary"):
+                rows.extend(sim.product_summary())
+        return rows
+
+    def _section_segment_summary(self):
+        rows: List[Dict[str, Any]] = []
+        for sim in self.simulations.values():
+            if hasattr(sim, "segment_summary"):
+                rows.extend(sim.segment_summary())
+        return rows
+
+    def _section_allocation_summary(self):
+        return [sim.allocation_summary for sim in self.simulations.values() if hasattr(sim, "allocation_summary")]
+
+    def _section_summary(self):
+        rows: List[Dict[str, Any]] = []
+        for brand_name in self.simulations:
+            summary = self.aggregate(brand_name, SummaryAggregator.name)
+            if summary is not None:
+                rows.append(summary)
+        return rows
 
-                # events (เมื่อเปลี่ยนสถานะ)
-                for product, grp in merged.groupby("Product"):
-                    grp = grp.sort_values("month")
-                    prev_trend = None
-                    for _, r in grp.iterrows():
-                        cur = str(r["trend"])
-                        if prev_trend is not None and cur != prev_trend:
-                            reason = []
-                            if pd.notna(r["mom_growth"]):
-                                reason.append(f"MoM={(float(r['mom_growth']) * 100):.1f}%")
-                            if pd.notna(r["growth_vs_baseline"]):
-                                reason.append(f"vsBase={(float(r['growth_vs_baseline']) * 100):.1f}%")
-                            product_trend_events.append({
-                                "month": int(r["month"]),
-                                "brand": brand_name,
-                                "product": str(product),
-                                "from_trend": prev_trend,
-                                "to_trend": cur,
-                                "trend_score": float(r["trend_score"]),
-                                "reason": "; ".join(reason) if reason else None
-                            })
-                        prev_trend = cur
-
-        # --- Summary per brand ---
-        total_demand = df["demand"].sum()
-        total_lost_sales = df["lost_sales"].sum()
-        lost_rate = (total_lost_sales / total_demand * 100) if total_demand > 0 else 0.0
-
-        summary_data.append({
-            "brand": brand_name,
-            "total_units_sold": int(df["sales"].sum()),
-            "total_revenue": float(df["revenue"].sum()),
-            "transactions": int((df["sales"] > 0).sum()),
-            "restock_count": int(len(sim.restock_events)),
-            "stockout_days": int((df["stockout"] > 0).sum()),
-            "avg_stock": float(df["stock_after"].mean()),
-            "final_stock": int(df["stock_after"].iloc[-1]),
-            "lost_sales_rate": float(lost_rate),
-            "total_lost_sales": int(total_lost_sales),
-            "avg_price": float(sim.avg_price)
-        })
 
-    # -------- Clean for JSON --------
-    all_daily_data = clean_data_for_json(all_daily_data)
-    all_monthly_data = clean_data_for_json(all_monthly_data)
-    all_restock_events = clean_data_for_json(all_restock_events)
-    all_reorder_point_events = clean_data_for_json(all_reorder_point_events)
-    all_festival_events = clean_data_for_json(all_festival_events)
-    all_season_events = clean_data_for_json(all_season_events)
-    summary_data = clean_data_for_json(summary_data)
-    best_selling_products = clean_data_for_json(best_selling_products)
-    monthly_trends = clean_data_for_json(monthly_trends)
-    all_trend_events = clean_data_for_json(all_trend_events)
-    product_monthly_trends = clean_data_for_json(product_monthly_trends)
-    product_trend_events = clean_data_for_json(product_trend_events)
-
-    return SimulationResponse(
-        daily_data=all_daily_data,
-        monthly_data=all_monthly_data,
-        restock_events=all_restock_events,
-        reorder_point_events=all_reorder_point_events,
-        festival_events=all_festival_events,
-        season_events=all_season_events,
-        summary=summary_data,
-        best_selling_products=best_selling_products,
-        simulation_days=simulation_days,
-        monthly_trends=[MonthlyTrend(**x) for x in monthly_trends],
-        trend_events=[TrendEvent(**x) for x in all_trend_events],
-        product_monthly_trends=[MonthlyProductTrend(**x) for x in product_monthly_trends],
-        product_trend_events=[ProductTrendEvent(**x) for x in product_trend_events]
-    )
+def process_results(
+    simulations: Dict[str, BrandSimulation],
+    simulation_days: int,
+    start_date: datetime,
+    include: Optional[Set[str]] = None,
+    resolution: str = "day",
+    max_points: Optional[int] = None,
+    cancel: Optional[CancelToken] = None
+) -> SimulationResponse:
+    """สร้าง response เฉพาะ section ที่อยู่ใน include (None = ทั้งหมดยกเว้น opt-in)"""
+    sections = set(RESPONSE_SECTIONS) - set(OPT_IN_SECTIONS) if include is None else include
+    stages = ResultStages(simulations, simulation_days, start_date, resolution, max_points, cancel)
+    payload = {name: stages.section(name) for name in RESPONSE_SECTIONS if name in sections}
+    return SimulationResponse(simulation_days=simulation_days, **payload)
 
 
 # -----------------------------
-# Main entry
+# Scenario store
 # -----------------------------
-def run_inventory_simulation(request: SimulationRequest) -> SimulationResponse:
+# field ของ response ที่ไม่ได้เก็บในผล (ตั้งค่าตอนส่งกลับ)
+SCENARIO_META_FIELDS = {"scenario_id", "seed", "cached"}
+
+
+def _load_scenario(store, scenario_id: str) -> Optional[SimulationResponse]:
+    try:
+        stored = store.get(scenario_id)
+    except sqlite3.Error as e:
+        print(f"⚠️ อ่าน scenario store ไม่สำเร็จ: {e}")
+        return None
+    if stored is None:
+        return None
+    return SimulationResponse(**stored["result"], scenario_id=scenario_id, seed=stored["seed"], cached=True)
+
+
+def get_scenario(scenario_id: str) -> SimulationResponse:
+    """ผลของ scenario ที่เก็บไว้ (404 ถ้าไม่มี / store ปิดอยู่)"""
+    store = get_scenario_store()
+    result = _load_scenario(store, scenario_id) if store is not None else None
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Scenario not found: {scenario_id}")
+    return result
+
+
+# -----------------------------
+# Request → run inputs
+# -----------------------------
+def require_plain_request(
+    request: SimulationRequest,
+    label: str,
+    demand_sources: Tuple[str, ...] = ("parameters",)
+) -> None:
+    """endpoint แบบ batch (lane ต่อแบรนด์) รับเฉพาะ granularity "brand", ไม่มี shared_constraint
+    และ demand_source ใน demand_sources (400 พร้อม label ของ endpoint)"""
+    if (request.granularity or "brand") != "brand":
+        raise HTTPException(status_code=400, detail=f"{label} supports granularity 'brand' only")
+    if request.shared_constraint is not None:
+        raise HTTPException(status_code=400, detail=f"{label} does not support shared_constraint")
+    if (request.demand_source or "parameters") not in demand_sources:
+        allowed = ", ".join(f"'{s}'" for s in demand_sources)
+        raise HTTPException(status_code=400, detail=f"{label} supports demand_source {allowed} only")
+
+
+def resolve_brand_configs(request: SimulationRequest) -> Dict[str, BrandConfig]:
+    """BrandConfig ของทุกแบรนด์ที่รองรับ (ไม่ส่งมา = ค่าเริ่มต้น) + ตรวจ lead time (400)"""
     configs: Dict[str, BrandConfig] = {}
 
     # สร้าง config เริ่มต้นให้ทุกแบรนด์ที่รองรับ (ถ้าไม่ได้ส่งมา)
@@ -328,6 +640,19 @@ def run_inventory_simulation(request: SimulationRequest) -> SimulationResponse:
             cfg = getattr(request, "H_M", None)
         configs[b] = cfg or BrandConfig()
 
+    for b, cfg in configs.items():
+        if (cfg.lead_time_distribution or "fixed") not in LEAD_TIME_DISTRIBUTIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid lead_time_distribution for {b}: {cfg.lead_time_distribution}. Use one of {list(LEAD_TIME_DISTRIBUTIONS)}"
+            )
+        if (cfg.lead_time_days or 0) < 0 or (cfg.lead_time_spread or 0) < 0:
+            raise HTTPException(status_code=400, detail=f"Lead time for {b} must be >= 0")
+    return configs
+
+
+def resolve_horizon(request: SimulationRequest) -> Tuple[int, datetime, int]:
+    """(start_day, start_date, simulation_days) จาก start_day / end_day / simulation_days (400 ถ้าช่วงผิด)"""
     start_day = request.start_day if request.start_day is not None else 0
     start_date = datetime(2024, 1, 1) + timedelta(days=start_day)
 
@@ -341,10 +666,163 @@ def run_inventory_simulation(request: SimulationRequest) -> SimulationResponse:
             status_code=400,
             detail=f"Invalid date range: start_day={start_day}, end_day={request.end_day}"
         )
+    return start_day, start_date, simulation_days
+
+
+def resolve_trace_window(request: SimulationRequest) -> Tuple[int, datetime, int]:
+    """demand_source "history": (start_day, start_date, simulation_days) นับจากวันแรกของ demand trace
+    (400 ถ้าไม่มี historical data หรือช่วงเกินข้อมูลจริง)"""
+    trace = get_demand_trace()
+    if trace is None:
+        raise HTTPException(status_code=400, detail="demand_source 'history' requires historical data")
+    start_day, _, simulation_days = resolve_horizon(request)
+    span = trace['units'].shape[1]
+    if start_day < 0 or start_day + simulation_days > span:
+        first = trace['start_date']
+        last = first + timedelta(days=span - 1)
+        raise HTTPException(
+            status_code=400,
+            detail=f"History window out of range: days {start_day}..{start_day + simulation_days - 1}, "
+                   f"history covers days 0..{span - 1} ({first.strftime('%Y-%m-%d')} to {last.strftime('%Y-%m-%d')})"
+        )
+    return start_day, trace['start_date'] + timedelta(days=start_day), simulation_days
+
 
-    festival_multipliers: Dict[str, float] = {}
+def history_traces(start_day: int, simulation_days: int) -> Dict[str, np.ndarray]:
+    """แบรนด์ → ยอดขายจริงรายวันในช่วง (แบรนด์ที่ไม่มีขายเลยในช่วงนั้นไม่อยู่ใน dict → ใช้พารามิเตอร์ปกติ
+    และแจ้งใน history_fallback_brands ของผล)"""
+    trace = get_demand_trace()
+    window = trace['units'][:, start_day:start_day + simulation_days]
+    return {brand: window[i] for i, brand in enumerate(trace['brands']) if window[i].any()}
+
+
+def resolve_festival_multipliers(request: SimulationRequest) -> Dict[str, float]:
     if request.festival_demand and request.festival_demand.multipliers:
-        festival_multipliers = request.festival_demand.multipliers
+        return request.festival_demand.multipliers
+    return {}
+
+
+def request_sections(request: SimulationRequest, include: Optional[Iterable[str]] = None) -> Set[str]:
+    """section ที่ request จะคำนวณ + ตรวจ resolution / max_points / granularity / seed (400)"""
+    # include จาก query (fields=) มาก่อน ไม่งั้นใช้จาก body
+    sections = resolve_sections(include if include else request.include)
+
+    resolution = request.resolution or "day"
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid resolution: {resolution}. Use one of {list(RESOLUTIONS)}")
+    if request.max_points is not None and request.max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be >= 3")
+    if request.resolution or request.max_points:
+        sections.add("series")
+
+    granularity = request.granularity or "brand"
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Invalid granularity: {granularity}. Use one of {list(GRANULARITIES)}")
+
+    if request.seed is not None and request.seed < 0:
+        raise HTTPException(status_code=400, detail="seed must be >= 0")
+
+    demand_source = request.demand_source or "parameters"
+    if demand_source not in DEMAND_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Invalid demand_source: {demand_source}. Use one of {list(DEMAND_SOURCES)}")
+    if demand_source == "forecast" and granularity in SEGMENT_GRANULARITIES:
+        raise HTTPException(status_code=400, detail="demand_source 'forecast' supports granularity 'brand' or 'product'")
+    if demand_source == "history":
+        require_plain_request(request, "demand_source 'history'", demand_sources=("history",))
+
+    constraint = request.shared_constraint
+    if constraint is not None:
+        validate_shared_constraint(constraint)
+        sections.add("allocation_summary")
+    return sections
+
+
+def validate_shared_constraint(constraint: SharedConstraint) -> None:
+    if (constraint.kind or "capacity") not in CONSTRAINT_KINDS:
+        raise HTTPException(status_code=400, detail=f"Invalid shared_constraint.kind: {constraint.kind}. Use one of {list(CONSTRAINT_KINDS)}")
+    if (constraint.rule or "proportional") not in ALLOCATION_RULES:
+        raise HTTPException(status_code=400, detail=f"Invalid shared_constraint.rule: {constraint.rule}. Use one of {list(ALLOCATION_RULES)}")
+    if constraint.limit < 0:
+        raise HTTPException(status_code=400, detail="shared_constraint.limit must be >= 0")
+    if constraint.period_days is not None and constraint.period_days < 1:
+        raise HTTPException(status_code=400, detail="shared_constraint.period_days must be >= 1")
+    if constraint.unit_cost_ratio is not None and constraint.unit_cost_ratio <= 0:
+        raise HTTPException(status_code=400, detail="shared_constraint.unit_cost_ratio must be > 0")
+    unknown = set(constraint.priorities or {}) - set(get_supported_brands())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown brands in shared_constraint.priorities: {sorted(unknown)}")
+
+
+# (store, data version, request ที่ใช้เป็น key, scenario_id)
+ScenarioEntry = Tuple[ScenarioStore, str, Dict[str, Any], str]
+
+
+def scenario_entry(request: SimulationRequest, sections: Set[str], seed: int) -> Optional[ScenarioEntry]:
+    """(store, data version, request ที่ใช้เป็น key, scenario_id) ของ request (None = ไม่มี scenario store)"""
+    store = get_scenario_store()
+    data_version = get_data_version()
+    if store is None or data_version is None:
+        return None
+    scenario_request = request.model_dump(exclude={"include", "seed"})
+    return store, data_version, scenario_request, scenario_key(scenario_request, sections, seed, data_version)
+
+
+def client_scenario(request: SimulationRequest, include: Optional[Iterable[str]] = None) -> Optional[ScenarioEntry]:
+    """entry ใน scenario store ของ request ที่ client ระบุ seed เอง (None = ไม่ระบุ seed / ไม่มี store)"""
+    if request.seed is None:
+        return None
+    return scenario_entry(request, request_sections(request, include), request.seed)
+
+
+def find_cached_simulation(entry: ScenarioEntry) -> Optional[SimulationResponse]:
+    """ผลที่เก็บไว้ของ entry (None = ยังไม่เคยจำลอง ต้องจำลองจริง)"""
+    store, _, _, scenario_id = entry
+    cached = _load_scenario(store, scenario_id)
+    if cached is not None:
+        print(f"♻️ ใช้ผลจาก scenario store: {scenario_id} (seed={cached.seed})")
+    return cached
+
+
+# -----------------------------
+# Main entry
+# -----------------------------
+def run_inventory_simulation(
+    request: SimulationRequest,
+    include: Optional[Iterable[str]] = None,
+    on_month_end: Optional[MonthEndCallback] = None,
+    cancel: Optional[CancelToken] = None,
+    seed: Optional[int] = None,
+    scenario: Optional[ScenarioEntry] = None
+) -> SimulationResponse:
+    """จำลองตาม request (on_month_end/cancel ใช้กับการ stream ผลและยกเลิกกลางทาง) — ไม่ค้น scenario store
+    (ผู้เรียกค้นเองก่อนด้วย find_cached_simulation) แต่บันทึกผลของ request ที่ระบุ seed
+
+    seed: seed ที่ผู้เรียกเลือกให้ request ที่ไม่ส่ง seed มา (None = สุ่มใหม่)
+    scenario: entry จาก client_scenario ที่ผู้เรียกหาไว้แล้ว (None = คำนวณเอง)
+    """
+    sections = request_sections(request, include)
+    resolution = request.resolution or "day"
+    granularity = request.granularity or "brand"
+    # ไม่ส่ง seed → สุ่ม seed ใหม่และส่งกลับใน response (ส่งซ้ำพร้อม seed นั้นเพื่อได้ผลเดิม)
+    if request.seed is not None:
+        seed = request.seed
+    elif seed is None:
+        seed = random.getrandbits(31)
+
+    # เก็บเฉพาะ request ที่ client ระบุ seed เอง: ผลของ seed ที่สุ่มให้แทบไม่ถูกขอซ้ำ
+    # และจะดันผลที่ใช้ซ้ำได้ออกจาก store
+    entry = scenario
+    if entry is None and request.seed is not None:
+        entry = scenario_entry(request, sections, seed)
+
+    demand_source = request.demand_source or "parameters"
+    configs = resolve_brand_configs(request)
+    if demand_source == "history":
+        start_day, start_date, simulation_days = resolve_trace_window(request)
+    else:
+        start_day, start_date, simulation_days = resolve_horizon(request)
+    festival_multipliers = resolve_festival_multipliers(request)
+    history_fallback: List[str] = []
 
     end_date = start_date + timedelta(days=simulation_days - 1)
 
@@ -352,18 +830,85 @@ def run_inventory_simulation(request: SimulationRequest) -> SimulationResponse:
     print(f" 📅 Start Date: {start_date.strftime('%Y-%m-%d')} (day {start_day} of year)")
     print(f" 📅 End Date:   {end_date.strftime('%Y-%m-%d')} (day {request.end_day} of year)")
     print(f" 📆 Simulation Days: {simulation_days}")
+    print(f" 🧩 Granularity: {granularity}")
     print(f" 🎉 Festival Multipliers: {len(festival_multipliers)} festivals")
     print(f" 📊 Date Range: {start_date.strftime('%b %d')} - {end_date.strftime('%b %d')}")
 
-    simulations = run_simulation(
+    if request.shared_constraint is not None:
+        run = partial(
+            run_coupled_simulation, constraint=request.shared_constraint, granularity=granularity, demand_source=demand_source
+        )
+        print(f" 🔗 Shared {request.shared_constraint.kind or 'capacity'}: {request.shared_constraint.limit} ({request.shared_constraint.rule or 'proportional'})")
+    elif demand_source == "forecast":
+        run = partial(run_forecast_simulation, granularity=granularity)
+        print(" 📈 Demand: per-product forecast")
+    elif demand_source == "history":
+        traces = history_traces(start_day, simulation_days)
+        history_fallback = [b for b in configs if b not in traces]
+        run = partial(run_simulation, traces=traces)
+        print(" ⏪ Demand: replay of historical daily sales")
+        if history_fallback:
+            print(f" ⚠️ No historical sales in window: {', '.join(history_fallback)} (using parameters)")
+    elif granularity in SEGMENT_GRANULARITIES:
+        run = partial(run_segment_simulation, dimension=granularity)
+    else:
+        run = run_sku_simulation if granularity == "product" else run_simulation
+    simulations = run(
         configs=configs,
         simulation_days=simulation_days,
         start_date=start_date,
-        festival_multipliers=festival_multipliers
+        festival_multipliers=festival_multipliers,
+        seed=seed,
+        on_month_end=on_month_end,
+        cancel=cancel
     )
 
-    results = process_results(simulations, simulation_days, start_date)
+    results = process_results(
+        simulations, simulation_days, start_date,
+        include=sections, resolution=resolution, max_points=request.max_points, cancel=cancel
+    )
+    results.seed = seed
+    results.history_fallback_brands = history_fallback
+    if granularity == "brand" and request.shared_constraint is None and demand_source == "parameters" and results.summary:
+        # ผลจริงเป็นข้อมูล train ของ /simulate/preview
+        record_simulation(request, results.summary)
+    if entry is not None:
+        store, data_version, scenario_request, scenario_id = entry
+        try:
+            store.put(scenario_id, scenario_request, sections, seed, data_version, results.model_dump(exclude=SCENARIO_META_FIELDS))
+            results.scenario_id = scenario_id
+        except sqlite3.Error as e:
+            print(f"⚠️ บันทึก scenario ไม่สำเร็จ: {e}")
     print("✅ Simulation completed successfully")
-    print(f" 📊 Total daily records: {len(results.daily_data)}")
-    print(f" 📈 Date range in results: {results.daily_data[0].date} to {results.daily_data[-1].date}")
+    print(f" 📦 Sections: {len(sections)}/{len(RESPONSE_SECTIONS)}")
+    if results.daily_data:
+        print(f" 📊 Total daily records: {len(results.daily_data)}")
+        print(f" 📈 Date range in results: {results.daily_data[0].date} to {results.daily_data[-1].date}")
     return results
+
+
+def simulate_admitted(
+    request: SimulationRequest,
+    include: Optional[Iterable[str]] = None,
+    deadline: Optional[float] = None,
+    cancel: Optional[CancelToken] = None,
+    on_month_end: Optional[MonthEndCallback] = None,
+    seed: Optional[int] = None
+) -> SimulationResponse:
+    """POST /simulate และ /ws/simulate: ผลใน scenario store ตอบทันทีโดยไม่เข้าคิว ไม่งั้นผ่าน admission
+    control แล้วจำลอง (deadline ของ admission รวมเข้ากับ cancel ของผู้เรียก ถ้ามี)
+
+    ค้น scenario store ครั้งเดียวที่นี่ แล้วส่ง entry เดิมต่อให้ run_inventory_simulation ใช้บันทึกผล
+    """
+    entry = client_scenario(request, include)
+    cached = find_cached_simulation(entry) if entry is not None else None
+    if cached is not None:
+        return cached
+    with admit_simulation(request, include, deadline) as admitted:
+        if cancel is None:
+            cancel = admitted
+        elif admitted is not None:
+            cancel.deadline = admitted.deadline
+        return run_inventory_simulation(
+            request, include=include, on_month_end=on_month_end, cancel=cancel, seed=seed, scenario=entry
+        )
@@ -0,0 +1,98 @@
+"""สถานะ start-up ของ process: liveness (/health) แยกจาก readiness (/ready)
+
+โมดูลนี้ใช้แค่ stdlib + fastapi เพื่อให้ app รับ request ได้ทันที ส่วน pandas/numpy/simpy
+และการโหลดข้อมูลทำใน thread warm-up เบื้องหลัง ทุกขั้นถูกบันทึกเป็น timeline (วินาทีนับจาก
+process เริ่ม) ลง log และดูได้ที่ /ready
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# เวลาเริ่ม process (ถ้าอ่าน /proc ไม่ได้ ใช้เวลาที่ import โมดูลนี้แทน)
+def _process_start() -> float:
+    try:
+        with open(f"/proc/{os.getpid()}/stat") as fh:
+            start_ticks = int(fh.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as fh:
+            uptime = float(fh.read().split()[0])
+        age = uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+        return time.perf_counter() - max(0.0, age)
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter()
+
+_T0 = _process_start()
+_timeline: List[Dict[str, Any]] = []
+_ready = threading.Event()
+_warm_up_thread: Optional[threading.Thread] = None
+
+# วินาทีที่แนะนำให้ client ลองใหม่ (Retry-After) ระหว่าง warm-up
+RETRY_AFTER_SECONDS = 1
+
+
+def mark(stage: str) -> None:
+    """บันทึกขั้น start-up พร้อมเวลานับจาก process เริ่ม"""
+    elapsed = time.perf_counter() - _T0
+    _timeline.append({"stage": stage, "seconds": round(elapsed, 3)})
+    logger.info(f"⏱️ start-up +{elapsed:.3f}s {stage}")
+
+
+def timeline() -> List[Dict[str, Any]]:
+    return list(_timeline)
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def _warm_up() -> None:
+    mark("warm-up started")
+    try:
+        from services import data_service
+        mark("data modules imported")
+        data_service.init_data(progress=mark)
+        import services.simulation_service  # noqa: F401 — โหลด simpy/engine ไว้ก่อน request แรก
+        mark("simulation modules imported")
+        from services.history_service import get_history_index
+        get_history_index()
+        mark("history index built")
+        from services.forecast_service import get_forecast_fit
+        get_forecast_fit("month")
+        mark("demand forecasts fitted")
+        from services import reference_cache
+        reference_cache.prime()
+        mark("reference responses precomputed")
+    except Exception as e:
+        # ไม่ ready → /ready ตอบ 503 ต่อไป ให้ orchestrator restart process
+        logger.exception(f"❌ warm-up ล้มเหลว: {e}")
+        mark("warm-up failed")
+        return
+    _ready.set()
+    mark("ready")
+    # surrogate ของ /simulate/preview train ต่อใน thread ของตัวเอง (ไม่เลื่อน ready)
+    from services.surrogate_service import start_surrogate_training
+    start_surrogate_training()
+
+
+def start_warm_up() -> None:
+    """เริ่ม warm-up เบื้องหลัง (เรียกซ้ำได้ — ทำครั้งเดียวต่อ process)"""
+    global _warm_up_thread
+    if _warm_up_thread is not None:
+        return
+    _warm_up_thread = threading.Thread(target=_warm_up, name="warm-up", daemon=True)
+    _warm_up_thread.start()
+
+
+def require_ready() -> None:
+    """FastAPI dependency: 503 + Retry-After ถ้าข้อมูลยังโหลดไม่เสร็จ"""
+    if not _ready.is_set():
+        raise HTTPException(
+            status_code=503,
+            detail="Service is warming up",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
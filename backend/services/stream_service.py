@@ -0,0 +1,144 @@
+"""รัน /simulate ผ่าน WebSocket: ส่งผลรายเดือนต่อแบรนด์ระหว่างจำลอง และยกเลิกกลางทางได้
+
+protocol (JSON ต่อ message):
+  client → {SimulationRequest}                   message แรก = body เดียวกับ POST /simulate
+  server → {"type": "started", "seed", "simulation_days"}
+  server → {"type": "month", "brand", "month", "date", "days_done", "simulation_days", ...MonthlyTrend}
+  client → {"type": "cancel"}                    เมื่อไหร่ก็ได้ (ตัดการเชื่อมต่อ = ยกเลิกเช่นกัน)
+  server → {"type": "result", "data": SimulationResponse} | {"type": "cancelled", "day"} | {"type": "error", "status", "detail"}
+
+แถว month คือแถวเดียวกับที่ engine เก็บใน trend_events ตอนสิ้นเดือน (month_trend_row)
+การจำลองผ่าน admission control เดียวกับ POST /simulate (คิว, ค่าประมาณ, deadline จาก ?deadline=)
+ถูกปฏิเสธ → {"type": "error", "status": 503, "detail", "retry_after"}
+"""
+import asyncio
+import json
+import random
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from models.pydantic import SimulationRequest
+from services.simulation_service import resolve_horizon, simulate_admitted
+from simulation.control import CancelToken, SimulationCancelled
+
+
+async def _watch_client(websocket: WebSocket, cancel: CancelToken) -> None:
+    """อ่าน message ของ client ระหว่างจำลอง: {"type": "cancel"} หรือหลุดการเชื่อมต่อ → ยกเลิก"""
+    while True:
+        try:
+            message = await websocket.receive_json()
+        except ValueError:
+            continue  # message ที่ไม่ใช่ JSON ไม่มีผลกับการจำลอง
+        except (WebSocketDisconnect, RuntimeError):
+            cancel.cancel("client disconnected")
+            return
+        if isinstance(message, dict) and message.get("type") == "cancel":
+            cancel.cancel("cancelled by client")
+            return
+
+
+async def _send(websocket: WebSocket, message: Dict[str, Any]) -> bool:
+    try:
+        await websocket.send_text(json.dumps(message, ensure_ascii=False))
+        return True
+    except (WebSocketDisconnect, RuntimeError):
+        return False
+
+
+async def stream_simulation(websocket: WebSocket) -> None:
+    try:
+        raw_deadline = websocket.query_params.get("deadline")
+        deadline = float(raw_deadline) if raw_deadline else None
+        body = await websocket.receive_json()
+        request = SimulationRequest(**body)
+    except WebSocketDisconnect:
+        return
+    except (ValueError, TypeError, ValidationError) as e:
+        detail = e.errors(include_url=False) if isinstance(e, ValidationError) else str(e)
+        await _send(websocket, {"type": "error", "status": 422, "detail": detail})
+        await websocket.close()
+        return
+
+    # seed แน่นอนตั้งแต่ต้น (client ได้รู้ก่อนผลเสร็จ) — เหมือน /simulate ผลจะถูกเก็บใน scenario store
+    # เฉพาะเมื่อ client ส่ง seed มาเอง
+    seed = request.seed if request.seed is not None else random.getrandbits(31)
+
+    try:
+        _, start_date, simulation_days = resolve_horizon(request)
+    except HTTPException as e:
+        await _send(websocket, {"type": "error", "status": e.status_code, "detail": e.detail})
+        await websocket.close()
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancel = CancelToken()
+
+    def on_month_end(row: Dict[str, Any], month_end: datetime) -> None:
+        # เรียกจาก thread ของการจำลอง → ส่งเข้า event loop
+        message = {
+            "type": "month",
+            **row,
+            "date": month_end.strftime("%Y-%m-%d"),
+            "days_done": (month_end - start_date).days + 1,
+            "simulation_days": simulation_days,
+        }
+        loop.call_soon_threadsafe(queue.put_nowait, message)
+
+    await _send(websocket, {"type": "started", "seed": seed, "simulation_days": simulation_days})
+    print(f"📡 Streaming simulation: {simulation_days} days (seed {seed})")
+
+    job = loop.run_in_executor(
+        None, lambda: simulate_admitted(request, deadline=deadline, cancel=cancel, on_month_end=on_month_end, seed=seed)
+    )
+    watcher = asyncio.ensure_future(_watch_client(websocket, cancel))
+    connected = True
+    try:
+        while not job.done():
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, job}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                break
+            if connected:
+                connected = await _send(websocket, getter.result())
+                if not connected:
+                    cancel.cancel("client disconnected")
+        # callback ที่ถูก schedule ก่อนงานจบยังอยู่ในคิว
+        while connected and not queue.empty():
+            connected = await _send(websocket, queue.get_nowait())
+
+        final: Optional[Dict[str, Any]] = None
+        try:
+            result = await job
+            if connected:
+                payload = '{"type":"result","data":' + result.model_dump_json() + "}"
+                await websocket.send_text(payload)
+        except SimulationCancelled as e:
+            print(f"🛑 Streaming simulation stopped at day {e.day}: {e.reason}")
+            final = {"type": "cancelled", "day": e.day, "reason": e.reason}
+        except HTTPException as e:
+            final = {"type": "error", "status": e.status_code, "detail": e.detail}
+            retry_after = (e.headers or {}).get("Retry-After")
+            if retry_after is not None:
+                final["retry_after"] = int(retry_after)
+        except Exception as e:
+            import traceback
+            print(f"❌ Simulation error: {str(e)}")
+            print(traceback.format_exc())
+            final = {"type": "error", "status": 500, "detail": f"Simulation error: {str(e)}"}
+        if final is not None and connected:
+            await _send(websocket, final)
+    except (WebSocketDisconnect, RuntimeError):
+        cancel.cancel("client disconnected")
+    finally:
+        watcher.cancel()
+        if not job.done():
+            cancel.cancel("client disconnected")
+        try:
+            await websocket.close()
+        except RuntimeError:
+            pass
@@ -0,0 +1,334 @@
+"""surrogate model ต่อแบรนด์สำหรับ /simulate/preview (ตอบในระดับ ms แทนการจำลองจริง)
+
+model เป็น gradient-boosted trees (numpy ล้วน, utils/surrogate.py) จาก feature ของ BrandConfig + ช่วงวันที่
+ไปยังตัวชี้วัดสรุปแบบไร้หน่วย (สัดส่วนที่ขายได้/เสียไป, จำนวนวันของ stock ฯลฯ) แล้วแปลงกลับ
+เป็นตัวชี้วัดของ BrandSummary ด้วยอัตรา demand ที่คำนวณได้ตรงจากพารามิเตอร์แบรนด์
+
+ข้อมูล train:
+- ชุดเริ่มต้น: config สุ่มรอบค่าเริ่มต้นของแบรนด์ จำลองด้วย BrandBatchSimulation ตอนเริ่ม
+- ผลจริง: ทุก /simulate (granularity "brand", ไม่มี shared_constraint, demand จากพารามิเตอร์) ใน process นี้ และผลใน scenario store (ทุก worker)
+
+thread เบื้องหลัง fit ครั้งแรกหลัง warm-up และ fit ใหม่เมื่อมีผลจริงเพิ่มครบ SURROGATE_REFIT_EVERY
+"""
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from models.pydantic import BrandConfig, SimulationRequest
+from services.data_service import get_brand_parameters, get_data_version, get_supported_brands
+from services.scenario_store import get_scenario_store
+from simulation.batch_simulation import BrandBatchSimulation
+from simulation.sku_simulation import day_calendar
+from utils.helpers import FESTIVALS
+from utils.surrogate import GradientBoostedTrees, fit_with_holdout
+
+# จำนวนตัวอย่างเริ่มต้นต่อแบรนด์ (= ช่วงวันที่ × config ต่อช่วง) และจำนวนผลจริงใหม่ก่อน fit ซ้ำ
+SURROGATE_BOOTSTRAP = int(os.getenv("SURROGATE_BOOTSTRAP", "2048") or 0)
+SURROGATE_REFIT_EVERY = int(os.getenv("SURROGATE_REFIT_EVERY", "20") or 1)
+SURROGATE_TREES = 300
+SURROGATE_DEPTH = 5
+BOOTSTRAP_CONFIGS_PER_HORIZON = 64
+# ผลจริงมีน้ำหนักมากกว่าตัวอย่างสุ่ม (เป็นจุดที่ผู้ใช้สนใจจริง)
+OBSERVED_WEIGHT = 5.0
+MAX_OBSERVATIONS = 5000
+STORE_ROWS = 200
+
+# target ไร้หน่วยที่ model เรียนรู้
+TARGETS = ("sold_fraction", "lost_fraction", "stockout_fraction", "restocks_per_day", "log_avg_cover", "log_final_cover")
+
+
+# -----------------------------
+# Features / targets
+# -----------------------------
+def _resolved(cfg: BrandConfig, calc: Dict[str, Any], field: str, default: Any) -> Any:
+    """ค่าที่ engine ใช้จริง (ไม่ได้ตั้ง/0 = ค่าจาก calculated_config)"""
+    value = getattr(cfg, field)
+    return value if value else calc.get(field, default)
+
+
+def _demand_profile(brand: str, start_date: datetime, days: int, festival: Optional[Dict[str, float]]) -> Tuple[float, float]:
+    """(demand เฉลี่ยต่อวันก่อน demand_multiplier, สัมประสิทธิ์การแปรผันตามฤดูกาล/เทศกาล)"""
+    params = get_brand_parameters().get(brand, {})
+    seasonality = params.get("seasonality", {m: 1.0 for m in range(1, 13)})
+    calendar = day_calendar(start_date, days, festival)
+    season = np.array([seasonality.get(int(m), 1.0) for m in range(13)], dtype="float64")[calendar["months"]]
+    factor = season * calendar["festival_multiplier"]
+    mean = float(factor.mean())
+    return params.get("base_demand", 50) * mean, float(factor.std() / mean) if mean > 0 else 0.0
+
+
+def _features(brand: str, cfg: BrandConfig, days: int, profile: Tuple[float, float]) -> Tuple[np.ndarray, float]:
+    """(feature vector, demand ต่อวันที่คาดไว้) ของแบรนด์หนึ่ง — ปริมาณเทียบเป็น "จำนวนวันของ demand" """
+    calc = get_brand_parameters().get(brand, {}).get("calculated_config", {})
+    base_rate, variation = profile
+    rate = max(base_rate * (cfg.demand_multiplier or 1.0), 1e-6)
+
+    initial_stock = _resolved(cfg, calc, "initial_stock", 1000)
+    restock_days = int(_resolved(cfg, calc, "restock_days", 25))
+    restock_quantity = _resolved(cfg, calc, "restock_quantity", 500)
+    enable = cfg.enable_reorder if cfg.enable_reorder is not None else True
+    reorder_point = _resolved(cfg, calc, "reorder_point", 200) if enable else 0
+    reorder_quantity = _resolved(cfg, calc, "reorder_quantity", 500) if enable else 0
+
+    lead = max(0, int(cfg.lead_time_days or 0))
+    dist = cfg.lead_time_distribution or "fixed"
+    spread = float(cfg.lead_time_spread or 0) if dist == "uniform" else math.sqrt(lead) if dist == "poisson" else 0.0
+
+    # ของที่เข้าตามรอบตลอดช่วง เทียบกับ demand ที่คาดไว้ (ตัวกำหนดหลักของสัดส่วนที่ขายได้)
+    supply = (initial_stock + restock_quantity * ((days - 1) // restock_days)) / (rate * days)
+
+    x = np.array([
+        math.log(rate),
+        math.log(days),
+        variation,
+        math.log1p(initial_stock / rate),
+        math.log(restock_days),
+        math.log1p(restock_quantity / (rate * restock_days)),
+        math.log(supply),
+        math.log1p(reorder_point / rate),
+        math.log1p(reorder_quantity / rate),
+        math.log1p(lead),
+        spread,
+    ])
+    return x, rate
+
+
+def _targets(summary: Dict[str, Any], rate: float, days: int) -> np.ndarray:
+    expected = rate * days
+    return np.array([
+        summary["total_units_sold"] / expected,
+        summary["total_lost_sales"] / expected,
+        summary["stockout_days"] / days,
+        summary["restock_count"] / days,
+        math.log1p(max(summary["avg_stock"], 0.0) / rate),
+        math.log1p(max(summary["final_stock"], 0) / rate),
+    ])
+
+
+def _metrics(pred: np.ndarray, rate: float, days: int, avg_price: float) -> Dict[str, float]:
+    """target ที่ทำนาย → ตัวชี้วัดของ BrandSummary (ตัดให้อยู่ในช่วงที่เป็นไปได้)"""
+    expected = rate * days
+    sold = max(0.0, float(pred[0])) * expected
+    lost = max(0.0, float(pred[1])) * expected
+    return {
+        "total_units_sold": sold,
+        "total_revenue": sold * avg_price,
+        "total_lost_sales": lost,
+        "lost_sales_rate": lost / (sold + lost) * 100 if sold + lost > 0 else 0.0,
+        "stockout_days": min(max(0.0, float(pred[2])), 1.0) * days,
+        "avg_stock": math.expm1(max(0.0, float(pred[4]))) * rate,
+        "final_stock": math.expm1(max(0.0, float(pred[5]))) * rate,
+        "restock_count": max(0.0, float(pred[3])) * days,
+    }
+
+
+def _request_rows(request: SimulationRequest) -> Dict[str, Tuple[np.ndarray, float, int]]:
+    """brand → (features, rate, days) ของ request (เฉพาะแบรนด์ที่รองรับ)"""
+    from services.simulation_service import resolve_brand_configs, resolve_festival_multipliers, resolve_horizon
+    _, start_date, days = resolve_horizon(request)
+    festival = resolve_festival_multipliers(request)
+    rows = {}
+    for brand, cfg in resolve_brand_configs(request).items():
+        x, rate = _features(brand, cfg, days, _demand_profile(brand, start_date, days, festival))
+        rows[brand] = (x, rate, days)
+    return rows
+
+
+# -----------------------------
+# Training data
+# -----------------------------
+def _bootstrap_samples(brand: str, total: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """config สุ่มรอบค่าเริ่มต้นของแบรนด์ × ช่วงวันที่สุ่ม จำลองแบบ batch ต่อช่วงวันที่"""
+    calc = get_brand_parameters().get(brand, {}).get("calculated_config", {})
+    xs, ys = [], []
+    horizons = max(1, total // BOOTSTRAP_CONFIGS_PER_HORIZON)
+    for _ in range(horizons):
+        start_date = datetime(2024, 1, 1) + timedelta(days=int(rng.integers(0, 365)))
+        days = int(rng.integers(7, 366))
+        configs, festivals = [], []
+        for _ in range(BOOTSTRAP_CONFIGS_PER_HORIZON):
+            def scaled(field: str, default: int) -> int:
+                return max(1, int(calc.get(field, default) * math.exp(rng.uniform(math.log(0.05), math.log(50)))))
+            dist = rng.choice(["fixed", "fixed", "uniform", "poisson"])
+            configs.append(BrandConfig(
+                initial_stock=scaled("initial_stock", 1000),
+                restock_days=int(rng.integers(1, 91)),
+                restock_quantity=scaled("restock_quantity", 500),
+                reorder_quantity=scaled("reorder_quantity", 500),
+                reorder_point=scaled("reorder_point", 200),
+                demand_multiplier=float(math.exp(rng.uniform(math.log(0.3), math.log(3.0)))),
+                enable_reorder=bool(rng.random() < 0.5),
+                lead_time_days=int(rng.integers(0, 15)),
+                lead_time_distribution=str(dist),
+                lead_time_spread=int(rng.integers(0, 6)) if dist == "uniform" else 0
+            ))
+            # บางครั้งปรับตัวคูณเทศกาล (UI ส่ง override มาเสมอ)
+            festivals.append(
+                {fid: f["multiplier"] * float(rng.uniform(0.5, 1.5)) for fid, f in FESTIVALS.items()}
+                if rng.random() < 0.3 else None
+            )
+        seed = int(rng.integers(0, 2 ** 31))
+        batch = BrandBatchSimulation(brand, configs, get_brand_parameters(), [seed], start_date, festivals)
+        result = batch.run(days)
+        default_profile = _demand_profile(brand, start_date, days, None)
+        for v, (cfg, fm) in enumerate(zip(configs, festivals)):
+            profile = default_profile if fm is None else _demand_profile(brand, start_date, days, fm)
+            x, rate = _features(brand, cfg, days, profile)
+            xs.append(x)
+            ys.append(_targets({m: float(result[m][v, 0]) for m in result}, rate, days))
+    return np.array(xs), np.array(ys)
+
+
+def _new_model() -> GradientBoostedTrees:
+    return GradientBoostedTrees(n_trees=SURROGATE_TREES, depth=SURROGATE_DEPTH)
+
+
+class SurrogateTrainer:
+    """เก็บข้อมูล train ต่อแบรนด์ + model ล่าสุด และ fit ใหม่ใน thread เบื้องหลัง"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._bootstrap: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._observed: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        self._pending = 0
+        self.models: Dict[str, GradientBoostedTrees] = {}
+        self.quality: Dict[str, Dict[str, float]] = {}
+        self.samples: Dict[str, int] = {}
+        self.trained_at: Optional[str] = None
+        self.data_version: Optional[str] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="surrogate-trainer", daemon=True)
+            self._thread.start()
+
+    def record(self, request: SimulationRequest, summaries: List[Any]) -> None:
+        """เก็บผล /simulate จริงเป็นข้อมูล train (ไม่ throw — ไม่ให้กระทบ request)"""
+        try:
+            rows = _request_rows(request)
+            with self._lock:
+                for s in summaries:
+                    s = s if isinstance(s, dict) else s.model_dump()
+                    if s["brand"] not in rows:
+                        continue
+                    x, rate, days = rows[s["brand"]]
+                    observed = self._observed.setdefault(s["brand"], [])
+                    observed.append((x, _targets(s, rate, days)))
+                    del observed[:-MAX_OBSERVATIONS]
+                self._pending += 1
+                if self._pending >= SURROGATE_REFIT_EVERY:
+                    self._wake.set()
+        except Exception as e:
+            print(f"⚠️ surrogate: skipped observation ({e})")
+
+    def _load_store(self) -> None:
+        """ผลที่ worker อื่น (หรือก่อน restart) เก็บไว้ใน scenario store บนข้อมูลชุดเดียวกัน"""
+        store = get_scenario_store()
+        if store is None:
+            return
+        loaded = 0
+        for row in store.iter_results(STORE_ROWS, data_version=get_data_version(), section="summary"):
+            request = SimulationRequest(**row["request"])
+            if (request.granularity or "brand") != "brand" or request.shared_constraint is not None:
+                continue
+            if (request.demand_source or "parameters") != "parameters":
+                continue
+            self.record(request, row["result"].get("summary") or [])
+            loaded += 1
+        with self._lock:
+            self._pending = 0
+        if loaded:
+            print(f"🧠 surrogate: loaded {loaded} stored scenarios")
+
+    def fit(self) -> None:
+        started = time.perf_counter()
+        rng = np.random.default_rng(0)
+        with self._lock:
+            observed = {b: list(rows) for b, rows in self._observed.items()}
+            self._pending = 0
+        models, quality, samples = {}, {}, {}
+        for brand in get_supported_brands():
+            if brand not in self._bootstrap:
+                self._bootstrap[brand] = _bootstrap_samples(brand, SURROGATE_BOOTSTRAP, rng)
+            x, y = self._bootstrap[brand]
+            weights = np.ones(len(x))
+            if observed.get(brand):
+                xo = np.array([r[0] for r in observed[brand]])
+                yo = np.array([r[1] for r in observed[brand]])
+                x, y = np.concatenate([x, xo]), np.concatenate([y, yo])
+                weights = np.concatenate([weights, np.full(len(xo), OBSERVED_WEIGHT)])
+            models[brand], r2 = fit_with_holdout(_new_model(), x, y, weights, rng)
+            quality[brand] = {t: round(float(v), 4) for t, v in zip(TARGETS, r2)}
+            samples[brand] = len(x)
+        # สลับทั้งชุดทีเดียว (preview ที่กำลังทำงานเห็นชุดเก่าหรือใหม่ทั้งชุด)
+        self.models, self.quality, self.samples = models, quality, samples
+        self.trained_at = datetime.now().isoformat(timespec="seconds")
+        self.data_version = get_data_version()
+        print(f"🧠 surrogate: fitted {len(models)} brands ({sum(samples.values())} samples) in {time.perf_counter() - started:.2f}s")
+
+    def _loop(self) -> None:
+        try:
+            self._load_store()
+        except Exception as e:
+            print(f"⚠️ surrogate: could not read scenario store ({e})")
+        while True:
+            try:
+                self.fit()
+            except Exception as e:
+                import traceback
+                print(f"❌ surrogate training failed: {e}")
+                print(traceback.format_exc())
+            self._wake.wait()
+            self._wake.clear()
+
+
+_trainer = SurrogateTrainer()
+
+
+def start_surrogate_training() -> None:
+    _trainer.start()
+
+
+def record_simulation(request: SimulationRequest, summaries: List[Any]) -> None:
+    if _trainer._thread is not None:
+        _trainer.record(request, summaries)
+
+
+def preview_simulation(request: SimulationRequest) -> Dict[str, Any]:
+    """ตัวชี้วัดสรุปต่อแบรนด์จาก surrogate (503 ถ้ายัง train ไม่เสร็จ)"""
+    from services.simulation_service import require_plain_request
+    from services.startup import RETRY_AFTER_SECONDS
+    require_plain_request(request, "/simulate/preview")
+    models = _trainer.models
+    if not models:
+        raise HTTPException(
+            status_code=503,
+            detail="Preview model is still training",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+    params = get_brand_parameters()
+    brands = []
+    for brand, (x, rate, days) in _request_rows(request).items():
+        if brand not in models:
+            continue
+        pred = models[brand].predict(x)[0]
+        brands.append({
+            "brand": brand,
+            **_metrics(pred, rate, days, params.get(brand, {}).get("avg_price", 100)),
+            "r2": _trainer.quality.get(brand, {}),
+            "samples": _trainer.samples.get(brand, 0),
+        })
+    return {
+        "data_version": _trainer.data_version,
+        "trained_at": _trainer.trained_at,
+        "brands": brands,
+    }
@@ -0,0 +1,46 @@
+"""process pool กลางสำหรับงานจำลองแบบ batch ที่แบ่ง lane ข้าม core ได้
+
+ใช้ spawn (ไม่ fork) เพราะ process หลักมี thread ของ server อยู่แล้ว pool ถูกสร้างครั้งแรก
+ที่ใช้และใช้ซ้ำตลอดอายุ process (worker import numpy ครั้งเดียว)
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+# จำนวน process สำหรับงาน batch (1 = คำนวณใน process เดียว)
+SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", "0") or 0) or (os.cpu_count() or 1)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """pool ของ process (None ถ้า SIMULATION_WORKERS <= 1)"""
+    global _pool
+    if SIMULATION_WORKERS <= 1:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=SIMULATION_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+
+def split_evenly(n: int, parts: int) -> List[slice]:
+    """แบ่ง range(n) เป็นช่วงติดกันไม่เกิน parts ช่วง ขนาดต่างกันไม่เกิน 1"""
+    parts = max(1, min(parts, n))
+    bounds = [round(i * n / parts) for i in range(parts + 1)]
+    return [slice(bounds[i], bounds[i + 1]) for i in range(parts)]
+
+
+def map_chunks(fn: Callable[..., Any], chunks: Sequence[tuple], parallel: bool = True) -> List[Any]:
+    """fn(*chunk) ทุก chunk (ผ่าน process pool ถ้ามีและมีมากกว่าหนึ่ง chunk) เรียงตามลำดับเดิม"""
+    pool = get_process_pool() if parallel and len(chunks) > 1 else None
+    if pool is None:
+        return [fn(*chunk) for chunk in chunks]
+    return list(pool.map(fn, *zip(*chunks)))
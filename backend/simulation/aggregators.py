@@ -0,0 +1,191 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+
+def classify_month_trend(growth_vs_baseline: float, mom_growth: Optional[float]) -> str:
+    """uptrend / downtrend / sideways จากการเติบโตเทียบ baseline และ MoM"""
+    up = (growth_vs_baseline >= 0.15) or (mom_growth is not None and mom_growth >= 0.10)
+    down = (growth_vs_baseline <= -0.10) or (mom_growth is not None and mom_growth <= -0.10)
+    if up and not down:
+        return "uptrend"
+    if down and not up:
+        return "downtrend"
+    return "sideways"
+
+
+def month_trend_row(
+    brand: str,
+    month: int,
+    sales_m: int,
+    baseline_m: float,
+    season_factor: float,
+    prev_sales: Optional[int]
+) -> Dict[str, Any]:
+    """แถว MonthlyTrend ของเดือนเดียว (ใช้ทั้ง online trend event และ monthly_trends)"""
+    growth_vs_baseline = 0.0 if baseline_m <= 0 else (sales_m - baseline_m) / baseline_m
+    mom_growth = None
+    if prev_sales is not None and prev_sales > 0:
+        mom_growth = (sales_m - prev_sales) / prev_sales
+    trend_score = 0.7 * growth_vs_baseline + 0.3 * (mom_growth if mom_growth is not None else 0.0)
+    return {
+        'month': int(month),
+        'brand': brand,
+        'sales': int(sales_m),
+        'baseline_units': float(baseline_m),
+        'growth_vs_baseline': float(growth_vs_baseline),
+        'mom_growth': float(mom_growth) if mom_growth is not None else None,
+        'seasonality_factor': float(season_factor),
+        'trend': classify_month_trend(growth_vs_baseline, mom_growth),
+        'trend_score': float(trend_score)
+    }
+
+
+class Aggregator(ABC):
+    """ตัวสรุปผลแบบ streaming: BrandSimulation เรียก update() ทุกวันที่จำลอง
+    (หลังเติมสต็อกของวันนั้นแล้ว) และ result() อ่านค่าที่สรุปเสร็จหลังจบการจำลอง
+
+    subclass ต้องกำหนด name (ใช้เป็น key ใน BrandSimulation.aggregators)
+    """
+    name: str = ""
+
+    @abstractmethod
+    def update(self, entry: Dict[str, Any], current_date: datetime) -> None:
+        ...
+
+    @abstractmethod
+    def result(self, sim: Any) -> Any:
+        ...
+
+
+class MonthlyTotalsAggregator(Aggregator):
+    """ยอดรายเดือน (รวมตามเดือนปฏิทิน 1-12) → MonthlyData"""
+    name = "monthly_data"
+
+    def __init__(self):
+        self._acc: Dict[int, List[float]] = {}  # month → [sales, revenue, stock_sum, days, stockout]
+
+    def update(self, entry, current_date):
+        acc = self._acc.get(current_date.month)
+        if acc is None:
+            acc = self._acc[current_date.month] = [0, 0.0, 0, 0, 0]
+        acc[0] += entry['sales']
+        acc[1] += entry['revenue']
+        acc[2] += entry['stock_after']
+        acc[3] += 1
+        acc[4] += entry['stockout']
+
+    def result(self, sim):
+        return [
+            {
+                "month": m,
+                "brand": sim.brand_name,
+                "total_sales": int(acc[0]),
+                "total_revenue": float(acc[1]),
+                "avg_stock": float(acc[2] / acc[3]),
+                "stockout_days": int(acc[4])
+            }
+            for m, acc in sorted(self._acc.items())
+        ]
+
+
+class MonthlyTrendAggregator(Aggregator):
+    """เทรนด์ระดับแบรนด์ต่อเดือนปฏิทิน (baseline จากพารามิเตอร์ historical) → MonthlyTrend"""
+    name = "monthly_trends"
+
+    def __init__(self):
+        self._sales: Dict[int, int] = {}
+
+    def update(self, entry, current_date):
+        m = current_date.month
+        self._sales[m] = self._sales.get(m, 0) + int(entry['sales'])
+
+    def result(self, sim):
+        rows = []
+        prev_sales = None
+        for m, sales_m in sorted(self._sales.items()):
+            rows.append(month_trend_row(
+                sim.brand_name, m, sales_m,
+                float(sim.monthly_baseline_units.get(m, 0.0)),
+                float(sim.seasonality_factors.get(m, 1.0)),
+                prev_sales
+            ))
+            prev_sales = sales_m
+        return rows
+
+
+class StockoutAggregator(Aggregator):
+    """ตัวนับ stockout: จำนวนวัน, ยอดขายที่เสียไป, ช่วงขาดสต็อกต่อเนื่องที่ยาวที่สุด"""
+    name = "stockouts"
+
+    def __init__(self):
+        self.stockout_days = 0
+        self.total_demand = 0
+        self.total_lost_sales = 0
+        self.longest_streak = 0
+        self._streak = 0
+
+    def update(self, entry, current_date):
+        self.total_demand += entry['demand']
+        self.total_lost_sales += entry['lost_sales']
+        if entry['stockout'] > 0:
+            self.stockout_days += 1
+            self._streak += 1
+            if self._streak > self.longest_streak:
+                self.longest_streak = self._streak
+        else:
+            self._streak = 0
+
+    def result(self, sim):
+        lost_rate = (self.total_lost_sales / self.total_demand * 100) if self.total_demand > 0 else 0.0
+        return {
+            "stockout_days": int(self.stockout_days),
+            "total_lost_sales": int(self.total_lost_sales),
+            "lost_sales_rate": float(lost_rate),
+            "longest_stockout_streak": int(self.longest_streak)
+        }
+
+
+class SummaryAggregator(Aggregator):
+    """สรุปทั้งช่วงจำลองของแบรนด์ → BrandSummary (รวมตัวนับจาก StockoutAggregator)"""
+    name = "summary"
+
+    def __init__(self):
+        self.total_units_sold = 0
+        self.total_revenue = 0.0
+        self.transactions = 0
+        self.stock_sum = 0
+        self.days = 0
+        self.final_stock = 0
+
+    def update(self, entry, current_date):
+        self.total_units_sold += entry['sales']
+        self.total_revenue += entry['revenue']
+        if entry['sales'] > 0:
+            self.transactions += 1
+        self.stock_sum += entry['stock_after']
+        self.days += 1
+        self.final_stock = entry['stock_after']
+
+    def result(self, sim):
+        stockouts = sim.aggregate(StockoutAggregator.name) or StockoutAggregator().result(sim)
+        return {
+            "brand": sim.brand_name,
+            "total_units_sold": int(self.total_units_sold),
+            "total_revenue": float(self.total_revenue),
+            "transactions": int(self.transactions),
+            "restock_count": int(len(sim.restock_events)),
+            "avg_stock": float(self.stock_sum / self.days) if self.days else 0.0,
+            "final_stock": int(self.final_stock),
+            "avg_price": float(sim.avg_price),
+            **stockouts
+        }
+
+
+def default_aggregators() -> List[Aggregator]:
+    return [
+        MonthlyTotalsAggregator(),
+        MonthlyTrendAggregator(),
+        StockoutAggregator(),
+        SummaryAggregator(),
+    ]
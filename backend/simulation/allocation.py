@@ -0,0 +1,169 @@
+"""ข้อจำกัดร่วมข้ามแบรนด์ (ความจุคลัง / งบจัดซื้อ) และการแบ่ง order ที่แข่งกันในแต่ละวัน
+
+ทุกวัน order ที่ทุกแถว (แบรนด์ / สินค้า / segment) ขอ ถูกตัดให้อยู่ในสิ่งที่เหลือของข้อจำกัดร่วม:
+- capacity: inventory position รวม (สต็อก + ของที่สั่งแล้ว) ทุกแบรนด์ไม่เกิน limit หน่วย
+- budget:   มูลค่าที่สั่ง (จำนวน × ต้นทุนต่อหน่วย) ไม่เกิน limit ต่อรอบ period_days วัน (ไม่สะสมข้ามรอบ)
+
+กฎการแบ่ง (ทุกกฎเป็น array op บนแถวที่ขอ ไม่วนต่อแถว):
+- priority:     เรียงตามลำดับความสำคัญของแบรนด์ ให้เต็มจำนวนจนหมด (แถวสุดท้ายได้บางส่วน)
+- proportional: ทุกแถวได้สัดส่วนเท่ากันของที่ขอ
+- greedy:       ให้ส่วนที่คาดว่าจะกันยอดขายที่เสียได้ก่อน (ความต้องการคาดการณ์ถึงรอบเติมถัดไปที่เกินสต็อก)
+                โดยเติมแถวที่สต็อกพอขายได้น้อยวันที่สุดก่อน (water-filling) แล้วจึงแบ่งส่วนที่เหลือตามสัดส่วน
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+CONSTRAINT_KINDS = ("capacity", "budget")
+ALLOCATION_RULES = ("priority", "proportional", "greedy")
+
+
+def allocate_in_order(requests: np.ndarray, cost: np.ndarray, available: float) -> np.ndarray:
+    """ให้ตามลำดับของ array จนใช้ available หมด (แถวที่ใช้จนเกินได้บางส่วน ปัดลง)"""
+    spend = requests * cost
+    cum = np.cumsum(spend)
+    granted = np.where(cum <= available + 1e-9, requests, 0)
+    k = int(np.searchsorted(cum, available + 1e-9, side="right"))
+    if k < len(requests):
+        remaining = available - (cum[k - 1] if k > 0 else 0.0)
+        granted[k] = min(requests[k], int(np.floor(remaining / cost[k]))) if cost[k] > 0 else requests[k]
+    return granted
+
+
+def allocate_cover(
+    caps: np.ndarray,
+    cost: np.ndarray,
+    rate: np.ndarray,
+    position: np.ndarray,
+    available: float,
+    iterations: int = 40
+) -> np.ndarray:
+    """เติมให้ทุกแถวมีวันที่สต็อกพอขาย (days of cover) เท่ากันที่สุดภายใน available (water-filling)
+
+    แถวที่จะขาดก่อนได้ก่อน → ลดยอดขายที่เสียรวมมากที่สุดต่อหน่วยที่ให้ หาระดับ cover ร่วมด้วย bisection
+    """
+    rate = np.maximum(rate, 1e-9)
+    units = lambda level: np.floor(np.clip(rate * level - position, 0, caps))
+    lo, hi = 0.0, float(((position + caps) / rate).max())
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        if float((units(mid) * cost).sum()) <= available:
+            lo = mid
+        else:
+            hi = mid
+    return units(lo).astype("int64")
+
+
+def allocate_proportional(requests: np.ndarray, cost: np.ndarray, available: float) -> np.ndarray:
+    total = float((requests * cost).sum())
+    if total <= 0:
+        return requests.copy()
+    return np.floor(requests * min(1.0, available / total)).astype("int64")
+
+
+class AllocationPool:
+    """สถานะของข้อจำกัดร่วมระหว่างจำลอง (ต่อแถวของ matrix ใน run_stacked)"""
+
+    def __init__(
+        self,
+        kind: str,
+        limit: float,
+        rule: str,
+        row_cost: np.ndarray,
+        row_rank: np.ndarray,
+        brand_of: np.ndarray,
+        period_days: int = 1
+    ):
+        if kind not in CONSTRAINT_KINDS:
+            raise ValueError(f"Unknown constraint kind: {kind}")
+        if rule not in ALLOCATION_RULES:
+            raise ValueError(f"Unknown allocation rule: {rule}")
+        self.kind = kind
+        self.limit = float(limit)
+        self.rule = rule
+        self.period_days = max(1, int(period_days))
+        # ต้นทุนต่อหน่วย (มูลค่าที่สั่ง) และหน่วยที่ใช้วัดข้อจำกัด (capacity นับเป็นชิ้น)
+        self.unit_cost = np.asarray(row_cost, dtype="float64")
+        self.cost = self.unit_cost if kind == "budget" else np.ones(len(self.unit_cost))
+        self.rank = np.asarray(row_rank, dtype="int64")
+        self.brand_of = np.asarray(brand_of, dtype="int64")
+        # มูลค่าที่สั่งแล้วในรอบงบปัจจุบัน (รอบ = day // period_days)
+        self.spent = 0.0
+        self.period = 0
+
+        # สถิติต่อแบรนด์ตลอดการจำลอง
+        brands = int(self.brand_of.max()) + 1 if len(self.brand_of) else 0
+        self.requested_units = np.zeros(brands, dtype="int64")
+        self.granted_units = np.zeros(brands, dtype="int64")
+        self.constrained_days = np.zeros(brands, dtype="int64")
+        self.spend = np.zeros(brands, dtype="float64")
+
+    def available(self, day: int, stock: np.ndarray, on_order: np.ndarray) -> float:
+        if self.kind == "capacity":
+            return max(0.0, self.limit - float(stock.sum() + on_order.sum()))
+        # เริ่มรอบใหม่เมื่อเลขรอบเปลี่ยน (วันแรกของรอบอาจไม่มีใครสั่ง)
+        period = day // self.period_days
+        if period != self.period:
+            self.period = period
+            self.spent = 0.0
+        return max(0.0, self.limit - self.spent)
+
+    def grant(
+        self,
+        day: int,
+        requested: np.ndarray,
+        stock: np.ndarray,
+        on_order: np.ndarray,
+        need: Optional[np.ndarray] = None,
+        rate: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """จำนวนที่อนุมัติต่อแถว (≤ requested) — need (ส่วนที่ขาดถึงรอบเติมถัดไป) / rate (ความต้องการคาดการณ์ต่อวัน)
+        ใช้กับกฎ greedy"""
+        rows = np.flatnonzero(requested)
+        granted = np.zeros_like(requested)
+        if not len(rows):
+            return granted
+        q = requested[rows]
+        cost = self.cost[rows]
+        available = self.available(day, stock, on_order)
+        if float((q * cost).sum()) <= available:
+            granted[rows] = q
+        elif self.rule == "proportional":
+            granted[rows] = allocate_proportional(q, cost, available)
+        elif self.rule == "priority":
+            order = np.argsort(self.rank[rows], kind="stable")
+            granted[rows[order]] = allocate_in_order(q[order], cost[order], available)
+        else:
+            position = stock[rows] + on_order[rows]
+            g = allocate_cover(np.minimum(q, need[rows]), cost, rate[rows], position, available)
+            left = available - float((g * cost).sum())
+            granted[rows] = g + allocate_proportional(q - g, cost, left)
+        if self.kind == "budget":
+            self.spent += float((granted * self.cost).sum())
+
+        brands = len(self.requested_units)
+        asked = np.bincount(self.brand_of[rows], weights=q, minlength=brands).astype("int64")
+        given = np.bincount(self.brand_of[rows], weights=granted[rows], minlength=brands).astype("int64")
+        self.requested_units += asked
+        self.granted_units += given
+        self.constrained_days += given < asked
+        self.spend += np.bincount(self.brand_of[rows], weights=granted[rows] * self.unit_cost[rows], minlength=brands)
+        return granted
+
+    def summary(self, brand_names: List[str]) -> List[Dict[str, Any]]:
+        """สรุปต่อแบรนด์: ขอ / ได้ / จำนวนวันที่ถูกตัด / มูลค่าที่สั่ง"""
+        rows = []
+        for i, brand in enumerate(brand_names):
+            requested = int(self.requested_units[i])
+            granted = int(self.granted_units[i])
+            rows.append({
+                "brand": brand,
+                "constraint": self.kind,
+                "rule": self.rule,
+                "requested_units": requested,
+                "granted_units": granted,
+                "fill_rate": float(granted / requested * 100) if requested > 0 else 100.0,
+                "constrained_days": int(self.constrained_days[i]),
+                "spend": float(self.spend[i]),
+            })
+        return rows
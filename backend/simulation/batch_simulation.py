@@ -0,0 +1,245 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+import numpy as np
+
+from simulation.pipeline import is_distributional, lead_time_sampler
+from simulation.sku_simulation import day_calendar
+from simulation.streams import brand_random, lead_time_generator
+
+# ตัวชี้วัดต่อ lane ที่ run() คืน (ชื่อเดียวกับ BrandSummary + จำนวน order / หน่วยที่สั่ง)
+BATCH_METRICS = (
+    "total_demand",
+    "total_units_sold",
+    "total_revenue",
+    "total_lost_sales",
+    "lost_sales_rate",
+    "stockout_days",
+    "longest_stockout_streak",
+    "transactions",
+    "restock_count",
+    "avg_stock",
+    "final_stock",
+    "orders_placed",
+    "units_ordered",
+)
+
+# ค่ารายวันต่อ lane ที่ run(daily=...) เขียนให้ได้
+#   demand / sales / lost_sales, stock = สต็อกสิ้นวัน (หลังของเข้า), ordered = จำนวนที่สั่ง, received = จำนวนที่เข้า
+DAILY_FIELDS = ("demand", "sales", "lost_sales", "stock", "ordered", "received")
+
+# (วัน, stock หลังขาย, on_order) → (lane ที่สั่งวันนี้, จำนวนที่สั่งต่อ lane) — ทุก array ขนาดเท่าจำนวน lane
+OrderRule = Callable[[int, np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+
+class BrandBatchSimulation:
+    """จำลองแบรนด์เดียวหลาย config × หลาย replication ในรอบเดียวแบบ vectorized
+
+    lane = (config v, replication r) เก็บสถานะเป็น array ขนาด V·R แล้ววนตามวันครั้งเดียว
+    ทุก config ใน replication เดียวกันใช้ demand draw ชุดเดียวกัน (common random numbers)
+    จาก brand_random(seeds[r]) และ lead time จาก lead_time_generator(seeds[r]) ผลของแต่ละ
+    lane จึงเท่ากับ BrandSimulation ของ config นั้นที่ seed เดียวกัน (ตัวชี้วัดสรุปเท่านั้น
+    ไม่สร้าง sales_data / events รายวัน) subclass เปลี่ยนนโยบายสั่งของได้ด้วย order_rule()
+    """
+
+    def __init__(
+        self,
+        brand_name: str,
+        configs: Sequence[Any],
+        brand_params: Dict[str, Any],
+        seeds: Sequence[int],
+        start_date: Optional[datetime] = None,
+        festival_multipliers: Optional[Sequence[Optional[Dict[str, float]]]] = None
+    ):
+        self.brand_name = brand_name
+        self.configs = list(configs)
+        self.seeds = [int(s) for s in seeds]
+        self.start_date = start_date if start_date else datetime(2024, 1, 1)
+        self.festival_multipliers = list(festival_multipliers) if festival_multipliers else [None] * len(self.configs)
+
+        params = brand_params.get(brand_name, {})
+        calc = params.get('calculated_config', {})
+
+        # Config ต่อ config (ค่าเริ่มต้นเหมือน BrandSimulation)
+        def per_config(field: str, default: Any) -> np.ndarray:
+            return np.array([getattr(c, field) if getattr(c, field) else calc.get(field, default) for c in self.configs])
+
+        self.initial_stock = per_config('initial_stock', 1000).astype("int64")
+        self.restock_days = per_config('restock_days', 25).astype("int64")
+        self.restock_quantity = per_config('restock_quantity', 500).astype("int64")
+        self.reorder_quantity = per_config('reorder_quantity', 500).astype("int64")
+        self.reorder_point = per_config('reorder_point', 200).astype("int64")
+        self.demand_multiplier = np.array([c.demand_multiplier if c.demand_multiplier else 1.0 for c in self.configs], dtype="float64")
+        self.enable_reorder = np.array([c.enable_reorder if c.enable_reorder is not None else True for c in self.configs], dtype=bool)
+
+        self.base_daily_demand = params.get('base_demand', 50) * self.demand_multiplier
+        self.seasonality_factors = params.get('seasonality', {m: 1.0 for m in range(1, 13)})
+        self.avg_price = params.get('avg_price', 100)
+
+    def _lanes(self, values: np.ndarray) -> np.ndarray:
+        """ค่าต่อ config → ค่าต่อ lane (config-major: lane = v·R + r)"""
+        return np.repeat(values, len(self.seeds))
+
+    def demand_paths(self, days: int) -> np.ndarray:
+        """demand ต่อ lane ต่อวัน (lanes, days) — replication เดียวกันใช้ draw ชุดเดียวกันทุก config"""
+        V, R = len(self.configs), len(self.seeds)
+        # demand: base(v) × season(d) × festival(v, d) × สุ่ม(r, d) — ลำดับการคูณเดียวกับ BrandSimulation
+        months = day_calendar(self.start_date, days)["months"]
+        season = np.array([self.seasonality_factors.get(int(m), 1.0) for m in range(13)], dtype="float64")[months]
+        festival = np.stack([day_calendar(self.start_date, days, fm)["festival_multiplier"] for fm in self.festival_multipliers])
+        variation = np.empty((R, days), dtype="float64")
+        for r, seed in enumerate(self.seeds):
+            rnd = brand_random(seed, self.brand_name)
+            variation[r] = [rnd.uniform(0.7, 1.3) for _ in range(days)]
+        mean = (self.base_daily_demand[:, None] * season[None, :]) * festival           # (V, days)
+        return np.maximum(1, np.floor(mean[:, None, :] * variation[None, :, :])).astype("int64").reshape(V * R, days)
+
+    def day_prices(self, days: int) -> np.ndarray:
+        """ราคาต่อหน่วยรายวัน (days,) — ค่าเริ่มต้น = ราคาเฉลี่ยของแบรนด์ทุกวัน"""
+        return np.full(days, float(self.avg_price))
+
+    def order_rule(self) -> OrderRule:
+        """นโยบายเดิมของ BrandSimulation: restock ทุก restock_days + reorder เมื่อ inventory position <= reorder_point"""
+        restock_days = self._lanes(self.restock_days)
+        restock_qty = self._lanes(self.restock_quantity)
+        reorder_qty = self._lanes(self.reorder_quantity)
+        reorder_point = self._lanes(self.reorder_point)
+        enable = self._lanes(self.enable_reorder)
+
+        def decide(d: int, stock: np.ndarray, on_order: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            # periodic ก่อน, ไม่ใช่วัน periodic จึงตรวจ reorder จาก inventory position
+            periodic = (d % restock_days == 0) & (d > 0)
+            reorder = ~periodic & (reorder_point > 0) & (stock + on_order <= reorder_point) & enable
+            return periodic | reorder, np.where(periodic, restock_qty, reorder_qty)
+        return decide
+
+    def run(self, simulation_days: int, daily: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+        """ตัวชี้วัดใน BATCH_METRICS เป็น array รูป (configs, replications)
+
+        daily: field ใน DAILY_FIELDS → array (lanes, days) ที่รับค่ารายวันของทุก lane (ไม่ส่ง = ไม่เก็บ)
+        """
+        days = int(simulation_days)
+        V, R = len(self.configs), len(self.seeds)
+        K = V * R
+        demand = self.demand_paths(days)
+        prices = self.day_prices(days)
+        decide = self.order_rule()
+
+        # lead time ต่อ lane (lane สุ่มมี generator ของตัวเอง ตาม seed ของ replication)
+        lead_fixed = np.zeros(K, dtype="int64")
+        samplers: Dict[int, Any] = {}
+        max_lead = 0
+        for v, cfg in enumerate(self.configs):
+            for r, seed in enumerate(self.seeds):
+                k = v * R + r
+                rng = lead_time_generator(seed, self.brand_name) if is_distributional(cfg) else None
+                cap, sample = lead_time_sampler(cfg, rng)
+                max_lead = max(max_lead, cap)
+                if rng is None:
+                    lead_fixed[k] = sample()
+                else:
+                    samplers[k] = sample
+        random_lanes = np.zeros(K, dtype=bool)
+        random_lanes[list(samplers)] = True
+        lanes = np.arange(K)
+
+        size = max_lead + 1
+        ring_qty = np.zeros((size, K), dtype="int64")
+        ring_orders = np.zeros((size, K), dtype="int64")
+        on_order = np.zeros(K, dtype="int64")
+        stock = self._lanes(self.initial_stock).copy()
+
+        units = np.zeros(K, dtype="int64")
+        revenue = np.zeros(K, dtype="float64")
+        lost = np.zeros(K, dtype="int64")
+        stockout_days = np.zeros(K, dtype="int64")
+        streak = np.zeros(K, dtype="int64")
+        longest = np.zeros(K, dtype="int64")
+        transactions = np.zeros(K, dtype="int64")
+        restocks = np.zeros(K, dtype="int64")
+        stock_sum = np.zeros(K, dtype="int64")
+        orders = np.zeros(K, dtype="int64")
+        ordered = np.zeros(K, dtype="int64")
+
+        for d in range(days):
+            dem = demand[:, d]
+            sales = np.minimum(dem, stock)
+            stock -= sales
+            units += sales
+            revenue += sales * prices[d]
+            lost += dem - sales
+            # วันที่ไม่มีความต้องการเลย (replay) ไม่นับเป็น stockout
+            out = (sales == 0) & (dem > 0)
+            stockout_days += out
+            transactions += sales > 0
+            streak = np.where(out, streak + 1, 0)
+            np.maximum(longest, streak, out=longest)
+
+            place, quantity = decide(d, stock, on_order)
+            if daily is not None:
+                if "demand" in daily:
+                    daily["demand"][:, d] = dem
+                if "sales" in daily:
+                    daily["sales"][:, d] = sales
+                if "lost_sales" in daily:
+                    daily["lost_sales"][:, d] = dem - sales
+                if "ordered" in daily:
+                    daily["ordered"][:, d] = np.where(place, quantity, 0)
+            if place.any():
+                idx = lanes[place]
+                lead = lead_fixed[idx].copy()
+                for j, k in enumerate(idx):
+                    if random_lanes[k]:
+                        lead[j] = samplers[k]()
+                qty = quantity[idx]
+                slots = (d + lead) % size
+                ring_qty[slots, idx] += qty
+                ring_orders[slots, idx] += 1
+                on_order[idx] += qty
+                orders[idx] += 1
+                ordered[idx] += qty
+
+            slot = d % size
+            arrived = ring_qty[slot]
+            if daily is not None and "received" in daily:
+                daily["received"][:, d] = arrived
+            if arrived.any():
+                stock += arrived
+                on_order -= arrived
+                restocks += ring_orders[slot]
+                ring_qty[slot] = 0
+                ring_orders[slot] = 0
+            if daily is not None and "stock" in daily:
+                daily["stock"][:, d] = stock
+            stock_sum += stock
+
+        total_demand = demand.sum(axis=1)
+        metrics = {
+            "total_demand": total_demand,
+            "total_units_sold": units,
+            "total_revenue": revenue,
+            "total_lost_sales": lost,
+            "lost_sales_rate": np.where(total_demand > 0, lost / np.maximum(total_demand, 1) * 100, 0.0),
+            "stockout_days": stockout_days,
+            "longest_stockout_streak": longest,
+            "transactions": transactions,
+            "restock_count": restocks,
+            "avg_stock": stock_sum / max(days, 1),
+            "final_stock": stock.copy(),
+            "orders_placed": orders,
+            "units_ordered": ordered,
+        }
+        return {name: np.asarray(values).reshape(V, R) for name, values in metrics.items()}
+
+
+def run_brand_batch(
+    brand_name: str,
+    configs: Sequence[Any],
+    brand_params: Dict[str, Any],
+    seeds: Sequence[int],
+    start_date: Optional[datetime],
+    festival_multipliers: Optional[Sequence[Optional[Dict[str, float]]]],
+    simulation_days: int
+) -> Dict[str, np.ndarray]:
+    """BrandBatchSimulation(...).run(...) เป็นฟังก์ชันระดับโมดูล (ส่งเข้า process pool ได้)"""
+    batch = BrandBatchSimulation(brand_name, configs, brand_params, seeds, start_date, festival_multipliers)
+    return batch.run(simulation_days)
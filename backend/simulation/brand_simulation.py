@@ -1,17 +1,21 @@
 from datetime import datetime, timedelta
 import random
+import numpy as np
 import simpy
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional
 
-from utils.constants import FESTIVALS
-from utils.helpers import get_season_info, get_festival_info
+from utils.helpers import get_season_info, get_festival_info, get_festival_multiplier
+from simulation.aggregators import Aggregator, default_aggregators, month_trend_row
+from simulation.pipeline import InTransitPipeline, is_distributional, lead_time_sampler
 
 class BrandSimulation:
-    def __init__(self, env, brand_name: str, config: Any, brand_params: Dict[str, Any], start_date: Optional[datetime] = None, festival_multipliers: Optional[Dict[str, float]] = None):
+    def __init__(self, env, brand_name: str, config: Any, brand_params: Dict[str, Any], start_date: Optional[datetime] = None, festival_multipliers: Optional[Dict[str, float]] = None, aggregators: Optional[List[Aggregator]] = None, rng: Optional[random.Random] = None, lead_rng: Optional[np.random.Generator] = None, on_month_end: Optional[Callable[[Dict[str, Any], datetime], None]] = None, demand_trace: Optional[np.ndarray] = None):
         self.env = env
         self.brand_name = brand_name
         self.start_date = start_date if start_date else datetime(2024, 1, 1)
         self.festival_multipliers = festival_multipliers if festival_multipliers else {}
+        # random stream ของแบรนด์ (None = random module กลาง)
+        self.random = rng if rng is not None else random
 
         params = brand_params.get(brand_name, {})
 
@@ -27,11 +31,20 @@ class BrandSimulation:
         # Stock
         self.stock = self.initial_stock
 
+        # Lead time + in-transit orders (rng แยก สร้างเฉพาะเมื่อ lead time สุ่ม เพื่อไม่กิน random stream เดิม)
+        # ส่ง lead_rng มาเอง → demand stream ไม่ขึ้นกับรูปแบบ lead time (ใช้กับ common random numbers)
+        if lead_rng is None and is_distributional(config):
+            lead_rng = np.random.default_rng(self.random.getrandbits(64))
+        max_lead, self._next_lead_time = lead_time_sampler(config, lead_rng)
+        self.pipeline = InTransitPipeline(max_lead)
+
         # Demand parameters
         self.base_daily_demand = params.get('base_demand', 50) * self.demand_multiplier
         self.seasonality_factors = params.get('seasonality', {m: 1.0 for m in range(1, 13)})
         self.monthly_baseline_units = params.get('monthly_baseline_units', {m: self.base_daily_demand * 30 for m in range(1, 13)})
         self.avg_price = params.get('avg_price', 100)
+        # Replay: ยอดขายจริงรายวันตั้งแต่ start_date (ใช้แทนความต้องการสุ่ม × demand_multiplier)
+        self.demand_trace = demand_trace
 
         # Stats & logs
         self.sales_data = []
@@ -40,6 +53,8 @@ class BrandSimulation:
         self.festival_events = []
         self.season_events = []
         self.trend_events = []  # monthly trend “events” (online)
+        # callback(แถว trend ของเดือน, วันสุดท้ายของเดือน) ทุกสิ้นเดือน — ใช้ stream ผลระหว่างจำลอง
+        self.on_month_end = on_month_end
 
         self.stockout_days = 0
         self.total_sales_transactions = 0
@@ -51,23 +66,28 @@ class BrandSimulation:
         self._month_sales_acc: Dict[int, int] = {}  # key=YYYYMM, value=sum sales
         self._prev_month_sales: Optional[int] = None
 
+        # Streaming aggregators (อัปเดตทุกวัน, อ่านผลด้วย aggregate(name))
+        self._aggregators = list(aggregators) if aggregators is not None else default_aggregators()
+        self.aggregators: Dict[str, Aggregator] = {a.name: a for a in self._aggregators}
+
         self.env.process(self.daily_sales_process())
 
     def get_seasonality_factor(self, current_date: datetime) -> float:
         return self.seasonality_factors.get(current_date.month, 1.0)
 
     def get_festival_multiplier(self, current_date: datetime) -> float:
-        month, day = current_date.month, current_date.day
-        for fid, fdata in FESTIVALS.items():
-            if fdata["month"] == month and day in fdata["days"]:
-                return self.festival_multipliers.get(fid, fdata["multiplier"])
-        return 1.0
+        return get_festival_multiplier(current_date, self.festival_multipliers)
 
     def calculate_daily_demand(self, current_date: datetime) -> tuple[int, float, float, float]:
+        if self.demand_trace is not None:
+            # trace มี seasonality / เทศกาลจริงอยู่แล้ว → ไม่คูณซ้ำ
+            day = (current_date - self.start_date).days
+            units = self.demand_trace[day] if day < len(self.demand_trace) else 0
+            return int(round(units * self.demand_multiplier)), 1.0, 0.0, 0.0
         base_demand = self.base_daily_demand
         seasonality = self.get_seasonality_factor(current_date)
         festival_multiplier = self.get_festival_multiplier(current_date)
-        random_variation = random.uniform(0.7, 1.3)
+        random_variation = self.random.uniform(0.7, 1.3)
         daily_demand = int(base_demand * seasonality * festival_multiplier * random_variation)
 
         base_without_factors = base_demand * random_variation
@@ -86,34 +106,18 @@ class BrandSimulation:
         baseline_m = float(self.monthly_baseline_units.get(current_date.month, self.base_daily_demand * 30))
         season_factor = float(self.seasonality_factors.get(current_date.month, 1.0))
 
-        growth_vs_baseline = 0.0 if baseline_m <= 0 else (sales_m - baseline_m) / baseline_m
-        mom_growth = None
-        if self._prev_month_sales is not None and self._prev_month_sales > 0:
-            mom_growth = (sales_m - self._prev_month_sales) / self._prev_month_sales
-
-        up_cond = (growth_vs_baseline >= 0.15) or (mom_growth is not None and mom_growth >= 0.10)
-        down_cond = (growth_vs_baseline <= -0.10) or (mom_growth is not None and mom_growth <= -0.10)
-        if up_cond and not down_cond:
-            trend_label = "uptrend"
-        elif down_cond and not up_cond:
-            trend_label = "downtrend"
-        else:
-            trend_label = "sideways"
-
-        trend_score = 0.7 * growth_vs_baseline + 0.3 * (mom_growth if mom_growth is not None else 0.0)
-
-        self.trend_events.append({
-            'month': int(current_date.month),
-            'brand': self.brand_name,
-            'sales': sales_m,
-            'baseline_units': baseline_m,
-            'growth_vs_baseline': float(growth_vs_baseline),
-            'mom_growth': float(mom_growth) if mom_growth is not None else None,
-            'seasonality_factor': season_factor,
-            'trend': trend_label,
-            'trend_score': float(trend_score)
-        })
+        row = month_trend_row(
+            self.brand_name, current_date.month, sales_m, baseline_m, season_factor, self._prev_month_sales
+        )
+        self.trend_events.append(row)
         self._prev_month_sales = sales_m
+        if self.on_month_end is not None:
+            self.on_month_end(row, current_date)
+
+    def aggregate(self, name: str) -> Any:
+        """ผลสรุปที่เสร็จแล้วของ aggregator ชื่อ name (None = ไม่ได้ลงทะเบียน)"""
+        agg = self.aggregators.get(name)
+        return agg.result(self) if agg is not None else None
 
     def daily_sales_process(self):
         while True:
@@ -155,12 +159,14 @@ class BrandSimulation:
                     'lost_sales': int(daily_demand - actual_sales)
                 }
             else:
-                self.stockout_days += 1
+                # วันที่ไม่มีความต้องการเลย (replay วันที่ไม่มีขายจริง) ไม่นับเป็น stockout
+                stockout = int(daily_demand > 0)
+                self.stockout_days += stockout
                 entry = {
                     **common,
                     'sales': 0,
                     'stock_after': int(self.stock),
-                    'stockout': 1,
+                    'stockout': stockout,
                     'lost_sales': int(daily_demand)
                 }
 
@@ -186,43 +192,45 @@ class BrandSimulation:
                     'demand_increase': float(festival_increase)
                 })
 
-            # periodic / reorder
-            if int(self.env.now) > 0 and int(self.env.now) % self.restock_days == 0:
-                before = self.stock
-                self.stock += self.restock_quantity
-                self.restock_count += 1
-                self.restock_events.append({
-                    'day': int(self.env.now),
-                    'brand': self.brand_name,
-                    'quantity': int(self.restock_quantity),
-                    'stock_before': int(before),
-                    'stock_after': int(self.stock),
-                    'type': 'periodic'
-                })
-                entry['stock_after'] = int(self.stock)
-            elif self.reorder_point > 0 and self.stock <= self.reorder_point:
+            # periodic / reorder → สั่งเข้า pipeline (lead time 0 = เข้าภายในวันเดียวกัน)
+            day = int(self.env.now)
+            if day > 0 and day % self.restock_days == 0:
+                self.pipeline.place(day, self._next_lead_time(), self.restock_quantity, 'periodic')
+            elif self.reorder_point > 0 and self.stock + self.pipeline.on_order <= self.reorder_point:
                 will_trigger = self.enable_reorder
                 self.reorder_point_events.append({
-                    'day': int(self.env.now),
+                    'day': day,
                     'brand': self.brand_name,
                     'stock_level': int(self.stock),
                     'reorder_point': int(self.reorder_point),
                     'reorder_quantity': int(self.reorder_quantity),
-                    'triggered': will_trigger
+                    'triggered': will_trigger,
+                    'on_order': int(self.pipeline.on_order)
                 })
                 if will_trigger:
-                    before = self.stock
-                    self.stock += self.reorder_quantity
-                    self.restock_count += 1
-                    self.restock_events.append({
-                        'day': int(self.env.now),
-                        'brand': self.brand_name,
-                        'quantity': int(self.reorder_quantity),
-                        'stock_before': int(before),
-                        'stock_after': int(self.stock),
-                        'type': 'reorder'
-                    })
-                    entry['stock_after'] = int(self.stock)
+                    self.pipeline.place(day, self._next_lead_time(), self.reorder_quantity, 'reorder')
+
+            # ของที่ถึงวันนี้
+            _, arrivals = self.pipeline.receive(day)
+            for order_day, arrival_day, kind, qty in arrivals:
+                before = self.stock
+                self.stock += qty
+                self.restock_count += 1
+                self.restock_events.append({
+                    'day': day,
+                    'brand': self.brand_name,
+                    'quantity': int(qty),
+                    'stock_before': int(before),
+                    'stock_after': int(self.stock),
+                    'type': kind,
+                    'order_day': int(order_day),
+                    'arrival_day': int(arrival_day)
+                })
+            if arrivals:
+                entry['stock_after'] = int(self.stock)
+
+            for agg in self._aggregators:
+                agg.update(entry, current_date)
 
             # accumulate month sales
             yyyymm = current_date.year * 100 + current_date.month
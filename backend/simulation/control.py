@@ -0,0 +1,43 @@
+import threading
+import time
+from typing import Optional
+
+
+class SimulationCancelled(Exception):
+    """การจำลองหยุดกลางทางเพราะ CancelToken ถูกยกเลิก (day = วันที่จำลองเสร็จแล้วตอนหยุด)"""
+
+    def __init__(self, day: int, reason: str = "cancelled"):
+        super().__init__(f"simulation {reason} at day {day}")
+        self.day = day
+        self.reason = reason
+
+
+class CancelToken:
+    """สัญญาณยกเลิกข้าม thread: ฝั่ง request เรียก cancel() ส่วน engine เรียก check() ทุกวันที่จำลอง
+
+    deadline (เวลา time.monotonic()) → check() หลังเลยเวลานั้นยกเลิกเองด้วยเหตุผล "deadline exceeded"
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+        self.deadline = deadline
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """วินาทีที่เหลือก่อน deadline (None = ไม่มี deadline)"""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def check(self, day: int) -> None:
+        if self.deadline is not None and not self._event.is_set() and time.monotonic() >= self.deadline:
+            self.cancel("deadline exceeded")
+        if self._event.is_set():
+            raise SimulationCancelled(day, self.reason or "cancelled")
@@ -0,0 +1,137 @@
+"""ผล Monte Carlo ขนาดใหญ่แบบ out-of-core: ค่ารายวันต่อ path เขียนลงไฟล์ .npy (memory-mapped) ทีละก้อน
+
+ไดเรกทอรีของหนึ่ง experiment:
+    manifest.json
+    <brand>/<field>.npy         (paths, days) int32 — ค่ารายวันต่อ path (field ใน DAILY_FIELDS)
+    <brand>/totals.npy          (paths, len(PATH_TOTALS)) float64 — ตัวชี้วัดสรุปต่อ path
+    <brand>/<field>.bands.npy   (len(BAND_STATS), days) float32 — mean/p05/p50/p95 ข้าม path ต่อวัน
+
+ก้อนของ path (แถวติดกัน) จำลองด้วย BrandBatchSimulation แล้วเขียนลงแถวของตัวเองในไฟล์ ก้อนต่างกันจึง
+เขียนพร้อมกันจากหลาย process ได้ ส่วนสรุปอ่านไฟล์ทีละช่วงของวัน RAM จึงไม่โตตามขนาด experiment
+"""
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from simulation.batch_simulation import BrandBatchSimulation
+
+DAILY_DTYPE = "int32"
+PATH_TOTALS = (
+    "total_demand",
+    "total_units_sold",
+    "total_revenue",
+    "total_lost_sales",
+    "lost_sales_rate",
+    "stockout_days",
+    "avg_stock",
+    "final_stock",
+    "restock_count",
+)
+BAND_STATS = ("mean", "p05", "p50", "p95")
+
+# ขนาดข้อมูลที่อ่านเข้า RAM ต่อก้อนตอนสรุป
+SUMMARY_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def brand_dir(directory: str, brand: str) -> str:
+    return os.path.join(directory, re.sub(r"[^A-Za-z0-9_-]", "_", brand))
+
+
+def daily_path(directory: str, brand: str, field: str) -> str:
+    return os.path.join(brand_dir(directory, brand), f"{field}.npy")
+
+
+def totals_path(directory: str, brand: str) -> str:
+    return os.path.join(brand_dir(directory, brand), "totals.npy")
+
+
+def bands_path(directory: str, brand: str, field: str) -> str:
+    return os.path.join(brand_dir(directory, brand), f"{field}.bands.npy")
+
+
+def experiment_bytes(brands: int, fields: int, paths: int, days: int) -> int:
+    """ขนาดไฟล์โดยประมาณของ experiment"""
+    item = np.dtype(DAILY_DTYPE).itemsize
+    return brands * (fields * paths * days * item + paths * len(PATH_TOTALS) * 8 + fields * len(BAND_STATS) * days * 4)
+
+
+def create_arrays(directory: str, brands: Sequence[str], fields: Sequence[str], paths: int, days: int) -> None:
+    """สร้างไฟล์ .npy ว่าง (sparse บนดิสก์จนกว่าจะถูกเขียน) ของทุกแบรนด์ / field"""
+    for brand in brands:
+        os.makedirs(brand_dir(directory, brand), exist_ok=True)
+        for field in fields:
+            np.lib.format.open_memmap(daily_path(directory, brand, field), mode="w+", dtype=DAILY_DTYPE, shape=(paths, days)).flush()
+        np.lib.format.open_memmap(totals_path(directory, brand), mode="w+", dtype="float64", shape=(paths, len(PATH_TOTALS))).flush()
+
+
+def run_experiment_chunk(
+    directory: str,
+    brand_name: str,
+    config: Any,
+    brand_params: Dict[str, Any],
+    seeds: Sequence[int],
+    start_date: Optional[datetime],
+    festival_multipliers: Optional[Dict[str, float]],
+    simulation_days: int,
+    row0: int,
+    fields: Sequence[str]
+) -> int:
+    """จำลอง path row0 .. row0 + len(seeds) - 1 ของแบรนด์แล้วเขียนลงไฟล์ (ระดับโมดูล → ส่งเข้า process pool ได้)"""
+    days = int(simulation_days)
+    batch = BrandBatchSimulation(brand_name, [config], brand_params, seeds, start_date, [festival_multipliers])
+    buffers = {field: np.empty((len(seeds), days), dtype=DAILY_DTYPE) for field in fields}
+    metrics = batch.run(days, daily=buffers)
+
+    rows = slice(row0, row0 + len(seeds))
+    for field, values in buffers.items():
+        target = np.load(daily_path(directory, brand_name, field), mmap_mode="r+")
+        target[rows] = values
+        target.flush()
+        del target
+    totals = np.load(totals_path(directory, brand_name), mmap_mode="r+")
+    totals[rows] = np.stack([np.asarray(metrics[m][0], dtype="float64") for m in PATH_TOTALS], axis=1)
+    totals.flush()
+    return len(seeds)
+
+
+def summarize_totals(directory: str, brand: str) -> Dict[str, Dict[str, float]]:
+    """สถิติข้าม path ของตัวชี้วัดสรุปแต่ละตัว (อ่านทีละคอลัมน์)"""
+    totals = np.load(totals_path(directory, brand), mmap_mode="r")
+    summary: Dict[str, Dict[str, float]] = {}
+    for j, metric in enumerate(PATH_TOTALS):
+        values = np.array(totals[:, j])
+        p05, p50, p95 = np.percentile(values, [5, 50, 95])
+        summary[metric] = {
+            "mean": float(values.mean()),
+            "std": float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+            "min": float(values.min()),
+            "p05": float(p05),
+            "p50": float(p50),
+            "p95": float(p95),
+            "max": float(values.max()),
+        }
+    return summary
+
+
+def compute_bands(directory: str, brand: str, field: str) -> None:
+    """mean / p05 / p50 / p95 ข้าม path ต่อวัน อ่านไฟล์ทีละช่วงของวัน (ไม่เกิน SUMMARY_BLOCK_BYTES)"""
+    values = np.load(daily_path(directory, brand, field), mmap_mode="r")
+    paths, days = values.shape
+    bands = np.lib.format.open_memmap(bands_path(directory, brand, field), mode="w+", dtype="float32", shape=(len(BAND_STATS), days))
+    block = max(1, SUMMARY_BLOCK_BYTES // max(1, paths * 4))
+    for d0 in range(0, days, block):
+        d1 = min(days, d0 + block)
+        x = np.asarray(values[:, d0:d1], dtype="float32")
+        bands[0, d0:d1] = x.mean(axis=0)
+        bands[1:, d0:d1] = np.percentile(x, [5, 50, 95], axis=0)
+    bands.flush()
+
+
+def read_window(path: str, rows: slice, columns: slice) -> np.ndarray:
+    """สำเนาของช่วงแถว/คอลัมน์จากไฟล์ .npy (อ่านเฉพาะส่วนนั้นผ่าน memmap)"""
+    values = np.load(path, mmap_mode="r")
+    return np.array(values[rows, columns])
+
@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from simulation.aggregators import Aggregator
+from simulation.sku_simulation import SkuBrandSimulation
+
+
+class ForecastBrandSimulation(SkuBrandSimulation):
+    """จำลองสต็อกระดับสินค้าโดยใช้ค่าพยากรณ์ต่อ (แบรนด์, สินค้า) เป็นความต้องการเฉลี่ย
+
+    profile = (สินค้า, ความต้องการเฉลี่ยต่อวัน รูป สินค้า × 13 index เดือน) จาก forecast_service
+    ความต้องการต่อวัน = Poisson(พยากรณ์ของเดือน × demand_multiplier × festival × สุ่มรายวัน) — seasonality
+    อยู่ในค่าพยากรณ์แล้ว ค่าใน BrandConfig แบ่งลงสินค้าตามสัดส่วนของพยากรณ์ทั้งปี
+    by_brand=True → แถวเดียวต่อแบรนด์ (รวมทุกสินค้า) ใช้กับ granularity "brand"
+    """
+
+    def __init__(
+        self,
+        brand_name: str,
+        config: Any,
+        brand_params: Dict[str, Any],
+        product_params: Dict[str, Dict[str, Any]],
+        profile: Tuple[np.ndarray, np.ndarray],
+        by_brand: bool = False,
+        start_date: Optional[datetime] = None,
+        festival_multipliers: Optional[Dict[str, float]] = None,
+        aggregators: Optional[List[Aggregator]] = None,
+        rng: Optional[np.random.Generator] = None,
+        on_month_end: Optional[Callable[[Dict[str, Any], datetime], None]] = None
+    ):
+        products, daily = profile
+        avg_price = float(brand_params.get(brand_name, {}).get('avg_price', 100))
+        if by_brand:
+            units = {}
+            daily = daily.sum(axis=0, keepdims=True)
+        else:
+            # ราคาต่อสินค้าจาก product parameters (สินค้าที่ไม่มีราคา → ราคาเฉลี่ยของแบรนด์)
+            known = product_params.get(brand_name) or {"products": [], "avg_price": []}
+            prices = dict(zip(known["products"], known["avg_price"]))
+            total = daily[:, 1:].sum(axis=1)
+            units = {brand_name: {
+                "products": products,
+                "shares": total / total.sum(),
+                "avg_price": np.array([float(prices.get(p, avg_price)) for p in products]),
+            }}
+        super().__init__(
+            brand_name, config, brand_params, units, start_date, festival_multipliers,
+            aggregators=aggregators, rng=rng, on_month_end=on_month_end
+        )
+        self.daily_forecast = daily * self.demand_multiplier
+
+    def demand_mean(self, cal: Dict[str, Any], season: np.ndarray, variation: np.ndarray) -> np.ndarray:
+        """พยากรณ์รายวันของเดือนนั้น × festival × สุ่มรายวัน (สินค้า × วัน)"""
+        return self.daily_forecast[:, cal["months"]] * (cal["festival_multiplier"] * variation)
@@ -0,0 +1,75 @@
+from typing import Any, Callable, List, Optional, Tuple
+import math
+import numpy as np
+
+# รูปแบบ lead time ที่รองรับใน BrandConfig.lead_time_distribution
+LEAD_TIME_DISTRIBUTIONS = ("fixed", "uniform", "poisson")
+
+
+def lead_time_sampler(config: Any, rng: Optional[np.random.Generator] = None) -> Tuple[int, Callable[[], int]]:
+    """(lead time สูงสุดที่เป็นไปได้, ฟังก์ชันสุ่ม lead time ของ order ถัดไป) จาก BrandConfig
+
+    - fixed:   ทุก order ใช้ lead_time_days
+    - uniform: สุ่มจำนวนเต็มใน [lead_time_days - spread, lead_time_days + spread]
+    - poisson: Poisson(lead_time_days) ตัดปลายที่ mean + 6·sqrt(mean) เพื่อให้ ring buffer มีขนาดจำกัด
+    """
+    lead = max(0, int(getattr(config, "lead_time_days", None) or 0))
+    dist = getattr(config, "lead_time_distribution", None) or "fixed"
+    spread = max(0, int(getattr(config, "lead_time_spread", None) or 0))
+    if dist not in LEAD_TIME_DISTRIBUTIONS:
+        raise ValueError(f"Unknown lead_time_distribution: {dist}")
+
+    if dist == "fixed" or (dist == "uniform" and spread == 0) or (dist == "poisson" and lead == 0):
+        return lead, lambda: lead
+
+    rng = rng if rng is not None else np.random.default_rng()
+    if dist == "uniform":
+        lo, hi = max(0, lead - spread), lead + spread
+        return hi, lambda: int(rng.integers(lo, hi + 1))
+
+    cap = int(lead + 6 * math.sqrt(lead) + 1)
+    return cap, lambda: min(cap, int(rng.poisson(lead)))
+
+
+def is_distributional(config: Any) -> bool:
+    dist = getattr(config, "lead_time_distribution", None) or "fixed"
+    return dist != "fixed"
+
+
+class InTransitPipeline:
+    """order ที่กำลังขนส่ง เก็บใน ring buffer ตามวันที่ของเข้า
+
+    ช่องที่ (arrival_day % size) เก็บจำนวนที่จะเข้าในวันนั้น ดังนั้น place() และ
+    receive() เป็น O(1) ต่อวันไม่ว่าจะมี order ค้างอยู่กี่รายการ shape ≠ () ใช้กับ
+    โหมดระดับสินค้า: จำนวนเป็น array ต่อสินค้า และ order ของทุกสินค้าในวันเดียวกัน
+    ใช้ lead time เดียวกัน (ซัพพลายเออร์ระดับแบรนด์)
+    """
+
+    def __init__(self, max_lead_time: int, shape: Tuple[int, ...] = ()):
+        self.size = int(max_lead_time) + 1
+        self._qty = np.zeros((self.size, *shape), dtype="int64")
+        # ต่อช่อง: [(order_day, arrival_day, kind, total_qty)] สำหรับรายงาน RestockEvent
+        self._orders: List[List[Tuple[int, int, str, int]]] = [[] for _ in range(self.size)]
+        self.on_order = np.zeros(shape, dtype="int64") if shape else 0
+
+    def place(self, day: int, lead_time: int, quantity, kind: str) -> int:
+        """สั่ง order วันนี้ ของเข้าวันที่ day + lead_time (คืน arrival day)"""
+        if lead_time >= self.size or lead_time < 0:
+            raise ValueError(f"lead_time {lead_time} outside pipeline capacity {self.size - 1}")
+        arrival = day + lead_time
+        slot = arrival % self.size
+        self._qty[slot] += quantity
+        self.on_order += quantity
+        self._orders[slot].append((day, arrival, kind, int(np.sum(quantity))))
+        return arrival
+
+    def receive(self, day: int):
+        """รับของที่ถึงวันนี้ → (จำนวนที่เข้า, รายการ order ที่เข้า)"""
+        slot = day % self.size
+        qty = self._qty[slot].copy() if self._qty.ndim > 1 else int(self._qty[slot])
+        orders = self._orders[slot]
+        if orders:
+            self._qty[slot] = 0
+            self.on_order -= qty
+            self._orders[slot] = []
+        return qty, orders
@@ -0,0 +1,106 @@
+"""นโยบายเติมสต็อก (replenishment policy) แบบ vectorized สำหรับ BrandBatchSimulation
+
+ทุก policy เขียนเป็นกฎเดียวบน inventory position (IP = stock + on_order) ที่ตรวจหลังขายของแต่ละวัน:
+วันที่ตรวจ (d % review_period == 0) และ IP <= reorder_level → สั่ง
+  - order_quantity > 0: Q หลายเท่าที่น้อยที่สุดจน IP > reorder_level
+  - ไม่งั้น: order_up_to - IP
+
+    s_S          (s, S)  ตรวจทุกวัน, IP <= s → เติมถึง S
+    R_Q          (R, Q)  ตรวจทุกวัน, IP <= R → สั่งทีละ Q
+    order_up_to  (T, S)  ตรวจทุก T วัน → เติมถึง S
+    base_stock   (S)     ตรวจทุกวัน → เติมส่วนที่ขายไปให้ IP กลับเป็น S
+
+policy ต่างชนิดจึงอยู่ใน batch เดียวกันได้ (แต่ละ lane มีค่า review_period / reorder_level / order_up_to /
+order_quantity ของตัวเอง)
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from simulation.batch_simulation import BrandBatchSimulation
+
+POLICY_TYPES = ("s_S", "R_Q", "order_up_to", "base_stock")
+
+
+def policy_parameters(policy: Any) -> Tuple[int, int, int, int]:
+    """(review_period, reorder_level, order_up_to, order_quantity) ของ policy (ValueError ถ้าค่าไม่ครบ/ผิด)"""
+    kind = policy.type
+    s, S, Q, T = policy.reorder_point, policy.order_up_to, policy.order_quantity, policy.review_period
+    if kind == "s_S":
+        if s is None or S is None or not 0 <= s < S:
+            raise ValueError("s_S requires 0 <= reorder_point < order_up_to")
+        return 1, s, S, 0
+    if kind == "R_Q":
+        if s is None or Q is None or s < 0 or Q <= 0:
+            raise ValueError("R_Q requires reorder_point >= 0 and order_quantity > 0")
+        return 1, s, 0, Q
+    if kind == "order_up_to":
+        if T is None or S is None or T < 1 or S <= 0:
+            raise ValueError("order_up_to requires review_period >= 1 and order_up_to > 0")
+        return T, S - 1, S, 0
+    if kind == "base_stock":
+        if S is None or S <= 0:
+            raise ValueError("base_stock requires order_up_to > 0")
+        return 1, S - 1, S, 0
+    raise ValueError(f"Unknown policy type: {kind}. Use one of {list(POLICY_TYPES)}")
+
+
+class PolicyBatchSimulation(BrandBatchSimulation):
+    """หลาย policy ของแบรนด์เดียว × หลาย replication ใน run เดียว
+
+    lane = (policy p, replication r) ทุก policy ใช้ BrandConfig เดียวกัน (demand_multiplier, lead time,
+    initial_stock) demand ของ replication เดียวกันจึงเป็น path เดียวกันทุก policy (common random numbers)
+    policy.initial_stock (ถ้ามี) แทน initial_stock ของ config เฉพาะ lane ของ policy นั้น
+    """
+
+    def __init__(
+        self,
+        brand_name: str,
+        config: Any,
+        policies: Sequence[Any],
+        brand_params: Dict[str, Any],
+        seeds: Sequence[int],
+        start_date: Optional[datetime] = None,
+        festival_multipliers: Optional[Dict[str, float]] = None
+    ):
+        super().__init__(
+            brand_name, [config] * len(policies), brand_params, seeds, start_date, [festival_multipliers] * len(policies)
+        )
+        self.policies = list(policies)
+        params = np.array([policy_parameters(p) for p in self.policies], dtype="int64").reshape(-1, 4)
+        self.review_period, self.reorder_level, self.order_up_to, self.order_quantity = params.T
+        self.initial_stock = np.array([
+            p.initial_stock if p.initial_stock is not None else stock
+            for p, stock in zip(self.policies, self.initial_stock)
+        ], dtype="int64")
+
+    def order_rule(self):
+        period = self._lanes(self.review_period)
+        level = self._lanes(self.reorder_level)
+        up_to = self._lanes(self.order_up_to)
+        q = self._lanes(self.order_quantity)
+        fixed = q > 0
+        q_safe = np.maximum(q, 1)
+
+        def decide(d: int, stock: np.ndarray, on_order: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            position = stock + on_order
+            place = (d % period == 0) & (position <= level)
+            quantity = np.where(fixed, ((level - position) // q_safe + 1) * q, up_to - position)
+            return place & (quantity > 0), quantity
+        return decide
+
+
+def run_policy_batch(
+    brand_name: str,
+    config: Any,
+    policies: Sequence[Any],
+    brand_params: Dict[str, Any],
+    seeds: Sequence[int],
+    start_date: Optional[datetime],
+    festival_multipliers: Optional[Dict[str, float]],
+    simulation_days: int
+) -> Dict[str, np.ndarray]:
+    """PolicyBatchSimulation(...).run(...) เป็นฟังก์ชันระดับโมดูล (ส่งเข้า process pool ได้)"""
+    batch = PolicyBatchSimulation(brand_name, config, policies, brand_params, seeds, start_date, festival_multipliers)
+    return batch.run(simulation_days)
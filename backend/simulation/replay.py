@@ -0,0 +1,58 @@
+"""Replay ยอดขายจริงจาก historical data (trace) แทนความต้องการสุ่ม สำหรับ backtest นโยบายสต็อก
+
+trace = ยอดขายจริงรายวันของแบรนด์ (แถวหนึ่งของ demand trace ใน data_service) ตัดเป็นช่วงที่ต้องการแล้ว
+ทุก config ในรอบเดียวเห็นความต้องการชุดเดียวกัน (× demand_multiplier ของ config) ราคาต่อหน่วยรายวันมาจาก
+ยอดขายจริง (total sales ÷ units) จึงเทียบรายได้กับที่เกิดขึ้นจริงได้ตรง
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from simulation.batch_simulation import BrandBatchSimulation
+
+
+class TraceBatchSimulation(BrandBatchSimulation):
+    """BrandBatchSimulation ที่ความต้องการของทุก lane = trace × demand_multiplier ของ config
+
+    lane = (config, seed) เหมือนเดิม — seed มีผลเฉพาะ lead time แบบสุ่ม
+    """
+
+    def __init__(
+        self,
+        brand_name: str,
+        configs: Sequence[Any],
+        brand_params: Dict[str, Any],
+        seeds: Sequence[int],
+        units: np.ndarray,
+        revenue: np.ndarray,
+        start_date: Optional[datetime] = None
+    ):
+        super().__init__(brand_name, configs, brand_params, seeds, start_date)
+        self.trace_units = np.asarray(units, dtype="int64")
+        self.trace_revenue = np.asarray(revenue, dtype="float64")
+
+    def demand_paths(self, days: int) -> np.ndarray:
+        units = self.trace_units[:days]
+        demand = np.rint(self.demand_multiplier[:, None] * units[None, :]).astype("int64")
+        return np.repeat(demand, len(self.seeds), axis=0)
+
+    def day_prices(self, days: int) -> np.ndarray:
+        units = self.trace_units[:days]
+        revenue = self.trace_revenue[:days]
+        return np.where(units > 0, revenue / np.maximum(units, 1), float(self.avg_price))
+
+
+def run_trace_batch(
+    brand_name: str,
+    configs: Sequence[Any],
+    brand_params: Dict[str, Any],
+    seeds: Sequence[int],
+    units: np.ndarray,
+    revenue: np.ndarray,
+    start_date: Optional[datetime],
+    simulation_days: int
+) -> Dict[str, np.ndarray]:
+    """TraceBatchSimulation(...).run(...) เป็นฟังก์ชันระดับโมดูล (ส่งเข้า process pool ได้)"""
+    batch = TraceBatchSimulation(brand_name, configs, brand_params, seeds, units, revenue, start_date)
+    return batch.run(simulation_days)
@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from simulation.aggregators import Aggregator
+from simulation.sku_simulation import SkuBrandSimulation
+
+
+class SegmentBrandSimulation(SkuBrandSimulation):
+    """จำลองสต็อกแยกตาม segment (Region / Retailer) ของแบรนด์ แล้ว rollup เป็นระดับแบรนด์
+
+    ใช้ engine ระดับสินค้าโดยให้ "สินค้า" = segment แต่ละ segment มีสัดส่วนความต้องการ, seasonality
+    และราคาของตัวเอง (calculate_segment_parameters) ใช้กับ run_stacked เพื่อจำลองทุก (แบรนด์ × segment)
+    เป็น matrix เดียว
+    """
+
+    def __init__(
+        self,
+        brand_name: str,
+        config: Any,
+        brand_params: Dict[str, Any],
+        segment_params: Dict[str, Dict[str, Any]],
+        dimension: str,
+        start_date: Optional[datetime] = None,
+        festival_multipliers: Optional[Dict[str, float]] = None,
+        aggregators: Optional[List[Aggregator]] = None,
+        rng: Optional[np.random.Generator] = None,
+        on_month_end: Optional[Callable[[Dict[str, Any], datetime], None]] = None
+    ):
+        seg = segment_params.get(brand_name)
+        units = {brand_name: {"products": seg["segments"], "shares": seg["shares"], "avg_price": seg["avg_price"]}} if seg else {}
+        super().__init__(
+            brand_name, config, brand_params, units, start_date, festival_multipliers,
+            aggregators=aggregators, rng=rng, on_month_end=on_month_end
+        )
+        self.dimension = dimension
+        if seg:
+            self.segment_seasonality = seg["seasonality"]
+        else:
+            # ไม่มีข้อมูล segment → segment เดียวตาม seasonality ของแบรนด์
+            self.segment_seasonality = np.array(
+                [[self.seasonality_factors.get(m, 1.0) for m in range(13)]], dtype="float64"
+            )
+
+    def demand_mean(self, cal: Dict[str, Any], season: np.ndarray, variation: np.ndarray) -> np.ndarray:
+        """share × seasonality ของ segment ในเดือนนั้น × base × festival × สุ่มรายวัน (segments × days)"""
+        daily = self.base_daily_demand * cal["festival_multiplier"] * variation
+        return self.shares[:, None] * self.segment_seasonality[:, cal["months"]] * daily
+
+    def product_summary(self) -> List[Dict[str, Any]]:
+        # แถวของ engine เป็น segment ไม่ใช่สินค้า → ดู segment_summary
+        return []
+
+    def segment_summary(self) -> List[Dict[str, Any]]:
+        """สรุปต่อ segment ทั้งช่วงจำลอง"""
+        avg_stock = self.stock_after.mean(axis=1) if self.stock_after.shape[1] else self.initial_stock_p
+        rows = []
+        for row, stock in zip(super().product_summary(), avg_stock):
+            segment = row.pop("product")
+            row.pop("brand")
+            rows.append({"brand": self.brand_name, "dimension": self.dimension, "segment": segment, **row, "avg_stock": float(stock)})
+        return rows
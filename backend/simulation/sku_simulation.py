@@ -0,0 +1,426 @@
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, List, Optional
+import numpy as np
+
+from utils.helpers import get_season_info, get_festival_info, get_festival_multiplier
+from simulation.aggregators import Aggregator, default_aggregators, month_trend_row
+from simulation.control import CancelToken
+from simulation.pipeline import InTransitPipeline, lead_time_sampler
+
+
+def allocate_by_share(total: float, shares: np.ndarray) -> np.ndarray:
+    """แบ่งจำนวนเต็ม total ตามสัดส่วน shares (largest remainder) ผลรวมเท่ากับ total พอดี"""
+    raw = total * shares
+    out = np.floor(raw).astype("int64")
+    remainder = int(round(total)) - int(out.sum())
+    if remainder > 0:
+        out[np.argsort(out - raw)[:remainder]] += 1
+    return out
+
+
+def day_calendar(start_date: datetime, days: int, festival_multipliers: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """ข้อมูลปฏิทินต่อวันจำลอง (วันที่, เดือน, ฤดูกาล, เทศกาล) — คำนวณครั้งเดียวต่อ run"""
+    dates = [start_date + timedelta(days=d) for d in range(days)]
+    return {
+        "dates": dates,
+        "months": np.fromiter((dt.month for dt in dates), dtype="int64", count=days),
+        "festival_multiplier": np.fromiter(
+            (get_festival_multiplier(dt, festival_multipliers) for dt in dates), dtype="float64", count=days
+        ),
+    }
+
+
+class SkuBrandSimulation:
+    """จำลองสต็อกระดับสินค้า (SKU) ของแบรนด์เดียวแบบ vectorized
+
+    ความต้องการต่อสินค้า = Poisson(share × base × seasonality × festival × สุ่มรายวัน)
+    สร้างเป็น matrix (products × days) ครั้งเดียว แล้ววนตามวันโดยทุกขั้น (ขาย,
+    เติมรอบ, reorder) เป็น array op บนทุกสินค้าพร้อมกัน ผลระดับแบรนด์ (sales_data,
+    events, aggregators) rollup จากระดับสินค้า จึงใช้กับ ResultStages ได้เหมือน
+    BrandSimulation
+    """
+
+    def __init__(
+        self,
+        brand_name: str,
+        config: Any,
+        brand_params: Dict[str, Any],
+        product_params: Dict[str, Dict[str, Any]],
+        start_date: Optional[datetime] = None,
+        festival_multipliers: Optional[Dict[str, float]] = None,
+        aggregators: Optional[List[Aggregator]] = None,
+        rng: Optional[np.random.Generator] = None,
+        on_month_end: Optional[Callable[[Dict[str, Any], datetime], None]] = None
+    ):
+        self.brand_name = brand_name
+        self.start_date = start_date if start_date else datetime(2024, 1, 1)
+        self.festival_multipliers = festival_multipliers if festival_multipliers else {}
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        params = brand_params.get(brand_name, {})
+        calc = params.get('calculated_config', {})
+
+        # Config (ค่าระดับแบรนด์ แบ่งลงสินค้าตามสัดส่วน)
+        self.initial_stock = config.initial_stock if config.initial_stock else calc.get('initial_stock', 1000)
+        self.restock_days = config.restock_days if config.restock_days else calc.get('restock_days', 25)
+        self.restock_quantity = config.restock_quantity if config.restock_quantity else calc.get('restock_quantity', 500)
+        self.reorder_quantity = config.reorder_quantity if config.reorder_quantity else calc.get('reorder_quantity', 500)
+        self.reorder_point = config.reorder_point if config.reorder_point else calc.get('reorder_point', 200)
+        self.demand_multiplier = config.demand_multiplier if config.demand_multiplier else 1.0
+        self.enable_reorder = config.enable_reorder if config.enable_reorder is not None else True
+
+        self.base_daily_demand = params.get('base_demand', 50) * self.demand_multiplier
+        self.seasonality_factors = params.get('seasonality', {m: 1.0 for m in range(1, 13)})
+        self.monthly_baseline_units = params.get('monthly_baseline_units', {m: self.base_daily_demand * 30 for m in range(1, 13)})
+        self.avg_price = params.get('avg_price', 100)
+
+        # สินค้า (ไม่มีข้อมูลระดับสินค้า → สินค้าเดียวแทนทั้งแบรนด์)
+        prod = product_params.get(brand_name)
+        if prod and len(prod['products']) > 0:
+            self.products = prod['products']
+            self.shares = prod['shares']
+            self.product_prices = prod['avg_price']
+        else:
+            self.products = np.array([brand_name], dtype=object)
+            self.shares = np.ones(1)
+            self.product_prices = np.array([float(self.avg_price)])
+
+        n = len(self.products)
+        self.initial_stock_p = allocate_by_share(self.initial_stock, self.shares)
+        self.restock_quantity_p = np.maximum(1, np.rint(self.restock_quantity * self.shares)).astype("int64")
+        self.reorder_quantity_p = np.maximum(1, np.rint(self.reorder_quantity * self.shares)).astype("int64")
+        self.reorder_point_p = self.reorder_point * self.shares
+
+        # Lead time: order ของทุกสินค้าในวันเดียวกันใช้ lead time เดียวกัน
+        self.max_lead_time, self._next_lead_time = lead_time_sampler(config, self.rng)
+
+        # ผลระดับสินค้า (products × days) หลัง run()
+        self.demand = np.zeros((n, 0), dtype="int32")
+        self.sales = np.zeros((n, 0), dtype="int32")
+        self.stock_after = np.zeros((n, 0), dtype="int32")
+
+        # Stats & logs ระดับแบรนด์ (รูปแบบเดียวกับ BrandSimulation)
+        self.sales_data = []
+        self.restock_events = []
+        self.reorder_point_events = []
+        self.festival_events = []
+        self.season_events = []
+        self.trend_events = []
+        self.on_month_end = on_month_end
+
+        self._aggregators = list(aggregators) if aggregators is not None else default_aggregators()
+        self.aggregators: Dict[str, Aggregator] = {a.name: a for a in self._aggregators}
+
+    def aggregate(self, name: str) -> Any:
+        agg = self.aggregators.get(name)
+        return agg.result(self) if agg is not None else None
+
+    def demand_mean(self, cal: Dict[str, Any], season: np.ndarray, variation: np.ndarray) -> np.ndarray:
+        """ค่าเฉลี่ยความต้องการต่อสินค้าต่อวัน (products × days)"""
+        brand_mean = self.base_daily_demand * season * cal["festival_multiplier"] * variation
+        return np.outer(self.shares, brand_mean)
+
+    def draw_demand(self, cal: Dict[str, Any]):
+        """(seasonality รายวันของแบรนด์, สุ่มรายวัน, ความต้องการ products × days)"""
+        days = len(cal["dates"])
+        season = np.array([self.seasonality_factors.get(int(m), 1.0) for m in range(13)], dtype="float64")[cal["months"]]
+        variation = self.rng.uniform(0.7, 1.3, size=days)
+        demand = self.rng.poisson(self.demand_mean(cal, season, variation)).astype("int32")
+        return season, variation, demand
+
+    def run(self, simulation_days: int, cancel: Optional[CancelToken] = None) -> "SkuBrandSimulation":
+        days = int(simulation_days)
+        cal = day_calendar(self.start_date, days, self.festival_multipliers)
+        season, variation, demand = self.draw_demand(cal)
+
+        n = len(self.products)
+        sales = np.empty((n, days), dtype="int32")
+        stock_after = np.empty((n, days), dtype="int32")
+
+        reorder_qty = np.zeros(days, dtype="int64")
+        reorder_skus = np.zeros(days, dtype="int64")
+        on_order_at_check = np.zeros(days, dtype="int64")
+        stock_pre_restock = np.zeros(days, dtype="int64")
+        arrivals: List[List[tuple]] = [[] for _ in range(days)]
+
+        pipeline = InTransitPipeline(self.max_lead_time, shape=(n,))
+        reorder_active = self.reorder_point > 0
+        stock = self.initial_stock_p.astype("int64").copy()
+        for d in range(days):
+            if cancel is not None:
+                cancel.check(d)
+            s = np.minimum(demand[:, d], stock)
+            stock -= s
+            sales[:, d] = s
+            if d > 0 and d % self.restock_days == 0:
+                pipeline.place(d, self._next_lead_time(), self.restock_quantity_p, 'periodic')
+            elif reorder_active:
+                # inventory position (สต็อก + ของที่สั่งแล้ว) ต่อสินค้า
+                mask = stock + pipeline.on_order <= self.reorder_point_p
+                k = int(np.count_nonzero(mask))
+                if k:
+                    reorder_skus[d] = k
+                    on_order_at_check[d] = int(pipeline.on_order.sum())
+                    if self.enable_reorder:
+                        q = np.where(mask, self.reorder_quantity_p, 0)
+                        reorder_qty[d] = q.sum()
+                        pipeline.place(d, self._next_lead_time(), q, 'reorder')
+            stock_pre_restock[d] = stock.sum()
+            qty, orders = pipeline.receive(d)
+            if orders:
+                stock += qty
+                arrivals[d] = orders
+            stock_after[:, d] = stock
+
+        self.demand, self.sales, self.stock_after = demand, sales, stock_after
+        self._rollup(cal, season, variation, reorder_qty, reorder_skus, on_order_at_check, stock_pre_restock, arrivals)
+        return self
+
+    def _rollup(self, cal, season, variation, reorder_qty, reorder_skus, on_order_at_check, stock_pre_restock, arrivals):
+        """รวมผลระดับสินค้าเป็นรายวันระดับแบรนด์ + events + aggregators"""
+        b_demand = self.demand.sum(axis=0, dtype="int64")
+        b_sales = self.sales.sum(axis=0, dtype="int64")
+        b_revenue = self.product_prices @ self.sales
+        b_stock_after = self.stock_after.sum(axis=0, dtype="int64")
+        b_stock_before = np.concatenate(([int(self.initial_stock_p.sum())], b_stock_after[:-1]))
+
+        month_sales: Dict[int, int] = {}
+        prev_month_sales: Optional[int] = None
+        for d, current_date in enumerate(cal["dates"]):
+            date_str = current_date.strftime('%Y-%m-%d')
+            season_info = get_season_info(current_date)
+            festival_name, _ = get_festival_info(current_date)
+            festival_multiplier = float(cal["festival_multiplier"][d])
+            sales_d = int(b_sales[d])
+            demand_d = int(b_demand[d])
+            revenue_d = float(b_revenue[d])
+
+            entry = {
+                'day': d,
+                'date': date_str,
+                'brand': self.brand_name,
+                'demand': demand_d,
+                'stock_before': int(b_stock_before[d]),
+                'revenue': revenue_d,
+                'price_per_unit': float(revenue_d / sales_d) if sales_d > 0 else float(self.avg_price),
+                'season': season_info['season'],
+                'season_type': season_info['season_type'],
+                'quarter': season_info['quarter'],
+                'festival': festival_name,
+                'festival_multiplier': festival_multiplier,
+                'sales': sales_d,
+                'stock_after': int(b_stock_after[d]),
+                # ระดับแบรนด์: มีสินค้าใดขาดจนขายไม่ได้ตามความต้องการ
+                'stockout': int(demand_d > sales_d),
+                'lost_sales': demand_d - sales_d
+            }
+            self.sales_data.append(entry)
+
+            seasonality = float(season[d])
+            base_without_factors = self.base_daily_demand * variation[d]
+            if seasonality > 1:
+                self.season_events.append({
+                    'day': d,
+                    'date': date_str,
+                    'season_name': season_info['season'],
+                    'season_type': season_info['season_type'],
+                    'multiplier': seasonality,
+                    'demand_increase': float((seasonality - 1) * base_without_factors * festival_multiplier)
+                })
+            if festival_multiplier > 1:
+                self.festival_events.append({
+                    'day': d,
+                    'date': date_str,
+                    'festival_name': festival_name,
+                    'multiplier': festival_multiplier,
+                    'demand_increase': float((festival_multiplier - 1) * base_without_factors * seasonality)
+                })
+
+            if reorder_skus[d] > 0:
+                self.reorder_point_events.append({
+                    'day': d,
+                    'brand': self.brand_name,
+                    'stock_level': int(stock_pre_restock[d]),
+                    'reorder_point': int(self.reorder_point),
+                    'reorder_quantity': int(reorder_qty[d]),
+                    'triggered': bool(self.enable_reorder),
+                    'on_order': int(on_order_at_check[d])
+                })
+            stock_level = int(stock_pre_restock[d])
+            for order_day, arrival_day, kind, qty in arrivals[d]:
+                self.restock_events.append({
+                    'day': d,
+                    'brand': self.brand_name,
+                    'quantity': int(qty),
+                    'stock_before': stock_level,
+                    'stock_after': stock_level + int(qty),
+                    'type': kind,
+                    'order_day': int(order_day),
+                    'arrival_day': int(arrival_day)
+                })
+                stock_level += int(qty)
+
+            for agg in self._aggregators:
+                agg.update(entry, current_date)
+
+            # month-end trend event (เหมือน BrandSimulation._emit_month_trend_if_needed)
+            yyyymm = current_date.year * 100 + current_date.month
+            month_sales[yyyymm] = month_sales.get(yyyymm, 0) + sales_d
+            if (current_date + timedelta(days=1)).month != current_date.month:
+                sales_m = month_sales[yyyymm]
+                row = month_trend_row(
+                    self.brand_name, current_date.month, sales_m,
+                    float(self.monthly_baseline_units.get(current_date.month, self.base_daily_demand * 30)),
+                    float(self.seasonality_factors.get(current_date.month, 1.0)),
+                    prev_month_sales
+                )
+                self.trend_events.append(row)
+                prev_month_sales = sales_m
+                if self.on_month_end is not None:
+                    self.on_month_end(row, current_date)
+
+    def product_summary(self) -> List[Dict[str, Any]]:
+        """สรุปต่อสินค้าทั้งช่วงจำลอง (คำนวณจาก matrix ทั้งก้อน)"""
+        total_demand = self.demand.sum(axis=1, dtype="int64")
+        total_sales = self.sales.sum(axis=1, dtype="int64")
+        lost = total_demand - total_sales
+        stockout_days = (self.demand > self.sales).sum(axis=1)
+        revenue = total_sales * self.product_prices
+        final_stock = self.stock_after[:, -1] if self.stock_after.shape[1] else self.initial_stock_p
+        rows = []
+        for i, product in enumerate(self.products):
+            rows.append({
+                'brand': self.brand_name,
+                'product': str(product),
+                'demand_share': float(self.shares[i]),
+                'total_demand': int(total_demand[i]),
+                'total_units_sold': int(total_sales[i]),
+                'total_lost_sales': int(lost[i]),
+                'lost_sales_rate': float(lost[i] / total_demand[i] * 100) if total_demand[i] > 0 else 0.0,
+                'stockout_days': int(stockout_days[i]),
+                'total_revenue': float(revenue[i]),
+                'final_stock': int(final_stock[i])
+            })
+        return rows
+
+
+def run_stacked(
+    simulations: List[SkuBrandSimulation],
+    simulation_days: int,
+    cancel: Optional[CancelToken] = None,
+    pool: Optional[Callable[[np.ndarray], Any]] = None
+) -> None:
+    """จำลองหลายแบรนด์พร้อมกันเป็น matrix เดียว (แถว = หน่วยของทุกแบรนด์ต่อกัน) แล้ว rollup ต่อแบรนด์
+
+    ผลต่อแบรนด์เหมือน SkuBrandSimulation.run ทีละแบรนด์ (random stream ของแต่ละแบรนด์ใช้ตามลำดับเดิม)
+    แต่ทุกขั้นรายวัน (ขาย, เติมรอบ, reorder, ของเข้า) เป็น array op ครั้งเดียวบนทุกแถวของทุกแบรนด์
+    แบรนด์ต้องใช้ start_date และเทศกาลเดียวกัน
+
+    pool: factory(brand_of) → AllocationPool (simulation/allocation.py) — order ของทุกแถวในวันเดียวกัน
+    ถูกตัดให้อยู่ในข้อจำกัดร่วมก่อนสั่ง แบรนด์ที่ไม่ได้รับเลยไม่เกิด order ในวันนั้น
+    """
+    if not simulations:
+        return
+    days = int(simulation_days)
+    first = simulations[0]
+    cal = day_calendar(first.start_date, days, first.festival_multipliers)
+    draws = [sim.draw_demand(cal) for sim in simulations]
+
+    sizes = np.array([len(sim.products) for sim in simulations])
+    brand_of = np.repeat(np.arange(len(simulations)), sizes)
+    b = len(simulations)
+    demand = np.concatenate([draw[2] for draw in draws])
+    sales = np.empty_like(demand)
+    stock_after = np.empty_like(demand)
+
+    restock_days = np.array([sim.restock_days for sim in simulations], dtype="int64")
+    reorder_active = np.array([sim.reorder_point > 0 for sim in simulations])
+    enable = np.array([sim.enable_reorder for sim in simulations])
+    restock_qty = np.concatenate([sim.restock_quantity_p for sim in simulations])
+    reorder_qty = np.concatenate([sim.reorder_quantity_p for sim in simulations])
+    reorder_point = np.concatenate([sim.reorder_point_p for sim in simulations])
+    stock = np.concatenate([sim.initial_stock_p for sim in simulations]).astype("int64")
+
+    size = max(sim.max_lead_time for sim in simulations) + 1
+    ring = np.zeros((size, len(stock)), dtype="int64")
+    on_order = np.zeros(len(stock), dtype="int64")
+    # ต่อช่อง: [(แบรนด์, order_day, arrival_day, kind, qty)]
+    slot_orders: List[List[tuple]] = [[] for _ in range(size)]
+
+    reorder_total = np.zeros((b, days), dtype="int64")
+    reorder_units = np.zeros((b, days), dtype="int64")
+    on_order_at_check = np.zeros((b, days), dtype="int64")
+    stock_pre_restock = np.zeros((b, days), dtype="int64")
+    arrivals: List[List[List[tuple]]] = [[[] for _ in range(days)] for _ in range(b)]
+    lead = np.zeros(b, dtype="int64")
+
+    allocator = pool(brand_of) if pool is not None else None
+    if allocator is not None and allocator.rule == "greedy":
+        # ความต้องการคาดการณ์สะสม (ไม่รวมสุ่มรายวัน) → ส่วนที่ขาดถึงรอบเติมถัดไปต่อแถว
+        expected = np.concatenate([
+            sim.demand_mean(cal, draw[0], np.ones(days)) for sim, draw in zip(simulations, draws)
+        ])
+        expected_cum = np.concatenate((np.zeros((len(stock), 1)), np.cumsum(expected, axis=1)), axis=1)
+        horizon = np.array([sim.max_lead_time + sim.restock_days for sim in simulations], dtype="int64")[brand_of]
+        row_index = np.arange(len(stock))
+
+    for d in range(days):
+        if cancel is not None:
+            cancel.check(d)
+        s = np.minimum(demand[:, d], stock)
+        stock -= s
+        sales[:, d] = s
+
+        periodic = (restock_days > 0) & (d > 0) & (d % np.maximum(restock_days, 1) == 0)
+        check = ~periodic & reorder_active
+        mask = check[brand_of] & (stock + on_order <= reorder_point)
+        triggered = np.bincount(brand_of, weights=mask, minlength=b).astype("int64")
+        placing = periodic | ((triggered > 0) & enable)
+        if triggered.any():
+            reorder_units[:, d] = triggered
+            on_order_at_check[:, d] = np.where(triggered > 0, np.bincount(brand_of, weights=on_order, minlength=b), 0)
+        if placing.any():
+            qty = np.where(periodic[brand_of], restock_qty, np.where(mask & enable[brand_of], reorder_qty, 0))
+            if allocator is not None:
+                need = rate = None
+                if allocator.rule == "greedy":
+                    end = np.minimum(d + horizon, days)
+                    ahead = expected_cum[row_index, end] - expected_cum[:, d]
+                    need = np.maximum(0, np.ceil(ahead - stock - on_order)).astype("int64")
+                    rate = ahead / np.maximum(end - d, 1)
+                qty = allocator.grant(d, qty, stock, on_order, need, rate)
+            totals = np.bincount(brand_of, weights=qty, minlength=b).astype("int64")
+            if allocator is not None:
+                placing &= totals > 0
+            for i in np.flatnonzero(placing):
+                lead[i] = simulations[i]._next_lead_time()
+                if lead[i] >= size or lead[i] < 0:
+                    raise ValueError(f"lead_time {lead[i]} outside pipeline capacity {size - 1}")
+                slot_orders[(d + lead[i]) % size].append((i, d, d + int(lead[i]), 'periodic' if periodic[i] else 'reorder', int(totals[i])))
+                if not periodic[i]:
+                    reorder_total[i, d] = totals[i]
+            rows = np.flatnonzero(qty)
+            ring[(d + lead[brand_of[rows]]) % size, rows] += qty[rows]
+            on_order += qty
+
+        stock_pre_restock[:, d] = np.bincount(brand_of, weights=stock, minlength=b)
+        slot = d % size
+        if slot_orders[slot]:
+            arrived = ring[slot].copy()
+            ring[slot] = 0
+            stock += arrived
+            on_order -= arrived
+            for i, order_day, arrival_day, kind, q in slot_orders[slot]:
+                arrivals[i][d].append((order_day, arrival_day, kind, q))
+            slot_orders[slot] = []
+        stock_after[:, d] = stock
+
+    bounds = np.concatenate(([0], np.cumsum(sizes)))
+    for i, sim in enumerate(simulations):
+        rows = slice(bounds[i], bounds[i + 1])
+        sim.demand, sim.sales, sim.stock_after = demand[rows], sales[rows], stock_after[rows]
+        season, variation, _ = draws[i]
+        sim._rollup(
+            cal, season, variation, reorder_total[i], reorder_units[i], on_order_at_check[i],
+            stock_pre_restock[i], arrivals[i]
+        )
@@ -0,0 +1,19 @@
+import random
+import zlib
+
+import numpy as np
+
+
+def brand_random(seed: int, brand_name: str) -> random.Random:
+    """random stream ของแบรนด์สำหรับ BrandSimulation (seed เดียวกัน → ผลเดิมทุก process)"""
+    return random.Random(f"{seed}:{brand_name}")
+
+
+def brand_generator(seed: int, brand_name: str) -> np.random.Generator:
+    """numpy Generator ของแบรนด์สำหรับโหมดระดับสินค้า (แยก stream ต่อแบรนด์ด้วย crc32 ของชื่อ)"""
+    return np.random.default_rng([seed, zlib.crc32(brand_name.encode("utf-8"))])
+
+
+def lead_time_generator(seed: int, brand_name: str) -> np.random.Generator:
+    """stream ของ lead time แยกจาก demand: เปลี่ยนรูปแบบ lead time แล้ว demand draw ยังเหมือนเดิม"""
+    return np.random.default_rng([seed, zlib.crc32(brand_name.encode("utf-8")), 1])
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# ให้ import แบบเดียวกับตอนรัน uvicorn จาก backend/ (models, services, simulation, utils)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
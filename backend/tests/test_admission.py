@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from services.admission import AdmissionController, estimate_cost, resolve_deadline
+
+
+def test_estimate_cost_counts_shared_stages_once():
+    base = estimate_cost(100, 4, [])
+    assert base == 4 * 100
+    assert estimate_cost(100, 4, [], granularity="product") == 4 * base
+    both = estimate_cost(100, 4, ["product_monthly_trends", "product_trend_events"])
+    assert both == estimate_cost(100, 4, ["product_monthly_trends"])
+    # product trends โตตามวันแค่ปีแรก
+    long_run = estimate_cost(3650, 1, ["product_monthly_trends"]) - estimate_cost(3650, 1, [])
+    assert long_run == estimate_cost(366, 1, ["product_monthly_trends"]) - estimate_cost(366, 1, [])
+
+
+def test_resolve_deadline():
+    assert resolve_deadline(1e6) == 300.0
+    with pytest.raises(HTTPException) as e:
+        resolve_deadline(0)
+    assert e.value.status_code == 400
+
+
+def _occupy(controller, cost=1.0, deadline=60.0):
+    """ถือ slot ไว้ใน thread จนกว่าจะ set event ที่คืนให้"""
+    admitted, release = threading.Event(), threading.Event()
+
+    def run():
+        with controller.admit(cost, deadline):
+            admitted.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert admitted.wait(5)
+    return release, thread
+
+
+def test_idle_server_admits_even_when_estimate_exceeds_deadline():
+    controller = AdmissionController(1, 4, seconds_per_unit=1.0)
+    controller.calibrated = True
+    with controller.admit(cost=100.0, deadline_seconds=1.0) as cancel:
+        assert 0 < cancel.remaining() <= 1.0
+    assert controller.stats()["admitted"] == 1
+
+
+def test_busy_server_rejects_requests_that_cannot_meet_the_deadline():
+    controller = AdmissionController(1, 4, seconds_per_unit=1.0)
+    controller.calibrated = True
+    release, thread = _occupy(controller, cost=10.0)
+    try:
+        # ไม่มีทางทันแม้คิวว่าง → ไม่มี Retry-After
+        with pytest.raises(HTTPException) as e:
+            with controller.admit(cost=20.0, deadline_seconds=15.0):
+                pass
+        assert e.value.status_code == 503 and e.value.headers is None
+        # รอคิว (~10s) + รัน 2s เกิน deadline 5s → Retry-After ตามเวลาที่ต้องรอ
+        with pytest.raises(HTTPException) as e:
+            with controller.admit(cost=2.0, deadline_seconds=5.0):
+                pass
+        assert 9 <= int(e.value.headers["Retry-After"]) <= 10
+    finally:
+        release.set()
+        thread.join()
+    assert controller.stats()["rejected"] == 2
+
+
+def test_full_queue_is_rejected():
+    controller = AdmissionController(1, 0)
+    release, thread = _occupy(controller)
+    try:
+        with pytest.raises(HTTPException) as e:
+            with controller.admit(cost=1.0, deadline_seconds=60.0):
+                pass
+        assert "queue is full" in e.value.detail and "Retry-After" in e.value.headers
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_queued_request_runs_after_the_slot_frees():
+    controller = AdmissionController(1, 2)
+    release, thread = _occupy(controller)
+    order = []
+
+    def queued():
+        with controller.admit(cost=1.0, deadline_seconds=10.0):
+            order.append("queued")
+
+    waiter = threading.Thread(target=queued)
+    waiter.start()
+    time.sleep(0.1)
+    assert controller.stats()["queued"] == 1 and not order
+    order.append("release")
+    release.set()
+    thread.join()
+    waiter.join(5)
+    assert order == ["release", "queued"]
+    assert controller.stats()["queued"] == 0
+
+
+def test_deadline_passes_while_queued():
+    controller = AdmissionController(1, 2)
+    release, thread = _occupy(controller)
+    try:
+        started = time.monotonic()
+        with pytest.raises(HTTPException) as e:
+            with controller.admit(cost=1.0, deadline_seconds=0.2):
+                pass
+        assert "deadline passed while queued" in e.value.detail
+        assert time.monotonic() - started < 2
+        assert controller.stats()["queued"] == 0
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_first_completed_run_calibrates_then_ewma():
+    controller = AdmissionController(1, 1, seconds_per_unit=123.0)
+    assert not controller.calibrated
+    with controller.admit(cost=1000.0, deadline_seconds=10.0):
+        time.sleep(0.05)
+    first = controller.seconds_per_unit
+    assert controller.calibrated and 4e-5 < first < 1e-3
+    with controller.admit(cost=1000.0, deadline_seconds=10.0):
+        pass
+    assert controller.seconds_per_unit < first
@@ -0,0 +1,103 @@
+"""aggregator แบบ streaming ต้องให้ผลเท่ากับการสรุปจาก sales_data ด้วย pandas แบบเดิม"""
+from datetime import datetime
+
+import pandas as pd
+import pytest
+import simpy
+
+from models.pydantic import BrandConfig
+from simulation.aggregators import StockoutAggregator, classify_month_trend
+from simulation.brand_simulation import BrandSimulation
+from simulation.streams import brand_random, lead_time_generator
+
+BRAND = "PUMA"
+BASE_DEMAND = 90
+SEASONALITY = {m: 0.7 + 0.05 * m for m in range(1, 13)}
+BRAND_PARAMS = {
+    BRAND: {
+        "base_demand": BASE_DEMAND,
+        "avg_price": 60.0,
+        "seasonality": SEASONALITY,
+        "monthly_baseline_units": {m: SEASONALITY[m] * BASE_DEMAND * 30 for m in range(1, 13)},
+        "calculated_config": {
+            "initial_stock": 1500,
+            "restock_days": 30,
+            "restock_quantity": 1200,
+            "reorder_quantity": 900,
+            "reorder_point": 300,
+        },
+    }
+}
+
+
+@pytest.fixture(scope="module", params=[BrandConfig(), BrandConfig(enable_reorder=False, restock_days=45)])
+def sim(request):
+    env = simpy.Environment()
+    sim = BrandSimulation(
+        env=env,
+        brand_name=BRAND,
+        config=request.param,
+        brand_params=BRAND_PARAMS,
+        start_date=datetime(2024, 3, 10),
+        rng=brand_random(3, BRAND),
+        lead_rng=lead_time_generator(3, BRAND),
+    )
+    # > 1 ปี: เดือนเดียวกันของสองปีรวมเป็นแถวเดียว
+    env.run(until=420)
+    return sim
+
+
+@pytest.fixture(scope="module")
+def daily(sim):
+    df = pd.DataFrame(sim.sales_data)
+    df["month"] = pd.to_datetime(df["date"]).dt.month
+    return df
+
+
+def test_monthly_totals(sim, daily):
+    agg = daily.groupby("month").agg({"sales": "sum", "revenue": "sum", "stock_after": "mean", "stockout": "sum"})
+    rows = sim.aggregate("monthly_data")
+    assert [r["month"] for r in rows] == list(agg.index)
+    for r in rows:
+        expected = agg.loc[r["month"]]
+        assert r["total_sales"] == int(expected["sales"])
+        assert r["total_revenue"] == pytest.approx(expected["revenue"])
+        assert r["avg_stock"] == pytest.approx(expected["stock_after"])
+        assert r["stockout_days"] == int(expected["stockout"])
+
+
+def test_monthly_trends(sim, daily):
+    sales = daily.groupby("month")["sales"].sum()
+    prev = None
+    for r, (m, sales_m) in zip(sim.aggregate("monthly_trends"), sales.items()):
+        baseline = BRAND_PARAMS[BRAND]["monthly_baseline_units"][m]
+        growth = (sales_m - baseline) / baseline
+        mom = (sales_m - prev) / prev if prev else None
+        assert (r["month"], r["sales"]) == (m, sales_m)
+        assert r["growth_vs_baseline"] == pytest.approx(growth)
+        assert r["mom_growth"] == (pytest.approx(mom) if mom is not None else None)
+        assert r["trend"] == classify_month_trend(growth, mom)
+        prev = sales_m
+
+
+def test_summary(sim, daily):
+    s = sim.aggregate("summary")
+    demand, lost = daily["demand"].sum(), daily["lost_sales"].sum()
+    assert s["total_units_sold"] == int(daily["sales"].sum())
+    assert s["total_revenue"] == pytest.approx(daily["revenue"].sum())
+    assert s["transactions"] == int((daily["sales"] > 0).sum())
+    assert s["restock_count"] == len(sim.restock_events)
+    assert s["stockout_days"] == int((daily["stockout"] > 0).sum())
+    assert s["avg_stock"] == pytest.approx(daily["stock_after"].mean())
+    assert s["final_stock"] == int(daily["stock_after"].iloc[-1])
+    assert s["total_lost_sales"] == int(lost)
+    assert s["lost_sales_rate"] == pytest.approx(lost / demand * 100)
+
+
+def test_longest_stockout_streak():
+    agg = StockoutAggregator()
+    for stockout in [0, 1, 1, 0, 1, 1, 1, 0, 1]:
+        agg.update({"demand": 10, "lost_sales": 5 * stockout, "stockout": stockout}, datetime(2024, 1, 1))
+    out = agg.result(None)
+    assert (out["stockout_days"], out["longest_stockout_streak"], out["total_lost_sales"]) == (6, 3, 30)
+    assert out["lost_sales_rate"] == pytest.approx(30 / 90 * 100)
@@ -0,0 +1,109 @@
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from models.pydantic import BrandConfig
+from simulation.allocation import AllocationPool, allocate_in_order
+from simulation.sku_simulation import SkuBrandSimulation, run_stacked
+from simulation.streams import brand_generator
+
+ZERO = np.zeros(3, dtype="int64")
+
+
+def _pool(kind="budget", limit=100, rule="proportional", cost=(1.0, 1.0, 1.0), rank=(0, 1, 2), period_days=1):
+    return AllocationPool(kind, limit, rule, np.array(cost), np.array(rank), np.arange(len(cost)), period_days=period_days)
+
+
+def test_budget_resets_when_the_period_changes_without_orders_on_its_first_day():
+    pool = _pool(limit=100, cost=(1.0,), rank=(0,), period_days=7)
+    one = np.zeros(1, dtype="int64")
+    assert pool.grant(3, np.array([100]), one, one).tolist() == [100]
+    assert pool.grant(5, np.array([10]), one, one).tolist() == [0]     # รอบเดิม งบหมดแล้ว
+    assert pool.grant(8, np.array([50]), one, one).tolist() == [50]    # วันที่ 7 ไม่มีใครสั่ง แต่รอบใหม่แล้ว
+    assert pool.grant(13, np.array([80]), one, one).tolist() == [50]
+
+
+def test_budget_counts_order_value():
+    pool = _pool(limit=32, cost=(10.0, 5.0, 1.0))
+    # ขอรวม 4 × 16 = 64 แต่งบ 32 → ทุกแถวได้ครึ่งหนึ่ง
+    assert pool.grant(0, np.array([4, 4, 4]), ZERO, ZERO).tolist() == [2, 2, 2]
+    summary = pool.summary(["A", "B", "C"])
+    assert [row["spend"] for row in summary] == [20.0, 10.0, 2.0]
+    assert [row["constrained_days"] for row in summary] == [1, 1, 1]
+
+
+def test_capacity_uses_inventory_position():
+    pool = _pool(kind="capacity", limit=1000, rule="priority", cost=(99.0, 99.0, 99.0))
+    stock, on_order = np.array([300, 200, 100]), np.array([0, 100, 0])
+    # เหลือที่ว่าง 300 ชิ้น (ต้นทุนไม่เกี่ยวกับ capacity) → ตามลำดับความสำคัญ
+    assert pool.grant(0, np.array([200, 200, 200]), stock, on_order).tolist() == [200, 100, 0]
+    assert pool.grant(1, np.array([50, 0, 0]), np.array([300, 200, 500]), on_order).tolist() == [0, 0, 0]
+
+
+def test_priority_follows_rank_not_row_order():
+    pool = _pool(limit=250, rule="priority", rank=(2, 0, 1))
+    assert pool.grant(0, np.array([100, 100, 100]), ZERO, ZERO).tolist() == [50, 100, 100]
+
+
+def test_unconstrained_requests_are_granted_in_full():
+    for rule in ("priority", "proportional", "greedy"):
+        pool = _pool(limit=1000, rule=rule)
+        assert pool.grant(0, np.array([100, 0, 300]), ZERO, ZERO).tolist() == [100, 0, 300]
+
+
+def test_greedy_fills_the_row_closest_to_stocking_out_first():
+    pool = _pool(limit=100, rule="greedy")
+    stock = np.array([0, 500, 50])
+    need = np.array([200, 0, 150])
+    rate = np.array([10.0, 10.0, 10.0])
+    granted = pool.grant(0, np.array([200, 200, 200]), stock, ZERO, need, rate)
+    assert granted.sum() <= 100 and granted[1] == 0
+    # days of cover เท่ากัน: 0 + 75 และ 50 + 25 → 7.5 วันทั้งคู่
+    assert granted.tolist() == [75, 0, 25]
+
+
+def test_allocate_in_order_gives_partial_to_the_last_row():
+    granted = allocate_in_order(np.array([30, 30, 30]), np.array([2.0, 2.0, 2.0]), 100)
+    assert granted.tolist() == [30, 20, 0]
+
+
+def test_invalid_kind_or_rule_is_rejected():
+    with pytest.raises(ValueError):
+        _pool(kind="space")
+    with pytest.raises(ValueError):
+        _pool(rule="random")
+
+
+def test_stacked_run_keeps_budget_per_period():
+    params = {
+        brand: {"base_demand": 60, "avg_price": 50.0, "seasonality": {m: 1.0 for m in range(1, 13)},
+                "calculated_config": {"initial_stock": 400, "restock_days": 10, "restock_quantity": 300,
+                                      "reorder_quantity": 400, "reorder_point": 200}}
+        for brand in ("NIKE", "PUMA")
+    }
+    sims = [
+        SkuBrandSimulation(brand, BrandConfig(), params, {}, datetime(2024, 1, 1), rng=brand_generator(3, brand))
+        for brand in params
+    ]
+    spent = defaultdict(float)
+    pools = []
+
+    def make_pool(brand_of):
+        pool = AllocationPool("budget", 20000, "proportional", np.full(len(brand_of), 50.0), brand_of, brand_of, period_days=7)
+        grant = pool.grant
+
+        def recording(day, *args):
+            granted = grant(day, *args)
+            spent[day // 7] += float((granted * pool.cost).sum())
+            return granted
+        pool.grant = recording
+        pools.append(pool)
+        return pool
+
+    run_stacked(sims, 90, pool=make_pool)
+    assert max(spent.values()) <= 20000
+    summary = pools[0].summary(list(params))
+    assert all(row["granted_units"] <= row["requested_units"] for row in summary)
+    assert any(row["constrained_days"] for row in summary)
@@ -0,0 +1,80 @@
+"""lane ของ BrandBatchSimulation ต้องเท่ากับ BrandSimulation ของ config เดียวกันที่ seed เดียวกัน
+(/compare, /sensitivity, /policies และ /backtest อาศัยข้อนี้)"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+import simpy
+
+from models.pydantic import BrandConfig
+from simulation.batch_simulation import BrandBatchSimulation
+from simulation.brand_simulation import BrandSimulation
+from simulation.streams import brand_random, lead_time_generator
+
+BRAND = "NIKE"
+BRAND_PARAMS = {
+    BRAND: {
+        "base_demand": 120,
+        "avg_price": 95.0,
+        "seasonality": {m: 0.8 + 0.04 * m for m in range(1, 13)},
+        "calculated_config": {
+            "initial_stock": 2000,
+            "restock_days": 20,
+            "restock_quantity": 1500,
+            "reorder_quantity": 1200,
+            "reorder_point": 600,
+        },
+    }
+}
+CONFIGS = [
+    BrandConfig(),
+    BrandConfig(reorder_point=900, reorder_quantity=2500, lead_time_days=3, lead_time_distribution="uniform", lead_time_spread=2),
+    BrandConfig(restock_days=7, restock_quantity=900, enable_reorder=False, lead_time_days=4, lead_time_distribution="poisson"),
+    BrandConfig(demand_multiplier=1.5, initial_stock=300, lead_time_days=2),
+]
+FESTIVALS = [None, {"valentine": 2.0}, None, {"songkran": 1.5}]
+SEEDS = [11, 12, 13]
+START = datetime(2024, 2, 1)
+DAYS = 200
+
+
+def run_brand_simulation(config, seed, festival):
+    env = simpy.Environment()
+    sim = BrandSimulation(
+        env=env,
+        brand_name=BRAND,
+        config=config,
+        brand_params=BRAND_PARAMS,
+        start_date=START,
+        festival_multipliers=festival,
+        rng=brand_random(seed, BRAND),
+        lead_rng=lead_time_generator(seed, BRAND),
+    )
+    env.run(until=DAYS)
+    return sim
+
+
+@pytest.fixture(scope="module")
+def batch_metrics():
+    batch = BrandBatchSimulation(BRAND, CONFIGS, BRAND_PARAMS, SEEDS, START, FESTIVALS)
+    return batch.run(DAYS)
+
+
+@pytest.mark.parametrize("v", range(len(CONFIGS)))
+@pytest.mark.parametrize("r", range(len(SEEDS)))
+def test_lane_matches_brand_simulation(batch_metrics, v, r):
+    sim = run_brand_simulation(CONFIGS[v], SEEDS[r], FESTIVALS[v])
+    lost = sum(entry["lost_sales"] for entry in sim.sales_data)
+    assert batch_metrics["total_units_sold"][v, r] == sim.total_units_sold
+    assert batch_metrics["total_lost_sales"][v, r] == lost
+    assert batch_metrics["total_demand"][v, r] == sim.total_units_sold + lost
+    assert batch_metrics["stockout_days"][v, r] == sim.stockout_days
+    assert batch_metrics["transactions"][v, r] == sim.total_sales_transactions
+    assert batch_metrics["restock_count"][v, r] == sim.restock_count
+    assert batch_metrics["final_stock"][v, r] == sim.stock
+    assert batch_metrics["total_revenue"][v, r] == pytest.approx(sim.total_revenue)
+
+
+def test_metric_shapes(batch_metrics):
+    for values in batch_metrics.values():
+        assert np.shape(values) == (len(CONFIGS), len(SEEDS))
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.data_service import _MOCK_BRAND_PARAMS, SUPPORTED_BRANDS, calculate_brand_parameters
+
+
+def _per_brand_reference(df: pd.DataFrame, brand: str):
+    """การคำนวณเดิม: กรอง df ทีละแบรนด์ → (base_demand, avg_price, seasonality)"""
+    bd = df[df['Brand'] == brand]
+    if len(bd) == 0 or bd['Units Sold'].sum() == 0:
+        mock = _MOCK_BRAND_PARAMS.get(brand, {'base_demand': 50, 'avg_price': 100})
+        return float(mock['base_demand']), float(mock['avg_price']), {m: 1.0 for m in range(1, 13)}
+    num_days = (bd['Invoice Date'].max() - bd['Invoice Date'].min()).days + 1
+    base = float(bd['Units Sold'].sum() / num_days)
+    monthly = bd.groupby(bd['Invoice Date'].dt.month)['Units Sold'].sum()
+    seasonality = {m: float(monthly[m] / monthly.mean()) if m in monthly.index else 1.0 for m in range(1, 13)}
+    vp = bd.loc[bd['Price per Unit'] > 0, 'Price per Unit']
+    if len(vp) > 0:
+        price = float(vp.mean())
+    else:
+        valid = bd[(bd['Total Sales'] > 0) & (bd['Units Sold'] > 0)]
+        price = float(valid['Total Sales'].sum() / valid['Units Sold'].sum()) if len(valid) else 100.0
+    return base, price, seasonality
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(5)
+    n = 3000
+    df = pd.DataFrame({
+        'Brand': rng.choice(['ADIDAS', 'NIKE', 'PUMA'], n),
+        'Invoice Date': pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 500, n), unit='D'),
+        'Units Sold': rng.integers(0, 40, n).astype(float),
+        'Price per Unit': rng.uniform(20, 80, n).round(2),
+    })
+    df['Total Sales'] = df['Units Sold'] * df['Price per Unit']
+    # PUMA ไม่มีราคาต่อหน่วย → ใช้ Total Sales / Units Sold
+    df.loc[df['Brand'] == 'PUMA', 'Price per Unit'] = 0.0
+    df.loc[df['Brand'] == 'PUMA', 'Total Sales'] *= 1.5
+    return df
+
+
+def test_grouped_pass_matches_per_brand_filtering(sales):
+    params = calculate_brand_parameters(sales)
+    assert set(params) == set(SUPPORTED_BRANDS)
+    for brand in SUPPORTED_BRANDS:
+        base, price, seasonality = _per_brand_reference(sales, brand)
+        p = params[brand]
+        assert p['base_demand'] == pytest.approx(base, rel=1e-12)
+        assert p['avg_price'] == pytest.approx(price, rel=1e-12)
+        assert p['seasonality'] == pytest.approx(seasonality, rel=1e-12)
+        assert p['calculated_config']['initial_stock'] == int(base * 30)
+
+    # loader เก็บ Brand เป็น categorical → ผลต้องเหมือนกัน
+    sales['Brand'] = pd.Categorical(sales['Brand'], categories=list(SUPPORTED_BRANDS))
+    assert calculate_brand_parameters(sales) == params
+
+
+def test_brand_without_rows_uses_mock_parameters(sales):
+    params = calculate_brand_parameters(sales[sales['Brand'] != 'NIKE'])
+    assert params['NIKE']['base_demand'] == float(_MOCK_BRAND_PARAMS['NIKE']['base_demand'])
+    assert params['NIKE']['seasonality'] == {m: 1.0 for m in range(1, 13)}
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from services.data_service import _parse_invoice_dates, detect_date_format, parse_dates_unique
+
+
+@pytest.mark.parametrize("values, expected", [
+    (["2021-01-05", "2021-12-31"], "%Y-%m-%d"),
+    # วันที่ 13 ขึ้นไปตัดสิน dayfirst / monthfirst ได้
+    (["05/01/2021", "31/12/2021"], "%d/%m/%Y"),
+    (["01/05/2021", "12/31/2021"], "%m/%d/%Y"),
+    # กำกวมทั้งหมด → dayfirst ก่อน (เหมือน dayfirst=True เดิม)
+    (["01/02/2021", "03/04/2021"], "%d/%m/%Y"),
+    (["5.1.2021", "31.12.2021"], "%d.%m.%Y"),
+    (["2021-01-05 10:30:00"], "%Y-%m-%d %H:%M:%S"),
+])
+def test_detect_date_format(values, expected):
+    assert detect_date_format(pd.Series(values + [None, ""])) == expected
+
+
+def test_detect_date_format_undetectable():
+    assert detect_date_format(pd.Series(["2021-01-05", "Jan 7 2021"])) is None
+    assert detect_date_format(pd.Series([None, " "])) is None
+
+
+def test_parse_dates_unique_matches_dayfirst_parse():
+    raw = pd.Series(["31/12/2021", "01/02/2021", None, "31/12/2021", "2021-03-04", "01/02/2021"])
+    parsed, fmt = parse_dates_unique(raw, detect=True)
+    assert fmt is None   # ค่า ISO ปนมา → ไม่มี format เดียวที่ครบ
+    expected = pd.to_datetime(raw, dayfirst=True, format="mixed", errors="coerce")
+    pd.testing.assert_series_equal(parsed, expected, check_names=False)
+
+    parsed, fmt = parse_dates_unique(raw.iloc[:2], detect=True)
+    assert fmt == "%d/%m/%Y"
+    assert list(parsed) == [pd.Timestamp(2021, 12, 31), pd.Timestamp(2021, 2, 1)]
+
+
+def test_parse_invoice_dates_caches_format_per_file(tmp_path):
+    path = tmp_path / "brand.csv"
+    path.write_text("x")
+    df = _parse_invoice_dates(pd.DataFrame({"Invoice Date": ["12/31/2021", "01/02/2021"]}), str(path))
+    assert list(df["Invoice Date"]) == [pd.Timestamp(2021, 12, 31), pd.Timestamp(2021, 1, 2)]
+    # ไฟล์เดิม (signature เดิม) ใช้ format ที่ตรวจไว้ แม้ค่าใหม่จะกำกวม
+    df = _parse_invoice_dates(pd.DataFrame({"Invoice Date": ["01/02/2021"]}), str(path))
+    assert list(df["Invoice Date"]) == [pd.Timestamp(2021, 1, 2)]
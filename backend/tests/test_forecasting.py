@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.forecasting import ForecastFit, fit_holt_winters, fit_seasonal_naive, fit_ses
+from utils.history_index import HistoryIndex
+
+PATTERN = np.array([10.0, 20.0, 30.0, 40.0])
+DATES = pd.date_range("2021-01-01", "2023-12-31", freq="D")
+SEASONAL = (10 + 5 * (DATES.month % 4)).to_numpy(dtype="float64")
+
+
+def ses_reference(y, alpha, m):
+    level, total = y[0], 0.0
+    for t in range(1, len(y)):
+        if t >= m:
+            total += abs(y[t] - level)
+        level += alpha * (y[t] - level)
+    return total / (len(y) - m), level
+
+
+def holt_winters_reference(y, alpha, gamma, m):
+    level = y[:m].mean()
+    season = list(y[:m] - level)
+    total = 0.0
+    for t in range(m, len(y)):
+        s = season[t % m]
+        err = y[t] - level - s
+        total += abs(err)
+        level += alpha * err
+        season[t % m] = s + gamma * (y[t] - level - s)
+    return total / (len(y) - m), level, np.array(season)
+
+
+def test_batched_fits_match_one_series_at_a_time():
+    y = np.random.default_rng(0).poisson(50, size=(5, 30)).astype("float64")
+    ses = fit_ses(y, 4)
+    hw = fit_holt_winters(y, 4)
+    for i in range(len(y)):
+        mae, level = ses_reference(y[i], ses["alpha"][i], 4)
+        assert (ses["mae"][i], ses["level"][i]) == pytest.approx((mae, level))
+        # alpha ที่เลือกต้องดีที่สุดใน grid
+        assert ses["mae"][i] <= min(ses_reference(y[i], a, 4)[0] for a in (0.05, 0.3, 0.9)) + 1e-12
+
+        mae, level, season = holt_winters_reference(y[i], hw["alpha"][i], hw["gamma"][i], 4)
+        assert (hw["mae"][i], hw["level"][i]) == pytest.approx((mae, level))
+        assert hw["season"][i] == pytest.approx(season)
+
+
+def test_seasonal_series_is_forecast_exactly():
+    y = np.tile(PATTERN, 5)[None, :] + np.array([[0.0], [100.0]])
+    naive = fit_seasonal_naive(y, 4)
+    assert naive["mae"].tolist() == [0.0, 0.0]
+    assert naive["last_season"][1].tolist() == (PATTERN + 100).tolist()
+
+    hw = fit_holt_winters(y, 4)
+    assert hw["mae"] == pytest.approx([0.0, 0.0])
+    assert (hw["level"][:, None] + hw["season"]) == pytest.approx(y[:, :4])
+
+
+def test_constant_series_has_no_ses_error():
+    out = fit_ses(np.full((2, 10), 7.0), 3)
+    assert out["mae"].tolist() == [0.0, 0.0] and out["level"].tolist() == [7.0, 7.0]
+
+
+@pytest.fixture(scope="module")
+def index():
+    """NIKE/Shoes ขายตามรูปแบบรายเดือนซ้ำทุกปี, PUMA/Shirts ขายคงที่ (3 ปี รายวัน)"""
+    n = len(DATES)
+    return HistoryIndex(pd.DataFrame({
+        "Invoice Date": np.concatenate([DATES, DATES]),
+        "Brand": ["NIKE"] * n + ["PUMA"] * n,
+        "Product": ["Shoes"] * n + ["Shirts"] * n,
+        "Units Sold": np.concatenate([SEASONAL, np.full(n, 3.0)]),
+    }))
+
+
+def test_forecast_fit_on_history(index):
+    fit = ForecastFit(index, "month")
+    assert fit.y.shape == (2, 36)
+    names = [(fit.brands[b], fit.products[p]) for b, p in zip(fit.brand_codes, fit.product_codes)]
+    nike = names.index(("NIKE", "Shoes"))
+    assert fit.y[nike].sum() == pytest.approx(SEASONAL.sum())
+    assert fit.y[1 - nike].sum() == pytest.approx(3.0 * len(DATES))
+
+    models, values = fit.forecast("auto", 12)
+    # ยอดรายเดือนซ้ำเดิมทุกปี (ต่างกันแค่จำนวนวันใน ก.พ.) → โมเดลที่มีฤดูกาลชนะ และพยากรณ์ปีถัดไปใกล้ปีล่าสุด
+    assert models[nike] in ("seasonal_naive", "holt_winters")
+    assert values[nike] == pytest.approx(fit.y[nike, -12:], rel=0.05)
+    assert (values >= 0).all()
+
+    _, ses = fit.forecast("ses", 3)
+    assert (ses == ses[:, :1]).all()
+    assert fit.period_code(0) == fit.first_period + 36
+
+
+def test_short_history_only_fits_ses(index):
+    fit = ForecastFit(index, "week")   # 157 สัปดาห์ > 52 → ครบทุกโมเดล
+    assert set(fit.fits) == {"ses", "seasonal_naive", "holt_winters"}
+    short = HistoryIndex(pd.DataFrame({
+        "Invoice Date": pd.date_range("2021-01-01", periods=90, freq="D"),
+        "Brand": ["NIKE"] * 90, "Product": ["Shoes"] * 90, "Units Sold": np.ones(90),
+    }))
+    fit = ForecastFit(short, "month")
+    assert set(fit.fits) == {"ses"}
+    models, values = fit.forecast("auto", 2)
+    assert models.tolist() == ["ses"] and values == pytest.approx(np.full((1, 2), 31.0), rel=0.05)
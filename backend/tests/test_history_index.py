@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.history_index import HistoryIndex
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(3)
+    n = 5000
+    return pd.DataFrame({
+        "Invoice Date": pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        "Brand": rng.choice(["ADIDAS", "NIKE", "PUMA"], n),
+        "Region": rng.choice(["Midwest", "Northeast", "South", "West"], n),
+        "Retailer": rng.choice(["Amazon", "Foot Locker", "Kohl's", "Walmart", "West Gear"], n),
+        "Units Sold": rng.integers(1, 500, n).astype("float64"),
+        "Total Sales": rng.uniform(100, 5000, n),
+    })
+
+
+@pytest.fixture(scope="module")
+def index(frame):
+    return HistoryIndex(frame)
+
+
+def posting_query(index, filters, start_day, end_day, group_by, period, measures):
+    """เส้นทาง posting list (select + aggregate) โดยไม่ผ่าน cube"""
+    rows = index.select(filters, start_day, end_day)
+    return (len(index.days[rows]), *index.aggregate(rows, group_by, period, measures))
+
+
+def day(text):
+    return int(np.datetime64(text, "D").astype("int64"))
+
+
+CASES = [
+    ({}, None, None, [], None),
+    ({}, None, None, [], "month"),
+    ({}, "2021-03-05", "2021-07-20", [], "week"),
+    ({}, None, None, ["region"], None),
+    ({}, "2021-02-01", "2021-02-28", ["retailer"], "day"),
+    ({"brand": ["NIKE", "PUMA"]}, None, None, [], "quarter"),
+    ({"brand": ["NIKE", "PUMA"]}, "2021-06-01", None, ["brand"], "month"),
+    ({"region": ["West"]}, None, "2021-09-30", ["region"], None),
+]
+
+
+@pytest.mark.parametrize("filters, start, end, group_by, period", CASES)
+def test_cube_path_matches_posting_path(index, filters, start, end, group_by, period):
+    codes = {dim: [index.lookup[dim][v] for v in values] for dim, values in filters.items()}
+    start_day = day(start) if start else None
+    end_day = day(end) if end else None
+    measures = ["units_sold", "total_sales"]
+    dims = set(group_by) | set(codes)
+    assert not dims or next(iter(dims)) in index.cubes
+
+    matched, components, counts, sums = index.query(codes, start_day, end_day, group_by, period, measures)
+    ref_matched, ref_components, ref_counts, ref_sums = posting_query(index, codes, start_day, end_day, group_by, period, measures)
+    assert matched == ref_matched
+    assert len(components) == len(ref_components)
+    for got, ref in zip(components, ref_components):
+        assert got.tolist() == ref.tolist()
+    assert counts.tolist() == ref_counts.tolist()
+    for m in measures:
+        np.testing.assert_allclose(sums[m], ref_sums[m], rtol=1e-9)
+
+
+def test_query_known_totals(index, frame):
+    codes = {"brand": [index.lookup["brand"]["NIKE"]], "region": [index.lookup["region"]["South"]]}
+    matched, components, counts, sums = index.query(codes, None, None, ["retailer"], None, ["units_sold"])
+    subset = frame[(frame["Brand"] == "NIKE") & (frame["Region"] == "South")]
+    expected = subset.groupby("Retailer")["Units Sold"].agg(["size", "sum"])
+    assert matched == len(subset)
+    retailers = [index.categories["retailer"][c] for c in components[0]]
+    assert retailers == expected.index.tolist()
+    assert counts.tolist() == expected["size"].tolist()
+    np.testing.assert_allclose(sums["units_sold"], expected["sum"].to_numpy())
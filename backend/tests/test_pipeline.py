@@ -0,0 +1,79 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import simpy
+
+from models.pydantic import BrandConfig
+from simulation.brand_simulation import BrandSimulation
+from simulation.pipeline import InTransitPipeline, lead_time_sampler
+from simulation.streams import brand_random, lead_time_generator
+
+
+def test_orders_arrive_on_their_day_in_order():
+    pipe = InTransitPipeline(max_lead_time=4)
+    # (lead time, qty, kind) ที่สั่งในแต่ละวัน — สั่งก่อนแล้วรับของของวันนั้น เหมือนใน BrandSimulation
+    orders = {0: (3, 100, "reorder"), 1: (2, 50, "periodic"), 2: (4, 70, "reorder")}
+    received = {}
+    for day in range(8):
+        if day in orders:
+            pipe.place(day, *orders[day])
+        if day == 2:
+            assert pipe.on_order == 220
+        received[day] = pipe.receive(day)
+    # order วันที่ 0 และ 1 เข้าช่องเดียวกัน, order วันที่ 2 วนกลับมาใช้ช่องของวันที่ 1
+    assert received[3] == (150, [(0, 3, "reorder", 100), (1, 3, "periodic", 50)])
+    assert received[6] == (70, [(2, 6, "reorder", 70)])
+    assert [day for day, (qty, _) in received.items() if qty] == [3, 6]
+    assert pipe.on_order == 0
+
+
+def test_lead_time_beyond_capacity_is_rejected():
+    pipe = InTransitPipeline(max_lead_time=2)
+    with pytest.raises(ValueError):
+        pipe.place(0, 3, 10, "reorder")
+
+
+def test_vector_pipeline_keeps_per_product_quantities():
+    pipe = InTransitPipeline(max_lead_time=1, shape=(3,))
+    pipe.place(5, 1, np.array([1, 2, 3]), "reorder")
+    qty, orders = pipe.receive(6)
+    assert qty.tolist() == [1, 2, 3] and orders == [(5, 6, "reorder", 6)]
+    assert pipe.on_order.tolist() == [0, 0, 0]
+
+
+@pytest.mark.parametrize("dist, lead, spread", [("uniform", 5, 2), ("poisson", 4, 0)])
+def test_sampled_lead_times_stay_within_capacity(dist, lead, spread):
+    config = SimpleNamespace(lead_time_days=lead, lead_time_distribution=dist, lead_time_spread=spread)
+    cap, sample = lead_time_sampler(config, np.random.default_rng(0))
+    draws = [sample() for _ in range(2000)]
+    assert 0 <= min(draws) and max(draws) <= cap
+    if dist == "uniform":
+        assert set(draws) == set(range(lead - spread, lead + spread + 1))
+
+
+def test_reorder_uses_inventory_position():
+    """stock + on_order ≤ reorder_point เท่านั้นถึงสั่ง: ระหว่างรอของจึงไม่สั่งซ้ำทุกวัน"""
+    params = {"ADIDAS": {
+        "base_demand": 100, "avg_price": 50.0, "seasonality": {m: 1.0 for m in range(1, 13)},
+        "calculated_config": {"initial_stock": 800, "restock_days": 1000, "restock_quantity": 0,
+                              "reorder_quantity": 2000, "reorder_point": 500},
+    }}
+    env = simpy.Environment()
+    sim = BrandSimulation(
+        env=env, brand_name="ADIDAS", config=BrandConfig(lead_time_days=6), brand_params=params,
+        start_date=datetime(2024, 1, 1), rng=brand_random(1, "ADIDAS"), lead_rng=lead_time_generator(1, "ADIDAS"),
+    )
+    env.run(until=120)
+    assert sim.restock_events
+    for event in sim.restock_events:
+        assert event["arrival_day"] - event["order_day"] == 6
+        assert event["day"] == event["arrival_day"]
+    # ไม่มีสอง order ค้างพร้อมกัน: order ถัดไปสั่งหลังของก่อนหน้าเข้าแล้วเท่านั้น
+    for prev, nxt in zip(sim.restock_events, sim.restock_events[1:]):
+        assert nxt["order_day"] >= prev["arrival_day"]
+    triggered = [e for e in sim.reorder_point_events if e["triggered"]]
+    assert len(triggered) == len(sim.restock_events) + sum(
+        1 for e in triggered if e["day"] + 6 >= 120
+    )
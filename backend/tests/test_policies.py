@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from models.pydantic import BrandConfig, InventoryPolicy
+from simulation.batch_simulation import DAILY_FIELDS
+from simulation.policies import PolicyBatchSimulation, policy_parameters
+
+BRAND = "NIKE"
+BRAND_PARAMS = {
+    BRAND: {
+        "base_demand": 80,
+        "avg_price": 70.0,
+        "seasonality": {m: 1.0 for m in range(1, 13)},
+        "calculated_config": {"initial_stock": 1000, "restock_days": 30, "restock_quantity": 500,
+                              "reorder_quantity": 500, "reorder_point": 200},
+    }
+}
+POLICIES = [
+    InventoryPolicy(type="s_S", reorder_point=300, order_up_to=1200),
+    InventoryPolicy(type="R_Q", reorder_point=300, order_quantity=250),
+    InventoryPolicy(type="order_up_to", review_period=7, order_up_to=1500),
+    InventoryPolicy(type="base_stock", order_up_to=1000),
+]
+
+
+def _batch(policies=POLICIES, seeds=(1, 2), lead_time_days=3):
+    return PolicyBatchSimulation(
+        BRAND, BrandConfig(lead_time_days=lead_time_days), policies, BRAND_PARAMS, seeds, datetime(2024, 1, 1)
+    )
+
+
+def test_policy_parameters():
+    assert [policy_parameters(p) for p in POLICIES] == [
+        (1, 300, 1200, 0), (1, 300, 0, 250), (7, 1499, 1500, 0), (1, 999, 1000, 0),
+    ]
+
+
+@pytest.mark.parametrize("policy", [
+    InventoryPolicy(type="s_S", reorder_point=500, order_up_to=500),
+    InventoryPolicy(type="s_S", order_up_to=500),
+    InventoryPolicy(type="R_Q", reorder_point=100, order_quantity=0),
+    InventoryPolicy(type="order_up_to", review_period=0, order_up_to=500),
+    InventoryPolicy(type="base_stock", order_up_to=0),
+    InventoryPolicy(type="kanban", order_up_to=500),
+])
+def test_invalid_policy_is_rejected(policy):
+    with pytest.raises(ValueError):
+        policy_parameters(policy)
+
+
+def test_order_rules_on_inventory_position():
+    """lane ละ policy (replication เดียว): stock + on_order เดียวกันทุก lane แล้วดูว่าแต่ละกฎสั่งเท่าไร"""
+    decide = _batch(seeds=(1,)).order_rule()
+    stock, on_order = np.full(4, 200), np.full(4, 50)   # IP = 250
+
+    place, qty = decide(1, stock, on_order)
+    # s_S เติมถึง S, R_Q สั่ง Q จน IP > s (250 + 250 = 500), order_up_to ไม่ใช่วันตรวจ, base_stock เติมกลับเป็น S
+    assert place.tolist() == [True, True, False, True]
+    assert qty[place].tolist() == [950, 250, 750]
+
+    place, qty = decide(7, stock, on_order)
+    assert place[2] and qty[2] == 1250
+
+    # R_Q: IP = 0 ต่ำกว่า s เกิน Q → สั่ง 2Q ในครั้งเดียวจน IP > s
+    place, qty = decide(1, np.full(4, 0), np.full(4, 0))
+    assert qty[1] == 500
+
+    # IP เหนือ reorder level → ไม่มีใครสั่ง (base_stock ที่ IP = S ก็ไม่สั่ง)
+    place, _ = decide(7, np.full(4, 1000), np.full(4, 500))
+    assert not place.any()
+
+
+def test_policies_share_demand_and_base_stock_replaces_sales():
+    batch = _batch()
+    days, lanes = 60, len(POLICIES) * 2
+    daily = {field: np.zeros((lanes, days), dtype="int64") for field in DAILY_FIELDS}
+    metrics = batch.run(days, daily)
+    assert metrics["total_demand"].shape == (len(POLICIES), 2)
+
+    # common random numbers: ทุก policy ใน replication เดียวกันเห็น demand path เดียวกัน (lane = p·R + r)
+    demand = daily["demand"].reshape(len(POLICIES), 2, days)
+    assert (demand == demand[:1]).all()
+    assert not (demand[0, 0] == demand[0, 1]).all()
+
+    # base_stock เริ่มที่ S จึงสั่งเท่ายอดขายของทุกวัน
+    base = slice(3 * 2, 4 * 2)
+    np.testing.assert_array_equal(daily["ordered"][base], daily["sales"][base])
+    # order_up_to สั่งเฉพาะวันตรวจ
+    ordered_days = np.nonzero(daily["ordered"][2 * 2:3 * 2].any(axis=0))[0]
+    assert ordered_days.size and (ordered_days % 7 == 0).all()
+    # R_Q สั่งเป็นหลายเท่าของ Q เสมอ
+    rq = daily["ordered"][1 * 2:2 * 2]
+    assert (rq % 250 == 0).all() and rq.any()
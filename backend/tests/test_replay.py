@@ -0,0 +1,101 @@
+"""replay ยอดขายจริง: trace ต้องเท่ากับประวัติ และ lane ของ TraceBatchSimulation ต้องเท่ากับ BrandSimulation(demand_trace)"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+import simpy
+
+from models.pydantic import BrandConfig
+from services.data_service import SUPPORTED_BRANDS, build_demand_trace
+from simulation.brand_simulation import BrandSimulation
+from simulation.replay import TraceBatchSimulation
+from simulation.streams import brand_random, lead_time_generator
+
+BRAND = "PUMA"
+BRAND_PARAMS = {
+    BRAND: {
+        "base_demand": 40,
+        "avg_price": 55.0,
+        "seasonality": {m: 1.0 for m in range(1, 13)},
+        "calculated_config": {"initial_stock": 600, "restock_days": 14, "restock_quantity": 400,
+                              "reorder_quantity": 500, "reorder_point": 250},
+    }
+}
+CONFIGS = [
+    BrandConfig(),
+    BrandConfig(demand_multiplier=1.3, lead_time_days=3, lead_time_distribution="uniform", lead_time_spread=2),
+    BrandConfig(enable_reorder=False, restock_days=10, restock_quantity=300),
+]
+SEEDS = [4, 5]
+DAYS = 120
+
+
+@pytest.fixture(scope="module")
+def history():
+    rng = np.random.default_rng(9)
+    n = 4000
+    units = rng.integers(1, 20, n).astype("float64")
+    return pd.DataFrame({
+        "Brand": rng.choice(["PUMA", "NIKE"], n),
+        "Invoice Date": pd.Timestamp("2022-03-01") + pd.to_timedelta(rng.integers(0, DAYS, n), unit="D"),
+        "Units Sold": units,
+        "Total Sales": units * rng.uniform(30, 90, n),
+    })
+
+
+@pytest.fixture(scope="module")
+def trace(history):
+    return build_demand_trace(history)
+
+
+def test_trace_equals_daily_history(history, trace):
+    assert trace["brands"] == list(SUPPORTED_BRANDS)
+    assert trace["start_date"] == datetime(2022, 3, 1)
+    daily = history.groupby(["Brand", "Invoice Date"])[["Units Sold", "Total Sales"]].sum()
+    for i, brand in enumerate(trace["brands"]):
+        if brand not in ("PUMA", "NIKE"):
+            assert not trace["units"][i].any()   # แบรนด์ที่ไม่มีข้อมูล = 0 ทุกวัน
+            continue
+        rows = daily.loc[brand].reindex(pd.date_range("2022-03-01", periods=trace["units"].shape[1]), fill_value=0)
+        assert trace["units"][i].tolist() == rows["Units Sold"].astype("int64").tolist()
+        assert trace["revenue"][i] == pytest.approx(rows["Total Sales"].to_numpy())
+
+
+def _trace_of(trace, brand):
+    i = trace["brands"].index(brand)
+    return trace["units"][i], trace["revenue"][i]
+
+
+def test_unconstrained_replay_reproduces_history(trace):
+    units, revenue = _trace_of(trace, BRAND)
+    batch = TraceBatchSimulation(BRAND, [BrandConfig(initial_stock=10 ** 6)], BRAND_PARAMS, [1], units, revenue, trace["start_date"])
+    metrics = batch.run(DAYS)
+    assert metrics["total_units_sold"][0, 0] == units.sum()
+    assert metrics["total_lost_sales"][0, 0] == 0 and metrics["stockout_days"][0, 0] == 0
+    assert metrics["total_revenue"][0, 0] == pytest.approx(revenue.sum())
+
+
+@pytest.fixture(scope="module")
+def batch_metrics(trace):
+    units, revenue = _trace_of(trace, BRAND)
+    return TraceBatchSimulation(BRAND, CONFIGS, BRAND_PARAMS, SEEDS, units, revenue, trace["start_date"]).run(DAYS)
+
+
+@pytest.mark.parametrize("v", range(len(CONFIGS)))
+@pytest.mark.parametrize("r", range(len(SEEDS)))
+def test_lane_matches_brand_simulation_with_trace(trace, batch_metrics, v, r):
+    units, _ = _trace_of(trace, BRAND)
+    env = simpy.Environment()
+    sim = BrandSimulation(
+        env=env, brand_name=BRAND, config=CONFIGS[v], brand_params=BRAND_PARAMS, start_date=trace["start_date"],
+        rng=brand_random(SEEDS[r], BRAND), lead_rng=lead_time_generator(SEEDS[r], BRAND), demand_trace=units,
+    )
+    env.run(until=DAYS)
+    demand = sum(entry["demand"] for entry in sim.sales_data)
+    assert batch_metrics["total_demand"][v, r] == demand
+    assert batch_metrics["total_units_sold"][v, r] == sim.total_units_sold
+    assert batch_metrics["total_lost_sales"][v, r] == demand - sim.total_units_sold
+    assert batch_metrics["stockout_days"][v, r] == sim.stockout_days
+    assert batch_metrics["restock_count"][v, r] == sim.restock_count
+    assert batch_metrics["final_stock"][v, r] == sim.stock
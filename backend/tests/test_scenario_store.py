@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.pydantic import SimulationRequest
+from services import data_service, scenario_store, simulation_service
+from services.scenario_store import ScenarioStore, scenario_key
+
+REQUEST = {"simulation_days": 30, "NIKE": {"reorder_point": 500}}
+
+
+def test_scenario_key_is_stable_and_distinguishes_inputs():
+    key = scenario_key(REQUEST, ["summary", "monthly_data"], 7, "v1")
+    assert key == scenario_key(dict(reversed(list(REQUEST.items()))), ["monthly_data", "summary"], 7, "v1")
+    assert len({
+        key,
+        scenario_key({**REQUEST, "simulation_days": 31}, ["summary", "monthly_data"], 7, "v1"),
+        scenario_key(REQUEST, ["summary"], 7, "v1"),
+        scenario_key(REQUEST, ["summary", "monthly_data"], 8, "v1"),
+        scenario_key(REQUEST, ["summary", "monthly_data"], 7, "v2"),
+    }) == 5
+
+
+def test_round_trip_and_least_recently_used_trim(tmp_path, monkeypatch):
+    clock = iter(f"2024-01-01T00:00:{s:02d}" for s in range(60))
+    monkeypatch.setattr(scenario_store, "_now", lambda: next(clock))
+    store = ScenarioStore(str(tmp_path / "s.sqlite3"), max_entries=2)
+    result = {"summary": [{"brand": "NIKE", "total_units_sold": 10}, {"brand": "PUMA", "total_units_sold": 5}], "simulation_days": 30}
+
+    store.put("a", REQUEST, ["summary"], 1, "v1", result)
+    store.put("b", REQUEST, ["summary"], 2, "v1", result)
+    assert store.get("a") == {"seed": 1, "result": result}   # a ใช้ล่าสุด → b เก่าสุด
+    store.put("c", REQUEST, ["summary"], 3, "v1", result)
+
+    assert store.get("b") is None
+    assert {item["scenario_id"] for item in store.list()["items"]} == {"a", "c"}
+    assert [row["seed"] for row in store.iter_results(10, data_version="v1")] == [3, 1]
+    assert list(store.iter_results(10, data_version="v2")) == []
+
+
+def test_data_version_follows_files_and_sample_data(tmp_path, monkeypatch):
+    path = tmp_path / "nike.csv"
+    path.write_text("Units Sold\n1\n")
+    monkeypatch.setattr(data_service, "SUPPORTED_BRANDS", {"NIKE": str(path)})
+    version = data_service.compute_data_version()
+    assert data_service.compute_data_version() == version
+
+    path.write_text("Units Sold\n1\n2\n")
+    os.utime(path, ns=(1, 1))
+    changed = data_service.compute_data_version()
+    assert changed != version
+
+    sample = pd.DataFrame({"Brand": ["NIKE"] * 3, "Units Sold": [1, 2, 3]})
+    assert data_service.compute_data_version(sample) == data_service.compute_data_version(sample.copy())
+    assert data_service.compute_data_version(sample) not in (version, changed)
+    assert data_service.compute_data_version(sample.assign(**{"Units Sold": [1, 2, 4]})) != data_service.compute_data_version(sample)
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """ข้อมูลสังเคราะห์ + scenario store ชั่วคราวสำหรับ run_inventory_simulation"""
+    rng = np.random.default_rng(0)
+    brands = list(data_service.SUPPORTED_BRANDS)
+    df = pd.DataFrame({
+        "Brand": rng.choice(brands, 2000),
+        "Invoice Date": pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 365, 2000), unit="D"),
+        "Units Sold": rng.integers(1, 50, 2000).astype(float),
+        "Price per Unit": rng.uniform(20, 80, 2000),
+    })
+    monkeypatch.setattr(data_service, "brand_parameters", data_service.calculate_brand_parameters(df))
+    monkeypatch.setattr(data_service, "data_version", "test")
+    store = ScenarioStore(str(tmp_path / "s.sqlite3"))
+    monkeypatch.setattr(simulation_service, "get_scenario_store", lambda: store)
+    return store
+
+
+def test_only_client_seeded_runs_are_stored(engine):
+    unseeded = simulation_service.run_inventory_simulation(SimulationRequest(simulation_days=20, include=["summary"]))
+    assert unseeded.scenario_id is None and unseeded.seed is not None
+    assert engine.list()["total"] == 0
+
+    request = SimulationRequest(simulation_days=20, include=["summary"], seed=unseeded.seed)
+    seeded = simulation_service.run_inventory_simulation(request)
+    assert seeded.scenario_id is not None and not seeded.cached
+    assert engine.list()["total"] == 1
+    # seed เดิมให้ผลเดิม ไม่ว่าจะสุ่มให้หรือส่งมาเอง
+    assert [s.model_dump() for s in seeded.summary] == [s.model_dump() for s in unseeded.summary]
+
+    entry = simulation_service.client_scenario(request)
+    assert entry is not None and entry[3] == seeded.scenario_id
+    again = simulation_service.find_cached_simulation(entry)
+    assert again is not None and again.cached and again.scenario_id == seeded.scenario_id
+    assert simulation_service.client_scenario(request.model_copy(update={"seed": None})) is None
+
+
+def test_simulate_admitted_reads_the_store_once(engine, monkeypatch):
+    request = SimulationRequest(simulation_days=20, include=["summary"], seed=5)
+    reads = []
+    get = engine.get
+    monkeypatch.setattr(engine, "get", lambda scenario_id: reads.append(scenario_id) or get(scenario_id))
+
+    first = simulation_service.simulate_admitted(request)
+    assert not first.cached and len(reads) == 1
+    second = simulation_service.simulate_admitted(request)
+    assert second.cached and reads == [first.scenario_id] * 2
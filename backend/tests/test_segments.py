@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.pydantic import BrandConfig
+from services import data_service
+from simulation.segment_simulation import SegmentBrandSimulation
+from simulation.sku_simulation import run_stacked
+from simulation.streams import brand_generator
+
+BRANDS = ["NIKE", "PUMA"]
+
+
+@pytest.fixture(scope="module")
+def params():
+    rng = np.random.default_rng(0)
+    n = 3000
+    df = pd.DataFrame({
+        "Brand": rng.choice(BRANDS, n),
+        "Region": rng.choice(["West", "South", "Midwest"], n, p=[0.5, 0.3, 0.2]),
+        "Invoice Date": pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+        "Units Sold": rng.integers(1, 50, n).astype(float),
+        "Price per Unit": rng.uniform(20, 80, n),
+    })
+    brand_params = data_service.calculate_brand_parameters(df)
+    return brand_params, data_service.calculate_segment_parameters(df, brand_params)
+
+
+def test_segment_parameters_add_up_to_brand(params):
+    brand_params, segment_params = params
+    assert "retailer" not in segment_params   # ไม่มีคอลัมน์ Retailer
+    for brand in BRANDS:
+        seg = segment_params["region"][brand]
+        assert sorted(seg["segments"]) == ["Midwest", "South", "West"]
+        assert seg["shares"].sum() == pytest.approx(1.0)
+        brand_season = [brand_params[brand]["seasonality"][m] for m in range(1, 13)]
+        assert (seg["shares"][:, None] * seg["seasonality"][:, 1:]).sum(axis=0) == pytest.approx(brand_season)
+        assert ((20 <= seg["avg_price"]) & (seg["avg_price"] <= 80)).all()
+
+
+def _simulations(params, brands, configs=None):
+    brand_params, segment_params = params
+    return [
+        SegmentBrandSimulation(
+            brand_name=brand, config=(configs or {}).get(brand, BrandConfig()), brand_params=brand_params,
+            segment_params=segment_params["region"], dimension="region", start_date=datetime(2024, 1, 1),
+            rng=brand_generator(11, brand),
+        )
+        for brand in brands
+    ]
+
+
+def test_segments_roll_up_to_brand_results(params):
+    sims = _simulations(params, BRANDS + ["ADIDAS"], {"PUMA": BrandConfig(initial_stock=300, reorder_point=150)})
+    run_stacked(sims, 90)
+    for sim in sims:
+        rows = sim.segment_summary()
+        summary = sim.aggregate("summary")
+        assert {row["dimension"] for row in rows} == {"region"}
+        assert summary["total_units_sold"] == sum(row["total_units_sold"] for row in rows)
+        assert summary["total_lost_sales"] == sum(row["total_lost_sales"] for row in rows)
+        assert summary["total_revenue"] == pytest.approx(sum(row["total_revenue"] for row in rows))
+        assert [day["sales"] for day in sim.sales_data] == sim.sales.sum(axis=0).tolist()
+        assert sim.product_summary() == []
+    # แบรนด์ที่ไม่มีข้อมูล segment → segment เดียวเท่ากับทั้งแบรนด์
+    assert [row["segment"] for row in sims[2].segment_summary()] == ["ADIDAS"]
+
+
+def test_stacked_run_matches_brand_by_brand(params):
+    together = _simulations(params, BRANDS)
+    run_stacked(together, 60)
+    for sim in together:
+        alone = _simulations(params, [sim.brand_name])
+        run_stacked(alone, 60)
+        np.testing.assert_array_equal(alone[0].sales, sim.sales)
+        assert alone[0].segment_summary() == sim.segment_summary()
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from utils.sensitivity import morris_design, morris_indices, saltelli_design, sobol_indices
+
+# Ishigami (a=7, b=0.1) บน [-π, π]^3 — ค่าวิเคราะห์ของ S1 / ST
+ISHIGAMI_S1 = [0.3139, 0.4424, 0.0]
+ISHIGAMI_ST = [0.5576, 0.4424, 0.2437]
+
+
+def ishigami(u: np.ndarray) -> np.ndarray:
+    x = -np.pi + 2 * np.pi * u
+    return np.sin(x[:, 0]) + 7 * np.sin(x[:, 1]) ** 2 + 0.1 * x[:, 2] ** 4 * np.sin(x[:, 0])
+
+
+def _sobol(model, k, samples, offset=0.0):
+    points = saltelli_design(k, samples, np.random.default_rng(1))
+    return sobol_indices(model(points) + offset, k, samples, np.random.default_rng(2), bootstrap=50)
+
+
+def test_sobol_ishigami_matches_analytic_values():
+    out = _sobol(ishigami, 3, 20000)
+    assert out["s1"] == pytest.approx(ISHIGAMI_S1, abs=0.03)
+    assert out["st"] == pytest.approx(ISHIGAMI_ST, abs=0.03)
+    assert np.all(out["s1_conf"] < 0.05)
+
+
+def test_sobol_linear_model_matches_analytic_values():
+    coef = np.array([1.0, 2.0, 0.0])
+    out = _sobol(lambda u: 1000 * (u @ coef), 3, 4000)
+    expected = coef ** 2 / (coef ** 2).sum()
+    assert out["s1"] == pytest.approx(expected, abs=0.02)
+    assert out["st"] == pytest.approx(expected, abs=0.02)
+
+
+@pytest.mark.parametrize("model, k", [(ishigami, 3), (lambda u: 1000 * u[:, 0], 2)])
+def test_sobol_is_shift_invariant(model, k):
+    base = _sobol(model, k, 2000)
+    shifted = _sobol(model, k, 2000, offset=2e5)
+    for key in ("s1", "st", "s1_conf", "st_conf"):
+        assert shifted[key] == pytest.approx(base[key], abs=1e-6)
+
+
+def test_sobol_constant_output_is_zero():
+    out = _sobol(lambda u: np.full(len(u), 5.0), 2, 100)
+    assert out["s1"].tolist() == [0.0, 0.0] and out["st"].tolist() == [0.0, 0.0]
+
+
+def test_morris_linear_model_elementary_effects():
+    coef = np.array([3.0, -1.0, 0.0])
+    points, order, direction = morris_design(3, 20, 4, np.random.default_rng(0))
+    assert points.min() >= 0 and points.max() <= 1
+    out = morris_indices(points @ coef, order, direction, 4)
+    assert out["mu"] == pytest.approx(coef)
+    assert out["mu_star"] == pytest.approx(np.abs(coef))
+    assert out["sigma"] == pytest.approx(np.zeros(3), abs=1e-9)
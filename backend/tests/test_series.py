@@ -0,0 +1,46 @@
+import numpy as np
+
+from utils.series import lttb_indices
+
+
+def lttb_reference(x, y, threshold):
+    """LTTB ตามต้นฉบับ (Steinarsson 2013) แบบวนทีละจุด"""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        cx, cy = np.mean(x[next_start:next_end]), np.mean(y[next_start:next_end])
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - cx) * (y[j] - y[a]) - (x[a] - x[j]) * (cy - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def test_lttb_keeps_spike():
+    x = np.arange(7)
+    y = np.array([0, 0, 0, 10, 0, 0, 0])
+    assert lttb_indices(x, y, 3).tolist() == [0, 3, 6]
+
+
+def test_lttb_small_input_untouched():
+    x = np.arange(5)
+    assert lttb_indices(x, x * 2, 10).tolist() == [0, 1, 2, 3, 4]
+    assert lttb_indices(x, x * 2, 2).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_lttb_matches_reference():
+    rng = np.random.default_rng(7)
+    for n, threshold in ((100, 10), (365, 52), (1000, 97), (731, 3)):
+        x = np.arange(n, dtype="float64")
+        y = np.cumsum(rng.normal(size=n))
+        got = lttb_indices(x, y, threshold)
+        assert len(got) == threshold
+        assert got.tolist() == lttb_reference(x, y, threshold).tolist()
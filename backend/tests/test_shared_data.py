@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.shared_data import MANIFEST, attach_columnar, export_columnar, load_or_build
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "Invoice Date": pd.to_datetime(["2021-01-01", "2021-01-02", None, "2021-03-05"]),
+        "Brand": pd.Categorical(["NIKE", "PUMA", "NIKE", "ADIDAS"], categories=["ADIDAS", "NIKE", "PUMA", "H&M"]),
+        "Region": ["West", None, "South", "West"],
+        "Units Sold": [10.0, np.nan, 3.0, 7.5],
+        "Count": np.array([1, 2, 3, 4], dtype="int32"),
+        "Online": [True, False, True, False],
+    })
+
+
+def test_round_trip_is_memory_mapped(tmp_path, frame):
+    export_columnar(frame, str(tmp_path / "v1"))
+    out = attach_columnar(str(tmp_path / "v1"))
+
+    assert list(out.columns) == list(frame.columns)
+    for name in ("Invoice Date", "Units Sold", "Count", "Online"):
+        assert out[name].dtype == frame[name].dtype
+        np.testing.assert_array_equal(out[name].to_numpy(), frame[name].to_numpy())
+    # categories เดิมของ categorical (รวมที่ไม่มีแถว) ต้องคงอยู่
+    assert list(out["Brand"].cat.categories) == ["ADIDAS", "NIKE", "PUMA", "H&M"]
+    assert list(out["Brand"]) == list(frame["Brand"])
+    # ข้อความ → categorical (ค่าว่างยังเป็น NaN)
+    assert isinstance(out["Region"].dtype, pd.CategoricalDtype)
+    assert list(out["Region"].astype(object).where(out["Region"].notna(), None)) == list(frame["Region"])
+    for name in ("Units Sold", "Count"):
+        assert isinstance(out[name].to_numpy().base, np.memmap) or isinstance(out[name].to_numpy(), np.memmap)
+    assert not out["Units Sold"].to_numpy().flags.writeable
+
+
+def test_load_or_build_reuses_version_and_drops_stale(tmp_path, frame):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return frame
+
+    root = str(tmp_path)
+    load_or_build(root, "v1", build)
+    out = load_or_build(root, "v1", build)
+    assert len(calls) == 1 and len(out) == len(frame)
+
+    load_or_build(root, "v2", build)
+    assert len(calls) == 2
+    assert sorted(n for n in os.listdir(root) if not n.startswith(".")) == ["v2"]
+    assert os.path.isfile(os.path.join(root, "v2", MANIFEST))
+
+
+def test_load_or_build_without_data(tmp_path):
+    assert load_or_build(str(tmp_path), "v1", lambda: None) is None
+    assert os.listdir(tmp_path) == []
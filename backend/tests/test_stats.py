@@ -0,0 +1,43 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.stats import mean_ci, t_cdf, t_quantile
+
+# ค่าจากตาราง Student's t (two-sided 95% / 90%)
+T_TABLE = [
+    (0.975, 1, 12.706204736),
+    (0.975, 2, 4.302652730),
+    (0.975, 5, 2.570581836),
+    (0.975, 10, 2.228138852),
+    (0.975, 30, 2.042272456),
+    (0.975, 100, 1.983971519),
+    (0.95, 3, 2.353363435),
+    (0.95, 29, 1.699127027),
+    (0.995, 7, 3.499483297),
+]
+
+
+@pytest.mark.parametrize("p, df, expected", T_TABLE)
+def test_t_quantile_known_values(p, df, expected):
+    assert t_quantile(p, df) == pytest.approx(expected, abs=1e-6)
+
+
+@pytest.mark.parametrize("df", [1, 2, 3, 8, 25])
+def test_t_quantile_inverts_cdf(df):
+    for p in (0.6, 0.9, 0.975):
+        assert t_cdf(t_quantile(p, df), df) == pytest.approx(p, abs=1e-9)
+        assert t_quantile(1 - p, df) == pytest.approx(-t_quantile(p, df), abs=1e-9)
+
+
+def test_t_quantile_rejects_bad_df():
+    with pytest.raises(ValueError):
+        t_quantile(0.975, 0)
+
+
+def test_mean_ci():
+    samples = np.array([[1.0, 2.0, 3.0, 4.0, 5.0]])
+    ci = mean_ci(samples, 0.95)
+    assert ci["mean"][0] == pytest.approx(3.0)
+    assert ci["half_width"][0] == pytest.approx(2.776445105 * math.sqrt(2.5) / math.sqrt(5), abs=1e-6)
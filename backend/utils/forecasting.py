@@ -0,0 +1,149 @@
+"""พยากรณ์ความต้องการแบบ batched ของทุก series (แบรนด์ × สินค้า) ใน numpy pass เดียว
+
+series ทั้งหมดอยู่ใน matrix หนาแน่น (series × ช่วงเวลา) แต่ละโมเดล fit ทุก series พร้อมกัน:
+loop เดียวตามเวลา และทุกขั้นเป็น array op บน (ค่าพารามิเตอร์ใน grid × series) จึงเลือกพารามิเตอร์
+ต่อ series ได้โดยไม่วนต่อ series
+
+โมเดล:
+- seasonal_naive: ค่าของช่วงเดียวกันในฤดูก่อน
+- ses:            simple exponential smoothing (เลือก alpha ต่อ series)
+- holt_winters:   exponential smoothing แบบ level + seasonal (additive, เลือก alpha / gamma ต่อ series)
+
+ทุกโมเดลวัดด้วย MAE ของ error แบบ one-step-ahead บนช่วงเดียวกัน (หลังฤดูแรก) → "auto" เลือกโมเดลที่
+MAE ต่ำสุดต่อ series
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.history_index import HistoryIndex
+
+FORECAST_MODELS = ("seasonal_naive", "ses", "holt_winters")
+# ความยาวฤดูต่อ period (สัปดาห์ในวัน, สัปดาห์ในปี, เดือนในปี)
+SEASON_LENGTHS = {"day": 7, "week": 52, "month": 12}
+
+ALPHA_GRID = np.array([0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9])
+GAMMA_GRID = np.array([0.05, 0.1, 0.2, 0.3, 0.5])
+
+
+def series_matrix(index: HistoryIndex, period: str) -> Tuple[np.ndarray, np.ndarray, int, np.ndarray]:
+    """(brand codes, product codes, period code แรก, units sold รูป series × ช่วงเวลา) — bincount ครั้งเดียว
+
+    ช่วงเวลาครอบคลุมตั้งแต่ช่วงแรกถึงช่วงสุดท้ายของข้อมูลทั้งหมด (ช่วงที่ไม่มีขาย = 0)
+    """
+    brand = index.codes["brand"].astype("int64")
+    product = index.codes["product"].astype("int64")
+    width = len(index.categories["product"])
+    keys, series = np.unique(brand * width + product, return_inverse=True)
+    periods = index.period_codes(slice(None), period)
+    first = int(periods[0]) if len(periods) else 0
+    count = int(periods[-1]) - first + 1 if len(periods) else 0
+    units = index.measures.get("units_sold", np.ones(index.rows))
+    cells = np.bincount(series * count + (periods - first), weights=np.clip(units, 0, None), minlength=len(keys) * count)
+    return keys // width, keys % width, first, cells.reshape(len(keys), count)
+
+
+def fit_seasonal_naive(y: np.ndarray, m: int) -> Dict[str, np.ndarray]:
+    errors = np.abs(y[:, m:] - y[:, :-m])
+    return {"mae": errors.mean(axis=1), "last_season": y[:, -m:].copy()}
+
+
+def fit_ses(y: np.ndarray, m: int, alphas: np.ndarray = ALPHA_GRID) -> Dict[str, np.ndarray]:
+    """level รูป (alpha × series) เดินตามเวลาครั้งเดียว แล้วเลือก alpha ที่ MAE ต่ำสุดต่อ series"""
+    a = alphas[:, None]
+    level = np.repeat(y[None, :, 0], len(alphas), axis=0)
+    abs_err = np.zeros_like(level)
+    for t in range(1, y.shape[1]):
+        err = y[:, t] - level
+        if t >= m:
+            abs_err += np.abs(err)
+        level += a * err
+    best = abs_err.argmin(axis=0)
+    cols = np.arange(y.shape[0])
+    return {
+        "mae": abs_err[best, cols] / max(1, y.shape[1] - m),
+        "alpha": alphas[best],
+        "level": level[best, cols],
+    }
+
+
+def fit_holt_winters(
+    y: np.ndarray,
+    m: int,
+    alphas: np.ndarray = ALPHA_GRID,
+    gammas: np.ndarray = GAMMA_GRID
+) -> Dict[str, np.ndarray]:
+    """level + seasonal แบบ additive บน grid (alpha × gamma × series) เริ่มจากฤดูแรก แล้วเลือกคู่ที่ MAE ต่ำสุด"""
+    a = np.repeat(alphas, len(gammas))[:, None]
+    g = np.tile(gammas, len(alphas))[:, None]
+    combos, n = len(a), y.shape[0]
+    level = np.repeat(y[None, :, :m].mean(axis=2), combos, axis=0)
+    # seasonal รูป (ช่วงในฤดู, combo, series) → อ่าน/เขียนทีละช่วงเป็นบล็อกต่อเนื่อง
+    first = (y[:, :m] - y[:, :m].mean(axis=1, keepdims=True)).T
+    season = np.repeat(first[:, None, :], combos, axis=1)
+    abs_err = np.zeros((combos, n))
+    for t in range(m, y.shape[1]):
+        s = season[t % m]
+        err = y[:, t] - level - s
+        abs_err += np.abs(err)
+        level += a * err
+        s += g * (y[:, t] - level - s)
+    best = abs_err.argmin(axis=0)
+    cols = np.arange(n)
+    return {
+        "mae": abs_err[best, cols] / max(1, y.shape[1] - m),
+        "alpha": a[best, 0],
+        "gamma": g[best, 0],
+        "level": level[best, cols],
+        "season": season[:, best, cols].T,
+    }
+
+
+class ForecastFit:
+    """ผล fit ของทุกโมเดลบนทุก series ของ period หนึ่ง — พยากรณ์กี่ช่วงก็ได้จาก state สุดท้าย"""
+
+    def __init__(self, index: HistoryIndex, period: str):
+        self.period = period
+        self.season_length = SEASON_LENGTHS[period]
+        self.brand_codes, self.product_codes, self.first_period, self.y = series_matrix(index, period)
+        self.brands = index.categories["brand"]
+        self.products = index.categories["product"]
+        self.periods = self.y.shape[1]
+        m = self.season_length
+        self.fits: Dict[str, Dict[str, np.ndarray]] = {"ses": fit_ses(self.y, m)}
+        # ต้องมีข้อมูลเกินหนึ่งฤดูจึงวัด/ใช้โมเดลที่มีฤดูกาลได้
+        if self.periods > m:
+            self.fits["seasonal_naive"] = fit_seasonal_naive(self.y, m)
+            self.fits["holt_winters"] = fit_holt_winters(self.y, m)
+
+    @property
+    def series(self) -> int:
+        return len(self.brand_codes)
+
+    def best_models(self, rows: np.ndarray) -> np.ndarray:
+        """ชื่อโมเดลที่ MAE ต่ำสุดของแต่ละ series (เสมอกัน → ตามลำดับใน FORECAST_MODELS)"""
+        names = [name for name in FORECAST_MODELS if name in self.fits]
+        mae = np.stack([self.fits[name]["mae"][rows] for name in names])
+        return np.array(names, dtype=object)[mae.argmin(axis=0)]
+
+    def forecast(self, model: str, horizon: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(ชื่อโมเดลต่อ series, ค่าพยากรณ์ ≥ 0 รูป series × horizon) ของ series ใน rows"""
+        rows = np.arange(self.series) if rows is None else rows
+        models = self.best_models(rows) if model == "auto" else np.full(len(rows), model, dtype=object)
+        steps = np.arange(horizon)
+        m = self.season_length
+        values = np.zeros((len(rows), horizon))
+        for name in set(models):
+            pick = models == name
+            fit, r = self.fits[name], rows[pick]
+            if name == "seasonal_naive":
+                values[pick] = fit["last_season"][r][:, steps % m]
+            elif name == "ses":
+                values[pick] = fit["level"][r][:, None]
+            else:
+                values[pick] = fit["level"][r][:, None] + fit["season"][r][:, (self.periods + steps) % m]
+        return models, np.clip(values, 0, None)
+
+    def period_code(self, step: int) -> int:
+        """period code ของช่วงพยากรณ์ที่ step (0 = ช่วงถัดจากข้อมูลล่าสุด)"""
+        return self.first_period + self.periods + step
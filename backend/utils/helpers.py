@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
 import pandas as pd
 import numpy as np
 
@@ -24,6 +24,14 @@ def get_festival_info(date: datetime) -> Tuple[str, float]:
             return festival_data["name"], festival_data["multiplier"]
     return "", 1.0
 
+def get_festival_multiplier(date: datetime, overrides: Optional[Dict[str, float]] = None) -> float:
+    """ตัวคูณเทศกาลของวันนั้น (override ต่อ festival_id ได้) — 1.0 ถ้าไม่ใช่วันเทศกาล"""
+    month, day = date.month, date.day
+    for fid, fdata in FESTIVALS.items():
+        if fdata["month"] == month and day in fdata["days"]:
+            return (overrides or {}).get(fid, fdata["multiplier"])
+    return 1.0
+
 def clean_data_for_json(data: Any) -> Any:
     """ทำความสะอาดข้อมูลสำหรับ JSON serialization"""
     if isinstance(data, dict):
@@ -0,0 +1,277 @@
+"""ดัชนีของ historical data สำหรับ query แบบ filter + group-by โดยไม่ scan DataFrame
+
+สร้างครั้งเดียวต่อ data version:
+- แถวเรียงตามวันที่ → ช่วงวันที่ = ช่วงแถวติดกัน (searchsorted)
+- แต่ละมิติ (Retailer, Region, ...) เก็บเป็น categorical codes + posting list ต่อค่า (แบบ CSR:
+  แถวของค่า i คือ rows[offsets[i]:offsets[i + 1]] เรียงจากน้อยไปมาก)
+- มิติที่มีค่าไม่มาก เก็บผลรวมรายวันต่อค่าไว้ด้วย (cube วัน × ค่า) รวมถึงผลรวมรายวันทั้งหมด
+
+query ที่ใช้มิติเดียว (group-by และ filter) ตอบจาก cube โดยตรง นอกนั้นเริ่มจาก posting list ของมิติ
+ที่เลือกแถวน้อยที่สุด ตัดด้วยช่วงวันที่ แล้วกรองมิติอื่นด้วย lookup table บน codes ส่วน group-by
+รวม codes เป็น key เดียว (mixed radix) แล้ว bincount
+"""
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# ชื่อมิติใน API → คอลัมน์ใน historical data
+DIMENSIONS = {
+    "brand": "Brand",
+    "retailer": "Retailer",
+    "region": "Region",
+    "state": "State",
+    "city": "City",
+    "product": "Product",
+    "sales_method": "Sales Method",
+}
+# ตัวชี้วัดที่รวมได้ (ผลรวม) → คอลัมน์; "rows" = จำนวนแถว
+MEASURES = {
+    "units_sold": "Units Sold",
+    "total_sales": "Total Sales",
+    "operating_profit": "Operating Profit",
+}
+PERIODS = ("day", "week", "month", "quarter", "year")
+UNKNOWN_VALUE = "(unknown)"
+
+# จำนวน key สูงสุดที่ใช้ bincount ตรง ๆ (มากกว่านี้ใช้ np.unique)
+DENSE_KEY_LIMIT = 1 << 22
+# ขนาดสูงสุดของ cube วัน × ค่า ต่อมิติ (ช่อง) — เกินนี้ query มิตินั้นใช้ posting list
+CUBE_MAX_CELLS = 1 << 20
+
+Rows = Union[slice, np.ndarray]
+Aggregate = Tuple[int, List[np.ndarray], np.ndarray, Dict[str, np.ndarray]]
+
+
+class HistoryIndex:
+    """codes + posting list ต่อมิติ, cube รายวัน และตัวชี้วัดเรียงตามวันที่ของ historical data"""
+
+    def __init__(self, df: pd.DataFrame):
+        dates = df["Invoice Date"].to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+        order = np.argsort(dates, kind="stable")
+        self.rows = len(order)
+        self.days = dates[order].astype("int64")
+        self.months = dates[order].astype("datetime64[M]").astype("int64")
+        self.first_day = int(self.days[0]) if self.rows else 0
+        self.day_count = int(self.days[-1]) - self.first_day + 1 if self.rows else 0
+        day_offsets = self.days - self.first_day
+
+        self.measures = {
+            name: df[column].to_numpy(dtype="float64")[order]
+            for name, column in MEASURES.items() if column in df.columns
+        }
+
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, List[str]] = {}
+        self.lookup: Dict[str, Dict[str, int]] = {}
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # มิติ (None = ทั้งหมด) → (จำนวนแถว, {ตัวชี้วัด: ผลรวม}) รูป (วัน, ค่า)
+        self.cubes: Dict[Optional[str], Tuple[np.ndarray, Dict[str, np.ndarray]]] = {
+            None: self._cube(day_offsets, np.zeros(self.rows, dtype="int64"), 1)
+        }
+        for name, column in DIMENSIONS.items():
+            if column not in df.columns:
+                continue
+            col = df[column]
+            if isinstance(col.dtype, pd.CategoricalDtype):
+                codes, categories = col.cat.codes.to_numpy(), [str(c) for c in col.cat.categories]
+            else:
+                codes, uniques = pd.factorize(col, sort=True)
+                categories = [str(c) for c in uniques]
+            codes = codes[order].astype("int32")
+            if (codes < 0).any():
+                codes[codes < 0] = len(categories)
+                categories.append(UNKNOWN_VALUE)
+            counts = np.bincount(codes, minlength=len(categories))
+            offsets = np.zeros(len(categories) + 1, dtype="int64")
+            np.cumsum(counts, out=offsets[1:])
+            # stable → แถวของแต่ละค่าเรียงจากน้อยไปมาก (= ตามวันที่); int16 ให้ numpy ใช้ radix sort
+            sortable = codes.astype("int16") if len(categories) <= np.iinfo("int16").max else codes
+            self.postings[name] = (offsets, np.argsort(sortable, kind="stable").astype("int32"))
+            self.codes[name] = codes
+            self.categories[name] = categories
+            self.lookup[name] = {value: i for i, value in enumerate(categories)}
+            if self.day_count * len(categories) <= CUBE_MAX_CELLS:
+                self.cubes[name] = self._cube(day_offsets, codes, len(categories))
+
+    def _cube(self, day_offsets: np.ndarray, codes: np.ndarray, width: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        cell = day_offsets * width + codes
+        size = self.day_count * width
+        shape = (self.day_count, width)
+        counts = np.bincount(cell, minlength=size).reshape(shape)
+        sums = {m: np.bincount(cell, weights=values, minlength=size).reshape(shape) for m, values in self.measures.items()}
+        return counts, sums
+
+    def date_bounds(self) -> Tuple[Optional[np.datetime64], Optional[np.datetime64]]:
+        if not self.rows:
+            return None, None
+        return np.datetime64(int(self.days[0]), "D"), np.datetime64(int(self.days[-1]), "D")
+
+    def value_counts(self, dimension: str) -> Dict[str, int]:
+        offsets, _ = self.postings[dimension]
+        counts = np.diff(offsets)
+        return {value: int(n) for value, n in zip(self.categories[dimension], counts) if n}
+
+    def query(
+        self,
+        filters: Dict[str, Sequence[int]],
+        start_day: Optional[int],
+        end_day: Optional[int],
+        group_by: Sequence[str],
+        period: Optional[str],
+        measures: Sequence[str]
+    ) -> Aggregate:
+        """(จำนวนแถวที่ผ่าน filter, codes ต่อ component, จำนวนแถว, ผลรวมต่อตัวชี้วัด) ของแต่ละกลุ่ม
+
+        component เรียงตาม group_by แล้วตามด้วย period (ถ้ามี) แต่ละกลุ่มเรียงตาม codes
+        """
+        used = set(group_by) | set(filters)
+        if len(used) <= 1:
+            dim = next(iter(used), None)
+            if dim in self.cubes:
+                return self._query_cube(dim, filters.get(dim), start_day, end_day, bool(group_by), period, measures)
+        rows = self.select(filters, start_day, end_day)
+        return (len(self.days[rows]), *self.aggregate(rows, group_by, period, measures))
+
+    def _query_cube(
+        self,
+        dim: Optional[str],
+        values: Optional[Sequence[int]],
+        start_day: Optional[int],
+        end_day: Optional[int],
+        grouped: bool,
+        period: Optional[str],
+        measures: Sequence[str]
+    ) -> Aggregate:
+        lo = 0 if start_day is None else min(max(start_day - self.first_day, 0), self.day_count)
+        hi = self.day_count if end_day is None else min(max(end_day - self.first_day + 1, lo), self.day_count)
+        counts, sums = self.cubes[dim]
+        columns = np.asarray(sorted(values), dtype="int64") if values else np.arange(counts.shape[1])
+        blocks = {"rows": counts[lo:hi][:, columns], **{m: sums[m][lo:hi][:, columns] for m in measures}}
+
+        if period and hi > lo:
+            codes = self.period_codes(self.first_day + np.arange(lo, hi), period, days=True)
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+            blocks = {k: np.add.reduceat(v, starts, axis=0) for k, v in blocks.items()}
+            period_values = codes[starts]
+        else:
+            blocks = {k: v.sum(axis=0, keepdims=True) for k, v in blocks.items()}
+            period_values = np.zeros(1, dtype="int64")
+        if not grouped:
+            blocks = {k: v.sum(axis=1, keepdims=True) for k, v in blocks.items()}
+            columns = columns[:1]
+
+        # (ช่วงเวลา, ค่า) → เรียงตามค่าก่อนแล้วตามช่วงเวลา
+        flat = {k: v.T.reshape(-1) for k, v in blocks.items()}
+        counts = flat.pop("rows")
+        keep = np.flatnonzero(counts)
+        components = []
+        if grouped:
+            components.append(np.repeat(columns, len(period_values))[keep])
+        if period:
+            components.append(np.tile(period_values, len(columns))[keep])
+        return int(counts.sum()), components, counts[keep].astype("int64"), {m: flat[m][keep] for m in measures}
+
+    def select(
+        self,
+        filters: Dict[str, Sequence[int]],
+        start_day: Optional[int] = None,
+        end_day: Optional[int] = None
+    ) -> Rows:
+        """แถวที่ผ่านทุก filter (OR ภายในมิติ, AND ข้ามมิติ) ในช่วงวัน [start_day, end_day]
+
+        ไม่มี filter → slice ของช่วงวันที่ ไม่งั้น array ของเลขแถวเรียงจากน้อยไปมาก
+        """
+        lo = 0 if start_day is None else int(np.searchsorted(self.days, start_day, side="left"))
+        hi = self.rows if end_day is None else int(np.searchsorted(self.days, end_day, side="right"))
+        if not filters:
+            return slice(lo, max(lo, hi))
+
+        def size(dim: str) -> int:
+            offsets, _ = self.postings[dim]
+            return int(sum(offsets[c + 1] - offsets[c] for c in filters[dim]))
+
+        first, *others = sorted(filters, key=size)
+        offsets, rows = self.postings[first]
+        parts = [rows[offsets[c]:offsets[c + 1]] for c in filters[first]]
+        candidates = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+        candidates = candidates[np.searchsorted(candidates, lo):np.searchsorted(candidates, hi)]
+        for dim in others:
+            allowed = np.zeros(len(self.categories[dim]), dtype=bool)
+            allowed[list(filters[dim])] = True
+            candidates = candidates[allowed[self.codes[dim][candidates]]]
+        return candidates
+
+    def period_codes(self, rows: Union[Rows, np.ndarray], period: str, days: bool = False) -> np.ndarray:
+        """รหัสช่วงเวลาของแถว (หรือของวัน epoch ใน rows ถ้า days=True) ค่าเพิ่มขึ้นตามเวลา"""
+        day = rows if days else self.days[rows]
+        if period == "day":
+            return day
+        if period == "week":
+            # epoch 1970-01-01 เป็นวันพฤหัส → +3 ให้สัปดาห์เริ่มวันจันทร์
+            return (day + 3) // 7
+        month = day.astype("datetime64[D]").astype("datetime64[M]").astype("int64") if days else self.months[rows]
+        if period == "month":
+            return month
+        if period == "quarter":
+            return month // 3
+        return month // 12
+
+    @staticmethod
+    def period_label(code: int, period: str) -> str:
+        if period == "day":
+            return str(np.datetime64(code, "D"))
+        if period == "week":
+            return str(np.datetime64(code * 7 - 3, "D"))
+        if period == "month":
+            return str(np.datetime64(code, "M"))
+        if period == "quarter":
+            return f"{1970 + code // 4}-Q{code % 4 + 1}"
+        return str(1970 + code)
+
+    def aggregate(
+        self,
+        rows: Rows,
+        group_by: Sequence[str],
+        period: Optional[str],
+        measures: Sequence[str]
+    ) -> Tuple[List[np.ndarray], np.ndarray, Dict[str, np.ndarray]]:
+        """รวมแถวที่เลือกตามมิติใน group_by (+ ช่วงเวลา) → (codes ต่อ component, จำนวนแถว, ผลรวมต่อตัวชี้วัด)"""
+        components = [self.codes[dim][rows] for dim in group_by]
+        radices = [len(self.categories[dim]) for dim in group_by]
+        period_base = 0
+        if period:
+            codes = self.period_codes(rows, period)
+            period_base = int(codes.min()) if len(codes) else 0
+            components.append(codes - period_base)
+            radices.append(int(codes.max()) - period_base + 1 if len(codes) else 1)
+
+        n = len(self.days[rows])
+        space = int(np.prod(radices, dtype=object)) if radices else 1
+        if space >= 1 << 62:
+            # key รวมล้น int64 → unique ตามแถวของ components
+            decoded_rows, inverse, counts = np.unique(np.stack(components, axis=1), axis=0, return_inverse=True, return_counts=True)
+            inverse = inverse.reshape(-1)
+            sums = {m: np.bincount(inverse, weights=self.measures[m][rows], minlength=len(counts)) for m in measures}
+            decoded = [decoded_rows[:, i] for i in range(len(components))]
+        else:
+            key = np.zeros(n, dtype="int64")
+            for component, radix in zip(components, radices):
+                key = key * radix + component
+            if space <= DENSE_KEY_LIMIT:
+                counts = np.bincount(key, minlength=space)
+                groups = np.flatnonzero(counts)
+                counts = counts[groups]
+                sums = {m: np.bincount(key, weights=self.measures[m][rows], minlength=space)[groups] for m in measures}
+            else:
+                groups, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+                sums = {m: np.bincount(inverse, weights=self.measures[m][rows], minlength=len(groups)) for m in measures}
+            decoded = []
+            rest = groups
+            for radix in reversed(radices):
+                rest, component = np.divmod(rest, radix)
+                decoded.append(component)
+            decoded.reverse()
+        if period:
+            decoded[-1] = decoded[-1] + period_base
+        return decoded, counts, sums
@@ -0,0 +1,93 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+def morris_design(k: int, trajectories: int, levels: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """แบบ Morris (one-at-a-time) บน unit hypercube
+
+    คืน (points รูป (r·(k+1), k), factor ที่เปลี่ยนในแต่ละก้าว (r, k), ทิศของก้าว ±1 (r, k))
+    แต่ละ trajectory เริ่มจากจุดบน grid แล้วขยับทีละ factor (ลำดับสุ่ม) ไป ±Δ
+    โดย Δ = levels / (2·(levels - 1))
+    """
+    delta = levels / (2 * (levels - 1))
+    grid = np.arange(levels) / (levels - 1)
+    low_grid = grid[grid <= 1 - delta + 1e-12]
+
+    points = np.empty((trajectories, k + 1, k))
+    order = np.empty((trajectories, k), dtype="int64")
+    direction = np.empty((trajectories, k))
+    for t in range(trajectories):
+        base = rng.choice(low_grid, size=k)
+        sign = rng.choice([-1.0, 1.0], size=k)
+        # ทิศลง → เริ่มที่ base + Δ แล้วลดลง (อยู่ใน [0, 1] เสมอ)
+        x = np.where(sign > 0, base, base + delta)
+        perm = rng.permutation(k)
+        points[t, 0] = x
+        for j, i in enumerate(perm):
+            x = x.copy()
+            x[i] += sign[i] * delta
+            points[t, j + 1] = x
+        order[t] = perm
+        direction[t] = sign[perm]
+    return points.reshape(-1, k), order, direction
+
+
+def morris_indices(y: np.ndarray, order: np.ndarray, direction: np.ndarray, levels: int) -> Dict[str, np.ndarray]:
+    """mu, mu* (ค่าเฉลี่ยของ |EE|), sigma ต่อ factor จากผล y รูป (r·(k+1), ...)"""
+    r, k = order.shape
+    delta = levels / (2 * (levels - 1))
+    y = y.reshape(r, k + 1, *y.shape[1:])
+    steps = np.diff(y, axis=1) / delta                       # (r, k, ...)
+    steps = steps * direction.reshape(r, k, *([1] * (y.ndim - 2)))
+    ee = np.empty_like(steps)
+    rows = np.arange(r)[:, None]
+    ee[rows, order] = steps                                  # จัดเรียงกลับตาม factor
+    return {
+        "mu": ee.mean(axis=0),
+        "mu_star": np.abs(ee).mean(axis=0),
+        "sigma": ee.std(axis=0, ddof=1) if r > 1 else np.zeros_like(ee[0]),
+    }
+
+
+def saltelli_design(k: int, samples: int, rng: np.random.Generator) -> np.ndarray:
+    """จุด [A; B; AB_1 .. AB_k] รูป (N·(k+2), k) — AB_i = A ที่คอลัมน์ i มาจาก B"""
+    a = rng.random((samples, k))
+    b = rng.random((samples, k))
+    ab = np.repeat(a[None, :, :], k, axis=0)
+    idx = np.arange(k)
+    ab[idx, :, idx] = b[:, idx].T
+    return np.concatenate([a, b, ab.reshape(-1, k)])
+
+
+def sobol_indices(y: np.ndarray, k: int, samples: int, rng: np.random.Generator, bootstrap: int = 100) -> Dict[str, np.ndarray]:
+    """first-order (Saltelli 2010) + total (Jansen) พร้อม half-width 95% จาก bootstrap
+
+    y รูป (N·(k+2), ...) เรียงตาม saltelli_design; ผลไม่เปลี่ยนเมื่อบวกค่าคงที่ให้ y
+    """
+    n = samples
+    fa, fb = y[:n], y[n:2 * n]
+    fab = y[2 * n:].reshape(k, n, *y.shape[1:])
+
+    def estimate(sel: np.ndarray):
+        a, b, ab = fa[sel], fb[sel], fab[:, sel]
+        # ตัวประมาณ S1 ใช้ค่า y ตรงๆ → ลบค่าเฉลี่ยก่อน ไม่งั้นผลขึ้นกับระดับของ y (ไม่ใช่แค่ความแปรปรวน)
+        pooled = np.concatenate([a, b])
+        center = pooled.mean(axis=0)
+        a, b, ab = a - center, b - center, ab - center
+        var = pooled.var(axis=0)
+        safe = np.where(var > 0, var, 1.0)
+        s1 = (b[None] * (ab - a[None])).mean(axis=1) / safe
+        st = 0.5 * ((a[None] - ab) ** 2).mean(axis=1) / safe
+        zero = var <= 0
+        return np.where(zero, 0.0, s1), np.where(zero, 0.0, st)
+
+    s1, st = estimate(np.arange(n))
+    boot = rng.integers(0, n, size=(bootstrap, n))
+    s1_b, st_b = zip(*(estimate(sel) for sel in boot))
+    return {
+        "s1": s1,
+        "s1_conf": 1.96 * np.std(s1_b, axis=0, ddof=1),
+        "st": st,
+        "st_conf": 1.96 * np.std(st_b, axis=0, ddof=1),
+    }
@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import Dict, List, Any
+import numpy as np
+
+# ระดับการรวมข้อมูลรายวันที่รองรับสำหรับกราฟ
+RESOLUTIONS = ("day", "week", "month")
+
+# คอลัมน์ที่ใช้ผลรวมต่อช่วง (flow) / ค่าสต็อก (level)
+SUM_FIELDS = ("demand", "sales", "revenue", "lost_sales", "stockout")
+LEVEL_FIELD = "stock_after"
+
+
+def period_codes(start_date: datetime, days: np.ndarray, resolution: str) -> np.ndarray:
+    """รหัสช่วงเวลาของแต่ละวันจำลอง (ค่าเพิ่มขึ้นตามเวลา, วันในช่วงเดียวกันได้ค่าเดียวกัน)"""
+    dates = np.datetime64(start_date.date(), "D") + days.astype("timedelta64[D]")
+    if resolution == "day":
+        return dates.astype("int64")
+    if resolution == "week":
+        # epoch 1970-01-01 เป็นวันพฤหัส → +3 ให้สัปดาห์เริ่มวันจันทร์
+        return (dates.astype("int64") + 3) // 7
+    return dates.astype("datetime64[M]").astype("int64")
+
+
+def aggregate_series(
+    arrays: Dict[str, np.ndarray],
+    start_date: datetime,
+    resolution: str
+) -> Dict[str, np.ndarray]:
+    """รวม array รายวัน (เรียงตาม day) เป็นรายช่วงด้วย reduceat ครั้งเดียวต่อคอลัมน์
+
+    flow (demand/sales/...) ใช้ผลรวม, สต็อกคืนทั้งค่าเฉลี่ยและค่าปิดช่วง
+    """
+    days = arrays["day"]
+    if len(days) == 0:
+        return {k: np.empty(0) for k in ("day", "days", *SUM_FIELDS, "avg_stock", LEVEL_FIELD)}
+
+    codes = period_codes(start_date, days, resolution)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+    ends = np.append(starts[1:], len(days))
+    counts = ends - starts
+
+    out: Dict[str, np.ndarray] = {
+        "day": days[starts],
+        "days": counts,
+    }
+    for f in SUM_FIELDS:
+        out[f] = np.add.reduceat(arrays[f], starts)
+    stock = arrays[LEVEL_FIELD]
+    out["avg_stock"] = np.add.reduceat(stock.astype("float64"), starts) / counts
+    out[LEVEL_FIELD] = stock[ends - 1]
+    return out
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: เลือก index ที่คงรูปกราฟไว้ไม่เกิน max_points จุด
+
+    จุดแรก/สุดท้ายเก็บเสมอ ที่เหลือแบ่งเป็น max_points - 2 bucket แล้วเลือกจุดที่
+    สร้างสามเหลี่ยมใหญ่สุดกับจุดที่เลือกก่อนหน้าและค่าเฉลี่ยของ bucket ถัดไป
+    พื้นที่ทั้ง bucket คำนวณแบบ vectorized จึงวนแค่จำนวน bucket (= ขนาด output)
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = x.astype("float64")
+    y = y.astype("float64")
+    # ขอบ bucket ของจุดกลาง (1 .. n-2)
+    edges = np.linspace(1, n - 1, max_points - 1).astype("int64")
+    # ค่าเฉลี่ยของแต่ละ bucket (ใช้เป็นจุด C ของ bucket ก่อนหน้า) + จุดสุดท้าย
+    sums_x = np.add.reduceat(x[:n - 1], edges[:-1])
+    sums_y = np.add.reduceat(y[:n - 1], edges[:-1])
+    widths = np.diff(edges)
+    avg_x = np.append(sums_x / widths, x[-1])
+    avg_y = np.append(sums_y / widths, y[-1])
+
+    selected = np.empty(max_points, dtype="int64")
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def build_series(
+    brand: str,
+    arrays: Dict[str, np.ndarray],
+    start_date: datetime,
+    resolution: str,
+    max_points: int | None = None
+) -> List[Dict[str, Any]]:
+    """series สำหรับกราฟของแบรนด์เดียว: รวมตาม resolution แล้ว LTTB (ตามระดับสต็อก) ถ้าเกิน max_points"""
+    agg = aggregate_series(arrays, start_date, resolution)
+    idx = np.arange(len(agg["day"]))
+    if max_points and len(idx) > max_points:
+        idx = lttb_indices(agg["day"], agg[LEVEL_FIELD], max_points)
+
+    base = np.datetime64(start_date.date(), "D")
+    rows: List[Dict[str, Any]] = []
+    for i in idx:
+        day = int(agg["day"][i])
+        rows.append({
+            "brand": brand,
+            "day": day,
+            "date": str(base + np.timedelta64(day, "D")),
+            "days": int(agg["days"][i]),
+            "demand": int(agg["demand"][i]),
+            "sales": int(agg["sales"][i]),
+            "revenue": float(agg["revenue"][i]),
+            "lost_sales": int(agg["lost_sales"][i]),
+            "stockout_days": int(agg["stockout"][i]),
+            "avg_stock": float(agg["avg_stock"][i]),
+            "stock_after": int(agg[LEVEL_FIELD][i]),
+        })
+    return rows
@@ -0,0 +1,65 @@
+import math
+from statistics import NormalDist
+from typing import Dict
+
+import numpy as np
+
+
+def t_cdf(t: float, df: int) -> float:
+    """CDF ของ Student's t สำหรับ df จำนวนเต็ม (สูตรอนุกรมจำกัดของ Abramowitz & Stegun 26.7)"""
+    theta = math.atan(t / math.sqrt(df))
+    c2 = math.cos(theta) ** 2
+    if df % 2 == 1:
+        term, acc = 1.0, 1.0
+        for k in range(1, (df - 1) // 2):
+            term *= c2 * (2 * k) / (2 * k + 1)
+            acc += term
+        a = 2 / math.pi * (theta + (math.sin(theta) * math.cos(theta) * acc if df > 1 else 0.0))
+    else:
+        term, acc = 1.0, 1.0
+        for k in range(1, df // 2):
+            term *= c2 * (2 * k - 1) / (2 * k)
+            acc += term
+        a = math.sin(theta) * acc
+    return 0.5 + a / 2
+
+
+def t_quantile(p: float, df: int) -> float:
+    """quantile ของ Student's t (ไม่พึ่ง scipy)
+
+    เริ่มจาก Cornish-Fisher expansion รอบ normal แล้ว Newton บน t_cdf ที่แม่นยำ
+    """
+    if df <= 0:
+        raise ValueError("df must be >= 1")
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    z2 = z * z
+    g1 = (z2 + 1) * z / 4
+    g2 = ((5 * z2 + 16) * z2 + 3) * z / 96
+    g3 = (((3 * z2 + 19) * z2 + 17) * z2 - 15) * z / 384
+    g4 = ((((79 * z2 + 776) * z2 + 1482) * z2 - 1920) * z2 - 945) * z / 92160
+    t = z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+    log_norm = math.lgamma((df + 1) / 2) - math.lgamma(df / 2) - 0.5 * math.log(df * math.pi)
+    for _ in range(4):
+        pdf = math.exp(log_norm - (df + 1) / 2 * math.log1p(t * t / df))
+        step = (t_cdf(t, df) - p) / pdf
+        t -= step
+        if abs(step) < 1e-12:
+            break
+    return t
+
+
+def mean_ci(samples: np.ndarray, confidence: float = 0.95) -> Dict[str, np.ndarray]:
+    """ค่าเฉลี่ย + ช่วงความเชื่อมั่นแบบ t ต่อแถวสุดท้าย (samples รูป (..., n))"""
+    samples = np.asarray(samples, dtype="float64")
+    n = samples.shape[-1]
+    mean = samples.mean(axis=-1)
+    if n < 2:
+        return {"mean": mean, "half_width": np.zeros_like(mean), "std": np.zeros_like(mean)}
+    std = samples.std(axis=-1, ddof=1)
+    half = t_quantile(0.5 + confidence / 2, n - 1) * std / math.sqrt(n)
+    return {"mean": mean, "half_width": half, "std": std}
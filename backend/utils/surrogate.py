@@ -0,0 +1,125 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class GradientBoostedTrees:
+    """gradient boosting (squared loss) ของ tree ลึกคงที่ แบบ histogram — numpy ล้วน หลาย target พร้อมกัน
+
+    feature ถูกแบ่งเป็น bin ตาม quantile ครั้งเดียว แต่ละ tree เป็น binary tree สมบูรณ์ลึก depth
+    (node ที่แบ่งไม่ได้ส่งทุกตัวอย่างไปทางซ้าย) หา split ของทุก node ในชั้นเดียวกันพร้อมกันจาก
+    histogram ของ residual (bincount) split เลือกจาก gain รวมทุก target (ที่ standardize แล้ว)
+    tree เก็บเป็น array (trees, nodes) จึง predict ทุก tree พร้อมกันด้วย depth ขั้นของ array op
+    """
+
+    def __init__(
+        self,
+        n_trees: int = 300,
+        depth: int = 4,
+        learning_rate: float = 0.1,
+        min_leaf: int = 8,
+        bins: int = 32,
+        l2: float = 1.0
+    ):
+        self.n_trees = n_trees
+        self.depth = depth
+        self.learning_rate = learning_rate
+        self.min_leaf = min_leaf
+        self.bins = bins
+        self.l2 = l2
+        self.y_mean: Optional[np.ndarray] = None
+        self.y_scale: Optional[np.ndarray] = None
+        self.feature: Optional[np.ndarray] = None     # (trees, internal nodes)
+        self.threshold: Optional[np.ndarray] = None   # (trees, internal nodes) ไปขวาเมื่อ x >= threshold
+        self.leaf: Optional[np.ndarray] = None        # (trees, leaves, targets)
+
+    def fit(self, x: np.ndarray, y: np.ndarray, weights: Optional[np.ndarray] = None) -> "GradientBoostedTrees":
+        x = np.asarray(x, dtype="float64")
+        y = np.asarray(y, dtype="float64")
+        n, k = x.shape
+        w = np.ones(n) if weights is None else np.asarray(weights, dtype="float64")
+
+        self.y_mean = np.average(y, axis=0, weights=w)
+        scale = y.std(axis=0)
+        self.y_scale = np.where(scale > 0, scale, 1.0)
+        resid = (y - self.y_mean) / self.y_scale
+        targets = y.shape[1]
+
+        # จุดตัด bin ต่อ feature (quantile ไม่ซ้ำ) → bin index 0..len(edges)
+        edges = [np.unique(np.quantile(x[:, f], np.linspace(0, 1, self.bins + 1)[1:-1])) for f in range(k)]
+        xb = np.stack([np.searchsorted(edges[f], x[:, f], side="right") for f in range(k)], axis=1)
+        B = self.bins
+
+        internal, leaves = 2 ** self.depth - 1, 2 ** self.depth
+        self.feature = np.zeros((self.n_trees, internal), dtype="int64")
+        self.threshold = np.full((self.n_trees, internal), np.inf)
+        self.leaf = np.zeros((self.n_trees, leaves, targets))
+        wr = resid * w[:, None]
+
+        for t in range(self.n_trees):
+            node = np.zeros(n, dtype="int64")
+            for level in range(self.depth):
+                width = 2 ** level
+                first = width - 1
+                best_gain = np.zeros(width)
+                best_f = np.full(width, -1)
+                best_b = np.zeros(width, dtype="int64")
+                for f in range(k):
+                    idx = node * B + xb[:, f]
+                    cnt = np.bincount(idx, weights=w, minlength=width * B).reshape(width, B)
+                    g = np.stack([
+                        np.bincount(idx, weights=wr[:, j], minlength=width * B) for j in range(targets)
+                    ], axis=-1).reshape(width, B, targets)
+                    cl, gl = np.cumsum(cnt, axis=1)[:, :-1], np.cumsum(g, axis=1)[:, :-1]
+                    ct, gt = cnt.sum(axis=1, keepdims=True), g.sum(axis=1, keepdims=True)
+                    cr, gr = ct - cl, gt - gl
+                    gain = ((gl ** 2).sum(-1) / (cl + self.l2) + (gr ** 2).sum(-1) / (cr + self.l2)
+                            - (gt ** 2).sum(-1) / (ct + self.l2))
+                    gain = np.where((cl >= self.min_leaf) & (cr >= self.min_leaf), gain, 0.0)
+                    b = gain.argmax(axis=1)
+                    g_best = gain[np.arange(width), b]
+                    better = g_best > best_gain
+                    best_gain[better], best_f[better], best_b[better] = g_best[better], f, b[better]
+                for j in np.flatnonzero(best_f >= 0):
+                    f = best_f[j]
+                    self.feature[t, first + j] = f
+                    self.threshold[t, first + j] = edges[f][best_b[j]]
+                split = best_f[node] >= 0
+                right = split & (xb[np.arange(n), np.maximum(best_f[node], 0)] > best_b[node])
+                node = 2 * node + right
+
+            cnt = np.bincount(node, weights=w, minlength=leaves)
+            g = np.stack([np.bincount(node, weights=wr[:, j], minlength=leaves) for j in range(targets)], axis=-1)
+            value = self.learning_rate * g / (cnt + self.l2)[:, None]
+            self.leaf[t] = value
+            resid = resid - value[node]
+            wr = resid * w[:, None]
+        return self
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        x = np.atleast_2d(np.asarray(x, dtype="float64"))
+        trees = np.arange(self.n_trees)[None, :]
+        rows = np.arange(len(x))[:, None]
+        node = np.zeros((len(x), self.n_trees), dtype="int64")
+        for _ in range(self.depth):
+            f = self.feature[trees, node]
+            node = 2 * node + 1 + (x[rows, f] >= self.threshold[trees, node])
+        leaf = node - (2 ** self.depth - 1)
+        out = self.leaf[trees, leaf].sum(axis=1)
+        return self.y_mean + out * self.y_scale
+
+
+def fit_with_holdout(
+    model, x: np.ndarray, y: np.ndarray, weights: Optional[np.ndarray], rng: np.random.Generator, fraction: float = 0.2
+) -> Tuple[object, np.ndarray]:
+    """fit จากตัวอย่าง (1 - fraction) แล้วคืน (model, R² ต่อ target บนส่วนที่กันไว้)
+
+    ใช้ model ตัวนี้ตอบจริง (ไม่ fit ซ้ำทั้งชุด) ค่า R² จึงเป็นคุณภาพของ model ที่ใช้อยู่
+    """
+    n = len(x)
+    test = rng.permutation(n)[:max(1, int(n * fraction))]
+    train = np.setdiff1d(np.arange(n), test)
+    model.fit(x[train], y[train], None if weights is None else weights[train])
+    resid = y[test] - model.predict(x[test])
+    var = y[test].var(axis=0)
+    return model, np.where(var > 0, 1 - (resid ** 2).mean(axis=0) / np.where(var > 0, var, 1.0), 1.0)